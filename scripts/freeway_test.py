@@ -6,6 +6,7 @@ import hydra
 from hydra.conf import ConfigStore
 from omegaconf import OmegaConf
 from umich_sim.sim_config import ConfigPool, Config, WizardConfig
+from umich_sim.sim_backend.scenario import read_current_plan, write_plan
 import pygame
 
 # Sample configuration dictionary
@@ -51,8 +52,15 @@ def main(config: Config) -> None:
     # Initialize the Pygame display
     experiment.init()
 
-    # Set up the experiment
-    experiment.initialize_experiment(configuration_dictionary)
+    # Set up the experiment, from the compiled plan if it was compiled from this configuration
+    plan = read_current_plan(config.scenario_plan, configuration_dictionary) if config.scenario_plan else None
+    if plan is not None:
+        experiment.initialize_experiment(plan)
+    else:
+        experiment.initialize_experiment(configuration_dictionary)
+        if config.scenario_plan:
+            print(f"compiling the scenario into {config.scenario_plan}")
+            write_plan(experiment.capture_plan(), config.scenario_plan)
 
     # Start the main simulation loop
     try:
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Sweep controller gains, target distances and light timings over a pool of CARLA servers.
+
+Start one CARLA server per port in CARLA_PORTS before running the script, or set
+USE_LOCAL_SIMULATOR to try the sweep without any server.
+"""
+
+from functools import partial
+from umich_sim.sweep import ParameterGrid, SweepOrchestrator, carla_trial, local_trial
+from umich_sim.base_logger import logger
+from intersection_test import configuration_dictionary
+
+# Ports of the CARLA servers, one worker process is bound to each of them
+CARLA_PORTS = [2000, 2002, 2004]
+# Run against the built-in local simulator instead of CARLA servers
+USE_LOCAL_SIMULATOR = False
+# Where the result table is written
+RESULT_FILE = "sweep_results.csv"
+
+parameter_grid = ParameterGrid({
+    "target_distance": [5.0, 10.0, 15.0],
+    "distance_pid": [(0.5, 0.02, 0.3), (0.8, 0.02, 0.3)],
+    "green_time": [8.0, 10.0, 12.0],
+    "yellow_time": 3.0,
+})
+
+
+def main() -> None:
+    logger.basicConfig(format="%(asctime)s [%(levelname)s] : %(message)s",
+                       level=logger.INFO)
+    if USE_LOCAL_SIMULATOR:
+        trial = local_trial
+        tasks_per_worker = None
+    else:
+        trial = partial(carla_trial,
+                        configuration=configuration_dictionary,
+                        experiment_type="intersection",
+                        ticks=1800)
+        # an experiment runs once per process
+        tasks_per_worker = 1
+
+    orchestrator = SweepOrchestrator(trial, CARLA_PORTS, max_retries=2, run_timeout=600.0,
+                                     tasks_per_worker=tasks_per_worker)
+    results = orchestrator.run(parameter_grid)
+    results.to_csv(RESULT_FILE)
+    logger.info("%d runs written to %s, %d failed", len(results), RESULT_FILE,
+                len(results.failed()))
+
+
+if __name__ == "__main__":
+    main()
@@ -46,13 +46,12 @@ def game_loop(config: Config) -> None:
                 break
 
             clock.tick_busy_loop(config.client_frame_rate)
+            # Drain the pygame event queue once per frame, the keys pressed apply this frame
+            # See: https://www.pygame.org/docs/ref/event.html#pygame.event.get
+            controller.pump_events()
             controller.tick()
             hud.tick(clock)
             world.render(display)
-
-            # Do you call the event queue every tick? If not pygame may become unresponsive.
-            # See: https://www.pygame.org/docs/ref/event.html#pygame.event.pump
-            pygame.event.pump()
             pygame.display.flip()
 
     finally:
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Load test of the wizard server
+
+Simulates pairs of ego and wizard clients ticking at a fixed rate against a wizard server and reports
+the round-trip latency of every call. Every tick the ego client reads the state with get_state and
+uploads its wheel position while it drives, the wizard client reads the state and uploads its wheel
+position while it drives, and hands the car over every --switch seconds. Every pair runs in its own
+process so the clients do not share an interpreter lock.
+
+    python scripts/wizard_load_test.py --pairs 8 --duration 10             # against a local server
+    python scripts/wizard_load_test.py --pairs 8 --addr 10.0.0.2 --no-spawn  # against a running one
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import msgpackrpc
+import numpy as np
+
+EGO, WIZARD = 0, 1
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def run_client(role: int, addr: str, port: int, rate: float, duration: float, switch: float,
+               start_at: float, latencies: Dict[str, List[float]], overruns: List[int]) -> None:
+    """
+    Tick a client at a fixed rate and record the latency of every call
+    :param role: EGO or WIZARD
+    :param start_at: time.time() of the first tick, shared by every client
+    :param latencies: receives the latencies in seconds per method
+    :param overruns: receives the number of ticks that took longer than the tick period
+    """
+    client = msgpackrpc.Client(msgpackrpc.Address(addr, port), timeout=10)
+
+    def call(method: str, *args):
+        t0 = time.perf_counter()
+        result = client.call(method, *args)
+        latencies.setdefault(method, []).append(time.perf_counter() - t0)
+        return result
+
+    period = 1.0 / rate
+    ticks = int(duration * rate)
+    next_switch = switch
+    overrun = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    start = time.perf_counter()
+    for tick in range(ticks):
+        deadline = start + tick * period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        _, driver, _ = call("get_state")
+        if driver == role:
+            call("set_wheel", math.sin(tick * period))
+        if role == WIZARD and switch > 0 and tick * period >= next_switch:
+            call("set_driver", EGO if driver == WIZARD else WIZARD)
+            next_switch += switch
+        if time.perf_counter() - deadline > period:
+            overrun += 1
+    client.close()
+    overruns.append(overrun)
+
+
+def run_pair(addr: str, port: int, rate: float, duration: float, switch: float, start_at: float,
+             results: "multiprocessing.Queue") -> None:
+    """run an ego and a wizard client on two threads and send their measurements back"""
+    # every client records into its own dictionary, merged once both are done
+    recorded: List[Dict[str, List[float]]] = [{}, {}]
+    overruns: List[int] = []
+    clients = [threading.Thread(target=run_client,
+                                args=(role, addr, port, rate, duration, switch, start_at,
+                                      recorded[role], overruns))
+               for role in (EGO, WIZARD)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    latencies: Dict[str, List[float]] = {}
+    for client_latencies in recorded:
+        for method, values in client_latencies.items():
+            latencies.setdefault(method, []).extend(values)
+    results.put((latencies, sum(overruns)))
+
+
+def summarize(latencies: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """count, percentiles and maximum in milliseconds of every method and of all of them"""
+    summary = {}
+    everything = [value for values in latencies.values() for value in values]
+    for method, values in sorted(latencies.items()) + [("all", everything)]:
+        if not values:
+            continue
+        values = np.array(values) * 1e3
+        summary[method] = {"count": len(values), "mean": float(values.mean()), "max": float(values.max())}
+        for p in PERCENTILES:
+            summary[method][f"p{p:g}"] = float(np.percentile(values, p))
+    return summary
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server(addr: str, port: int, timeout: float = 10.0) -> None:
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with socket.create_connection((addr, port), timeout=0.5):
+                return
+        except OSError:
+            if time.time() > deadline:
+                raise Exception(f"Error: no wizard server on {addr}:{port}")
+            time.sleep(0.1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=4, help="number of ego/wizard client pairs")
+    parser.add_argument("--rate", type=float, default=60.0, help="ticks per second of every client")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--switch", type=float, default=2.0,
+                        help="seconds between two hand-overs by the wizard, 0 never hands over")
+    parser.add_argument("--addr", default="127.0.0.1", help="address of the server")
+    parser.add_argument("--port", type=int, default=None,
+                        help="port of the server, a free port when spawning the server")
+    parser.add_argument("--no-spawn", action="store_true",
+                        help="use a running server instead of spawning one")
+    parser.add_argument("-o", "--output", default=None, help="JSON file receiving the summary")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if not args.no_spawn:
+        port = port or free_port()
+        server = subprocess.Popen([sys.executable, "-m", "umich_sim.wizard.server",
+                                   "--host", args.addr, "--port", str(port)],
+                                  stdout=subprocess.DEVNULL)
+    elif port is None:
+        port = 2003
+    try:
+        wait_for_server(args.addr, port)
+        results = multiprocessing.Queue()
+        start_at = time.time() + 0.5 + 0.05 * args.pairs
+        pairs = [multiprocessing.Process(target=run_pair,
+                                         args=(args.addr, port, args.rate, args.duration, args.switch,
+                                               start_at, results))
+                 for _ in range(args.pairs)]
+        for pair in pairs:
+            pair.start()
+        latencies: Dict[str, List[float]] = {}
+        overruns = 0
+        for _ in pairs:
+            pair_latencies, pair_overruns = results.get()
+            overruns += pair_overruns
+            for method, values in pair_latencies.items():
+                latencies.setdefault(method, []).extend(values)
+        for pair in pairs:
+            pair.join()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(latencies)
+    ticks = 2 * args.pairs * int(args.duration * args.rate)
+    print(f"{args.pairs} pairs at {args.rate:g} Hz for {args.duration:g} s, "
+          f"{overruns} of {ticks} client ticks overran their period")
+    columns = ["count", "mean"] + [f"p{p:g}" for p in PERCENTILES] + ["max"]
+    print(f"{'method':<12}" + "".join(f"{c:>10}" for c in columns) + "   (ms)")
+    for method, row in summary.items():
+        print(f"{method:<12}{row['count']:>10d}" + "".join(f"{row[c]:>10.3f}" for c in columns[1:]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"pairs": args.pairs, "rate": args.rate, "duration": args.duration,
+                       "overruns": overruns, "ticks": ticks, "latency_ms": summary}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
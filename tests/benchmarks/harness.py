@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness: registry, timing, scaling curve JSON output and baseline comparison
+"""
+
+import datetime
+import gc
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Version of the JSON layout written by run_suite
+SCHEMA_VERSION = 1
+
+# A case builds its inputs for a given size outside of the timed region and returns the
+# zero-argument callable that is timed
+Case = Callable[[int], Callable[[], Any]]
+
+
+class Benchmark:
+    """
+    A benchmarked function measured at several sizes of its input
+    """
+
+    def __init__(self, name: str, case: Case, parameter: str, sizes: Tuple[int, ...]):
+        self.name: str = name
+        self.case: Case = case
+        self.parameter: str = parameter
+        self.sizes: Tuple[int, ...] = sizes
+
+
+_registry: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, parameter: str, sizes: Iterable[int]) -> Callable[[Case], Case]:
+    """
+    Register a benchmark case
+    :param name: name of the benchmark, used as key in the JSON output
+    :param parameter: what the size of the case stands for (e.g. "vehicles")
+    :param sizes: sizes the case is measured at, they make up the scaling curve
+    """
+    def decorator(case: Case) -> Case:
+        if name in _registry:
+            raise Exception(f"Error: benchmark {name!r} registered twice")
+        _registry[name] = Benchmark(name, case, parameter, tuple(sizes))
+        return case
+    return decorator
+
+
+def registered() -> List[Benchmark]:
+    return list(_registry.values())
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.05) -> Dict[str, float]:
+    """
+    Time a callable like timeit: the number of calls per repeat is calibrated so a repeat lasts at
+    least min_time, and the garbage collector is disabled while timing
+    :param func: the callable to time
+    :param repeat: number of timed repeats
+    :param min_time: minimal duration of a repeat, in seconds
+    :return: statistics of the time per call, in seconds
+    """
+    number = 1
+    while True:
+        elapsed = _time(func, number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    timings = [_time(func, number) / number for _ in range(repeat)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "stdev": statistics.stdev(timings) if repeat > 1 else 0.0,
+    }
+
+
+def _time(func: Callable[[], Any], number: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def new_results() -> Dict[str, Any]:
+    """:return: results without any benchmark, describing the environment of the run"""
+    import numpy as np
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "numpy": np.__version__,
+        },
+        "benchmarks": {},
+    }
+
+
+def run_suite(selection: Optional[str] = None, repeat: int = 5, min_time: float = 0.05,
+              log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    Run the registered benchmarks
+    :param selection: only run the benchmarks whose name contains this string
+    :param repeat: number of timed repeats of every point
+    :param min_time: minimal duration of a repeat, in seconds
+    :param log: function receiving one progress line per point
+    :return: the results, one scaling curve per benchmark
+    """
+    results = new_results()
+    for bench in registered():
+        if selection is not None and selection not in bench.name:
+            continue
+        points = []
+        for size in bench.sizes:
+            func = bench.case(size)
+            point = {"size": size}
+            point.update(measure(func, repeat, min_time))
+            points.append(point)
+            log(f"{bench.name:<36} {bench.parameter}={size:<6} median {_format(point['median'])}")
+        results["benchmarks"][bench.name] = {"parameter": bench.parameter, "points": points}
+    return results
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.25,
+            statistic: str = "median") -> List[Dict[str, Any]]:
+    """
+    Compare two result files point by point
+    :param baseline: results of the reference run
+    :param current: results of the run under test
+    :param threshold: relative slowdown above which a point counts as a regression
+    :param statistic: statistic of the points that is compared
+    :return: one row per point present in both runs, with its ratio and status
+                ("regression", "improvement" or "ok")
+    """
+    rows = []
+    for name, curve in current["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        reference = {point["size"]: point for point in baseline["benchmarks"][name]["points"]}
+        for point in curve["points"]:
+            if point["size"] not in reference:
+                continue
+            before, after = reference[point["size"]][statistic], point[statistic]
+            ratio = after / before if before > 0 else float("inf")
+            if ratio > 1 + threshold:
+                status = "regression"
+            elif ratio < 1 / (1 + threshold):
+                status = "improvement"
+            else:
+                status = "ok"
+            rows.append({"benchmark": name, "parameter": curve["parameter"], "size": point["size"],
+                         "baseline": before, "current": after, "ratio": ratio, "status": status})
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """:return: the rows returned by compare as a text table"""
+    lines = [f"{'benchmark':<36} {'size':>8} {'baseline':>12} {'current':>12} {'ratio':>7}  status"]
+    for row in rows:
+        lines.append(f"{row['benchmark']:<36} {row['size']:>8} {_format(row['baseline']):>12} "
+                     f"{_format(row['current']):>12} {row['ratio']:>7.2f}  {row['status']}")
+    return "\n".join(lines)
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Import time of the umich_sim packages
+
+Every module is imported in a fresh interpreter, several times, and the time of the import statement
+is recorded along with the heavy dependencies it loaded. A module loading a dependency it must not
+load (e.g. pygame for umich_sim.sim_config) fails the run. The results use the layout of
+run_benchmarks.py, so its compare command flags import time regressions:
+
+    python import_time.py run -o imports.json               # with the carla module installed
+    python import_time.py run --stand-in -o imports.json    # with the kinematic stand-in instead
+    python run_benchmarks.py compare baseline_imports.json imports.json --threshold 0.5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List
+
+import harness
+
+# Dependencies that are slow to import or only needed by some entry points
+HEAVY = frozenset({"carla", "pygame", "PyQt5", "simple_pid", "hydra", "omegaconf", "evdev", "msgpackrpc"})
+# Interactive front ends, loaded only by the code that opens a window, reads a wheel or talks to the
+# wizard server
+FRONT_ENDS = frozenset({"pygame", "PyQt5", "hydra", "omegaconf", "evdev", "msgpackrpc"})
+
+# Modules measured, with the dependencies they must not load
+TARGETS: Dict[str, FrozenSet[str]] = {
+    "umich_sim": HEAVY,
+    "umich_sim.sim_config": HEAVY,
+    "umich_sim.wizard": HEAVY,
+    "umich_sim.wizard.inputs": HEAVY,
+    "umich_sim.sweep": HEAVY,
+    "umich_sim.sim_backend.carla_modules": HEAVY,
+    "umich_sim.sim_backend.experiments": HEAVY,
+    "umich_sim.sim_backend.carla_modules.lane_index": FRONT_ENDS | {"simple_pid"},
+    "umich_sim.sim_backend.carla_modules.ego_vehicle": FRONT_ENDS,
+    "umich_sim.sim_backend.experiments.intersection_experiment": FRONT_ENDS,
+    "umich_sim.sim_backend.experiments.freeway_experiment": FRONT_ENDS,
+}
+
+# Runs in the fresh interpreter: imports the module and prints the time and the new top level modules
+PROBE = """
+import json, sys, time
+if sys.argv[2] == "1":
+    from umich_sim import kinematic_carla
+    kinematic_carla.install()
+before = set(sys.modules)
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+loaded = sorted({name.split(".")[0] for name in set(sys.modules) - before})
+print(json.dumps({"seconds": elapsed, "loaded": loaded}))
+"""
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def probe(module: str, stand_in: bool) -> Dict[str, Any]:
+    """import a module in a fresh interpreter, returns the time and the top level modules it loaded"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    # pygame prints a banner when imported
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    result = subprocess.run([sys.executable, "-c", PROBE, module, "1" if stand_in else "0"],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Error: importing {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(repeat: int, stand_in: bool) -> Dict[str, Any]:
+    results = harness.new_results()
+    results["violations"] = {}
+    for module, forbidden in TARGETS.items():
+        samples = [probe(module, stand_in) for _ in range(repeat)]
+        timings = [sample["seconds"] for sample in samples]
+        loaded = sorted(set(samples[0]["loaded"]) & HEAVY)
+        results["benchmarks"][f"import {module}"] = {"parameter": "imports", "points": [{
+            "size": 1,
+            "number": 1,
+            "repeat": repeat,
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.mean(timings),
+            "stdev": statistics.stdev(timings) if repeat > 1 else 0.0,
+            "loaded": loaded,
+        }]}
+        violations = sorted(set(loaded) & forbidden)
+        if violations:
+            results["violations"][module] = violations
+        print(f"{module:<60} median {statistics.median(timings) * 1e3:8.1f} ms  "
+              f"{', '.join(loaded) or '-'}{'  FORBIDDEN: ' + ', '.join(violations) if violations else ''}")
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="measure the import times")
+    run_parser.add_argument("-o", "--output", default="import_results.json",
+                            help="JSON file receiving the results")
+    run_parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    run_parser.add_argument("--stand-in", action="store_true",
+                            help="install the kinematic carla stand-in before importing")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.stand_in)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.output}")
+    violations: List[str] = [f"{module} loads {', '.join(names)}"
+                             for module, names in results["violations"].items()]
+    if violations:
+        print("\n".join(violations))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite of the sim_backend hot paths, runs on the kinematic CARLA stand-in
+
+    python run_benchmarks.py run -o results.json            # measure the scaling curves
+    python run_benchmarks.py run -k tick -o tick.json       # only the benchmarks matching "tick"
+    python run_benchmarks.py compare baseline.json results.json --threshold 0.25
+
+compare exits with status 1 when a point of the current run is slower than the baseline by
+more than the threshold, so it can gate CI.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# The cases import umich_sim, run from this directory it is found at the root of the repository
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import harness  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write the scaling curves")
+    run_parser.add_argument("-o", "--output", default="benchmark_results.json",
+                            help="JSON file receiving the results")
+    run_parser.add_argument("-k", "--select", default=None,
+                            help="only run the benchmarks whose name contains this string")
+    run_parser.add_argument("--repeat", type=int, default=5, help="timed repeats per point")
+    run_parser.add_argument("--min-time", type=float, default=0.05,
+                            help="minimal duration of a repeat, in seconds")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("baseline", help="JSON results of the reference run")
+    compare_parser.add_argument("current", help="JSON results of the run under test")
+    compare_parser.add_argument("--threshold", type=float, default=0.25,
+                                help="relative slowdown counted as a regression")
+    compare_parser.add_argument("--statistic", default="median", choices=("min", "median", "mean"),
+                                help="statistic of the points that is compared")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        # registers the cases
+        import sim_backend_cases  # noqa: F401
+
+        results = harness.run_suite(args.select, args.repeat, args.min_time)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = harness.compare(baseline, current, args.threshold, args.statistic)
+    print(harness.format_comparison(rows))
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
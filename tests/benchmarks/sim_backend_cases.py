@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Benchmark cases of the sim_backend hot paths
+
+Every case runs against the kinematic CARLA stand-in on a synthetic grid map, with all random
+choices seeded, so two runs of the suite measure exactly the same work.
+"""
+
+import math
+import random
+import tempfile
+from typing import Callable, Dict, List, Tuple
+
+from umich_sim import kinematic_carla
+
+carla = kinematic_carla.install()
+
+from umich_sim.sim_config import ConfigPool, Config  # noqa: E402
+from umich_sim.sim_backend.carla_modules import Vehicle  # noqa: E402
+from umich_sim.sim_backend.experiments import IntersectionExperiment  # noqa: E402
+from umich_sim.sim_backend.helpers import VehicleType, smooth_path  # noqa: E402
+from umich_sim.sim_backend.reachability import LaneGraph, Reachability  # noqa: E402
+from umich_sim.sim_backend.replay import RecordedTrajectories  # noqa: E402
+from umich_sim.sim_backend.sections import Intersection, Section  # noqa: E402
+from umich_sim.sim_backend.telemetry import TelemetryRecorder  # noqa: E402
+from umich_sim.sim_backend.vehicle_control import VehicleController  # noqa: E402
+from umich_sim.sim_backend.vehicle_control.base_controller import WAYPOINT_SEPARATION  # noqa: E402
+
+from harness import benchmark  # noqa: E402
+
+# Seed of every random choice made by the cases
+SEED = 1234
+# Port of the stand-in server used by the cases
+BENCHMARK_PORT = 2000
+# Junctions per row of the benchmark grids and distance between them
+GRID_COLUMNS = 6
+BLOCK_LENGTH = 100.0
+VEHICLE_BLUEPRINT = "vehicle.tesla.model3"
+# Frames recorded for the replay benchmark, the replay starts over once they are played
+REPLAY_FRAMES = 120
+
+ConfigPool.load_config(Config())
+
+
+def _load_grid(rows: int, lanes_per_direction: int = 2) -> carla.World:
+    """Load a fresh benchmark grid on the stand-in server"""
+    name = f"BenchmarkGrid{rows}x{GRID_COLUMNS}x{lanes_per_direction}"
+    if name not in kinematic_carla.available_maps():
+        kinematic_carla.register_map(name, kinematic_carla.grid_lane_graph(
+            rows=rows, cols=GRID_COLUMNS, block_length=BLOCK_LENGTH,
+            lanes_per_direction=lanes_per_direction, name=name))
+    world = carla.Client("127.0.0.1", BENCHMARK_PORT).load_world(name)
+    settings = world.get_settings()
+    settings.fixed_delta_seconds = 1 / 60
+    world.apply_settings(settings)
+    return world
+
+
+def _junctions(carla_map: carla.Map) -> Dict[int, carla.Junction]:
+    """Collect the junctions of the map like Experiment.init does"""
+    junctions = {}
+    for waypoint in carla_map.generate_waypoints(WAYPOINT_SEPARATION):
+        if waypoint.is_junction and waypoint.get_junction().id not in junctions:
+            junctions[waypoint.get_junction().id] = waypoint.get_junction()
+    return junctions
+
+
+def _eastbound_spawn_points(carla_map: carla.Map, row: int) -> List[carla.Transform]:
+    """Spawn points heading east on the given row of the grid, west of its last junction"""
+    y_min, y_max = row * BLOCK_LENGTH, row * BLOCK_LENGTH + BLOCK_LENGTH / 4
+    last_junction_x = (GRID_COLUMNS - 1) * BLOCK_LENGTH
+    return sorted(
+        (t for t in carla_map.get_spawn_points()
+         if abs(t.rotation.yaw) < 1.0 and y_min < t.location.y < y_max
+         and t.location.x < last_junction_x - 20.0),
+        key=lambda t: (t.location.x, t.location.y))
+
+
+def _route(waypoint: carla.Waypoint, count: int, spacing: float) -> List[carla.Waypoint]:
+    """Follow the first branch of the lane graph (straight ahead on the grid)"""
+    route = [waypoint]
+    for _ in range(count - 1):
+        route.append(route[-1].next(spacing)[0])
+    return route
+
+
+def _spawn_vehicles(world: carla.World, transforms: List[carla.Transform]) -> List[Vehicle]:
+    blueprint = world.get_blueprint_library().find(VEHICLE_BLUEPRINT)
+    return [Vehicle(world.spawn_actor(blueprint, transform), f"bench_{i}", VehicleType.GENERIC)
+            for i, transform in enumerate(transforms)]
+
+
+class BenchmarkExperiment(IntersectionExperiment):
+    """
+    Headless IntersectionExperiment on a benchmark grid, every vehicle drives east through the
+    junctions of its row
+    """
+
+    def __init__(self, vehicles: int):
+        super().__init__(headless=True)
+        self.number_of_vehicles: int = vehicles
+
+    def init(self) -> None:
+        # connect to the stand-in without opening a window or creating the HUD and the wizard
+        per_row = len(_eastbound_spawn_points(_load_grid(1).get_map(), 0))
+        self.world = _load_grid(math.ceil(self.number_of_vehicles / per_row))
+        self.client = carla.Client("127.0.0.1", BENCHMARK_PORT)
+        self.map = self.world.get_map()
+        self.waypoints = [waypoint for waypoint in self.map.generate_waypoints(WAYPOINT_SEPARATION)
+                          if waypoint.lane_type == carla.LaneType.Driving]
+        self.spawn_points = self.map.get_spawn_points()
+        self.junctions = _junctions(self.map)
+        self.server_initialized = True
+
+    def initialize_experiment(self, configuration: Dict = None) -> None:
+        random.seed(SEED)
+        Section.id = 0
+        Vehicle.id = 0
+        rows = len({junction.bounding_box.location.y for junction in self.junctions.values()})
+        row_sections: List[List[int]] = []
+        for row in range(rows):
+            indices = []
+            for col in range(GRID_COLUMNS):
+                junction_id = row * GRID_COLUMNS + col
+                indices.append(len(self.section_list))
+                self.add_section(Intersection(
+                    self.junctions[junction_id],
+                    self.world.get_traffic_lights_in_junction(junction_id)))
+            row_sections.append(indices)
+
+        configuration = {}
+        for row in range(rows):
+            remaining = self.number_of_vehicles - len(self.vehicle_list)
+            transforms = _eastbound_spawn_points(self.map, row)[:remaining]
+            for vehicle in _spawn_vehicles(self.world, transforms):
+                x = vehicle.get_current_location().x
+                ahead = [i for col, i in enumerate(row_sections[row]) if col * BLOCK_LENGTH > x]
+                vehicle.set_active_sections(self.section_list[ahead[0]], self.section_list[ahead[-1]])
+                vehicle.active = True
+                configuration[vehicle.id] = {"sections": {i: "straight" for i in ahead}}
+                self.vehicle_list.append(vehicle)
+        self._generate_section_paths(configuration)
+
+
+def _fleet(vehicles: int) -> Tuple[carla.World, List[Vehicle]]:
+    """A fleet of vehicles spawned on a benchmark grid, without paths"""
+    random.seed(SEED)
+    per_row = len(_eastbound_spawn_points(_load_grid(1).get_map(), 0))
+    world = _load_grid(math.ceil(vehicles / per_row))
+    transforms = []
+    row = 0
+    while len(transforms) < vehicles:
+        transforms += _eastbound_spawn_points(world.get_map(), row)[:vehicles - len(transforms)]
+        row += 1
+    return world, _spawn_vehicles(world, transforms)
+
+
+@benchmark("generate_path", parameter="blocks", sizes=(1, 2, 4))
+def bench_generate_path(blocks: int) -> Callable[[], None]:
+    world = _load_grid(1)
+    carla_map = world.get_map()
+    vehicle = _spawn_vehicles(world, [_eastbound_spawn_points(carla_map, 0)[0]])[0]
+    start = carla_map.get_waypoint(vehicle.get_current_location())
+    light = world.get_traffic_lights_in_junction(blocks)[0]
+    end = light.get_stop_waypoints()[0]
+
+    def run():
+        random.seed(SEED)
+        VehicleController.generate_path(vehicle, start, end)
+    return run
+
+
+@benchmark("smooth_path", parameter="waypoints", sizes=(10, 50, 200))
+def bench_smooth_path(waypoints: int) -> Callable[[], None]:
+    carla_map = _load_grid(1).get_map()
+    start = carla_map.get_waypoint(_eastbound_spawn_points(carla_map, 0)[0].location)
+    route = _route(start, waypoints, 2.0)
+    return lambda: smooth_path(route, num_passes=2)
+
+
+@benchmark("steering_control", parameter="trajectory_points", sizes=(100, 500, 2000))
+def bench_steering_control(points: int) -> Callable[[], None]:
+    world, (vehicle,) = _fleet(1)
+    start = world.get_map().get_waypoint(vehicle.get_current_location())
+    vehicle.trajectory = [waypoint.transform for waypoint in _route(start, points, 0.25)]
+    return lambda: VehicleController.steering_control(vehicle)
+
+
+@benchmark("throttle_control", parameter="other_vehicles", sizes=(10, 50, 200))
+def bench_throttle_control(others: int) -> Callable[[], None]:
+    _, vehicles = _fleet(others + 1)
+    vehicle = vehicles[0]
+    vehicle.update_other_vehicle_locations(vehicles)
+    return lambda: VehicleController.throttle_control(vehicle)
+
+
+@benchmark("update_other_vehicle_locations", parameter="vehicles", sizes=(10, 50, 200))
+def bench_update_other_vehicle_locations(vehicles: int) -> Callable[[], None]:
+    _, fleet = _fleet(vehicles)
+
+    def run():
+        for vehicle in fleet:
+            vehicle.update_other_vehicle_locations(fleet)
+    return run
+
+
+def _intersection(lanes_per_direction: int) -> Tuple[carla.World, Intersection]:
+    world = _load_grid(1, lanes_per_direction)
+    junction_id = GRID_COLUMNS // 2
+    junction = _junctions(world.get_map())[junction_id]
+    return world, Intersection(junction, world.get_traffic_lights_in_junction(junction_id))
+
+
+@benchmark("intersection_get_stop_location", parameter="lanes_per_direction", sizes=(1, 2, 4))
+def bench_get_stop_location(lanes_per_direction: int) -> Callable[[], None]:
+    import numpy as np
+
+    _, intersection = _intersection(lanes_per_direction)
+    rng = np.random.default_rng(SEED)
+    center = intersection.junction.bounding_box.location
+    locations = [np.array([center.x, center.y, 0.0]) + rng.uniform(-40, 40, 3) * (1, 1, 0)
+                 for _ in range(32)]
+
+    def run():
+        for location in locations:
+            intersection.get_stop_location(location)
+    return run
+
+
+@benchmark("intersection_get_thru_waypoints", parameter="lanes_per_direction", sizes=(1, 2, 4))
+def bench_get_thru_waypoints(lanes_per_direction: int) -> Callable[[], None]:
+    world, intersection = _intersection(lanes_per_direction)
+    center = intersection.junction.bounding_box.location
+    approach = world.get_map().get_waypoint(carla.Location(center.x - 30.0, center.y + 1.75, 0.0))
+    vehicle = _spawn_vehicles(world, [approach.transform])[0]
+    carla_map = world.get_map()
+
+    def run():
+        for direction in ("straight", "right", "left"):
+            intersection.get_thru_waypoints(carla_map, vehicle, direction)
+    return run
+
+
+@benchmark("reachability_check_vehicle", parameter="sections", sizes=(1, 3, 6))
+def bench_reachability_check_vehicle(sections: int) -> Callable[[], None]:
+    world = _load_grid(1)
+    carla_map = world.get_map()
+    junctions = _junctions(carla_map)
+    section_list = [Intersection(junctions[i], world.get_traffic_lights_in_junction(i)) for i in range(sections)]
+    spawn_points = carla_map.get_spawn_points()
+    reachability = Reachability(LaneGraph(carla_map), spawn_points, carla_map, section_list)
+    # westmost spawn point heading east on the first row, straight through every junction
+    spawn_point = min((i for i, t in enumerate(spawn_points)
+                       if abs(t.rotation.yaw) < 1.0 and 0 < t.location.y < BLOCK_LENGTH / 4),
+                      key=lambda i: spawn_points[i].location.x)
+    configuration = {"spawn_point": spawn_point, "sections": {i: "straight" for i in range(sections)}}
+    if reachability.check_vehicle("vehicle", configuration, spawn_points[spawn_point]):
+        raise Exception("Error: the benchmark configuration is not reachable")
+    return lambda: reachability.check_vehicle("vehicle", configuration, spawn_points[spawn_point])
+
+
+@benchmark("experiment_tick", parameter="vehicles", sizes=(10, 50, 200))
+def bench_experiment_tick(vehicles: int) -> Callable[[], None]:
+    experiment = BenchmarkExperiment(vehicles)
+    experiment.init()
+    experiment.initialize_experiment()
+    world = experiment.world
+    # let the traffic get moving before measuring
+    for _ in range(60):
+        experiment.step()
+        world.tick()
+
+    def run():
+        experiment.step()
+        world.tick()
+    return run
+
+
+@benchmark("experiment_replay_tick", parameter="vehicles", sizes=(10, 50, 200))
+def bench_experiment_replay_tick(vehicles: int) -> Callable[[], None]:
+    # record a live run, then replay it on a fresh copy of the experiment
+    experiment = BenchmarkExperiment(vehicles)
+    experiment.init()
+    experiment.initialize_experiment()
+    with tempfile.TemporaryDirectory(prefix="replay_benchmark_") as directory:
+        with TelemetryRecorder(directory) as recorder:
+            for _ in range(REPLAY_FRAMES):
+                experiment.step()
+                experiment.world.tick()
+                timestamp = experiment.world.get_snapshot().timestamp
+                recorder.record(timestamp.frame, timestamp.elapsed_seconds, experiment.vehicle_list)
+        recording = RecordedTrajectories.from_directory(directory)
+
+    experiment = BenchmarkExperiment(vehicles)
+    experiment.init()
+    experiment.initialize_experiment()
+    experiment.start_replay(recording)
+    world = experiment.world
+
+    def run():
+        # the harness times more ticks than there are recorded frames, start over rather than holding the
+        # last poses
+        if experiment.replay.finished:
+            experiment.stop_replay()
+            experiment.start_replay(recording)
+        experiment.step()
+        world.tick()
+    return run
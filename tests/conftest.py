@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Shared test setup: the kinematic stand-in replaces the carla module when CARLA is not installed
+"""
+
+import importlib.util
+
+if importlib.util.find_spec("carla") is None:
+    from umich_sim import kinematic_carla
+    kinematic_carla.install()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests of the frame-indexed ring buffer holding the collision history
+"""
+
+import numpy as np
+import pytest
+
+from umich_sim.sim_backend.carla_modules.collision_sensor import CollisionHistory
+
+
+def expected_window(events, frame, length):
+    """intensities of the frames ending at frame, computed without the ring"""
+    window = np.zeros(length)
+    for event_frame, intensity in events:
+        position = event_frame - (frame - length + 1)
+        if 0 <= position < length:
+            window[position] += intensity
+    return window
+
+
+def test_window_sums_collisions_per_frame():
+    history = CollisionHistory(size=16)
+    history.add(100, 1.0, "wall")
+    history.add(100, 2.0, "car")
+    history.add(103, 4.0, "car")
+    np.testing.assert_array_equal(history.window(105, 8), [0, 0, 3.0, 0, 0, 4.0, 0, 0])
+    assert history.count == 3
+    assert history.peak_intensity == 4.0
+    assert history.last_actor == "car"
+    assert history.last_frame == 103
+
+
+def test_window_wraps_around_the_ring():
+    history = CollisionHistory(size=16)
+    events = [(frame, float(frame)) for frame in range(5, 60, 3)]
+    for frame, intensity in events:
+        history.add(frame, intensity)
+        for length in (1, 7, 16):
+            np.testing.assert_array_equal(history.window(frame, length), expected_window(events, frame, length))
+
+
+def test_old_collisions_are_cleared():
+    history = CollisionHistory(size=16)
+    history.add(10, 5.0)
+    # gap shorter than the ring, crossing its end
+    np.testing.assert_array_equal(history.window(20, 16), expected_window([(10, 5.0)], 20, 16))
+    np.testing.assert_array_equal(history.window(26, 16), np.zeros(16))
+    history.add(27, 1.0)
+    # gap longer than the ring
+    np.testing.assert_array_equal(history.window(100, 16), np.zeros(16))
+
+
+def test_window_is_a_read_only_view():
+    history = CollisionHistory(size=16)
+    history.add(3, 1.0)
+    window = history.window(3, 4)
+    assert not window.flags.writeable
+    assert not window.flags.owndata
+    with pytest.raises(ValueError):
+        window[0] = 1.0
+    with pytest.raises(Exception, match="longer than the history"):
+        history.window(3, 17)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests of the force feedback of a wheel unplugged while the effects are set, on a fake evdev device
+"""
+
+import errno
+import threading
+
+import pytest
+
+pytest.importorskip("evdev")
+from evdev import ecodes, ff
+
+from umich_sim.wizard.inputs.ff_manager import FFManager
+
+
+class FakeDevice:
+    """evdev device recording the effects written to it, every access fails once it is closed"""
+
+    def __init__(self):
+        self.closed = False
+        self.uploads = 0
+        self.written = []
+
+    def _check(self) -> None:
+        if self.closed:
+            raise OSError(errno.ENODEV, "No such device")
+
+    def write(self, etype: int, code: int, value: int) -> None:
+        self._check()
+        self.written.append((etype, code, value))
+
+    def upload_effect(self, effect) -> int:
+        self._check()
+        self.uploads += 1
+        return effect.id if effect.id >= 0 else 7
+
+    def erase_effect(self, effect_id: int) -> None:
+        self._check()
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def rumble() -> ff.Effect:
+    return ff.Effect(ecodes.FF_RUMBLE, -1, 0, ff.Trigger(0, 0), ff.Replay(100, 0),
+                     ff.EffectType(ff_rumble_effect=ff.Rumble(strong_magnitude=0xffff, weak_magnitude=0)))
+
+
+def test_unplugged_device_is_detached():
+    device = FakeDevice()
+    manager = FFManager(device, max_rate=0)
+    manager.set_autocenter(30000)
+    manager.set_spring(100, 65535, 32767)
+    device.close()
+
+    # the write fails, the device is dropped until attach
+    manager.set_spring(10000, 65535, 32767)
+    assert not manager.attached()
+    manager.upload("rumble", rumble())
+    manager.play("rumble")
+    manager.stop_spring()
+    manager.erase()
+
+    # erased while detached, nothing to restore on the new device, the spring is uploaded again
+    device = FakeDevice()
+    manager.attach(device)
+    assert manager.attached()
+    assert device.written == []
+    manager.set_spring(10000, 65535, 32767)
+    assert device.uploads == 1
+    assert device.written[-1] == (ecodes.EV_FF, 7, 1)
+
+
+def test_lost_upload_is_not_played():
+    device = FakeDevice()
+    manager = FFManager(device)
+    device.close()
+    assert manager.upload("rumble", rumble()) is None
+    manager.play("rumble")
+    assert device.written == []
+
+    device = FakeDevice()
+    manager.attach(device)
+    assert manager.upload("rumble", rumble()) == 7
+    manager.play("rumble")
+    assert device.written == [(ecodes.EV_FF, 7, 1)]
+
+
+def test_attach_restores_auto_center():
+    device = FakeDevice()
+    manager = FFManager(device)
+    manager.set_autocenter(30000)
+    device.close()
+    manager.detach()
+
+    device = FakeDevice()
+    manager.attach(device)
+    assert device.written == [(ecodes.EV_FF, ecodes.FF_AUTOCENTER, 30000)]
+
+
+def test_disconnect_while_setting_effects():
+    device = FakeDevice()
+    manager = FFManager(device, max_rate=0)
+    stop = threading.Event()
+    errors = []
+
+    def main_loop() -> None:
+        # sets the effects every tick like EgoVehicle.update
+        pos = 0
+        try:
+            while not stop.is_set():
+                pos = (pos + 1000) % 30000
+                manager.set_spring(pos, 65535, 32767)
+                manager.set_autocenter(pos + 1)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=main_loop)
+    thread.start()
+    try:
+        for _ in range(200):
+            # what the input reactor does when the wheel is unplugged and plugged in again
+            manager.detach()
+            device.close()
+            device = FakeDevice()
+            manager.attach(device)
+    finally:
+        stop.set()
+        thread.join()
+    assert errors == []
+    assert manager.attached()
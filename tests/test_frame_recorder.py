@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests of the camera frame recorder and of its hookup in the camera sensor callback
+"""
+
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from umich_sim.sim_backend.carla_modules.camera_manager import CameraManager
+from umich_sim.sim_backend.carla_modules.frame_recorder import FrameRecorder, MANIFEST_NAME, read_recording
+from umich_sim.sim_backend.carla_modules.frame_worker import FrameWorker
+
+WIDTH, HEIGHT = 8, 6
+
+
+def fake_image(frame: int):
+    """stand-in of a carla.Image whose pixels all hold the frame number"""
+    raw_data = bytes([frame % 256]) * (WIDTH * HEIGHT * 4)
+    return SimpleNamespace(frame=frame, timestamp=frame / 20, raw_data=raw_data, width=WIDTH, height=HEIGHT)
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip(tmp_path, compress):
+    recorder = FrameRecorder(tmp_path, compress=compress, queue_size=64, chunk_frames=4)
+    for frame in range(10):
+        image = fake_image(frame)
+        assert recorder.submit(image.frame, image.timestamp, image.raw_data, WIDTH, HEIGHT)
+    recorder.close()
+
+    frames = list(read_recording(tmp_path))
+    assert [entry["frame"] for entry, _ in frames] == list(range(10))
+    assert [entry["chunk"] for entry, _ in frames] == [0] * 4 + [1] * 4 + [2] * 2
+    for entry, pixels in frames:
+        assert pixels.shape == (HEIGHT, WIDTH, 4)
+        assert (pixels == entry["frame"]).all()
+        assert entry["timestamp"] == pytest.approx(entry["frame"] / 20)
+
+
+def test_drops_are_counted(tmp_path):
+    recorder = FrameRecorder(tmp_path, compress=False, queue_size=1)
+    for frame in range(200):
+        image = fake_image(frame)
+        recorder.submit(image.frame, image.timestamp, image.raw_data, WIDTH, HEIGHT)
+    recorder.close()
+    # submitted after close
+    assert not recorder.submit(200, 10.0, fake_image(200).raw_data, WIDTH, HEIGHT)
+
+    with open(tmp_path / MANIFEST_NAME) as f:
+        manifest = json.load(f)
+    assert manifest["received"] == 200
+    assert manifest["written"] + manifest["dropped"] == 200
+    assert manifest["written"] == len(list(read_recording(tmp_path)))
+    assert recorder.dropped == manifest["dropped"] + 1
+
+
+def test_recorded_before_latest_frame_handoff(tmp_path):
+    # a frame worker slower than the sensor replaces the frames waiting for it
+    worker = FrameWorker(lambda frame: time.sleep(0.005))
+    recorder = FrameRecorder(tmp_path, compress=False, queue_size=64)
+    camera = SimpleNamespace(index=0, sensors=[['sensor.camera.rgb']], recorder=recorder, frame_worker=worker)
+    for frame in range(50):
+        CameraManager._parse_image(lambda: camera, fake_image(frame))
+    worker.destroy()
+    recorder.close()
+
+    assert worker.dropped > 0
+    assert recorder.dropped == 0
+    frames = [entry["frame"] for entry, _ in read_recording(tmp_path)]
+    assert frames == list(range(50))
+    assert np.array_equal(next(read_recording(tmp_path))[1], np.zeros((HEIGHT, WIDTH, 4), dtype=np.uint8))
+
+
+def test_lidar_is_not_recorded(tmp_path):
+    worker = FrameWorker(lambda frame: None)
+    recorder = FrameRecorder(tmp_path, compress=False)
+    camera = SimpleNamespace(index=0, sensors=[['sensor.lidar.ray_cast']], recorder=recorder, frame_worker=worker)
+    CameraManager._parse_image(lambda: camera, fake_image(0))
+    worker.destroy()
+    recorder.close()
+    assert recorder.received == 0
+    assert worker.received == 1
+
+
+def test_destroy_survives_failing_close(tmp_path):
+    def close():
+        time.sleep(0.05)
+        raise Exception("disk full")
+
+    failing = SimpleNamespace(close=close, directory=tmp_path)
+    camera = SimpleNamespace(frame_worker=FrameWorker(lambda frame: None), recorder=failing,
+                             _closing_recorders=[])
+    camera._close_recorder = lambda recorder: CameraManager._close_recorder(camera, recorder)
+    start = time.monotonic()
+    CameraManager._close_recorder(camera, SimpleNamespace(close=close, directory=tmp_path))
+    # closing happens in the background
+    assert time.monotonic() - start < 0.05
+    CameraManager.destroy(camera)
+    assert camera.recorder is None
+    assert camera._closing_recorders == []
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests of the input log, written with InputLogWriter and read back with read_input_log and ReplayInput
+"""
+
+import pytest
+
+from umich_sim.wizard.inputs import ClientMode, ControlEventType, InputDevType
+from umich_sim.wizard.inputs.input_log import InputLogWriter, ReplayInput, read_input_log
+
+EVENTS = [
+    (ControlEventType.STEER, ClientMode.EGO, 32768, 10.0),
+    (ControlEventType.GAS, ClientMode.EGO, 0, 10.25),
+    (ControlEventType.INC_GEAR, ClientMode.EGO, 0, 10.5),
+    (ControlEventType.SWITCH_DRIVER, ClientMode.WIZARD, 0, 11.0),
+    (ControlEventType.STEER, ClientMode.EGO, -1, 11.125),
+]
+
+
+def write_log(path) -> None:
+    writer = InputLogWriter(path, InputDevType.G29, ClientMode.EGO, steer_max=65535, pedal_max=255)
+    for event in EVENTS:
+        writer.write(*event)
+    assert writer.count == len(EVENTS)
+    writer.close()
+    # written after close, dropped
+    writer.write(*EVENTS[0])
+    assert writer.count == len(EVENTS)
+
+
+def test_write_read_round_trip(tmp_path):
+    path = tmp_path / "inputs.bin"
+    write_log(path)
+
+    header, events = read_input_log(path)
+    assert header == {"dev_type": InputDevType.G29, "client_mode": ClientMode.EGO,
+                      "steer_max": 65535, "pedal_max": 255}
+    assert events.tolist() == [(timestamp, int(event_type), int(dev), val)
+                               for event_type, dev, val, timestamp in EVENTS]
+
+
+def test_cut_record_is_dropped(tmp_path):
+    path = tmp_path / "inputs.bin"
+    write_log(path)
+    with open(path, "r+b") as f:
+        f.truncate(path.stat().st_size - 3)
+
+    _, events = read_input_log(path)
+    assert len(events) == len(EVENTS) - 1
+    assert events["val"].tolist() == [val for _, _, val, _ in EVENTS[:-1]]
+
+
+def test_not_an_input_log(tmp_path):
+    path = tmp_path / "inputs.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(Exception, match="not an input log"):
+        read_input_log(path)
+
+
+def test_replay(tmp_path):
+    path = tmp_path / "inputs.bin"
+    write_log(path)
+
+    replay = ReplayInput(path, speed=0.0)
+    received = []
+    replay.sink = lambda event_type, dev, val, timestamp: received.append((event_type, dev, val))
+    replay.start()
+    assert replay.finished.wait(3.0)
+    assert replay.sent == len(EVENTS)
+    assert received == [(event_type, dev, val) for event_type, dev, val, _ in EVENTS]
+    # the recorded wheel maps its values as the live one did
+    assert replay.SteerMap(65535) == 1.0
+    assert replay.PedalMap(255) == 0.0
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests of the lazy packages, their exports must stay visible to dir, import * and the static checkers
+"""
+
+import ast
+import importlib
+import inspect
+
+import pytest
+
+PACKAGES = [
+    "umich_sim",
+    "umich_sim.sweep",
+    "umich_sim.wizard",
+    "umich_sim.sim_backend.carla_modules",
+    "umich_sim.sim_backend.experiments",
+    "umich_sim.sim_backend.sections",
+    "umich_sim.sim_backend.vehicle_control",
+]
+
+
+def type_checking_imports(package) -> dict:
+    """names imported in the "if TYPE_CHECKING:" block of a package and the module they come from"""
+    imports = {}
+    for node in ast.parse(inspect.getsource(package)).body:
+        if isinstance(node, ast.If) and isinstance(node.test, ast.Name) and node.test.id == "TYPE_CHECKING":
+            for statement in node.body:
+                module = "." * statement.level + (statement.module or "")
+                imports.update({alias.name: module for alias in statement.names})
+    return imports
+
+
+@pytest.mark.parametrize("name", PACKAGES)
+def test_exports_are_listed(name):
+    package = importlib.import_module(name)
+    exports = package._EXPORTS
+    assert package.__all__ == list(exports)
+    assert set(exports) <= set(dir(package))
+    # the static checkers see every export where it is defined
+    assert type_checking_imports(package) == exports
+
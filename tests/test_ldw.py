@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests of the lane index and the lane departure warning on lanes of the kinematic stand-in
+"""
+
+import math
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from umich_sim import kinematic_carla
+
+pytestmark = pytest.mark.skipif(sys.modules.get("carla") is not kinematic_carla,
+                                reason="builds its lanes with the kinematic stand-in")
+
+import carla
+from umich_sim.sim_backend.carla_modules.lane_index import LaneIndex
+from umich_sim.sim_backend.carla_modules.ldw import LaneDepartureWarning, time_to_reach
+
+RADIUS = 100.0
+LANE_WIDTH = 3.5
+SPEED = 20.0
+
+
+def lane_map() -> carla.Map:
+    """a straight lane along x and a lane turning right on a circle of RADIUS, both marked Solid"""
+    angles = np.radians(np.arange(0.0, 90.5, 0.5))
+    lane = {"width": LANE_WIDTH, "left_marking": "Solid", "right_marking": "Solid", "successors": []}
+    return carla.Map("Lanes", {"lanes": [
+        dict(lane, id=0, road_id=0, points=[[0.0, 0.0, 0.0], [200.0, 0.0, 0.0]]),
+        # carla is left-handed, the yaw grows while turning right towards +y
+        dict(lane, id=1, road_id=1, points=np.column_stack((
+            1000.0 + RADIUS * np.sin(angles), RADIUS - RADIUS * np.cos(angles), np.zeros(len(angles)))).tolist()),
+    ]})
+
+
+def fake_vehicle(x: float, y: float, yaw: float, yaw_rate: float = 0.0, speed: float = SPEED):
+    """vehicle at a pose driving at speed along its yaw, yaw_rate in deg/s like get_angular_velocity"""
+    velocity = carla.Vector3D(speed * math.cos(math.radians(yaw)), speed * math.sin(math.radians(yaw)), 0.0)
+    return SimpleNamespace(
+        get_transform=lambda: carla.Transform(carla.Location(x, y, 0.0), carla.Rotation(yaw=yaw)),
+        get_velocity=lambda: velocity,
+        get_angular_velocity=lambda: carla.Vector3D(0.0, 0.0, yaw_rate),
+        bounding_box=SimpleNamespace(extent=carla.Vector3D(2.4, 0.9, 0.8)))
+
+
+def on_curve(angle: float, offset: float = 0.0, yaw_rate: float = math.degrees(SPEED / RADIUS)):
+    """vehicle following the curved lane at an angle along it, offset to the right of its centre"""
+    phi = math.radians(angle)
+    r = RADIUS - offset
+    return fake_vehicle(1000.0 + r * math.sin(phi), RADIUS - r * math.cos(phi), angle, yaw_rate)
+
+
+@pytest.fixture
+def ldw():
+    return LaneDepartureWarning(LaneIndex(lane_map(), radius=400.0))
+
+
+def test_time_to_reach():
+    assert time_to_reach(0.0, 1.0, 0.0, 10.0) == 0.0
+    assert time_to_reach(2.0, 1.0, 0.0, 10.0) == pytest.approx(2.0)
+    assert time_to_reach(2.0, -1.0, 0.0, 10.0) == math.inf
+    assert time_to_reach(2.0, 0.0, 1.0, 10.0) == pytest.approx(2.0)
+    # braking before the target
+    assert time_to_reach(2.0, 1.0, -1.0, 10.0) == math.inf
+    assert time_to_reach(50.0, 1.0, 0.0, 10.0) == math.inf
+
+
+def test_locate_finds_the_run_and_segment():
+    index = LaneIndex(lane_map(), radius=400.0, spacing=1.0)
+    run, segment = index.locate(carla.Location(50.3, 0.4, 0.0))
+    assert run.key == (0, 0, -1)
+    assert segment == 50
+    assert run.s[-1] == pytest.approx(200.0)
+    assert run.points[segment, 0] <= 50.3 <= run.points[segment + 1, 0]
+
+    projection = index.project(carla.Location(50.3, 0.4, 0.0))
+    assert projection.lane_width == LANE_WIDTH
+    assert projection.left_marking == carla.LaneMarkingType.Solid
+
+    curve, _ = index.locate(on_curve(30.0).get_transform().location)
+    assert curve.key == (1, 0, -1)
+    assert curve.s[-1] == pytest.approx(RADIUS * math.pi / 2, rel=1e-3)
+
+
+def test_centred_on_straight_lane(ldw):
+    state = ldw.update(fake_vehicle(50.0, 0.0, 0.0), 0.0)
+    assert state == (math.inf, math.inf, None)
+
+
+def test_centred_on_curved_lane(ldw):
+    # following the curve needs a yaw rate of SPEED / RADIUS, it is not a drift
+    for tick, angle in enumerate(np.arange(10.0, 80.0, 0.5)):
+        state = ldw.update(on_curve(angle), tick / 20)
+        assert state.warning is None
+        # the centre line is sampled every meter, its heading is off by a fraction of a degree
+        assert state.ttlc_left > 2.0 and state.ttlc_right > 2.0
+    # the vehicle was followed along the cached run
+    assert ldw.refreshes == 1
+
+
+def test_drift_on_straight_lane(ldw):
+    # heading 3 degrees to the right, about 1 m/s towards the right line
+    state = ldw.update(fake_vehicle(50.0, 0.0, 3.0), 0.0)
+    assert state.warning == "right"
+    assert state.ttlc_right == pytest.approx((LANE_WIDTH / 2 - 0.9 * math.cos(math.radians(3.0))
+                                              - 2.4 * math.sin(math.radians(3.0))) / (SPEED * math.sin(math.radians(3.0))),
+                                             rel=1e-3)
+    assert state.ttlc_left == math.inf
+
+
+def test_drift_on_curved_lane(ldw):
+    # the wheel is held straight while the lane turns right, the vehicle leaves it on the left
+    state = ldw.update(on_curve(45.0, yaw_rate=0.0), 0.0)
+    assert state.warning == "left"
+    assert state.ttlc_left == pytest.approx(math.sqrt(2 * (LANE_WIDTH / 2 - 0.9) * RADIUS) / SPEED, rel=0.05)
+    assert state.ttlc_right == math.inf
+
+
+def test_warnings_are_rate_limited(ldw):
+    assert ldw.update(fake_vehicle(50.0, 0.0, 3.0), 0.0).warning == "right"
+    assert ldw.update(fake_vehicle(50.0, 0.0, 3.0), 1.0).warning is None
+    assert ldw.update(fake_vehicle(50.0, 0.0, 3.0), 3.0).warning == "right"
+    assert ldw.update(fake_vehicle(50.0, 0.0, 3.0), 6.0, suppressed=True).warning is None
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests of the mailbox of the input events of the wizard
+"""
+
+import threading
+
+from umich_sim.wizard.inputs import ControlEventType, ClientMode, InputPacket
+from umich_sim.wizard.mailbox import InputMailbox
+
+
+def test_axis_events_are_coalesced():
+    mailbox = InputMailbox()
+    for val in range(10):
+        mailbox.post(InputPacket(ControlEventType.STEER, ClientMode.EGO, val))
+        mailbox.post(InputPacket(ControlEventType.GAS, ClientMode.EGO, 2 * val))
+    # the same axis of the other device is kept apart
+    mailbox.post(InputPacket(ControlEventType.STEER, ClientMode.WIZARD, -1))
+
+    packets = mailbox.drain()
+    assert [(p.event_type, p.dev, p.val) for p in packets] == [
+        (ControlEventType.STEER, ClientMode.EGO, 9),
+        (ControlEventType.GAS, ClientMode.EGO, 18),
+        (ControlEventType.STEER, ClientMode.WIZARD, -1),
+    ]
+    assert mailbox.coalesced == 18
+    assert mailbox.drain() == []
+
+
+def test_discrete_events_are_kept_in_order():
+    mailbox = InputMailbox()
+    mailbox.post(InputPacket(ControlEventType.LEFT_BLINKER, ClientMode.EGO, 0))
+    mailbox.post(InputPacket(ControlEventType.BRAKE, ClientMode.EGO, 5))
+    mailbox.post(InputPacket(ControlEventType.INC_GEAR, ClientMode.EGO, 0))
+    mailbox.post(InputPacket(ControlEventType.INC_GEAR, ClientMode.EGO, 0))
+    mailbox.post(InputPacket(ControlEventType.BRAKE, ClientMode.EGO, 7))
+    mailbox.post(InputPacket(ControlEventType.SWITCH_DRIVER, ClientMode.WIZARD, 0))
+
+    # the discrete events come first, then the latest position of every axis
+    assert [(p.event_type, p.val) for p in mailbox.drain()] == [
+        (ControlEventType.LEFT_BLINKER, 0),
+        (ControlEventType.INC_GEAR, 0),
+        (ControlEventType.INC_GEAR, 0),
+        (ControlEventType.SWITCH_DRIVER, 0),
+        (ControlEventType.BRAKE, 7),
+    ]
+    assert mailbox.coalesced == 1
+
+
+def test_concurrent_posts_are_not_lost():
+    mailbox = InputMailbox()
+    posts = 5000
+    devices = [ClientMode.EGO, ClientMode.WIZARD]
+    drained = []
+    done = threading.Event()
+
+    def post(dev: ClientMode) -> None:
+        for val in range(posts):
+            mailbox.post(InputPacket(ControlEventType.STEER, dev, val))
+            mailbox.post(InputPacket(ControlEventType.INC_GEAR, dev, val))
+
+    def drain() -> None:
+        while not done.is_set():
+            drained.extend(mailbox.drain())
+
+    drainer = threading.Thread(target=drain)
+    drainer.start()
+    posters = [threading.Thread(target=post, args=(dev,)) for dev in devices]
+    for poster in posters:
+        poster.start()
+    for poster in posters:
+        poster.join()
+    done.set()
+    drainer.join()
+    drained.extend(mailbox.drain())
+
+    for dev in devices:
+        gears = [p.val for p in drained if p.event_type == ControlEventType.INC_GEAR and p.dev == dev]
+        assert gears == list(range(posts))
+        steers = [p.val for p in drained if p.event_type == ControlEventType.STEER and p.dev == dev]
+        # every drain hands out the latest position so far, the last one is never dropped
+        assert steers == sorted(steers)
+        assert steers[-1] == posts - 1
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests of the reachability precheck: the lane graph closure on synthetic graphs, and the configuration check
+of an experiment on a grid of the kinematic stand-in
+"""
+
+import random
+import sys
+from typing import List
+
+import numpy as np
+import pytest
+
+from umich_sim import kinematic_carla
+
+pytestmark = pytest.mark.skipif(sys.modules.get("carla") is not kinematic_carla,
+                                reason="builds its map with the kinematic stand-in")
+
+import carla
+from umich_sim.sim_backend.experiments import IntersectionExperiment
+from umich_sim.sim_backend.helpers import VehicleType
+from umich_sim.sim_backend.reachability import LaneGraph
+from umich_sim.sim_backend.scenario import validate_configuration
+from umich_sim.sim_backend.sections import Intersection
+
+MAP_NAME = "ReachabilityGrid"
+# the junction of the grid without turns, only straight on
+NO_TURNS = 1
+
+
+def lane_graph(successors: List[List[int]]) -> LaneGraph:
+    """LaneGraph of made up lanes, without a map"""
+    graph = LaneGraph.__new__(LaneGraph)
+    graph.successors = successors
+    graph._condense()
+    return graph
+
+
+def brute_force_reach(successors: List[List[int]]) -> np.ndarray:
+    """reach[i, j]: a path of at least one lane leads from lane i to lane j"""
+    reach = np.zeros((len(successors), len(successors)), dtype=bool)
+    for start in range(len(successors)):
+        pending = list(successors[start])
+        while pending:
+            node = pending.pop()
+            if not reach[start, node]:
+                reach[start, node] = True
+                pending += successors[node]
+    return reach
+
+
+def check_condensation(successors: List[List[int]]) -> None:
+    graph = lane_graph(successors)
+    reach = brute_force_reach(successors)
+    component = graph.component
+    size = len(successors)
+    for i in range(size):
+        for j in range(size):
+            # the components are the lanes reaching each other
+            assert (component[i] == component[j]) == (i == j or (reach[i, j] and reach[j, i]))
+            assert graph.reach[component[i], component[j]] == reach[i, j]
+    for i in range(size):
+        assert graph.cyclic[component[i]] == reach[i, i]
+        # reverse topological order
+        for successor in successors[i]:
+            assert component[successor] <= component[i]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_condensation_matches_brute_force(seed):
+    rng = random.Random(seed)
+    size = rng.randint(1, 40)
+    successors = [rng.sample(range(size), rng.randint(0, min(3, size))) for _ in range(size)]
+    check_condensation(successors)
+
+
+def test_condensation_of_chains_and_cycles():
+    # a chain into a cycle, a lane following itself and a lane without successors
+    check_condensation([[1], [2], [3], [4], [2], [5], [6, 5], []])
+    # long enough for a recursive search to hit the recursion limit
+    size = 5000
+    graph = lane_graph([[i + 1] for i in range(size - 1)] + [[0]])
+    assert len(graph.cyclic) == 1 and graph.reach.all()
+    graph = lane_graph([[i + 1] for i in range(size - 1)] + [[]])
+    assert len(graph.cyclic) == size and not graph.cyclic.any()
+    assert graph.reach[graph.component[0], graph.component[size - 1]]
+    assert not graph.reach[graph.component[size - 1], graph.component[0]]
+
+
+def grid_without_turns():
+    """one row of three junctions, the one in the middle has no turning lanes"""
+    grid = kinematic_carla.grid_lane_graph(rows=1, cols=3, lanes_per_direction=1, name=MAP_NAME)
+    turns = {lane["id"] for lane in grid["lanes"] if lane.get("junction") == NO_TURNS and len(lane["points"]) > 2}
+    grid["lanes"] = [lane for lane in grid["lanes"] if lane["id"] not in turns]
+    for lane in grid["lanes"]:
+        lane["successors"] = [successor for successor in lane["successors"] if successor not in turns]
+    return grid
+
+
+class GridExperiment(IntersectionExperiment):
+    """
+    IntersectionExperiment through the junctions of the grid from west to east, without a window, the HUD or
+    the wizard
+    """
+
+    def init(self) -> None:
+        kinematic_carla.register_map(MAP_NAME, grid_without_turns())
+        self.client = carla.Client("127.0.0.1", 2000)
+        self.world = self.client.load_world(MAP_NAME)
+        self.map = self.world.get_map()
+        self.spawn_points = self.map.get_spawn_points()
+        self.junctions = {}
+        for waypoint in self.map.generate_waypoints(2.0):
+            if waypoint.is_junction:
+                self.junctions.setdefault(waypoint.get_junction().id, waypoint.get_junction())
+        self.server_initialized = True
+
+    def add_sections(self) -> None:
+        for junction_id in sorted(self.junctions):
+            self.add_section(Intersection(self.junctions[junction_id],
+                                          self.world.get_traffic_lights_in_junction(junction_id)))
+
+    def eastbound(self, low: float, high: float) -> int:
+        """:return: a spawn point driving east between two x"""
+        return next(i for i, transform in enumerate(self.spawn_points)
+                    if abs(transform.rotation.yaw) < 1.0 and 0.0 < transform.location.y
+                    and low < transform.location.x < high)
+
+
+@pytest.fixture
+def experiment():
+    experiment = GridExperiment(headless=True)
+    experiment.init()
+    return experiment
+
+
+def test_configuration_checked_before_spawning(experiment):
+    west = experiment.eastbound(-50.0, 0.0)
+    between = experiment.eastbound(100.0, 200.0)
+    configuration = {
+        "number_of_vehicles": 2,
+        # spawned past the first junction, driving away from it
+        0: {"type": VehicleType.GENERIC, "spawn_point": between, "sections": {0: "straight"}},
+        1: {"type": VehicleType.GENERIC, "spawn_point": west, "sections": {0: "straight", 1: "left"}},
+    }
+    with pytest.raises(Exception, match="invalid configuration") as error:
+        experiment.initialize_experiment(configuration)
+    assert f"vehicle 0 can not reach section 0 from spawn point {between}" in str(error.value)
+    assert f"vehicle 1 can not turn left at section {NO_TURNS}" in str(error.value)
+    # nothing was spawned
+    assert experiment.vehicle_list == []
+    assert len(experiment.world.get_actors().filter("vehicle.*")) == 0
+
+    # straight on through the junctions ahead, or turning where the junction has the lane
+    configuration[0]["sections"] = {2: "straight"}
+    configuration[1]["sections"] = {0: "straight", 1: "straight", 2: "right"}
+    assert validate_configuration(experiment, configuration) == []
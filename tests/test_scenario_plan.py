@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests of the scenario plan files, a plan is only reused for the configuration it was compiled from
+"""
+
+import numpy as np
+import pytest
+
+from umich_sim.sim_backend.helpers import ExperimentType, VehicleType
+from umich_sim.sim_backend.scenario import (ScenarioPlan, PlannedVehicle, WAYPOINT_DTYPE, TRANSFORM_DTYPE, _HEADER,
+                                            PLAN_MAGIC, configuration_hash, read_current_plan, read_plan,
+                                            write_plan)
+
+CONFIGURATION = {
+    "debug": True,
+    "number_of_vehicles": 2,
+    0: {"type": VehicleType.EGO_FULL_MANUAL, "spawn_point": 188, "spawn_offset": 0.0,
+        "sections": {0: "straight", 1: "left"}},
+    1: {"type": VehicleType.LEAD, "spawn_point": 190, "spawn_offset": 5.0, "sections": {0: "straight"}},
+}
+
+
+def compiled_plan(configuration) -> ScenarioPlan:
+    """plan as capture_plan returns it, with made up routes"""
+    vehicles = []
+    for i in range(configuration["number_of_vehicles"]):
+        waypoints = np.zeros(3, dtype=WAYPOINT_DTYPE)
+        waypoints["s"] = [0.0, 1.5, 3.0]
+        trajectory = np.zeros(4, dtype=TRANSFORM_DTYPE)
+        trajectory["x"] = np.arange(4) + i
+        vehicles.append(PlannedVehicle(
+            vehicle_type=configuration[i]["type"], ego=i == 0, blueprint="vehicle.tesla.model3",
+            spawn=(float(i), 2.0, 0.5, 0.0, 90.0, 0.0), sections=configuration[i]["sections"],
+            initial_lane_index=None, waypoints=waypoints, trajectory=trajectory))
+    return ScenarioPlan(experiment_type=ExperimentType.INTERSECTION, map="Carla/Maps/Town05", section_count=4,
+                        debug=True, vehicles=vehicles, source_hash=configuration_hash(configuration))
+
+
+def test_hash_ignores_key_order():
+    reordered = {1: CONFIGURATION[1], 0: dict(reversed(list(CONFIGURATION[0].items()))),
+                 "number_of_vehicles": 2, "debug": True}
+    assert configuration_hash(reordered) == configuration_hash(CONFIGURATION)
+    changed = {**CONFIGURATION, 1: dict(CONFIGURATION[1], sections={0: "left"})}
+    assert configuration_hash(changed) != configuration_hash(CONFIGURATION)
+
+
+def test_plan_round_trip(tmp_path):
+    path = tmp_path / "intersection.plan"
+    plan = compiled_plan(CONFIGURATION)
+    write_plan(plan, path)
+
+    loaded = read_plan(path)
+    assert loaded.source_hash == plan.source_hash
+    assert loaded.configuration() == plan.configuration()
+    for vehicle, expected in zip(loaded.vehicles, plan.vehicles):
+        assert vehicle.spawn == expected.spawn
+        np.testing.assert_array_equal(vehicle.waypoints, expected.waypoints)
+        np.testing.assert_array_equal(vehicle.trajectory, expected.trajectory)
+
+
+def test_stale_plan_is_not_loaded(tmp_path):
+    path = tmp_path / "intersection.plan"
+    assert read_current_plan(path, CONFIGURATION) is None
+    write_plan(compiled_plan(CONFIGURATION), path)
+    assert read_current_plan(path, CONFIGURATION) is not None
+
+    # the configuration changed after the plan was compiled
+    changed = {**CONFIGURATION, 1: dict(CONFIGURATION[1], spawn_point=191)}
+    assert read_current_plan(path, changed) is None
+
+
+def test_plan_of_other_version_is_not_loaded(tmp_path):
+    path = tmp_path / "intersection.plan"
+    write_plan(compiled_plan(CONFIGURATION), path)
+    data = bytearray(path.read_bytes())
+    _HEADER.pack_into(data, 0, PLAN_MAGIC, 1, _HEADER.unpack_from(data)[2])
+    path.write_bytes(bytes(data))
+    assert read_current_plan(path, CONFIGURATION) is None
+    with pytest.raises(Exception, match="compile the scenario again"):
+        read_plan(path)
+
+    # any other file is not taken for a plan
+    path.write_bytes(b"not a plan at all")
+    with pytest.raises(Exception, match="not a scenario plan"):
+        read_current_plan(path, CONFIGURATION)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests of the frame-stamped sensor rings and of their frame-aligned export
+"""
+
+import numpy as np
+
+from umich_sim.sim_backend.carla_modules.sensor_bus import SensorBus, SensorRing
+
+
+def test_latest_at_or_before_frame():
+    ring = SensorRing(("x", "y"), capacity=8)
+    assert ring.latest() is None
+    for frame in (10, 12, 15):
+        ring.publish(frame, frame / 20, (frame, -frame))
+    assert ring.latest(9) is None
+    assert ring.latest(10).frame == 10
+    assert ring.latest(14) == (12, 0.6, {"x": 12.0, "y": -12.0})
+    assert ring.latest(100).frame == 15
+    assert ring.latest().frame == 15
+
+
+def test_overwritten_samples():
+    ring = SensorRing(("x",), capacity=4)
+    for frame in range(10):
+        ring.publish(frame, frame / 20, (frame,))
+    assert len(ring) == 4
+    # frames 0 to 5 were overwritten
+    assert ring.latest(5) is None
+    for frame in range(6, 10):
+        assert ring.latest(frame).values == {"x": float(frame)}
+
+
+def test_export_aligns_sensors_on_frames():
+    bus = SensorBus.get_instance()
+    imu = bus.register("imu", ("ax",), capacity=16)
+    gnss = bus.register("gnss", ("lat", "lon"), capacity=16)
+    for frame in range(4, 12):
+        imu.publish(frame, frame / 20, (frame,))
+    for frame in (5, 9):
+        gnss.publish(frame, frame / 20, (frame, 2 * frame))
+
+    assert bus.latest("gnss", 8).frame == 5
+    columns = bus.export([3, 6, 9, 20], names=["imu", "gnss"])
+    np.testing.assert_array_equal(columns["frame"], [3, 6, 9, 20])
+    np.testing.assert_array_equal(columns["imu.frame"], [-1, 6, 9, 11])
+    np.testing.assert_array_equal(columns["imu.ax"], [np.nan, 6, 9, 11])
+    np.testing.assert_array_equal(columns["gnss.frame"], [-1, 5, 9, 9])
+    np.testing.assert_array_equal(columns["gnss.lon"], [np.nan, 10, 18, 18])
+    assert set(bus.export([6], names=["gnss"])) == {"frame", "gnss.frame", "gnss.lat", "gnss.lon"}
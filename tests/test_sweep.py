@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests of the sweep orchestrator, run on the local simulator stand-in
+"""
+
+import os
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from umich_sim.sweep import ParameterGrid, SweepOrchestrator, SweepResults, carla_trial, local_trial
+from umich_sim.sweep import trials
+
+GRID = ParameterGrid({
+    "target_distance": [5.0, 10.0],
+    "green_time": [8.0, 12.0],
+    "duration": 5.0,
+})
+PORTS = [2000, 2002]
+
+
+def flaky_trial(params: Dict[str, Any], carla_port: int, marker: str, crash: bool) -> Dict[str, Any]:
+    """
+    local_trial failing the first attempt of the run with target_distance 10 and green_time 8,
+    the marker file tells the retry apart from the first attempt across worker processes
+    """
+    if params["target_distance"] == 10.0 and params["green_time"] == 8.0 and not os.path.exists(marker):
+        Path(marker).touch()
+        if crash:
+            os._exit(1)
+        raise Exception("injected failure")
+    return local_trial(params, carla_port)
+
+
+# whether once_per_process_trial already ran in this process
+_started = False
+
+
+def once_per_process_trial(params: Dict[str, Any], carla_port: int) -> Dict[str, Any]:
+    """local_trial failing the second time it runs in a process like carla_trial, reports its worker"""
+    global _started
+    if _started:
+        raise Exception("Error: the trial already ran in this process")
+    _started = True
+    metrics = local_trial(params, carla_port)
+    metrics["pid"] = os.getpid()
+    return metrics
+
+
+def failing_trial(params: Dict[str, Any], carla_port: int) -> Dict[str, Any]:
+    raise Exception("injected failure")
+
+
+def check_rows(results: SweepResults) -> None:
+    assert len(results) == len(GRID)
+    assert results.column("run_id") == list(range(len(GRID)))
+    for row, params in zip(results, GRID):
+        assert row["status"] == SweepResults.STATUS_OK
+        assert row["carla_port"] in PORTS
+        for name, value in params.items():
+            assert row[name] == value
+        assert row["sim_time"] > 0
+        assert "min_gap" in row
+
+
+def test_retry_after_failure(tmp_path):
+    trial = partial(flaky_trial, marker=str(tmp_path / "failed"), crash=False)
+    results = SweepOrchestrator(trial, PORTS, max_retries=1).run(GRID)
+    check_rows(results)
+    assert (tmp_path / "failed").exists()
+    assert results.column("attempts") == [1, 1, 2, 1]
+    assert results.failed() == []
+
+
+def test_retry_after_worker_crash(tmp_path):
+    trial = partial(flaky_trial, marker=str(tmp_path / "crashed"), crash=True)
+    results = SweepOrchestrator(trial, PORTS, max_retries=1).run(GRID)
+    check_rows(results)
+    assert results.column("attempts") == [1, 1, 2, 1]
+
+
+def test_failed_after_retries():
+    results = SweepOrchestrator(failing_trial, PORTS, max_retries=1).run(GRID)
+    assert len(results) == len(GRID)
+    assert all(row["status"] == SweepResults.STATUS_FAILED for row in results)
+    assert results.column("attempts") == [2] * len(GRID)
+    assert all("injected failure" in row["error"] for row in results)
+
+
+def test_fresh_worker_for_every_run():
+    results = SweepOrchestrator(once_per_process_trial, PORTS[:1], max_retries=0, tasks_per_worker=1).run(GRID)
+    check_rows(results)
+    assert results.column("attempts") == [1] * len(GRID)
+    assert len(set(results.column("pid"))) == len(GRID)
+
+
+def test_worker_kept_for_the_sweep():
+    # the runs after the first one run in the same process
+    results = SweepOrchestrator(once_per_process_trial, PORTS[:1], max_retries=0).run(GRID)
+    assert results.column("status") == [SweepResults.STATUS_OK] + [SweepResults.STATUS_FAILED] * (len(GRID) - 1)
+    assert all("already ran" in row["error"] for row in results.failed())
+
+
+def test_carla_trial_refuses_a_second_run(monkeypatch):
+    monkeypatch.setattr(trials, "_trial_started", True)
+    with pytest.raises(Exception, match="tasks_per_worker=1"):
+        carla_trial({}, 2000, configuration={})
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests of the telemetry recorder, written chunks are read back with load_telemetry
+"""
+
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from umich_sim.sim_backend.telemetry import (TelemetryRecorder, TELEMETRY_SCHEMA, MANIFEST_NAME,
+                                             load_telemetry, select_vehicle)
+
+
+def fake_vehicle(vehicle_id: int, x: float):
+    """stand-in of a Vehicle outside of any section, driving along x at 10 m/s"""
+    transform = SimpleNamespace(location=SimpleNamespace(x=x, y=2.0 * vehicle_id, z=0.0),
+                                rotation=SimpleNamespace(yaw=90.0))
+    carla_vehicle = SimpleNamespace(
+        get_transform=lambda: transform,
+        get_velocity=lambda: SimpleNamespace(x=10.0, y=0.0, z=0.0),
+        get_control=lambda: SimpleNamespace(throttle=0.5, steer=-0.1, brake=0.0, reverse=False))
+    return SimpleNamespace(id=vehicle_id, carla_vehicle=carla_vehicle, current_section=None, active=True)
+
+
+def record_ticks(recorder: TelemetryRecorder, ticks: int) -> None:
+    for tick in range(ticks):
+        recorder.record(100 + tick, tick / 60, [fake_vehicle(0, tick), fake_vehicle(1, -tick)])
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_chunks_round_trip(tmp_path, compress):
+    with TelemetryRecorder(tmp_path, chunk_size=4, compress=compress) as recorder:
+        record_ticks(recorder, 11)
+        assert recorder.rows == 22
+
+    # 5 full chunks and a partial one written on close
+    assert len(list(tmp_path.glob("chunk_*.npz"))) == 6
+    with open(tmp_path / MANIFEST_NAME) as f:
+        manifest = json.load(f)
+    assert manifest["rows"] == 22
+    assert manifest["chunks"] == 6
+
+    telemetry = load_telemetry(tmp_path)
+    assert list(telemetry) == [name for name, _ in TELEMETRY_SCHEMA]
+    for name, dtype in TELEMETRY_SCHEMA:
+        assert telemetry[name].dtype == np.dtype(dtype)
+        assert len(telemetry[name]) == 22
+    np.testing.assert_array_equal(telemetry["frame"], np.repeat(np.arange(100, 111), 2))
+    np.testing.assert_allclose(telemetry["speed"], 36.0)
+    np.testing.assert_array_equal(telemetry["section"], -1)
+    np.testing.assert_array_equal(telemetry["driver"], -1)
+
+    second = select_vehicle(telemetry, 1)
+    np.testing.assert_array_equal(second["x"], -np.arange(11, dtype=np.float32))
+    np.testing.assert_array_equal(second["y"], 2.0)
+
+
+def test_writer_failure_raises(tmp_path):
+    # the first chunk can not be written over a directory
+    (tmp_path / "chunk_000000.npz").mkdir()
+    recorder = TelemetryRecorder(tmp_path, chunk_size=4)
+    record_ticks(recorder, 3)
+    with pytest.raises(Exception, match="telemetry writer failed"):
+        recorder.close()
+    with pytest.raises(Exception, match="closed"):
+        record_ticks(recorder, 1)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests of the local mirror of the wizard state against a local WizardServer
+"""
+
+import socket
+import threading
+import time
+
+import msgpackrpc
+import pytest
+
+from umich_sim.wizard.inputs import ClientMode
+from umich_sim.wizard.server import WizardServer
+from umich_sim.wizard.sync import WizardSync
+
+POLL_TIMEOUT = 0.5
+RETRY_INTERVAL = 0.2
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class GatedSync(WizardSync):
+    """WizardSync whose uploads wait for the gate to open, the subscription is not gated"""
+
+    def __init__(self, *args, **kwargs):
+        self.gate = threading.Event()
+        self.gate.set()
+        super().__init__(*args, **kwargs)
+
+    def _client(self):
+        client = super()._client()
+        call = client.call
+
+        def gated_call(method, *args):
+            if method.startswith("set_"):
+                self.gate.wait()
+            return call(method, *args)
+        client.call = gated_call
+        return client
+
+
+@pytest.fixture
+def port():
+    return free_port()
+
+
+@pytest.fixture
+def server(port):
+    server = WizardServer(port).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def other(port, server):
+    """another client of the server"""
+    client = msgpackrpc.Client(msgpackrpc.Address("127.0.0.1", port))
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def sync(port, server):
+    sync = GatedSync("127.0.0.1", port, poll_timeout=POLL_TIMEOUT, retry_interval=RETRY_INTERVAL)
+    yield sync
+    sync.gate.set()
+    sync.close()
+
+
+def wait_until(condition, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def test_wheel_updates_are_coalesced(sync, other):
+    assert sync.wait_synced(3.0)
+    # the sender can not take anything while the lock is held, only the last position is sent
+    with sync._cond:
+        for i in range(100):
+            sync.set_wheel(i / 100)
+    assert sync.wait_synced(3.0)
+    assert sync.coalesced == 99
+    assert sync.sent == 1
+    assert other.call("get_wheel") == 0.99
+    assert sync.get_wheel() == 0.99
+
+
+def test_server_changes_are_pushed(sync, other):
+    assert sync.wait_synced(3.0)
+    other.call("set_driver", int(ClientMode.WIZARD))
+    assert wait_until(lambda: sync.get_driver() == ClientMode.WIZARD)
+    other.call("set_wheel", 0.25)
+    assert wait_until(lambda: sync.get_wheel() == 0.25)
+
+
+def test_local_change_wins_until_acknowledged(sync, other):
+    assert sync.wait_synced(3.0)
+    sync.gate.clear()
+    sync.set_wheel(0.1)
+    # the server state changes while the local position is not sent yet
+    other.call("set_wheel", 0.5)
+    other.call("set_driver", int(ClientMode.WIZARD))
+    assert wait_until(lambda: sync.get_driver() == ClientMode.WIZARD)
+    assert sync.get_wheel() == 0.1
+    assert not sync.wait_synced(0.1)
+
+    sync.gate.set()
+    assert sync.wait_synced(3.0)
+    assert sync.get_wheel() == 0.1
+    assert other.call("get_wheel") == 0.1
+
+
+def test_reconnects_after_server_restart(port, server, sync):
+    assert sync.wait_synced(3.0)
+    for i in range(5):
+        sync.set_wheel(i + 1.0)
+        assert sync.wait_synced(3.0)
+    assert sync.version >= 5
+
+    server.stop()
+    time.sleep(2 * RETRY_INTERVAL)
+    restarted = WizardServer(port).start()
+    try:
+        # the versions of the restarted server start over
+        client = msgpackrpc.Client(msgpackrpc.Address("127.0.0.1", port))
+        client.call("set_driver", int(ClientMode.WIZARD))
+        assert wait_until(lambda: sync.get_driver() == ClientMode.WIZARD, 5.0)
+        sync.set_wheel(-0.5)
+        assert sync.wait_synced(5.0)
+        assert client.call("get_wheel") == -0.5
+        client.close()
+    finally:
+        sync.close()
+        restarted.stop()
+
+
+@pytest.mark.parametrize("server_up", [True, False])
+def test_close_returns_in_time(port, server, server_up):
+    if not server_up:
+        server.stop()
+    sync = WizardSync("127.0.0.1", port, poll_timeout=POLL_TIMEOUT, retry_interval=RETRY_INTERVAL)
+    if server_up:
+        assert sync.wait_synced(3.0)
+        # let the subscription wait on the server
+        time.sleep(POLL_TIMEOUT / 2)
+    else:
+        time.sleep(RETRY_INTERVAL / 2)
+    start = time.monotonic()
+    sync.close()
+    assert time.monotonic() - start <= POLL_TIMEOUT + RETRY_INTERVAL
+    # the singleton can be created again
+    WizardSync("127.0.0.1", port, poll_timeout=POLL_TIMEOUT, retry_interval=RETRY_INTERVAL).close()
+
+
+def connects(host: str, port: int) -> bool:
+    with socket.socket() as s:
+        return s.connect_ex((host, port)) == 0
+
+
+@pytest.mark.parametrize("host, reachable", [("0.0.0.0", True), ("127.0.0.1", False)])
+def test_server_listens_on_its_host(port, host, reachable):
+    server = WizardServer(port, host).start()
+    try:
+        assert connects("127.0.0.1", port)
+        # another loopback address, only reachable when listening on every interface
+        assert connects("127.0.0.2", port) == reachable
+    finally:
+        server.stop()
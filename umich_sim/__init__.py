@@ -1,6 +1,22 @@
 #!/usr/bin/env python3
 """
 root package for the project
+
+The experiments are imported on first access so that subpackages that do not need CARLA
+(e.g. umich_sim.kinematic_carla, which stands in for it) can be imported on their own.
 """
 
-from umich_sim.sim_backend.experiments import FreewayExperiment, IntersectionExperiment
+from typing import TYPE_CHECKING
+
+from umich_sim.lazy import lazy_dir, lazy_exports
+
+_EXPORTS = {
+    "FreewayExperiment": "umich_sim.sim_backend.experiments",
+    "IntersectionExperiment": "umich_sim.sim_backend.experiments",
+}
+__all__ = list(_EXPORTS)
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+__dir__ = lazy_dir(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from umich_sim.sim_backend.experiments import FreewayExperiment, IntersectionExperiment
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+In-process kinematic stand-in for the CARLA Python API
+
+Implements the subset of the carla module used by umich_sim (Client, World, Map, Waypoint,
+Junction, Vehicle, TrafficLight, WorldSnapshot, apply_batch, ...) on top of a lane graph road
+network and a vectorized bicycle model, so the backend can be profiled and load tested without
+a CARLA server. Nothing is rendered, sensors never produce data and vehicles do not collide.
+
+Call install() before anything imports carla::
+
+    from umich_sim import kinematic_carla
+    kinematic_carla.install()
+    from umich_sim.sim_backend.experiments import IntersectionExperiment
+"""
+
+import sys
+from types import ModuleType
+
+from . import command
+from .geometry import BoundingBox, Color, Location, Rotation, Transform, Vector2D, Vector3D
+from .road import (Junction, LaneChange, LaneMarking, LaneMarkingColor, LaneMarkingType, LaneType,
+                   Map, Waypoint, load_lane_graph)
+from .actors import (Actor, AttachmentType, Sensor, TrafficLight, TrafficLightState, Vehicle,
+                     VehicleControl, VehicleLightState, VehiclePhysicsControl, VehicleStates,
+                     WheelPhysicsControl)
+from .world import (ActorAttribute, ActorBlueprint, ActorList, ActorSnapshot, BlueprintLibrary,
+                    Client, ColorConverter, DebugHelper, Timestamp, WeatherParameters, World,
+                    WorldSettings, WorldSnapshot)
+from .maps import available_maps, grid_lane_graph, register_map
+
+
+def install() -> ModuleType:
+    """
+    Register the stand-in as the carla module, must be called before carla is first imported
+    :return: the stand-in module
+    """
+    existing = sys.modules.get("carla")
+    module = sys.modules[__name__]
+    if existing is not None and existing is not module:
+        raise Exception("Error: carla was already imported, install the stand-in before importing it")
+    sys.modules["carla"] = module
+    sys.modules["carla.command"] = command
+    return module
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Actors of the stand-in (carla.Actor, carla.Vehicle, carla.TrafficLight, carla.Sensor, ...)
+
+The dynamic state of every vehicle of a world lives in a single VehicleStates table (one numpy
+array per quantity) so the whole fleet is integrated with a handful of vectorized operations.
+Vehicle objects are thin handles on a row of that table.
+"""
+
+import enum
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .geometry import BoundingBox, Location, Rotation, Transform, Vector3D
+
+
+class VehicleLightState(enum.IntFlag):
+    """
+    Mirrors carla.VehicleLightState
+    """
+    NONE = 0
+    Position = 0x1
+    LowBeam = 0x1 << 1
+    HighBeam = 0x1 << 2
+    Brake = 0x1 << 3
+    RightBlinker = 0x1 << 4
+    LeftBlinker = 0x1 << 5
+    Reverse = 0x1 << 6
+    Fog = 0x1 << 7
+    Interior = 0x1 << 8
+    Special1 = 0x1 << 9
+    Special2 = 0x1 << 10
+    All = 0xFFFFFFFF
+
+
+class TrafficLightState(enum.IntEnum):
+    """
+    Mirrors carla.TrafficLightState
+    """
+    Red = 0
+    Yellow = 1
+    Green = 2
+    Off = 3
+    Unknown = 4
+
+
+class AttachmentType(enum.IntEnum):
+    """
+    Mirrors carla.AttachmentType, the stand-in treats every attachment as rigid
+    """
+    Rigid = 0
+    SpringArm = 1
+
+
+class VehicleControl:
+    """
+    Mirrors carla.VehicleControl
+    """
+
+    def __init__(self, throttle: float = 0.0, steer: float = 0.0, brake: float = 0.0,
+                 hand_brake: bool = False, reverse: bool = False, manual_gear_shift: bool = False,
+                 gear: int = 0):
+        self.throttle = throttle
+        self.steer = steer
+        self.brake = brake
+        self.hand_brake = hand_brake
+        self.reverse = reverse
+        self.manual_gear_shift = manual_gear_shift
+        self.gear = gear
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, VehicleControl) and \
+            (self.throttle, self.steer, self.brake, self.hand_brake, self.reverse) == \
+            (other.throttle, other.steer, other.brake, other.hand_brake, other.reverse)
+
+    def __repr__(self) -> str:
+        return (f"VehicleControl(throttle={self.throttle:.3f}, steer={self.steer:.3f}, "
+                f"brake={self.brake:.3f}, hand_brake={self.hand_brake}, reverse={self.reverse})")
+
+
+class WheelPhysicsControl:
+    """
+    Mirrors carla.WheelPhysicsControl, position is in world coordinates and in centimeters like
+    the one returned by CARLA
+    """
+
+    def __init__(self, tire_friction: float = 3.5, max_steer_angle: float = 70.0,
+                 radius: float = 35.0, position: Vector3D = None):
+        self.tire_friction = tire_friction
+        self.max_steer_angle = max_steer_angle
+        self.radius = radius
+        self.position: Vector3D = position if position is not None else Vector3D()
+
+
+class VehiclePhysicsControl:
+    """
+    Mirrors the parts of carla.VehiclePhysicsControl the stand-in models
+    """
+
+    def __init__(self, mass: float = 1500.0, max_rpm: float = 6000.0,
+                 wheels: Optional[List[WheelPhysicsControl]] = None):
+        self.mass = mass
+        self.max_rpm = max_rpm
+        self.wheels: List[WheelPhysicsControl] = wheels if wheels is not None else []
+
+
+class VehicleStates:
+    """
+    Struct of arrays holding the state, the control and the parameters of every vehicle of a world.
+
+    Rows are handed out by allocate and recycled by release, the arrays grow by doubling.
+    """
+    # Drag coefficient of the longitudinal model, in 1/s
+    DRAG = 0.02
+    # Top speed of every vehicle, in m/s
+    MAX_SPEED = 70.0
+
+    _FLOAT_FIELDS = ("x", "y", "z", "yaw", "speed", "yaw_rate", "acceleration", "throttle", "steer",
+                     "brake", "wheelbase", "max_steer_angle", "max_acceleration", "max_deceleration")
+    _BOOL_FIELDS = ("hand_brake", "reverse", "physics", "alive")
+
+    def __init__(self, capacity: int = 64):
+        self.capacity: int = capacity
+        # number of rows in use, including the released ones
+        self.count: int = 0
+        self._free: List[int] = []
+        for name in self._FLOAT_FIELDS:
+            setattr(self, name, np.zeros(capacity))
+        for name in self._BOOL_FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=bool))
+
+    def allocate(self) -> int:
+        """:return: the index of a free row"""
+        if self._free:
+            return self._free.pop()
+        if self.count == self.capacity:
+            self.capacity *= 2
+            for name in self._FLOAT_FIELDS + self._BOOL_FIELDS:
+                old = getattr(self, name)
+                new = np.zeros(self.capacity, dtype=old.dtype)
+                new[:self.count] = old[:self.count]
+                setattr(self, name, new)
+        self.count += 1
+        return self.count - 1
+
+    def release(self, index: int) -> None:
+        self.alive[index] = False
+        self.physics[index] = False
+        self._free.append(index)
+
+    def step(self, delta_seconds: float) -> None:
+        """
+        Integrate every live vehicle with simulated physics over one time step.
+
+        The longitudinal model turns the throttle and brake into an acceleration with a linear
+        drag, the lateral model is a kinematic bicycle model referenced at the center of the
+        vehicle.
+        :param delta_seconds: length of the time step
+        """
+        n = self.count
+        if n == 0 or delta_seconds <= 0:
+            return
+        active = self.alive[:n] & self.physics[:n]
+        speed = self.speed[:n]
+
+        # longitudinal dynamics
+        direction = np.where(self.reverse[:n], -1.0, 1.0)
+        brake = np.where(self.hand_brake[:n], 1.0, self.brake[:n])
+        new_speed = speed + (direction * self.throttle[:n] * self.max_acceleration[:n]
+                             - self.DRAG * speed) * delta_seconds
+        braking = brake * self.max_deceleration[:n] * delta_seconds
+        new_speed = np.sign(new_speed) * np.maximum(np.abs(new_speed) - braking, 0.0)
+        np.clip(new_speed, -self.MAX_SPEED, self.MAX_SPEED, out=new_speed)
+
+        # kinematic bicycle model
+        steer_angle = np.radians(np.clip(self.steer[:n], -1.0, 1.0) * self.max_steer_angle[:n])
+        slip = np.arctan(0.5 * np.tan(steer_angle))
+        mean_speed = 0.5 * (speed + new_speed)
+        heading = np.radians(self.yaw[:n])
+        yaw_rate = mean_speed * 2.0 / self.wheelbase[:n] * np.sin(slip)
+        x = self.x[:n] + mean_speed * np.cos(heading + slip) * delta_seconds
+        y = self.y[:n] + mean_speed * np.sin(heading + slip) * delta_seconds
+        yaw = np.degrees(heading + yaw_rate * delta_seconds)
+        yaw = (yaw + 180.0) % 360.0 - 180.0
+
+        self.acceleration[:n] = np.where(active, (new_speed - speed) / delta_seconds, 0.0)
+        self.yaw_rate[:n] = np.where(active, np.degrees(yaw_rate), 0.0)
+        self.speed[:n] = np.where(active, new_speed, 0.0)
+        self.x[:n] = np.where(active, x, self.x[:n])
+        self.y[:n] = np.where(active, y, self.y[:n])
+        self.yaw[:n] = np.where(active, yaw, self.yaw[:n])
+
+
+class Actor:
+    """
+    Mirrors carla.Actor, the transform of plain actors is stored on the object itself
+    """
+
+    def __init__(self, world, actor_id: int, type_id: str,
+                 attributes: Optional[Dict[str, str]] = None,
+                 transform: Optional[Transform] = None,
+                 parent: Optional["Actor"] = None):
+        self._world = world
+        self.id: int = actor_id
+        self.type_id: str = type_id
+        self.attributes: Dict[str, str] = dict(attributes or {})
+        self.parent: Optional[Actor] = parent
+        self.semantic_tags: List[int] = []
+        self.bounding_box: BoundingBox = BoundingBox()
+        self._alive: bool = True
+        # relative to the parent for attached actors
+        self._transform: Transform = _copy_transform(transform or Transform())
+
+    @property
+    def is_alive(self) -> bool:
+        return self._alive
+
+    def get_world(self):
+        return self._world
+
+    def get_transform(self) -> Transform:
+        if self.parent is None:
+            return _copy_transform(self._transform)
+        parent_transform = self.parent.get_transform()
+        location = parent_transform.transform(self._transform.location)
+        rotation = self._transform.rotation
+        return Transform(location, Rotation(rotation.pitch,
+                                            parent_transform.rotation.yaw + rotation.yaw,
+                                            rotation.roll))
+
+    def get_location(self) -> Location:
+        return self.get_transform().location
+
+    def get_velocity(self) -> Vector3D:
+        return self.parent.get_velocity() if self.parent is not None else Vector3D()
+
+    def get_angular_velocity(self) -> Vector3D:
+        return Vector3D()
+
+    def get_acceleration(self) -> Vector3D:
+        return Vector3D()
+
+    def set_transform(self, transform: Transform) -> None:
+        self._transform = _copy_transform(transform)
+
+    def set_location(self, location: Location) -> None:
+        transform = self.get_transform() if self.parent is None else _copy_transform(self._transform)
+        transform.location = Location(location.x, location.y, location.z)
+        self.set_transform(transform)
+
+    def set_simulate_physics(self, enabled: bool = True) -> None:
+        pass
+
+    def destroy(self) -> bool:
+        if not self._alive:
+            return False
+        self._world._destroy_actor(self)
+        return True
+
+    def __repr__(self) -> str:
+        return f"Actor(id={self.id}, type={self.type_id})"
+
+
+class Vehicle(Actor):
+    """
+    Mirrors carla.Vehicle, a handle on a row of the VehicleStates of its world
+    """
+
+    def __init__(self, world, actor_id: int, type_id: str, attributes: Dict[str, str],
+                 transform: Transform, index: int, extent: Vector3D):
+        super().__init__(world, actor_id, type_id, attributes)
+        self._states: VehicleStates = world._vehicle_states
+        self._index: int = index
+        self.bounding_box = BoundingBox(Location(0.0, 0.0, extent.z), extent)
+        self._light_state: VehicleLightState = VehicleLightState.NONE
+        states, i = self._states, index
+        states.x[i], states.y[i], states.z[i] = transform.location.x, transform.location.y, \
+            transform.location.z
+        states.yaw[i] = transform.rotation.yaw
+        states.speed[i] = states.yaw_rate[i] = states.acceleration[i] = 0.0
+        states.throttle[i] = states.steer[i] = states.brake[i] = 0.0
+        states.hand_brake[i] = states.reverse[i] = False
+        states.physics[i] = states.alive[i] = True
+        states.wheelbase[i] = float(attributes.get("wheelbase", 2.8))
+        states.max_steer_angle[i] = float(attributes.get("max_steer_angle", 70.0))
+        states.max_acceleration[i] = float(attributes.get("max_acceleration", 3.5))
+        states.max_deceleration[i] = float(attributes.get("max_deceleration", 8.0))
+
+    def get_transform(self) -> Transform:
+        states, i = self._states, self._index
+        return Transform(Location(states.x[i], states.y[i], states.z[i]),
+                         Rotation(yaw=states.yaw[i]))
+
+    def get_location(self) -> Location:
+        states, i = self._states, self._index
+        return Location(states.x[i], states.y[i], states.z[i])
+
+    def get_velocity(self) -> Vector3D:
+        states, i = self._states, self._index
+        yaw = math.radians(states.yaw[i])
+        speed = float(states.speed[i])
+        return Vector3D(speed * math.cos(yaw), speed * math.sin(yaw), 0.0)
+
+    def get_angular_velocity(self) -> Vector3D:
+        return Vector3D(0.0, 0.0, self._states.yaw_rate[self._index])
+
+    def get_acceleration(self) -> Vector3D:
+        states, i = self._states, self._index
+        yaw = math.radians(states.yaw[i])
+        acceleration = float(states.acceleration[i])
+        return Vector3D(acceleration * math.cos(yaw), acceleration * math.sin(yaw), 0.0)
+
+    def set_transform(self, transform: Transform) -> None:
+        states, i = self._states, self._index
+        states.x[i], states.y[i], states.z[i] = transform.location.x, transform.location.y, \
+            transform.location.z
+        states.yaw[i] = transform.rotation.yaw
+
+    def set_target_velocity(self, velocity: Vector3D) -> None:
+        """Set the speed of the vehicle to the component of velocity along its heading"""
+        states, i = self._states, self._index
+        yaw = math.radians(states.yaw[i])
+        states.speed[i] = velocity.x * math.cos(yaw) + velocity.y * math.sin(yaw)
+
+    def set_simulate_physics(self, enabled: bool = True) -> None:
+        self._states.physics[self._index] = enabled
+
+    def apply_control(self, control: VehicleControl) -> None:
+        states, i = self._states, self._index
+        states.throttle[i] = control.throttle
+        states.steer[i] = control.steer
+        states.brake[i] = control.brake
+        states.hand_brake[i] = control.hand_brake
+        states.reverse[i] = control.reverse
+
+    def get_control(self) -> VehicleControl:
+        states, i = self._states, self._index
+        return VehicleControl(float(states.throttle[i]), float(states.steer[i]),
+                              float(states.brake[i]), bool(states.hand_brake[i]),
+                              bool(states.reverse[i]))
+
+    def get_light_state(self) -> VehicleLightState:
+        return self._light_state
+
+    def set_light_state(self, light_state: VehicleLightState) -> None:
+        self._light_state = VehicleLightState(int(light_state))
+
+    def set_autopilot(self, enabled: bool = True, port: int = 8000) -> None:
+        pass
+
+    def get_speed_limit(self) -> float:
+        return 50.0
+
+    def get_traffic_light(self) -> Optional["TrafficLight"]:
+        return None
+
+    def get_traffic_light_state(self) -> TrafficLightState:
+        return TrafficLightState.Green
+
+    def is_at_traffic_light(self) -> bool:
+        return False
+
+    def get_physics_control(self) -> VehiclePhysicsControl:
+        """
+        :return: the physics control of the vehicle, its wheels are placed on the corners of the
+                 wheelbase at the current position of the vehicle
+        """
+        states, i = self._states, self._index
+        transform = self.get_transform()
+        half_wheelbase = states.wheelbase[i] / 2
+        half_track = self.bounding_box.extent.y * 0.85
+        wheels = []
+        for forward, right in ((half_wheelbase, -half_track), (half_wheelbase, half_track),
+                               (-half_wheelbase, -half_track), (-half_wheelbase, half_track)):
+            position = transform.transform(Vector3D(forward, right, 0.0))
+            wheels.append(WheelPhysicsControl(
+                max_steer_angle=float(states.max_steer_angle[i]) if forward > 0 else 0.0,
+                position=Vector3D(position.x * 100, position.y * 100, position.z * 100)))
+        return VehiclePhysicsControl(wheels=wheels)
+
+    def apply_physics_control(self, physics_control: VehiclePhysicsControl) -> None:
+        pass
+
+    def get_wheel_steer_angle(self, wheel_location: Any) -> float:
+        states, i = self._states, self._index
+        return float(states.steer[i] * states.max_steer_angle[i])
+
+    def __repr__(self) -> str:
+        return f"Vehicle(id={self.id}, type={self.type_id})"
+
+
+class TrafficLight(Actor):
+    """
+    Mirrors carla.TrafficLight.
+
+    Lights that are not frozen cycle through green, yellow and red on their own, each light on
+    its own timer.
+    """
+
+    def __init__(self, world, actor_id: int, transform: Transform, junction_id: Optional[int],
+                 stop_waypoints: List, pole_index: int):
+        super().__init__(world, actor_id, "traffic.traffic_light", transform=transform)
+        self.junction_id: Optional[int] = junction_id
+        self._stop_waypoints = stop_waypoints
+        self._pole_index: int = pole_index
+        self._state: TrafficLightState = \
+            TrafficLightState.Green if pole_index == 0 else TrafficLightState.Red
+        self._frozen: bool = False
+        self._elapsed: float = 0.0
+        self._timings: Dict[TrafficLightState, float] = {
+            TrafficLightState.Green: 10.0,
+            TrafficLightState.Yellow: 3.0,
+            TrafficLightState.Red: 10.0,
+        }
+
+    @property
+    def state(self) -> TrafficLightState:
+        return self._state
+
+    def get_state(self) -> TrafficLightState:
+        return self._state
+
+    def set_state(self, state: TrafficLightState) -> None:
+        self._state = TrafficLightState(state)
+        self._elapsed = 0.0
+
+    def freeze(self, freeze: bool) -> None:
+        self._frozen = freeze
+
+    def is_frozen(self) -> bool:
+        return self._frozen
+
+    def get_elapsed_time(self) -> float:
+        return self._elapsed
+
+    def get_green_time(self) -> float:
+        return self._timings[TrafficLightState.Green]
+
+    def set_green_time(self, green_time: float) -> None:
+        self._timings[TrafficLightState.Green] = green_time
+
+    def get_yellow_time(self) -> float:
+        return self._timings[TrafficLightState.Yellow]
+
+    def set_yellow_time(self, yellow_time: float) -> None:
+        self._timings[TrafficLightState.Yellow] = yellow_time
+
+    def get_red_time(self) -> float:
+        return self._timings[TrafficLightState.Red]
+
+    def set_red_time(self, red_time: float) -> None:
+        self._timings[TrafficLightState.Red] = red_time
+
+    def get_pole_index(self) -> int:
+        return self._pole_index
+
+    def get_stop_waypoints(self) -> List:
+        return list(self._stop_waypoints)
+
+    def get_affected_lane_waypoints(self) -> List:
+        return list(self._stop_waypoints)
+
+    def get_group_traffic_lights(self) -> List["TrafficLight"]:
+        return self._world.get_traffic_lights_in_junction(self.junction_id)
+
+    def reset_group(self) -> None:
+        for light in self.get_group_traffic_lights():
+            light.set_state(TrafficLightState.Green if light._pole_index == 0
+                            else TrafficLightState.Red)
+
+    def _advance(self, delta_seconds: float) -> None:
+        """Run the timer of the light if it is not frozen"""
+        if self._frozen or self._state not in self._timings:
+            return
+        self._elapsed += delta_seconds
+        if self._elapsed >= self._timings[self._state]:
+            self._elapsed = 0.0
+            self._state = {
+                TrafficLightState.Green: TrafficLightState.Yellow,
+                TrafficLightState.Yellow: TrafficLightState.Red,
+                TrafficLightState.Red: TrafficLightState.Green,
+            }[self._state]
+
+    def __repr__(self) -> str:
+        return f"TrafficLight(id={self.id}, state={self._state.name})"
+
+
+class Sensor(Actor):
+    """
+    Mirrors carla.Sensor. The stand-in does not render or detect anything, sensors never
+    produce data
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._callback: Optional[Callable[[Any], None]] = None
+
+    @property
+    def is_listening(self) -> bool:
+        return self._callback is not None
+
+    def listen(self, callback: Callable[[Any], None]) -> None:
+        self._callback = callback
+
+    def stop(self) -> None:
+        self._callback = None
+
+    def destroy(self) -> bool:
+        self.stop()
+        return super().destroy()
+
+    def __repr__(self) -> str:
+        return f"Sensor(id={self.id}, type={self.type_id})"
+
+
+def _copy_transform(transform: Transform) -> Transform:
+    location, rotation = transform.location, transform.rotation
+    return Transform(Location(location.x, location.y, location.z),
+                     Rotation(rotation.pitch, rotation.yaw, rotation.roll))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Commands applied in batches through Client.apply_batch, mirrors carla.command
+"""
+
+from typing import Optional
+
+from .geometry import Transform, Vector3D
+
+
+def _actor_id(actor) -> int:
+    """Commands accept either an actor or its id"""
+    return actor if isinstance(actor, int) else actor.id
+
+
+class Response:
+    """
+    Mirrors carla.command.Response
+    """
+
+    def __init__(self, actor_id: int, error: str = ""):
+        self.actor_id: int = actor_id
+        self.error: str = error
+
+    def has_error(self) -> bool:
+        return self.error != ""
+
+
+class ApplyTransform:
+    def __init__(self, actor, transform: Transform):
+        self.actor_id: int = _actor_id(actor)
+        self.transform: Transform = transform
+
+
+class ApplyVehicleControl:
+    def __init__(self, actor, control):
+        self.actor_id: int = _actor_id(actor)
+        self.control = control
+
+
+class ApplyTargetVelocity:
+    def __init__(self, actor, velocity: Vector3D):
+        self.actor_id: int = _actor_id(actor)
+        self.velocity: Vector3D = velocity
+
+
+class SetSimulatePhysics:
+    def __init__(self, actor, enabled: bool):
+        self.actor_id: int = _actor_id(actor)
+        self.enabled: bool = enabled
+
+
+class SetVehicleLightState:
+    def __init__(self, actor, light_state):
+        self.actor_id: int = _actor_id(actor)
+        self.light_state = light_state
+
+
+class DestroyActor:
+    def __init__(self, actor):
+        self.actor_id: int = _actor_id(actor)
+
+
+class SpawnActor:
+    def __init__(self, blueprint, transform: Transform, parent=None):
+        self.blueprint = blueprint
+        self.transform: Transform = transform
+        self.parent_id: Optional[int] = _actor_id(parent) if parent is not None else None
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Geometry classes of the stand-in (carla.Vector3D, carla.Location, carla.Rotation, ...)
+
+Angles are in degrees and the frame follows CARLA: x forward, y right, yaw rotating x onto y.
+"""
+
+import math
+from typing import List
+
+
+class Vector2D:
+    """
+    2D vector, mirrors carla.Vector2D
+    """
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: float = 0.0, y: float = 0.0):
+        self.x = float(x)
+        self.y = float(y)
+
+    def __add__(self, other: "Vector2D") -> "Vector2D":
+        return Vector2D(self.x + other.x, self.y + other.y)
+
+    def __sub__(self, other: "Vector2D") -> "Vector2D":
+        return Vector2D(self.x - other.x, self.y - other.y)
+
+    def __mul__(self, k: float) -> "Vector2D":
+        return Vector2D(self.x * k, self.y * k)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, k: float) -> "Vector2D":
+        return Vector2D(self.x / k, self.y / k)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Vector2D) and self.x == other.x and self.y == other.y
+
+    def length(self) -> float:
+        return math.hypot(self.x, self.y)
+
+    def squared_length(self) -> float:
+        return self.x * self.x + self.y * self.y
+
+    def make_unit_vector(self) -> "Vector2D":
+        length = self.length()
+        return Vector2D(self.x / length, self.y / length) if length > 0 else Vector2D()
+
+    def __repr__(self) -> str:
+        return f"Vector2D(x={self.x:.6f}, y={self.y:.6f})"
+
+
+class Vector3D:
+    """
+    3D vector, mirrors carla.Vector3D
+    """
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+
+    def _new(self, x: float, y: float, z: float) -> "Vector3D":
+        return type(self)(x, y, z)
+
+    def __add__(self, other: "Vector3D") -> "Vector3D":
+        return self._new(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other: "Vector3D") -> "Vector3D":
+        return self._new(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, k: float) -> "Vector3D":
+        return self._new(self.x * k, self.y * k, self.z * k)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, k: float) -> "Vector3D":
+        return self._new(self.x / k, self.y / k, self.z / k)
+
+    def __neg__(self) -> "Vector3D":
+        return self._new(-self.x, -self.y, -self.z)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Vector3D) and \
+            self.x == other.x and self.y == other.y and self.z == other.z
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y, self.z))
+
+    def length(self) -> float:
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def squared_length(self) -> float:
+        return self.x * self.x + self.y * self.y + self.z * self.z
+
+    def make_unit_vector(self) -> "Vector3D":
+        length = self.length()
+        return self / length if length > 0 else self._new(0.0, 0.0, 0.0)
+
+    def dot(self, other: "Vector3D") -> float:
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def dot_2d(self, other: "Vector3D") -> float:
+        return self.x * other.x + self.y * other.y
+
+    def cross(self, other: "Vector3D") -> "Vector3D":
+        return Vector3D(self.y * other.z - self.z * other.y,
+                        self.z * other.x - self.x * other.z,
+                        self.x * other.y - self.y * other.x)
+
+    def distance(self, other: "Vector3D") -> float:
+        return math.sqrt((self.x - other.x)**2 + (self.y - other.y)**2 + (self.z - other.z)**2)
+
+    def distance_squared(self, other: "Vector3D") -> float:
+        return (self.x - other.x)**2 + (self.y - other.y)**2 + (self.z - other.z)**2
+
+    def distance_2d(self, other: "Vector3D") -> float:
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+    def distance_squared_2d(self, other: "Vector3D") -> float:
+        return (self.x - other.x)**2 + (self.y - other.y)**2
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(x={self.x:.6f}, y={self.y:.6f}, z={self.z:.6f})"
+
+
+class Location(Vector3D):
+    """
+    Point in the world in meters, mirrors carla.Location
+    """
+    __slots__ = ()
+
+
+class Rotation:
+    """
+    Rotation in degrees, mirrors carla.Rotation
+    """
+    __slots__ = ("pitch", "yaw", "roll")
+
+    def __init__(self, pitch: float = 0.0, yaw: float = 0.0, roll: float = 0.0):
+        self.pitch = float(pitch)
+        self.yaw = float(yaw)
+        self.roll = float(roll)
+
+    def get_forward_vector(self) -> Vector3D:
+        pitch, yaw = math.radians(self.pitch), math.radians(self.yaw)
+        return Vector3D(math.cos(pitch) * math.cos(yaw),
+                        math.cos(pitch) * math.sin(yaw),
+                        math.sin(pitch))
+
+    def get_right_vector(self) -> Vector3D:
+        yaw = math.radians(self.yaw)
+        return Vector3D(-math.sin(yaw), math.cos(yaw), 0.0)
+
+    def get_up_vector(self) -> Vector3D:
+        return Vector3D(0.0, 0.0, 1.0)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Rotation) and \
+            self.pitch == other.pitch and self.yaw == other.yaw and self.roll == other.roll
+
+    def __repr__(self) -> str:
+        return f"Rotation(pitch={self.pitch:.6f}, yaw={self.yaw:.6f}, roll={self.roll:.6f})"
+
+
+class Transform:
+    """
+    Location and rotation of an object, mirrors carla.Transform.
+
+    Only the yaw is taken into account when transforming points, the stand-in world is flat.
+    """
+    __slots__ = ("location", "rotation")
+
+    def __init__(self, location: Location = None, rotation: Rotation = None):
+        self.location: Location = location if location is not None else Location()
+        self.rotation: Rotation = rotation if rotation is not None else Rotation()
+
+    def get_forward_vector(self) -> Vector3D:
+        return self.rotation.get_forward_vector()
+
+    def get_right_vector(self) -> Vector3D:
+        return self.rotation.get_right_vector()
+
+    def get_up_vector(self) -> Vector3D:
+        return self.rotation.get_up_vector()
+
+    def transform(self, in_point: Vector3D) -> Location:
+        """
+        Convert a point from the local frame of the transform to world coordinates
+        :param in_point: point in local coordinates
+        :return: the point in world coordinates
+        """
+        yaw = math.radians(self.rotation.yaw)
+        cos_yaw, sin_yaw = math.cos(yaw), math.sin(yaw)
+        return Location(self.location.x + cos_yaw * in_point.x - sin_yaw * in_point.y,
+                        self.location.y + sin_yaw * in_point.x + cos_yaw * in_point.y,
+                        self.location.z + in_point.z)
+
+    def get_matrix(self) -> List[List[float]]:
+        yaw = math.radians(self.rotation.yaw)
+        cos_yaw, sin_yaw = math.cos(yaw), math.sin(yaw)
+        return [[cos_yaw, -sin_yaw, 0.0, self.location.x],
+                [sin_yaw, cos_yaw, 0.0, self.location.y],
+                [0.0, 0.0, 1.0, self.location.z],
+                [0.0, 0.0, 0.0, 1.0]]
+
+    def get_inverse_matrix(self) -> List[List[float]]:
+        yaw = math.radians(self.rotation.yaw)
+        cos_yaw, sin_yaw = math.cos(yaw), math.sin(yaw)
+        x, y = self.location.x, self.location.y
+        return [[cos_yaw, sin_yaw, 0.0, -(cos_yaw * x + sin_yaw * y)],
+                [-sin_yaw, cos_yaw, 0.0, sin_yaw * x - cos_yaw * y],
+                [0.0, 0.0, 1.0, -self.location.z],
+                [0.0, 0.0, 0.0, 1.0]]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Transform) and \
+            self.location == other.location and self.rotation == other.rotation
+
+    def __repr__(self) -> str:
+        return f"Transform({self.location}, {self.rotation})"
+
+
+class BoundingBox:
+    """
+    Box defined by its center and half extents, mirrors carla.BoundingBox
+    """
+
+    def __init__(self, location: Location = None, extent: Vector3D = None):
+        self.location: Location = location if location is not None else Location()
+        self.extent: Vector3D = extent if extent is not None else Vector3D()
+        self.rotation: Rotation = Rotation()
+
+    def contains(self, world_point: Location, transform: Transform) -> bool:
+        local = world_point - transform.location
+        yaw = math.radians(transform.rotation.yaw)
+        x = math.cos(yaw) * local.x + math.sin(yaw) * local.y - self.location.x
+        y = -math.sin(yaw) * local.x + math.cos(yaw) * local.y - self.location.y
+        return abs(x) <= self.extent.x and abs(y) <= self.extent.y
+
+    def __repr__(self) -> str:
+        return f"BoundingBox({self.location}, {self.extent})"
+
+
+class Color:
+    """
+    RGBA color, mirrors carla.Color
+    """
+    __slots__ = ("r", "g", "b", "a")
+
+    def __init__(self, r: int = 0, g: int = 0, b: int = 0, a: int = 255):
+        self.r, self.g, self.b, self.a = r, g, b, a
+
+    def __repr__(self) -> str:
+        return f"Color({self.r}, {self.g}, {self.b}, {self.a})"
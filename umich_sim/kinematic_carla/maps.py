@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Maps available to the stand-in
+
+Maps are registered by name, either as a lane graph (a dictionary or the path of a JSON file)
+or as a function building the lane graph. Client.load_world looks the name up in the registry,
+then falls back to <name>.json in the directories listed in the KINEMATIC_CARLA_MAP_PATH
+environment variable. A synthetic grid of four way junctions is registered as "Grid".
+"""
+
+import itertools
+import math
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from .road import Map, load_lane_graph
+
+# Environment variable listing the directories searched for lane graph files
+MAP_PATH_VARIABLE = "KINEMATIC_CARLA_MAP_PATH"
+
+# Headings of the approaches of a grid junction, in the order of its traffic lights. Opposite
+# approaches are two lights apart, like the (0, 2) and (1, 3) pairs used by the Intersection
+_APPROACH_YAWS = (0, 90, 180, 270)
+
+MapSource = Union[Dict[str, Any], str, Path, Callable[[], Dict[str, Any]]]
+_registry: Dict[str, MapSource] = {}
+_loaded: Dict[str, Map] = {}
+
+
+def _unit(yaw: int) -> Tuple[float, float]:
+    return round(math.cos(math.radians(yaw))), round(math.sin(math.radians(yaw)))
+
+
+def grid_lane_graph(rows: int = 3,
+                    cols: int = 3,
+                    block_length: float = 100.0,
+                    lane_width: float = 3.5,
+                    lanes_per_direction: int = 1,
+                    spawn_spacing: float = 20.0,
+                    name: str = "Grid") -> Dict[str, Any]:
+    """
+    Build the lane graph of a grid of signalised four way junctions.
+
+    Junctions are block_length apart, every junction on the border of the grid gets dead end
+    roads of half a block so that all the junctions have four approaches. Every junction has one
+    traffic light per approach, ordered by the heading of the approach (0, 90, 180, 270 degrees).
+    :param rows: number of rows of junctions
+    :param cols: number of columns of junctions
+    :param block_length: distance between two neighbouring junctions, in meters
+    :param lane_width: width of the lanes, in meters
+    :param lanes_per_direction: number of lanes of every road in each direction
+    :param spawn_spacing: distance between the spawn points along the roads, in meters
+    :param name: name of the map
+    :return: the lane graph
+    """
+    junction_radius = lanes_per_direction * lane_width + 3.0
+    lanes: List[Dict[str, Any]] = []
+    road_ids = itertools.count()
+    spawn_points: List[Dict[str, Any]] = []
+    # lanes entering and leaving every junction, indexed by junction then heading
+    incoming: Dict[int, Dict[int, List[Dict[str, Any]]]] = {}
+    outgoing: Dict[int, Dict[int, List[Dict[str, Any]]]] = {}
+
+    def node_position(row: int, col: int) -> Tuple[float, float]:
+        return col * block_length, row * block_length
+
+    def add_road(start, end, yaw: int, start_node, end_node) -> None:
+        """Add the lanes of a directed road from start to end, trimmed at the junctions"""
+        ux, uy = _unit(yaw)
+        rx, ry = -uy, ux
+        sx, sy = start
+        ex, ey = end
+        if start_node is not None:
+            sx, sy = sx + ux * junction_radius, sy + uy * junction_radius
+        if end_node is not None:
+            ex, ey = ex - ux * junction_radius, ey - uy * junction_radius
+        road_id = next(road_ids)
+        road_lanes = []
+        for k in range(lanes_per_direction):
+            offset = (k + 0.5) * lane_width
+            lane = {
+                "id": len(lanes),
+                "road_id": road_id,
+                "lane_id": -(k + 1),
+                "width": lane_width,
+                "points": [[sx + rx * offset, sy + ry * offset, 0.0],
+                           [ex + rx * offset, ey + ry * offset, 0.0]],
+                "successors": [],
+                "left_marking": "SolidSolid" if k == 0 else "Broken",
+                "right_marking": "Solid" if k == lanes_per_direction - 1 else "Broken",
+            }
+            lanes.append(lane)
+            road_lanes.append(lane)
+            length = math.hypot(ex - sx, ey - sy)
+            s = min(spawn_spacing / 2, length / 2)
+            while s < length - 5.0:
+                spawn_points.append({"lane": lane["id"], "s": s})
+                s += spawn_spacing
+        for k, lane in enumerate(road_lanes):
+            lane["left"] = road_lanes[k - 1]["id"] if k > 0 else None
+            lane["right"] = road_lanes[k + 1]["id"] if k + 1 < len(road_lanes) else None
+        if start_node is not None:
+            outgoing.setdefault(start_node, {})[yaw] = road_lanes
+        if end_node is not None:
+            incoming.setdefault(end_node, {})[yaw] = road_lanes
+
+    # roads between the junctions and dead ends on the border, both directions
+    for row in range(rows):
+        for col in range(cols):
+            node = row * cols + col
+            position = node_position(row, col)
+            for yaw in _APPROACH_YAWS:
+                dx, dy = _unit(yaw)
+                neighbour_row, neighbour_col = row + dy, col + dx
+                if 0 <= neighbour_row < rows and 0 <= neighbour_col < cols:
+                    # roads between two junctions are added once, from their west/north end
+                    if yaw in (0, 90):
+                        neighbour = neighbour_row * cols + neighbour_col
+                        neighbour_position = node_position(neighbour_row, neighbour_col)
+                        add_road(position, neighbour_position, yaw, node, neighbour)
+                        add_road(neighbour_position, position, (yaw + 180) % 360, neighbour, node)
+                else:
+                    dead_end = (position[0] + dx * block_length / 2,
+                                position[1] + dy * block_length / 2)
+                    add_road(position, dead_end, yaw, node, None)
+                    add_road(dead_end, position, (yaw + 180) % 360, None, node)
+
+    # lanes crossing the junctions and their traffic lights
+    traffic_lights: List[Dict[str, Any]] = []
+    for node in range(rows * cols):
+        for yaw in _APPROACH_YAWS:
+            approach = incoming[node][yaw]
+            maneuvers = [(approach[k], outgoing[node][yaw][k], False)
+                         for k in range(lanes_per_direction)]
+            maneuvers.append((approach[-1], outgoing[node][(yaw + 90) % 360][-1], True))  # right
+            maneuvers.append((approach[0], outgoing[node][(yaw + 270) % 360][0], True))  # left
+            for entry, exit_lane, turn in maneuvers:
+                start, end = entry["points"][-1], exit_lane["points"][0]
+                if not turn:
+                    points = [start, end]
+                else:
+                    # quadratic curve through the corner where the two lanes would meet
+                    ux, uy = _unit(yaw)
+                    along = (end[0] - start[0]) * ux + (end[1] - start[1]) * uy
+                    corner = (start[0] + ux * along, start[1] + uy * along)
+                    points = []
+                    for i in range(9):
+                        t = i / 8
+                        points.append([
+                            (1 - t)**2 * start[0] + 2 * (1 - t) * t * corner[0] + t**2 * end[0],
+                            (1 - t)**2 * start[1] + 2 * (1 - t) * t * corner[1] + t**2 * end[1],
+                            0.0,
+                        ])
+                connector = {
+                    "id": len(lanes),
+                    "road_id": next(road_ids),
+                    "lane_id": -1,
+                    "width": lane_width,
+                    "junction": node,
+                    "points": points,
+                    "successors": [exit_lane["id"]],
+                }
+                lanes.append(connector)
+                entry["successors"].append(connector["id"])
+            traffic_lights.append({
+                "junction": node,
+                "stop_lanes": [lane["id"] for lane in approach],
+                "stop_offset": 1.0,
+            })
+
+    return {"name": name, "lanes": lanes, "spawn_points": spawn_points,
+            "traffic_lights": traffic_lights}
+
+
+def register_map(name: str, source: MapSource) -> None:
+    """
+    Make a map available to Client.load_world
+    :param name: name of the map
+    :param source: the lane graph, the path of a lane graph file or a function building the lane graph
+    """
+    _registry[name] = source
+    _loaded.pop(name, None)
+
+
+def available_maps() -> List[str]:
+    """:return: the names of the registered maps and of the lane graph files on the map path"""
+    names = list(_registry)
+    for directory in os.environ.get(MAP_PATH_VARIABLE, "").split(os.pathsep):
+        if directory and os.path.isdir(directory):
+            names += [path.stem for path in sorted(Path(directory).glob("*.json"))]
+    return names
+
+
+def get_map(name: str) -> Map:
+    """
+    Build (or reuse) a registered map, maps are immutable so they are shared by all the worlds
+    :param name: name of the map, a "Carla/Maps/" prefix is ignored
+    :return: the map
+    """
+    name = name.split("/")[-1]
+    if name in _loaded:
+        return _loaded[name]
+    source = _registry.get(name)
+    if source is None:
+        for directory in os.environ.get(MAP_PATH_VARIABLE, "").split(os.pathsep):
+            path = Path(directory) / f"{name}.json"
+            if directory and path.is_file():
+                source = path
+                break
+    if source is None:
+        raise RuntimeError(f"map '{name}' not found")
+    if callable(source):
+        lane_graph = source()
+    elif isinstance(source, dict):
+        lane_graph = source
+    else:
+        lane_graph = load_lane_graph(source)
+    _loaded[name] = Map(name, lane_graph)
+    return _loaded[name]
+
+
+register_map("Grid", grid_lane_graph)
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Road network of the stand-in (carla.Map, carla.Waypoint, carla.Junction, ...)
+
+The road network is a lane graph: every lane is a directed polyline with a list of successor
+lanes. Lanes inside a junction connect the lanes entering the junction to the lanes leaving it.
+A lane graph is a plain dictionary (usually loaded from a JSON file) of the form::
+
+    {
+        "name": "Grid",
+        "lanes": [
+            {"id": 0, "points": [[x, y, z], ...], "successors": [1, 2],
+             "road_id": 0, "lane_id": -1, "width": 3.5, "lane_type": "Driving",
+             "junction": null, "left": null, "right": null,
+             "left_marking": "SolidSolid", "right_marking": "Solid"},
+            ...
+        ],
+        "spawn_points": [{"lane": 0, "s": 10.0}, {"x": 0.0, "y": 0.0, "z": 0.5, "yaw": 90.0}],
+        "traffic_lights": [{"junction": 4, "stop_lanes": [0, 1], "stop_offset": 1.0}]
+    }
+
+Only "id", "points" and "successors" are required for a lane. "left" and "right" refer to
+the neighbouring lanes driving in the same direction.
+"""
+
+import bisect
+import enum
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .geometry import BoundingBox, Location, Rotation, Transform, Vector3D
+
+
+class LaneType(enum.IntFlag):
+    """
+    Mirrors carla.LaneType
+    """
+    NONE = 0x1
+    Driving = 0x1 << 1
+    Stop = 0x1 << 2
+    Shoulder = 0x1 << 3
+    Biking = 0x1 << 4
+    Sidewalk = 0x1 << 5
+    Border = 0x1 << 6
+    Restricted = 0x1 << 7
+    Parking = 0x1 << 8
+    Bidirectional = 0x1 << 9
+    Median = 0x1 << 10
+    Special1 = 0x1 << 11
+    Special2 = 0x1 << 12
+    Special3 = 0x1 << 13
+    RoadWorks = 0x1 << 14
+    Tram = 0x1 << 15
+    Rail = 0x1 << 16
+    Entry = 0x1 << 17
+    Exit = 0x1 << 18
+    OffRamp = 0x1 << 19
+    OnRamp = 0x1 << 20
+    Any = 0xFFFFFFFE
+
+
+class LaneChange(enum.IntFlag):
+    """
+    Mirrors carla.LaneChange
+    """
+    NONE = 0
+    Right = 1
+    Left = 2
+    Both = 3
+
+
+class LaneMarkingType(enum.IntEnum):
+    """
+    Mirrors carla.LaneMarkingType
+    """
+    NONE = 0
+    Other = 1
+    Broken = 2
+    Solid = 3
+    SolidSolid = 4
+    SolidBroken = 5
+    BrokenSolid = 6
+    BrokenBroken = 7
+    BottsDots = 8
+    Grass = 9
+    Curb = 10
+
+
+class LaneMarkingColor(enum.IntEnum):
+    """
+    Mirrors carla.LaneMarkingColor
+    """
+    Standard = 0
+    White = 0
+    Blue = 1
+    Green = 2
+    Red = 3
+    Yellow = 4
+    Other = 5
+
+
+class LaneMarking:
+    """
+    Mirrors carla.LaneMarking
+    """
+    __slots__ = ("type", "color", "lane_change", "width")
+
+    def __init__(self, marking_type: LaneMarkingType, color: LaneMarkingColor,
+                 lane_change: LaneChange, width: float = 0.15):
+        self.type = marking_type
+        self.color = color
+        self.lane_change = lane_change
+        self.width = width
+
+    def __repr__(self) -> str:
+        return f"LaneMarking({self.type.name}, {self.color.name})"
+
+
+# Markings that can be crossed, with the direction they can be crossed in when seen from the left
+# (the lane to the right of the marking) and from the right
+_CROSSABLE_MARKINGS = {
+    LaneMarkingType.Broken: LaneChange.Both,
+    LaneMarkingType.BrokenBroken: LaneChange.Both,
+    LaneMarkingType.BottsDots: LaneChange.Both,
+    LaneMarkingType.SolidBroken: LaneChange.Right,
+    LaneMarkingType.BrokenSolid: LaneChange.Left,
+}
+
+# Resolution of the position part of the waypoint ids, in meters
+_WAYPOINT_ID_RESOLUTION = 0.01
+# Number of waypoint ids reserved for every lane, limits the lane length to 10 km
+_WAYPOINT_IDS_PER_LANE = 1_000_000
+
+
+class _Lane:
+    """
+    A single directed lane of the lane graph
+    """
+
+    def __init__(self, index: int, spec: Dict[str, Any]):
+        self.index: int = index
+        self.road_id: int = int(spec.get("road_id", index))
+        self.section_id: int = int(spec.get("section_id", 0))
+        self.lane_id: int = int(spec.get("lane_id", -1))
+        self.width: float = float(spec.get("width", 3.5))
+        self.lane_type: LaneType = LaneType[spec.get("lane_type", "Driving")]
+        self.junction_id: Optional[int] = spec.get("junction")
+
+        self.points: np.ndarray = np.asarray(spec["points"], dtype=np.float64).reshape(-1, 3)
+        if len(self.points) < 2:
+            raise Exception(f"Error: lane {spec['id']} needs at least two points")
+        segment_lengths = np.linalg.norm(np.diff(self.points[:, :2], axis=0), axis=1)
+        self.s: np.ndarray = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+        self.length: float = float(self.s[-1])
+        self.headings: np.ndarray = np.degrees(
+            np.arctan2(np.diff(self.points[:, 1]), np.diff(self.points[:, 0])))
+        # python copies used by the scalar lookups, indexing numpy arrays one value at a time is slow
+        self._s_list: List[float] = self.s.tolist()
+        self._point_list: List[List[float]] = self.points.tolist()
+        self._heading_list: List[float] = self.headings.tolist()
+
+        left_marking = LaneMarkingType[spec.get("left_marking", "NONE")]
+        right_marking = LaneMarkingType[spec.get("right_marking", "NONE")]
+        left_color = LaneMarkingColor.Yellow if left_marking == LaneMarkingType.SolidSolid \
+            else LaneMarkingColor.Standard
+        self.left_marking = LaneMarking(left_marking, left_color,
+                                        _CROSSABLE_MARKINGS.get(left_marking, LaneChange.NONE))
+        self.right_marking = LaneMarking(right_marking, LaneMarkingColor.Standard,
+                                         _CROSSABLE_MARKINGS.get(right_marking, LaneChange.NONE))
+
+        # resolved by the Map once every lane is created
+        self.successors: List["_Lane"] = []
+        self.predecessors: List["_Lane"] = []
+        self.left: Optional["_Lane"] = None
+        self.right: Optional["_Lane"] = None
+
+    def lane_change(self) -> LaneChange:
+        """:return: the lane changes allowed from this lane"""
+        change = LaneChange.NONE
+        if self.left is not None and self.left_marking.lane_change & LaneChange.Left:
+            change |= LaneChange.Left
+        if self.right is not None and self.right_marking.lane_change & LaneChange.Right:
+            change |= LaneChange.Right
+        return change
+
+    def pose_at(self, s: float) -> Tuple[float, float, float, float]:
+        """
+        Interpolate the lane at a given distance from its start
+        :param s: distance along the lane, clamped to the lane
+        :return: the x, y, z and yaw of the lane at s
+        """
+        s_list = self._s_list
+        segment = min(max(bisect.bisect_right(s_list, s) - 1, 0), len(s_list) - 2)
+        s0, s1 = s_list[segment], s_list[segment + 1]
+        t = min(max((s - s0) / (s1 - s0), 0.0), 1.0) if s1 > s0 else 0.0
+        (x0, y0, z0), (x1, y1, z1) = self._point_list[segment], self._point_list[segment + 1]
+        return (x0 + t * (x1 - x0), y0 + t * (y1 - y0), z0 + t * (z1 - z0),
+                self._heading_list[segment])
+
+
+class Waypoint:
+    """
+    A point at a given distance along a lane, mirrors carla.Waypoint
+    """
+    __slots__ = ("_map", "_lane", "s", "_transform")
+
+    def __init__(self, carla_map: "Map", lane: _Lane, s: float):
+        self._map = carla_map
+        self._lane = lane
+        self.s: float = min(max(s, 0.0), lane.length)
+        self._transform: Optional[Transform] = None
+
+    @property
+    def id(self) -> int:
+        return self._lane.index * _WAYPOINT_IDS_PER_LANE + int(round(self.s / _WAYPOINT_ID_RESOLUTION))
+
+    @property
+    def transform(self) -> Transform:
+        if self._transform is None:
+            x, y, z, yaw = self._lane.pose_at(self.s)
+            self._transform = Transform(Location(x, y, z), Rotation(yaw=yaw))
+        # callers are allowed to modify the transform, hand out a copy
+        location, rotation = self._transform.location, self._transform.rotation
+        return Transform(Location(location.x, location.y, location.z),
+                         Rotation(rotation.pitch, rotation.yaw, rotation.roll))
+
+    @property
+    def road_id(self) -> int:
+        return self._lane.road_id
+
+    @property
+    def section_id(self) -> int:
+        return self._lane.section_id
+
+    @property
+    def lane_id(self) -> int:
+        return self._lane.lane_id
+
+    @property
+    def lane_width(self) -> float:
+        return self._lane.width
+
+    @property
+    def lane_type(self) -> LaneType:
+        return self._lane.lane_type
+
+    @property
+    def is_junction(self) -> bool:
+        return self._lane.junction_id is not None
+
+    @property
+    def junction_id(self) -> int:
+        return self._lane.junction_id if self._lane.junction_id is not None else -1
+
+    @property
+    def lane_change(self) -> LaneChange:
+        return self._lane.lane_change()
+
+    @property
+    def left_lane_marking(self) -> LaneMarking:
+        return self._lane.left_marking
+
+    @property
+    def right_lane_marking(self) -> LaneMarking:
+        return self._lane.right_marking
+
+    def get_junction(self) -> Optional["Junction"]:
+        if self._lane.junction_id is None:
+            return None
+        return self._map._junctions[self._lane.junction_id]
+
+    def next(self, distance: float) -> List["Waypoint"]:
+        """
+        Get the waypoints at a given distance ahead, one per branch of the lane graph
+        :param distance: distance to travel along the lanes
+        :return: the list of waypoints, empty at a dead end
+        """
+        results: List[Waypoint] = []
+        seen = set()
+        pending: List[Tuple[_Lane, float]] = [(self._lane, self.s + distance)]
+        while pending:
+            lane, s = pending.pop(0)
+            if s <= lane.length:
+                key = (lane.index, round(s, 3))
+                if key not in seen:
+                    seen.add(key)
+                    results.append(Waypoint(self._map, lane, s))
+            else:
+                pending.extend((successor, s - lane.length) for successor in lane.successors)
+        return results
+
+    def previous(self, distance: float) -> List["Waypoint"]:
+        """
+        Get the waypoints at a given distance behind, one per branch of the lane graph
+        :param distance: distance to travel backwards along the lanes
+        :return: the list of waypoints, empty at the start of a road
+        """
+        results: List[Waypoint] = []
+        seen = set()
+        pending: List[Tuple[_Lane, float]] = [(self._lane, self.s - distance)]
+        while pending:
+            lane, s = pending.pop(0)
+            if s >= 0.0:
+                key = (lane.index, round(s, 3))
+                if key not in seen:
+                    seen.add(key)
+                    results.append(Waypoint(self._map, lane, s))
+            else:
+                pending.extend((predecessor, predecessor.length + s)
+                               for predecessor in lane.predecessors)
+        return results
+
+    def next_until_lane_end(self, distance: float) -> List["Waypoint"]:
+        s_values = np.arange(self.s + distance, self._lane.length, distance).tolist()
+        return [Waypoint(self._map, self._lane, s) for s in s_values + [self._lane.length]]
+
+    def previous_until_lane_start(self, distance: float) -> List["Waypoint"]:
+        s_values = np.arange(self.s - distance, 0.0, -distance).tolist()
+        return [Waypoint(self._map, self._lane, s) for s in s_values + [0.0]]
+
+    def get_left_lane(self) -> Optional["Waypoint"]:
+        return self._neighbour(self._lane.left)
+
+    def get_right_lane(self) -> Optional["Waypoint"]:
+        return self._neighbour(self._lane.right)
+
+    def _neighbour(self, lane: Optional[_Lane]) -> Optional["Waypoint"]:
+        if lane is None:
+            return None
+        return Waypoint(self._map, lane, self.s * lane.length / self._lane.length)
+
+    def __repr__(self) -> str:
+        return f"Waypoint(id={self.id}, road_id={self.road_id}, lane_id={self.lane_id}, s={self.s:.2f})"
+
+
+class Junction:
+    """
+    Mirrors carla.Junction
+    """
+
+    def __init__(self, carla_map: "Map", junction_id: int, lanes: List[_Lane]):
+        self.id: int = junction_id
+        self._map = carla_map
+        self._lanes: List[_Lane] = lanes
+        points = np.concatenate([lane.points for lane in lanes])
+        low, high = points.min(axis=0), points.max(axis=0)
+        center = (low + high) / 2
+        extent = (high - low) / 2
+        self.bounding_box = BoundingBox(Location(*center.tolist()),
+                                        Vector3D(*extent.tolist()))
+
+    def get_waypoints(self, lane_type: LaneType = LaneType.Driving) -> List[Tuple[Waypoint, Waypoint]]:
+        """
+        :param lane_type: type of the lanes to return
+        :return: the (entry, exit) waypoints of every lane crossing the junction
+        """
+        return [(Waypoint(self._map, lane, 0.0), Waypoint(self._map, lane, lane.length))
+                for lane in self._lanes if lane.lane_type & lane_type]
+
+    def __repr__(self) -> str:
+        return f"Junction(id={self.id})"
+
+
+def load_lane_graph(path: Union[Path, str]) -> Dict[str, Any]:
+    """
+    Load a lane graph from a JSON file
+    :param path: path of the JSON file
+    :return: the lane graph
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+class Map:
+    """
+    Road network built from a lane graph, mirrors carla.Map
+    """
+
+    def __init__(self, name: str, lane_graph: Dict[str, Any]):
+        """
+        :param name: name of the map
+        :param lane_graph: the lane graph, see the documentation of this module
+        """
+        self.name: str = name
+        specs = lane_graph["lanes"]
+        # lanes outside junctions come first so they win ties against the junction lanes
+        # starting at the same point in get_waypoint
+        specs = sorted(specs, key=lambda spec: spec.get("junction") is not None)
+        self._lanes: List[_Lane] = [_Lane(index, spec) for index, spec in enumerate(specs)]
+        by_id: Dict[Any, _Lane] = {spec["id"]: lane for spec, lane in zip(specs, self._lanes)}
+        for spec, lane in zip(specs, self._lanes):
+            lane.successors = [by_id[successor] for successor in spec.get("successors", [])]
+            for successor in lane.successors:
+                successor.predecessors.append(lane)
+            lane.left = by_id.get(spec.get("left"))
+            lane.right = by_id.get(spec.get("right"))
+
+        junction_lanes: Dict[int, List[_Lane]] = {}
+        for lane in self._lanes:
+            if lane.junction_id is not None:
+                junction_lanes.setdefault(lane.junction_id, []).append(lane)
+        self._junctions: Dict[int, Junction] = {
+            junction_id: Junction(self, junction_id, lanes)
+            for junction_id, lanes in junction_lanes.items()
+        }
+
+        # flattened segments of every lane, used to project locations on the road
+        starts, vectors, lane_indices, s_starts = [], [], [], []
+        for lane in self._lanes:
+            starts.append(lane.points[:-1, :2])
+            vectors.append(np.diff(lane.points[:, :2], axis=0))
+            lane_indices.append(np.full(len(lane.points) - 1, lane.index))
+            s_starts.append(lane.s[:-1])
+        self._segment_starts: np.ndarray = np.concatenate(starts)
+        self._segment_vectors: np.ndarray = np.concatenate(vectors)
+        self._segment_squared_lengths: np.ndarray = np.maximum(
+            np.einsum("ij,ij->i", self._segment_vectors, self._segment_vectors), 1e-12)
+        self._segment_lanes: np.ndarray = np.concatenate(lane_indices)
+        self._segment_s: np.ndarray = np.concatenate(s_starts)
+        self._segment_lane_types: np.ndarray = np.array(
+            [int(self._lanes[index].lane_type) for index in self._segment_lanes], dtype=np.int64)
+        self._segment_widths: np.ndarray = np.array(
+            [self._lanes[index].width for index in self._segment_lanes])
+
+        self._spawn_points: List[Transform] = [
+            self._spawn_point(spec, by_id) for spec in lane_graph.get("spawn_points", [])
+        ]
+        # traffic lights are spawned by the World, keep the resolved specifications around
+        self._traffic_light_specs: List[Dict[str, Any]] = [
+            self._traffic_light_spec(spec, by_id) for spec in lane_graph.get("traffic_lights", [])
+        ]
+        # lanes by (road_id, lane_id), built by the first get_waypoint_xodr
+        self._xodr_lanes: Optional[Dict[Tuple[int, int], List[_Lane]]] = None
+
+    @classmethod
+    def from_file(cls, path: Union[Path, str], name: Optional[str] = None) -> "Map":
+        """
+        Build a map from a lane graph file
+        :param path: path of the JSON lane graph
+        :param name: name of the map, defaults to the name stored in the file or the file name
+        :return: the map
+        """
+        lane_graph = load_lane_graph(path)
+        return cls(name or lane_graph.get("name", Path(path).stem), lane_graph)
+
+    def _spawn_point(self, spec: Dict[str, Any], by_id: Dict[Any, _Lane]) -> Transform:
+        if "lane" in spec:
+            x, y, z, yaw = by_id[spec["lane"]].pose_at(float(spec.get("s", 0.0)))
+            return Transform(Location(x, y, z + spec.get("z", 0.5)), Rotation(yaw=yaw))
+        return Transform(Location(spec["x"], spec["y"], spec.get("z", 0.5)),
+                         Rotation(yaw=spec.get("yaw", 0.0)))
+
+    def _traffic_light_spec(self, spec: Dict[str, Any], by_id: Dict[Any, _Lane]) -> Dict[str, Any]:
+        stop_offset = float(spec.get("stop_offset", 1.0))
+        stop_waypoints = [
+            Waypoint(self, by_id[lane], by_id[lane].length - stop_offset)
+            for lane in spec.get("stop_lanes", [])
+        ]
+        if "location" in spec:
+            transform = Transform(Location(*spec["location"]), Rotation(yaw=spec.get("yaw", 0.0)))
+        elif stop_waypoints:
+            transform = stop_waypoints[0].transform
+        else:
+            transform = Transform()
+        return {"junction": spec.get("junction"), "stop_waypoints": stop_waypoints,
+                "transform": transform}
+
+    def get_waypoint(self,
+                     location: Location,
+                     project_to_road: bool = True,
+                     lane_type: LaneType = LaneType.Driving) -> Optional[Waypoint]:
+        """
+        Get the waypoint of the lane closest to a location
+        :param location: the location to project on the road
+        :param project_to_road: if False, None is returned when the location is not on a lane
+        :param lane_type: type of the lanes to consider
+        :return: the closest waypoint or None
+        """
+        point = np.array((location.x, location.y))
+        t = np.einsum("ij,ij->i", point - self._segment_starts,
+                      self._segment_vectors) / self._segment_squared_lengths
+        np.clip(t, 0.0, 1.0, out=t)
+        offsets = self._segment_starts + t[:, None] * self._segment_vectors - point
+        distances = np.einsum("ij,ij->i", offsets, offsets)
+        distances[(self._segment_lane_types & int(lane_type)) == 0] = np.inf
+        segment = int(np.argmin(distances))
+        if not np.isfinite(distances[segment]):
+            return None
+        if not project_to_road and \
+                math.sqrt(distances[segment]) > self._segment_widths[segment] / 2:
+            return None
+        lane = self._lanes[self._segment_lanes[segment]]
+        s = self._segment_s[segment] + t[segment] * math.sqrt(
+            self._segment_squared_lengths[segment])
+        return Waypoint(self, lane, float(s))
+
+    def get_waypoint_xodr(self, road_id: int, lane_id: int, s: float) -> Optional[Waypoint]:
+        """
+        Get a waypoint from its OpenDRIVE coordinates
+        :param road_id: id of the road
+        :param lane_id: id of the lane on the road
+        :param s: distance along the lane
+        :return: the waypoint or None if the road has no such lane or is shorter than s
+        """
+        if self._xodr_lanes is None:
+            self._xodr_lanes = {}
+            for lane in self._lanes:
+                self._xodr_lanes.setdefault((lane.road_id, lane.lane_id), []).append(lane)
+        for lane in self._xodr_lanes.get((road_id, lane_id), ()):
+            if 0.0 <= s <= lane.length:
+                return Waypoint(self, lane, s)
+        return None
+
+    def generate_waypoints(self, distance: float) -> List[Waypoint]:
+        """
+        :param distance: approximate distance between the waypoints
+        :return: waypoints spread along every lane of the map
+        """
+        return [
+            Waypoint(self, lane, s)
+            for lane in self._lanes
+            for s in np.arange(0.0, lane.length, distance).tolist()
+        ]
+
+    def get_topology(self) -> List[Tuple[Waypoint, Waypoint]]:
+        """
+        :return: the (start, end) waypoints of every lane of the map
+        """
+        return [(Waypoint(self, lane, 0.0), Waypoint(self, lane, lane.length)) for lane in self._lanes]
+
+    def get_spawn_points(self) -> List[Transform]:
+        return [Transform(Location(t.location.x, t.location.y, t.location.z),
+                          Rotation(t.rotation.pitch, t.rotation.yaw, t.rotation.roll))
+                for t in self._spawn_points]
+
+    def get_junction(self, waypoint: Waypoint) -> Optional[Junction]:
+        return waypoint.get_junction()
+
+    def __repr__(self) -> str:
+        return f"Map(name={self.name})"
@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+"""
+World and client of the stand-in (carla.Client, carla.World, carla.WorldSnapshot, ...)
+
+There is no server process: every (host, port) pair gets its own in-process world, shared by all
+the clients connected to it. The world only advances when it is ticked (World.tick or
+World.wait_for_tick), by fixed_delta_seconds or by DEFAULT_DELTA_SECONDS when no fixed step is set.
+"""
+
+import copy
+import enum
+import fnmatch
+import itertools
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from . import command
+from .actors import (Actor, AttachmentType, Sensor, TrafficLight, TrafficLightState, Vehicle,
+                     VehicleStates, _copy_transform)
+from .geometry import Location, Rotation, Transform, Vector3D
+from .maps import available_maps, get_map
+from .road import Map
+
+# Time step used when the world is ticked without fixed_delta_seconds
+DEFAULT_DELTA_SECONDS = 0.05
+# Map loaded by new servers
+DEFAULT_MAP = "Grid"
+# Vehicles closer than this to a spawn point make the spawn fail, in meters
+SPAWN_CLEARANCE = 2.0
+
+# Vehicle blueprints: id, number of wheels, bounding box extent (x, y, z) and wheelbase in meters
+_VEHICLE_BLUEPRINTS: Tuple[Tuple[str, int, Tuple[float, float, float], float], ...] = (
+    ("vehicle.audi.a2", 4, (1.85, 0.90, 0.77), 2.45),
+    ("vehicle.tesla.model3", 4, (2.40, 1.08, 0.75), 2.90),
+    ("vehicle.lincoln.mkz_2020", 4, (2.45, 1.07, 0.77), 2.90),
+    ("vehicle.mercedes.coupe_2020", 4, (2.34, 1.00, 0.72), 2.80),
+    ("vehicle.nissan.patrol", 4, (2.30, 0.95, 0.93), 2.75),
+    ("vehicle.carlamotors.carlacola", 4, (2.60, 1.30, 1.25), 3.30),
+    ("vehicle.bh.crossbike", 2, (0.74, 0.43, 0.55), 1.20),
+    ("vehicle.yamaha.yzf", 2, (1.10, 0.43, 0.63), 1.40),
+)
+_SENSOR_BLUEPRINTS = ("sensor.other.collision", "sensor.other.lane_invasion", "sensor.other.gnss",
+                      "sensor.other.imu", "sensor.camera.rgb", "sensor.camera.depth",
+                      "sensor.camera.semantic_segmentation", "sensor.lidar.ray_cast")
+_VEHICLE_COLORS = ["255,255,255", "0,0,0", "200,20,20", "20,60,200", "120,120,120"]
+
+
+class ColorConverter(enum.IntEnum):
+    """
+    Mirrors carla.ColorConverter
+    """
+    Raw = 0
+    Depth = 1
+    LogarithmicDepth = 2
+    CityScapesPalette = 3
+
+
+class ActorAttribute:
+    """
+    Mirrors carla.ActorAttribute, values are stored as strings
+    """
+
+    def __init__(self, attribute_id: str, value: str, recommended_values: Optional[List[str]] = None,
+                 is_modifiable: bool = True):
+        self.id: str = attribute_id
+        self.recommended_values: List[str] = list(recommended_values or [])
+        self.is_modifiable: bool = is_modifiable
+        self._value: str = str(value)
+
+    def as_str(self) -> str:
+        return self._value
+
+    def as_int(self) -> int:
+        return int(self._value)
+
+    def as_float(self) -> float:
+        return float(self._value)
+
+    def as_bool(self) -> bool:
+        return self._value.lower() == "true"
+
+    def __int__(self) -> int:
+        return self.as_int()
+
+    def __float__(self) -> float:
+        return self.as_float()
+
+    def __bool__(self) -> bool:
+        return self.as_bool()
+
+    def __str__(self) -> str:
+        return self._value
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ActorAttribute):
+            return self._value == other._value
+        return self._value == str(other)
+
+    def __repr__(self) -> str:
+        return f"ActorAttribute(id={self.id}, value={self._value})"
+
+
+class ActorBlueprint:
+    """
+    Mirrors carla.ActorBlueprint
+    """
+
+    def __init__(self, blueprint_id: str, attributes: List[ActorAttribute]):
+        self.id: str = blueprint_id
+        self.tags: List[str] = blueprint_id.split(".")
+        self._attributes: Dict[str, ActorAttribute] = {attribute.id: attribute
+                                                       for attribute in attributes}
+
+    def has_tag(self, tag: str) -> bool:
+        return tag in self.tags
+
+    def match_tags(self, wildcard_pattern: str) -> bool:
+        return fnmatch.fnmatch(self.id, wildcard_pattern) or \
+            any(fnmatch.fnmatch(tag, wildcard_pattern) for tag in self.tags)
+
+    def has_attribute(self, attribute_id: str) -> bool:
+        return attribute_id in self._attributes
+
+    def get_attribute(self, attribute_id: str) -> ActorAttribute:
+        if attribute_id not in self._attributes:
+            raise IndexError(f"attribute '{attribute_id}' not found in '{self.id}'")
+        return self._attributes[attribute_id]
+
+    def set_attribute(self, attribute_id: str, value: Any) -> None:
+        attribute = self.get_attribute(attribute_id)
+        if not attribute.is_modifiable:
+            raise RuntimeError(f"attribute '{attribute_id}' of '{self.id}' is not modifiable")
+        attribute._value = str(value)
+
+    def __iter__(self) -> Iterator[ActorAttribute]:
+        return iter(self._attributes.values())
+
+    def __len__(self) -> int:
+        return len(self._attributes)
+
+    def __repr__(self) -> str:
+        return f"ActorBlueprint(id={self.id})"
+
+
+class BlueprintLibrary:
+    """
+    Mirrors carla.BlueprintLibrary
+    """
+
+    def __init__(self, blueprints: List[ActorBlueprint]):
+        self._blueprints: List[ActorBlueprint] = blueprints
+
+    @classmethod
+    def default(cls) -> "BlueprintLibrary":
+        """:return: the blueprints of the vehicles and sensors known to the stand-in"""
+        blueprints = []
+        for blueprint_id, wheels, extent, wheelbase in _VEHICLE_BLUEPRINTS:
+            blueprints.append(ActorBlueprint(blueprint_id, [
+                ActorAttribute("number_of_wheels", wheels, is_modifiable=False),
+                ActorAttribute("generation", 2, is_modifiable=False),
+                ActorAttribute("color", _VEHICLE_COLORS[0], _VEHICLE_COLORS),
+                ActorAttribute("role_name", "autopilot", ["autopilot", "scenario", "ego", "hero"]),
+                ActorAttribute("extent", ",".join(str(value) for value in extent), is_modifiable=False),
+                ActorAttribute("wheelbase", wheelbase, is_modifiable=False),
+                ActorAttribute("max_steer_angle", 70.0 if wheels == 4 else 50.0, is_modifiable=False),
+                ActorAttribute("max_acceleration", 3.5, is_modifiable=False),
+                ActorAttribute("max_deceleration", 8.0, is_modifiable=False),
+            ]))
+        for blueprint_id in _SENSOR_BLUEPRINTS:
+            blueprints.append(ActorBlueprint(blueprint_id, [
+                ActorAttribute("role_name", "front"),
+                ActorAttribute("sensor_tick", "0.0"),
+                ActorAttribute("image_size_x", "800"),
+                ActorAttribute("image_size_y", "600"),
+                ActorAttribute("fov", "90.0"),
+                ActorAttribute("range", "10.0"),
+            ]))
+        return cls(blueprints)
+
+    def filter(self, wildcard_pattern: str) -> "BlueprintLibrary":
+        return BlueprintLibrary([blueprint for blueprint in self._blueprints
+                                 if blueprint.match_tags(wildcard_pattern)])
+
+    def find(self, blueprint_id: str) -> ActorBlueprint:
+        for blueprint in self._blueprints:
+            if blueprint.id == blueprint_id:
+                return blueprint
+        raise IndexError(f"blueprint '{blueprint_id}' not found")
+
+    def __getitem__(self, index: int) -> ActorBlueprint:
+        return self._blueprints[index]
+
+    def __iter__(self) -> Iterator[ActorBlueprint]:
+        return iter(self._blueprints)
+
+    def __len__(self) -> int:
+        return len(self._blueprints)
+
+
+class ActorList:
+    """
+    Mirrors carla.ActorList
+    """
+
+    def __init__(self, actors: List[Actor]):
+        self._actors: List[Actor] = actors
+
+    def filter(self, wildcard_pattern: str) -> "ActorList":
+        return ActorList([actor for actor in self._actors
+                          if fnmatch.fnmatch(actor.type_id, wildcard_pattern)])
+
+    def find(self, actor_id: int) -> Optional[Actor]:
+        for actor in self._actors:
+            if actor.id == actor_id:
+                return actor
+        return None
+
+    def __getitem__(self, index: int) -> Actor:
+        return self._actors[index]
+
+    def __iter__(self) -> Iterator[Actor]:
+        return iter(self._actors)
+
+    def __len__(self) -> int:
+        return len(self._actors)
+
+
+class WeatherParameters:
+    """
+    Mirrors carla.WeatherParameters, the weather has no effect on the stand-in
+    """
+
+    def __init__(self, cloudiness: float = 0.0, precipitation: float = 0.0,
+                 precipitation_deposits: float = 0.0, wind_intensity: float = 0.0,
+                 sun_azimuth_angle: float = 0.0, sun_altitude_angle: float = 0.0,
+                 fog_density: float = 0.0, fog_distance: float = 0.0, wetness: float = 0.0):
+        self.cloudiness = cloudiness
+        self.precipitation = precipitation
+        self.precipitation_deposits = precipitation_deposits
+        self.wind_intensity = wind_intensity
+        self.sun_azimuth_angle = sun_azimuth_angle
+        self.sun_altitude_angle = sun_altitude_angle
+        self.fog_density = fog_density
+        self.fog_distance = fog_distance
+        self.wetness = wetness
+
+
+WeatherParameters.Default = WeatherParameters(cloudiness=5.0, sun_altitude_angle=45.0)
+WeatherParameters.ClearNoon = WeatherParameters(cloudiness=5.0, sun_altitude_angle=45.0)
+WeatherParameters.CloudyNoon = WeatherParameters(cloudiness=60.0, sun_altitude_angle=45.0)
+WeatherParameters.WetNoon = WeatherParameters(cloudiness=5.0, wetness=50.0, sun_altitude_angle=45.0)
+WeatherParameters.HardRainNoon = WeatherParameters(cloudiness=100.0, precipitation=100.0,
+                                                   wetness=100.0, sun_altitude_angle=45.0)
+WeatherParameters.ClearSunset = WeatherParameters(cloudiness=5.0, sun_altitude_angle=15.0)
+
+
+class WorldSettings:
+    """
+    Mirrors carla.WorldSettings
+    """
+
+    def __init__(self, synchronous_mode: bool = False, no_rendering_mode: bool = False,
+                 fixed_delta_seconds: Optional[float] = None):
+        self.synchronous_mode = synchronous_mode
+        self.no_rendering_mode = no_rendering_mode
+        self.fixed_delta_seconds = fixed_delta_seconds
+
+
+class Timestamp:
+    """
+    Mirrors carla.Timestamp
+    """
+    __slots__ = ("frame", "elapsed_seconds", "delta_seconds", "platform_timestamp")
+
+    def __init__(self, frame: int, elapsed_seconds: float, delta_seconds: float,
+                 platform_timestamp: float):
+        self.frame = frame
+        self.elapsed_seconds = elapsed_seconds
+        self.delta_seconds = delta_seconds
+        self.platform_timestamp = platform_timestamp
+
+
+class ActorSnapshot:
+    """
+    Mirrors carla.ActorSnapshot
+    """
+    __slots__ = ("id", "_transform", "_velocity", "_angular_velocity", "_acceleration")
+
+    def __init__(self, actor_id: int, transform: Transform, velocity: Vector3D,
+                 angular_velocity: Vector3D, acceleration: Vector3D):
+        self.id = actor_id
+        self._transform = transform
+        self._velocity = velocity
+        self._angular_velocity = angular_velocity
+        self._acceleration = acceleration
+
+    def get_transform(self) -> Transform:
+        return _copy_transform(self._transform)
+
+    def get_velocity(self) -> Vector3D:
+        return Vector3D(self._velocity.x, self._velocity.y, self._velocity.z)
+
+    def get_angular_velocity(self) -> Vector3D:
+        return Vector3D(self._angular_velocity.x, self._angular_velocity.y, self._angular_velocity.z)
+
+    def get_acceleration(self) -> Vector3D:
+        return Vector3D(self._acceleration.x, self._acceleration.y, self._acceleration.z)
+
+
+class WorldSnapshot:
+    """
+    State of every actor at a given frame, mirrors carla.WorldSnapshot.
+
+    The state of the vehicles is copied out of the VehicleStates arrays when the snapshot is
+    taken, ActorSnapshot objects are only built when they are accessed.
+    """
+
+    def __init__(self, world: "World"):
+        self.id: int = world.id
+        self.timestamp: Timestamp = world._timestamp
+        n = world._vehicle_states.count
+        states = world._vehicle_states
+        alive = states.alive[:n]
+        self._vehicle_ids: np.ndarray = world._vehicle_ids[:n][alive]
+        self._vehicle_state: np.ndarray = np.stack([
+            states.x[:n][alive], states.y[:n][alive], states.z[:n][alive], states.yaw[:n][alive],
+            states.speed[:n][alive], states.yaw_rate[:n][alive], states.acceleration[:n][alive]
+        ], axis=1)
+        self._vehicle_rows: Dict[int, int] = {
+            actor_id: row for row, actor_id in enumerate(self._vehicle_ids.tolist())
+        }
+        # transform of the free actors, attached actors are resolved against their parent
+        self._others: Dict[int, Tuple[Optional[Transform], Actor]] = {
+            actor.id: (actor.get_transform() if actor.parent is None else None, actor)
+            for actor in world._actors.values() if not isinstance(actor, Vehicle)
+        }
+
+    @property
+    def frame(self) -> int:
+        return self.timestamp.frame
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return self.timestamp.elapsed_seconds
+
+    @property
+    def delta_seconds(self) -> float:
+        return self.timestamp.delta_seconds
+
+    @property
+    def platform_timestamp(self) -> float:
+        return self.timestamp.platform_timestamp
+
+    def has_actor(self, actor_id: int) -> bool:
+        return actor_id in self._vehicle_rows or actor_id in self._others
+
+    def find(self, actor_id: int) -> Optional[ActorSnapshot]:
+        row = self._vehicle_rows.get(actor_id)
+        if row is not None:
+            x, y, z, yaw, speed, yaw_rate, acceleration = self._vehicle_state[row].tolist()
+            forward = Rotation(yaw=yaw).get_forward_vector()
+            return ActorSnapshot(actor_id, Transform(Location(x, y, z), Rotation(yaw=yaw)),
+                                 forward * speed, Vector3D(0.0, 0.0, yaw_rate),
+                                 forward * acceleration)
+        if actor_id in self._others:
+            transform, actor = self._others[actor_id]
+            if transform is None:
+                parent = self.find(actor.parent.id)
+                parent_transform = parent.get_transform() if parent is not None \
+                    else actor.parent.get_transform()
+                transform = Transform(parent_transform.transform(actor._transform.location),
+                                      Rotation(yaw=parent_transform.rotation.yaw))
+            return ActorSnapshot(actor_id, transform, Vector3D(), Vector3D(), Vector3D())
+        return None
+
+    def __iter__(self) -> Iterator[ActorSnapshot]:
+        for actor_id in itertools.chain(self._vehicle_rows, self._others):
+            yield self.find(actor_id)
+
+    def __len__(self) -> int:
+        return len(self._vehicle_rows) + len(self._others)
+
+
+class DebugHelper:
+    """
+    Mirrors carla.DebugHelper, nothing is drawn by the stand-in
+    """
+
+    def draw_point(self, location, size=0.1, color=None, life_time=-1.0, persistent_lines=True):
+        pass
+
+    def draw_line(self, begin, end, thickness=0.1, color=None, life_time=-1.0, persistent_lines=True):
+        pass
+
+    def draw_arrow(self, begin, end, thickness=0.1, arrow_size=0.1, color=None, life_time=-1.0,
+                   persistent_lines=True):
+        pass
+
+    def draw_box(self, box, rotation, thickness=0.1, color=None, life_time=-1.0,
+                 persistent_lines=True):
+        pass
+
+    def draw_string(self, location, text, draw_shadow=False, color=None, life_time=-1.0,
+                    persistent_lines=True):
+        pass
+
+
+class World:
+    """
+    Mirrors carla.World
+    """
+    _episode_ids = itertools.count(1)
+
+    def __init__(self, carla_map: Map):
+        self.id: int = next(World._episode_ids)
+        self.debug: DebugHelper = DebugHelper()
+        self._map: Map = carla_map
+        self._settings: WorldSettings = WorldSettings()
+        self._weather: WeatherParameters = WeatherParameters()
+        self._timestamp: Timestamp = Timestamp(0, 0.0, 0.0, time.time())
+        self._actor_ids = itertools.count(1)
+        self._actors: Dict[int, Actor] = {}
+        self._vehicle_states: VehicleStates = VehicleStates()
+        # actor id of every row of the vehicle states
+        self._vehicle_ids: np.ndarray = np.zeros(self._vehicle_states.capacity, dtype=np.int64)
+        self._vehicles: Dict[int, Vehicle] = {}
+        self._on_tick_callbacks: Dict[int, Callable[[WorldSnapshot], None]] = {}
+        self._callback_ids = itertools.count(1)
+
+        self._spectator: Actor = self._add_actor(Actor, "spectator")
+        self._traffic_lights: List[TrafficLight] = []
+        pole_indices: Dict[Any, int] = {}
+        for spec in carla_map._traffic_light_specs:
+            pole_index = pole_indices.get(spec["junction"], 0)
+            pole_indices[spec["junction"]] = pole_index + 1
+            self._traffic_lights.append(self._add_actor(
+                TrafficLight, spec["transform"], spec["junction"], spec["stop_waypoints"], pole_index))
+
+    def _add_actor(self, actor_class, *args, **kwargs) -> Actor:
+        actor = actor_class(self, next(self._actor_ids), *args, **kwargs)
+        self._actors[actor.id] = actor
+        return actor
+
+    def _destroy_actor(self, actor: Actor) -> None:
+        actor._alive = False
+        self._actors.pop(actor.id, None)
+        if isinstance(actor, Vehicle):
+            self._vehicles.pop(actor.id, None)
+            self._vehicle_states.release(actor._index)
+        # attached actors go away with their parent
+        for child in [child for child in self._actors.values() if child.parent is actor]:
+            child.destroy()
+
+    def get_map(self) -> Map:
+        return self._map
+
+    def get_spectator(self) -> Actor:
+        return self._spectator
+
+    def get_blueprint_library(self) -> BlueprintLibrary:
+        # like CARLA, every call hands out its own copy of the blueprints
+        return BlueprintLibrary.default()
+
+    def get_settings(self) -> WorldSettings:
+        return copy.copy(self._settings)
+
+    def apply_settings(self, settings: WorldSettings) -> int:
+        self._settings = copy.copy(settings)
+        return self._timestamp.frame
+
+    def get_weather(self) -> WeatherParameters:
+        return copy.copy(self._weather)
+
+    def set_weather(self, weather: WeatherParameters) -> None:
+        self._weather = copy.copy(weather)
+
+    def get_snapshot(self) -> WorldSnapshot:
+        return WorldSnapshot(self)
+
+    def get_actor(self, actor_id: int) -> Optional[Actor]:
+        return self._actors.get(actor_id)
+
+    def get_actors(self, actor_ids: Optional[List[int]] = None) -> ActorList:
+        if actor_ids is None:
+            return ActorList(list(self._actors.values()))
+        return ActorList([self._actors[actor_id] for actor_id in actor_ids if actor_id in self._actors])
+
+    def get_traffic_lights_in_junction(self, junction_id: int) -> List[TrafficLight]:
+        return [light for light in self._traffic_lights if light.junction_id == junction_id]
+
+    def freeze_all_traffic_lights(self, frozen: bool) -> None:
+        for light in self._traffic_lights:
+            light.freeze(frozen)
+
+    def reset_all_traffic_lights(self) -> None:
+        for light in self._traffic_lights:
+            light.set_state(TrafficLightState.Green if light.get_pole_index() == 0
+                            else TrafficLightState.Red)
+
+    def spawn_actor(self, blueprint, transform: Transform, attach_to: Optional[Actor] = None,
+                    attachment_type: AttachmentType = AttachmentType.Rigid) -> Actor:
+        """
+        Spawn an actor, raises a RuntimeError when a vehicle would overlap another vehicle
+        """
+        actor = self.try_spawn_actor(blueprint, transform, attach_to, attachment_type)
+        if actor is None:
+            raise RuntimeError("Spawn failed because of collision at spawn position")
+        return actor
+
+    def try_spawn_actor(self, blueprint, transform: Transform, attach_to: Optional[Actor] = None,
+                        attachment_type: AttachmentType = AttachmentType.Rigid) -> Optional[Actor]:
+        attributes = {attribute.id: str(attribute) for attribute in blueprint}
+        if blueprint.id.startswith("vehicle."):
+            if self._is_occupied(transform.location):
+                return None
+            extent = [float(value) for value in attributes["extent"].split(",")]
+            states = self._vehicle_states
+            index = states.allocate()
+            if len(self._vehicle_ids) < states.capacity:
+                self._vehicle_ids = np.resize(self._vehicle_ids, states.capacity)
+            actor = self._add_actor(Vehicle, blueprint.id, attributes, transform, index,
+                                    Vector3D(*extent))
+            self._vehicle_ids[index] = actor.id
+            self._vehicles[actor.id] = actor
+            return actor
+        if blueprint.id.startswith("sensor."):
+            return self._add_actor(Sensor, blueprint.id, attributes, transform, attach_to)
+        return self._add_actor(Actor, blueprint.id, attributes, transform, attach_to)
+
+    def _is_occupied(self, location: Location) -> bool:
+        n = self._vehicle_states.count
+        states = self._vehicle_states
+        squared_distances = (states.x[:n] - location.x)**2 + (states.y[:n] - location.y)**2
+        return bool(np.any(states.alive[:n] & (squared_distances < SPAWN_CLEARANCE**2)))
+
+    def on_tick(self, callback: Callable[[WorldSnapshot], None]) -> int:
+        callback_id = next(self._callback_ids)
+        self._on_tick_callbacks[callback_id] = callback
+        return callback_id
+
+    def remove_on_tick(self, callback_id: int) -> None:
+        self._on_tick_callbacks.pop(callback_id, None)
+
+    def tick(self, seconds: float = 10.0) -> int:
+        """
+        Advance the simulation by one step
+        :param seconds: unused, kept for compatibility
+        :return: the id of the new frame
+        """
+        delta_seconds = self._settings.fixed_delta_seconds or DEFAULT_DELTA_SECONDS
+        self._vehicle_states.step(delta_seconds)
+        for light in self._traffic_lights:
+            light._advance(delta_seconds)
+        self._timestamp = Timestamp(self._timestamp.frame + 1,
+                                    self._timestamp.elapsed_seconds + delta_seconds,
+                                    delta_seconds, time.time())
+        if self._on_tick_callbacks:
+            snapshot = WorldSnapshot(self)
+            for callback in list(self._on_tick_callbacks.values()):
+                callback(snapshot)
+        return self._timestamp.frame
+
+    def wait_for_tick(self, seconds: float = 10.0) -> WorldSnapshot:
+        """
+        There is no server ticking the world on its own, advance it by one step instead of waiting
+        :return: the snapshot of the new frame
+        """
+        self.tick(seconds)
+        return WorldSnapshot(self)
+
+    def _apply_batch(self, commands) -> List[command.Response]:
+        """
+        Apply a batch of commands, transforms and controls of vehicles are written into the
+        vehicle states with a single vectorized assignment per run of consecutive commands
+        """
+        responses: List[command.Response] = []
+        transforms: List[Tuple[int, Transform]] = []
+        for cmd in commands:
+            if isinstance(cmd, command.ApplyTransform) and cmd.actor_id in self._vehicles:
+                transforms.append((self._vehicles[cmd.actor_id]._index, cmd.transform))
+                responses.append(command.Response(cmd.actor_id))
+                continue
+            if transforms:
+                self._write_transforms(transforms)
+                transforms = []
+            responses.append(self._apply_command(cmd))
+        if transforms:
+            self._write_transforms(transforms)
+        return responses
+
+    def _write_transforms(self, transforms: List[Tuple[int, Transform]]) -> None:
+        indices = np.fromiter((index for index, _ in transforms), dtype=np.int64,
+                              count=len(transforms))
+        values = np.array([(t.location.x, t.location.y, t.location.z, t.rotation.yaw)
+                           for _, t in transforms]).reshape(-1, 4)
+        states = self._vehicle_states
+        states.x[indices] = values[:, 0]
+        states.y[indices] = values[:, 1]
+        states.z[indices] = values[:, 2]
+        states.yaw[indices] = values[:, 3]
+
+    def _apply_command(self, cmd) -> command.Response:
+        if isinstance(cmd, command.SpawnActor):
+            parent = self._actors.get(cmd.parent_id) if cmd.parent_id else None
+            actor = self.try_spawn_actor(cmd.blueprint, cmd.transform, parent)
+            if actor is None:
+                return command.Response(0, "Spawn failed because of collision at spawn position")
+            return command.Response(actor.id)
+        actor = self._actors.get(cmd.actor_id)
+        if actor is None:
+            return command.Response(cmd.actor_id, f"actor {cmd.actor_id} not found")
+        if isinstance(cmd, command.ApplyTransform):
+            actor.set_transform(cmd.transform)
+        elif isinstance(cmd, command.ApplyVehicleControl):
+            actor.apply_control(cmd.control)
+        elif isinstance(cmd, command.ApplyTargetVelocity):
+            actor.set_target_velocity(cmd.velocity)
+        elif isinstance(cmd, command.SetSimulatePhysics):
+            actor.set_simulate_physics(cmd.enabled)
+        elif isinstance(cmd, command.SetVehicleLightState):
+            actor.set_light_state(cmd.light_state)
+        elif isinstance(cmd, command.DestroyActor):
+            actor.destroy()
+        else:
+            return command.Response(cmd.actor_id, f"unsupported command {type(cmd).__name__}")
+        return command.Response(cmd.actor_id)
+
+
+class _Server:
+    """
+    State of a simulated server, shared by every Client connected to the same host and port
+    """
+
+    def __init__(self):
+        self.world: World = World(get_map(DEFAULT_MAP))
+
+
+_servers: Dict[Tuple[str, int], _Server] = {}
+
+
+class Client:
+    """
+    Mirrors carla.Client
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 2000, worker_threads: int = 0):
+        self._server: _Server = _servers.setdefault((host, port), _Server())
+        self._timeout: float = 5.0
+
+    def set_timeout(self, seconds: float) -> None:
+        self._timeout = seconds
+
+    def get_timeout(self) -> float:
+        return self._timeout
+
+    def get_client_version(self) -> str:
+        return "0.9.13-kinematic"
+
+    def get_server_version(self) -> str:
+        return "0.9.13-kinematic"
+
+    def get_world(self) -> World:
+        return self._server.world
+
+    def get_available_maps(self) -> List[str]:
+        return available_maps()
+
+    def load_world(self, map_name: str, reset_settings: bool = True) -> World:
+        """
+        Replace the world of the server with a fresh one on the given map, see maps.get_map
+        """
+        settings = self._server.world.get_settings()
+        self._server.world = World(get_map(map_name))
+        if not reset_settings:
+            self._server.world.apply_settings(settings)
+        return self._server.world
+
+    def reload_world(self, reset_settings: bool = True) -> World:
+        return self.load_world(self._server.world.get_map().name, reset_settings)
+
+    def apply_batch(self, commands) -> None:
+        self._server.world._apply_batch(commands)
+
+    def apply_batch_sync(self, commands, do_tick: bool = False) -> List[command.Response]:
+        responses = self._server.world._apply_batch(commands)
+        if do_tick:
+            self._server.world.tick()
+        return responses
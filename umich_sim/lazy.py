@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Lazy re-exports of the package __init__ modules
+
+A package lists the names it re-exports and the module defining each of them, the module is only
+imported when the name is first accessed (PEP 562), so importing a package or one of its light
+submodules does not pull in the dependencies of all its siblings (carla, pygame, evdev, ...):
+
+    _EXPORTS = {
+        "World": ".world",
+        "EgoVehicle": ".ego_vehicle",
+    }
+    __all__ = list(_EXPORTS)
+    __getattr__ = lazy_exports(__name__, _EXPORTS)
+    __dir__ = lazy_dir(__name__, _EXPORTS)
+
+    if TYPE_CHECKING:
+        from .world import World
+        from .ego_vehicle import EgoVehicle
+
+The TYPE_CHECKING imports are never run, they let pylint, mypy and the editors see the names.
+"""
+
+import importlib
+import sys
+from typing import Any, Callable, Dict, List
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Callable[[str], Any]:
+    """
+    Build the module level __getattr__ of a package
+    :param package: __name__ of the package
+    :param exports: exported name -> module defining it, relative to the package if it starts with a dot
+    :return: the __getattr__ of the package, caching every name it resolves in the package
+    """
+    def __getattr__(name: str) -> Any:
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(exports[name], package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
+
+
+def lazy_dir(package: str, exports: Dict[str, str]) -> Callable[[], List[str]]:
+    """
+    Build the module level __dir__ of a package, listing the exported names before they are imported
+    :param package: __name__ of the package
+    :param exports: exported name -> module defining it, as given to lazy_exports
+    :return: the __dir__ of the package
+    """
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __dir__
@@ -1,15 +1,41 @@
 #!/usr/bin/env python3
 """
 modules interfacing carla directly
+
+The classes are imported on first access, importing one module of the package does not import
+carla, pygame and the sound mixer for all the others.
 """
 
-from .camera_manager import CameraManager
-from .collision_sensor import CollisionSensor
-from .gnss_sensor import GnssSensor
-from .imu_sensor import IMUSensor
-from .lane_invasion_sensor import LaneInvasionSensor
-from .hud import HUD
-from .world import World
-from .ego_vehicle import EgoVehicle
-from .vehicle import Vehicle
-from .module_helper import (DefaultSettings, find_weather_presets, get_actor_display_name, get_actor_display_name)
+from typing import TYPE_CHECKING
+
+from umich_sim.lazy import lazy_dir, lazy_exports
+
+_EXPORTS = {
+    "CameraManager": ".camera_manager",
+    "CollisionSensor": ".collision_sensor",
+    "GnssSensor": ".gnss_sensor",
+    "IMUSensor": ".imu_sensor",
+    "LaneInvasionSensor": ".lane_invasion_sensor",
+    "HUD": ".hud",
+    "World": ".world",
+    "EgoVehicle": ".ego_vehicle",
+    "Vehicle": ".vehicle",
+    "DefaultSettings": ".module_helper",
+    "find_weather_presets": ".module_helper",
+    "get_actor_display_name": ".module_helper",
+}
+__all__ = list(_EXPORTS)
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+__dir__ = lazy_dir(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .camera_manager import CameraManager
+    from .collision_sensor import CollisionSensor
+    from .gnss_sensor import GnssSensor
+    from .imu_sensor import IMUSensor
+    from .lane_invasion_sensor import LaneInvasionSensor
+    from .hud import HUD
+    from .world import World
+    from .ego_vehicle import EgoVehicle
+    from .vehicle import Vehicle
+    from .module_helper import DefaultSettings, find_weather_presets, get_actor_display_name
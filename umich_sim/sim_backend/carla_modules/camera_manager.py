@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 import carla
 from carla import ColorConverter as cc
-import numpy as np
 import weakref
 import os
+import threading
 import time
-import pygame
 from .world import World
 from .hud import HUD
 from .ego_vehicle import EgoVehicle
+from .frame_buffer import FrameBuffer
+from .frame_worker import FrameWorker
+from .lidar_raster import LidarRaster
+from .frame_recorder import FrameRecorder
+from .sensor_bus import set_sensor_tick
+from umich_sim.sim_config import ConfigPool, Config
 
 
 class CameraManager:
@@ -18,15 +23,25 @@ class CameraManager:
 
     def __init__(self):
         self.sensor = None
-        self.surface = None
+        # double-buffered surfaces receiving the sensor frames
+        self.frame_buffer = FrameBuffer()
+        # converts the sensor frames off the sensor callback thread, only the latest frame is kept
+        weak_self = weakref.ref(self)
+        self.frame_worker = FrameWorker(
+            lambda frame: CameraManager._process_frame(weak_self, frame))
+        World.get_instance().register_death(self)
         self._parent = EgoVehicle.get_instance().carla_vehicle
         self.hud = HUD.get_instance()
-        # recording stuffs
-        # TODO: recover this
+        # recording stuffs, every recording goes to its own directory under cam_record_dir
+        config: Config = ConfigPool.get_config()
+        self.record_root = config.cam_record_dir
+        self.record_compress = config.cam_record_compress
+        self.recorder: FrameRecorder = None
         self.recording = False
-        self.record_dir = os.path.join("./_record", str(int(time.time())))
-        if self.recording:
-            os.mkdir(self.record_dir)
+        # recorders flushing their backlog in the background after recording was turned off
+        self._closing_recorders = []
+        if config.cam_recording:
+            self.toggle_recording()
         self._camera_transforms = [
             carla.Transform(carla.Location(x=-5.5, z=2.8),
                             carla.Rotation(pitch=-15)),
@@ -58,9 +73,12 @@ class CameraManager:
             if item[0].startswith('sensor.camera'):
                 bp.set_attribute('image_size_x', str(self.hud.dim[0]))
                 bp.set_attribute('image_size_y', str(self.hud.dim[1]))
+                set_sensor_tick(bp, config.sensors.camera_tick)
             elif item[0].startswith('sensor.lidar'):
                 bp.set_attribute('range', '50')
             item.append(bp)
+        # top view of the lidar sweeps, matches the 50 m range of the lidar blueprint
+        self.lidar_raster = LidarRaster(self.hud.dim[0], self.hud.dim[1], lidar_range=50.0)
         self.index = None
 
     def toggle_camera(self):
@@ -76,7 +94,8 @@ class CameraManager:
         if needs_respawn:
             if self.sensor is not None:
                 self.sensor.destroy()
-                self.surface = None
+                self.frame_buffer.clear()
+                self.lidar_raster.clear()
             self.sensor = self._parent.get_world().spawn_actor(
                 self.sensors[index][-1],
                 self._camera_transforms[self.transform_index],
@@ -96,37 +115,81 @@ class CameraManager:
 
     def toggle_recording(self):
         self.recording = not self.recording
-        self.hud.notification('Recording %s' %
-                              ('On' if self.recording else 'Off'))
+        if self.recording:
+            record_dir = os.path.join(self.record_root, str(int(time.time())))
+            self.recorder = FrameRecorder(record_dir, compress=self.record_compress)
+            self.hud.notification('Recording On')
+        else:
+            recorder, self.recorder = self.recorder, None
+            self._close_recorder(recorder)
+            # nothing is submitted any more, the counts are final
+            self.hud.notification('Recording Off (%d frames, %d dropped)' %
+                                  (recorder.received - recorder.dropped, recorder.dropped))
+
+    def destroy(self):
+        """stop the frame worker and the recording, the sensor is destroyed by World"""
+        self.frame_worker.destroy()
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            self._close_recorder(recorder)
+        # wait for the recordings to be flushed before exiting
+        for thread in self._closing_recorders:
+            thread.join()
+        self._closing_recorders.clear()
+
+    def _close_recorder(self, recorder):
+        """flush and close a recorder on a thread of its own, the main loop does not wait for the backlog"""
+        thread = threading.Thread(target=CameraManager._finish_recording, args=(recorder,),
+                                  name="frame-recorder-close", daemon=True)
+        thread.start()
+        self._closing_recorders = [t for t in self._closing_recorders if t.is_alive()]
+        self._closing_recorders.append(thread)
+
+    @staticmethod
+    def _finish_recording(recorder):
+        try:
+            recorder.close()
+        except Exception as e:
+            print(f"Error: failed to save the recording to {recorder.directory}: {e}")
+            return
+        print('Recording saved to %s (%d frames, %d dropped)' %
+              (recorder.directory, recorder.written, recorder.dropped))
 
     def render(self, display):
-        if self.surface is not None:
-            display.blit(self.surface, (0, 0))
+        self.frame_buffer.render(display)
+
+    @property
+    def frame_id(self):
+        """frame number of the image currently shown, None before the first image"""
+        return self.frame_buffer.frame_id
 
     @staticmethod
     def _parse_image(weak_self, image):
+        """
+        sensor callback, records camera images then hands the image and the sensor it came from over to
+        the frame worker. Recording happens before the latest-frame-wins handoff so every frame reaches
+        the recorder, whose bounded queue is the only place frames are dropped (and counted).
+        Frames are recorded as delivered by the sensor, before the display conversion.
+        """
         self = weak_self()
         if not self:
             return
-        if self.sensors[self.index][0].startswith('sensor.lidar'):
-            points = np.frombuffer(image.raw_data, dtype=np.dtype('f4'))
-            points = np.reshape(points, (int(points.shape[0] / 3), 3))
-            lidar_data = np.array(points[:, :2])
-            lidar_data *= min(self.hud.dim) / 100.0
-            lidar_data += (0.5 * self.hud.dim[0], 0.5 * self.hud.dim[1])
-            lidar_data = np.fabs(lidar_data)  # pylint: disable=E1111
-            lidar_data = lidar_data.astype(np.int32)
-            lidar_data = np.reshape(lidar_data, (-1, 2))
-            lidar_img_size = (self.hud.dim[0], self.hud.dim[1], 3)
-            lidar_img = np.zeros(lidar_img_size)
-            lidar_img[tuple(lidar_data.T)] = (255, 255, 255)
-            self.surface = pygame.surfarray.make_surface(lidar_img)
+        index = self.index
+        recorder = self.recorder
+        if recorder is not None and not self.sensors[index][0].startswith('sensor.lidar'):
+            recorder.submit(image.frame, image.timestamp, image.raw_data, image.width, image.height)
+        self.frame_worker.submit((image, index))
+
+    @staticmethod
+    def _process_frame(weak_self, frame):
+        """runs on the frame worker thread, converts an image and publishes it to the frame buffer"""
+        self = weak_self()
+        if not self:
+            return
+        image, index = frame
+        if self.sensors[index][0].startswith('sensor.lidar'):
+            self.frame_buffer.write_surface(self.lidar_raster.draw(image.raw_data), image.frame)
         else:
-            image.convert(self.sensors[self.index][1])
-            array = np.frombuffer(image.raw_data, dtype=np.dtype("uint8"))
-            array = np.reshape(array, (image.height, image.width, 4))
-            array = array[:, :, :3]
-            array = array[:, :, ::-1]
-            self.surface = pygame.surfarray.make_surface(array.swapaxes(0, 1))
-        if self.recording:
-            image.save_to_disk(os.path.join(self.record_dir, str(image.frame)))
+            image.convert(self.sensors[index][1])
+            # raw_data is BGRA, copied as is into a surface with the same layout
+            self.frame_buffer.write_bgra(image.raw_data, image.width, image.height, image.frame)
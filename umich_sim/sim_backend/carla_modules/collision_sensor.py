@@ -1,14 +1,91 @@
 #!/usr/bin/env python3
 import carla
 import weakref
-import collections
 import math
+import threading
+import numpy as np
 from .world import World, get_actor_display_name
 from .hud import HUD
 from .ego_vehicle import EgoVehicle
+from .sensor_bus import SensorBus
+from umich_sim.sim_config import ConfigPool, Config
 # from wizard.helper import *
 from datetime import datetime, timedelta
 
+class CollisionHistory:
+    """
+    Collision intensity summed per frame, kept in a fixed-size ring indexed by frame number.
+
+    The ring is stored twice back to back, so the window ending at any frame is a contiguous
+    slice of the storage and can be read without copying.
+    """
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        # intensities, slot i and slot i + size always hold the same value
+        self._values = np.zeros(2 * size)
+        # last frame whose slot has been cleared
+        self._cleared = None
+        self._lock = threading.Lock()
+
+        # aggregate stats
+        self.count = 0
+        self.peak_intensity = 0.0
+        self.last_actor = None
+        self.last_frame = None
+
+    def _advance(self, frame: int):
+        """clear the slots of the frames between the last cleared frame and frame"""
+        if self._cleared is None or frame - self._cleared >= self.size:
+            self._values.fill(0.0)
+        elif frame > self._cleared:
+            first = (self._cleared + 1) % self.size
+            last = frame % self.size
+            if first <= last:
+                self._values[first:last + 1] = 0.0
+                self._values[first + self.size:last + self.size + 1] = 0.0
+            else:
+                self._values[first:self.size + last + 1] = 0.0
+                self._values[:last + 1] = 0.0
+                self._values[first + self.size:] = 0.0
+        else:
+            return
+        self._cleared = frame
+
+    def add(self, frame: int, intensity: float, actor_name: str = None):
+        """
+        Record a collision
+        :param frame: frame of the collision
+        :param intensity: norm of the collision impulse
+        :param actor_name: display name of the other actor
+        """
+        with self._lock:
+            self._advance(frame)
+            slot = frame % self.size
+            self._values[slot] += intensity
+            self._values[slot + self.size] = self._values[slot]
+            self.count += 1
+            self.peak_intensity = max(self.peak_intensity, intensity)
+            self.last_actor = actor_name
+            self.last_frame = frame
+
+    def window(self, frame: int, length: int = 200) -> np.ndarray:
+        """
+        Get the intensities of the frames ending at frame, without copying
+        :param frame: last frame of the window
+        :param length: number of frames of the window, at most size
+        :return: a read-only view of length values, oldest frame first
+        """
+        if length > self.size:
+            raise Exception("Error: collision window longer than the history")
+        with self._lock:
+            self._advance(frame)
+            end = frame % self.size + self.size + 1
+            view = self._values[end - length:end]
+        view.flags.writeable = False
+        return view
+
+
 class CollisionSensor:
     """
     Sensor to get the car collision data with the environment
@@ -16,7 +93,13 @@ class CollisionSensor:
 
     def __init__(self):
         self.sensor = None
-        self.history = []
+        self.history = CollisionHistory()
+        config: Config = ConfigPool.get_config()
+        self.ring = SensorBus.get_instance().register(
+            'collision', ('intensity', 'other_actor_id'), config.sensors.history)
+        # collision is an event sensor, events closer than sensor_tick to the last handled one are ignored
+        self.sensor_tick = config.sensors.collision_tick
+        self._last_event_ts = None
         self._parent = EgoVehicle.get_instance().carla_vehicle
         self.hud = HUD.get_instance()
         world = World.get_instance().world
@@ -35,24 +118,29 @@ class CollisionSensor:
         self.ff_time_interval = timedelta(seconds=1.0) # time interval for the forcefeedback, in seconds
         self.last_collision_ts = datetime.now()
 
-    def get_collision_history(self):
-        history = collections.defaultdict(int)
-        for frame, intensity in self.history:
-            history[frame] += intensity
-        return history
+    def get_collision_history(self, frame, length=200):
+        """
+        :param frame: last frame of the window
+        :param length: number of frames
+        :return: zero-copy view of the collision intensities of the last length frames
+        """
+        return self.history.window(frame, length)
 
     @staticmethod
     def _on_collision(weak_self, event):
         self = weak_self()
         if not self:
             return
+        if self._last_event_ts is not None and \
+                event.timestamp - self._last_event_ts < self.sensor_tick:
+            return
+        self._last_event_ts = event.timestamp
         actor_type = get_actor_display_name(event.other_actor)
         self.hud.notification('Collision with %r' % actor_type)
         impulse = event.normal_impulse
         intensity = math.sqrt(impulse.x**2 + impulse.y**2 + impulse.z**2)
-        self.history.append((event.frame, intensity))
-        if len(self.history) > 4000:
-            self.history.pop(0)
+        self.history.add(event.frame, intensity, actor_type)
+        self.ring.publish(event.frame, event.timestamp, (intensity, event.other_actor.id))
         
         ### Force feedback
         curr_time = datetime.now()
@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
-from time import time
+from time import time, monotonic
+from typing import Dict, Optional
 import carla
-from umich_sim.wizard.inputs import ClientMode, InputPacket, InputDevice, create_input_device
+import numpy as np
+from umich_sim.wizard.inputs import ClientMode, ControlEventType, InputPacket, InputDevice, create_input_device
+from umich_sim.wizard.latency import LatencyTracker
 from umich_sim.sim_config import ConfigPool, Config
 # from umich_sim.sim_backend.helpers import VehicleType
 from .vehicle import Vehicle
-from .hud import HUD
+from .lane_index import LaneIndex
+from .ldw import LaneDepartureWarning, LdwState
 from umich_sim.sim_backend.helpers import (WorldDirection, VehicleType,
                                            to_numpy_vector, rotate_vector,
                                            ORANGE, RED)
-from pygame import mixer
-from datetime import datetime, timedelta
 
 
 class EgoVehicle(Vehicle):
@@ -55,12 +57,18 @@ class EgoVehicle(Vehicle):
         self._local_ctl: carla.VehicleControl = carla.VehicleControl()
         # control info from carla server
         self._carla_ctl: carla.VehicleControl = carla.VehicleControl()
+        # creation time of the oldest input of every type not applied yet
+        self._input_stamps: Dict[ControlEventType, float] = {}
+        self.input_latency: LatencyTracker = LatencyTracker.get_instance()
 
         # whether to enable wizard
         self.enable_wizard = config.wizard.enable_wizard
         if self.enable_wizard:
-            from umich_sim.wizard.rpc import RPC
-            self._rpc: RPC = RPC.get_instance()
+            # local mirror of the wizard state, never waits on the network
+            from umich_sim.wizard.sync import WizardSync
+            self._rpc: WizardSync = WizardSync.get_instance()
+            # give the mirror a moment to receive the state on start up
+            self._rpc.wait_synced(1.0)
             # who is driving
             self.driver: ClientMode = self._rpc.get_driver()
         else:
@@ -69,21 +77,26 @@ class EgoVehicle(Vehicle):
         # TODO: change this
         self.joystick_wheel: InputDevice = create_input_device(
             config.wizard.dev_type, config.wizard.client_mode,
-            config.wizard.dev_path)
+            config.wizard.dev_path, config.wizard.input_log,
+            config.wizard.replay_speed)
 
         self.type_id: VehicleType = VehicleType.EGO_FULL_MANUAL
 
         # Rumble Strips
         self.mapp = World.get_instance().world.get_map()
+        # lane centre lines around the vehicle, queried every tick by lane_effect_update
+        self.lane_index = LaneIndex(self.mapp)
+        # wheel positions in the frame of the vehicle, read once from the physics control at spawn
+        self._wheel_offsets: Optional[np.ndarray] = None
+        if carla_vehicle is not None:
+            # a vehicle taken over from the wizard may already be moving, its current pose is the best we have
+            self._wheel_offsets = self._read_wheel_offsets(
+                spawn_point if config.client_mode == ClientMode.EGO else carla_vehicle.get_transform())
         self.is_rumbling: bool = False
         self.rumble_lane_type = {carla.LaneMarkingType.Solid}
 
-        # LDW System
+        # LDW System, predicts the time to line crossing in simulation time
         self._is_ldw_on = False
-        self._last_ldw_ts = datetime.now()
-        self._ldw_time_interval = timedelta(
-            seconds=3
-        )  # time interval between two triggered warning, in seconds
         self.ldw_lane_type = {
             carla.LaneMarkingType.Solid, carla.LaneMarkingType.Broken,
             carla.LaneMarkingType.SolidSolid,
@@ -91,10 +104,15 @@ class EgoVehicle(Vehicle):
             carla.LaneMarkingType.BrokenSolid,
             carla.LaneMarkingType.BrokenBroken
         }
+        self.ldw = LaneDepartureWarning(self.lane_index,
+                                        ttlc_threshold=config.ldw_ttlc,
+                                        interval=config.ldw_interval,
+                                        markings=self.ldw_lane_type)
 
         # Sound Effect
         # TODO: move this part to HUD module
         if config.enable_sound:
+            from pygame import mixer
             mixer.init()  # Initialzing pyamge mixer
             mixer.pre_init(44100, 16, 2, 4096)
             self._sound_rs = mixer.Sound(
@@ -110,12 +128,16 @@ class EgoVehicle(Vehicle):
             return EgoVehicle()
         return EgoVehicle.__instance
 
-    def set_vehicle(self, vehicle: carla.Vehicle):
+    def set_vehicle(self, vehicle: carla.Vehicle, spawn_point: Optional[carla.Transform] = None):
         """
-        set vehicle from outside
+        set vehicle from outside, right after spawning it
         :param vehicle: carla vehicle to set
+        :param spawn_point: transform the vehicle was spawned at, its current transform by default
         """
         self.carla_vehicle = vehicle
+        self._wheel_offsets = self._read_wheel_offsets(
+            spawn_point if spawn_point is not None else vehicle.get_transform())
+        self.ldw.reset()
         self._light = self.carla_vehicle.get_light_state()
         self._is_left_blinking = False
         self._is_right_blinking = False
@@ -130,6 +152,11 @@ class EgoVehicle(Vehicle):
         """
         self.carla_vehicle.destroy()
         self.joystick_wheel.stop()
+        if self.enable_wizard:
+            self._rpc.close()
+        latency_file = ConfigPool.get_config().input_latency_file
+        if latency_file:
+            self.input_latency.export(latency_file)
 
     # TODO: recover this
     def change_vehicle(self, blueprint, spawn_point):
@@ -138,6 +165,9 @@ class EgoVehicle(Vehicle):
         self.carla_vehicle.destroy()
         self.carla_vehicle: carla.Vehicle = \
             World.get_instance().world.try_spawn_actor(blueprint, spawn_point)
+        self._wheel_offsets = None if self.carla_vehicle is None else self._read_wheel_offsets(spawn_point)
+        self.lane_index.clear()
+        self.ldw.reset()
 
     def switch_driver(self):
         """Switch the current driver, wizard should be enabled"""
@@ -168,6 +198,10 @@ class EgoVehicle(Vehicle):
             # update control
             self.carla_vehicle.apply_control(self._local_ctl)
             self._carla_ctl = self._local_ctl
+            if self._input_stamps:
+                applied = monotonic()
+                for event_type, stamp in self._input_stamps.items():
+                    self.input_latency.record(event_type, applied - stamp)
             if self.joystick_wheel.support_ff():
                 # erase spring effect
                 self.joystick_wheel.erase_ff_spring()
@@ -184,6 +218,8 @@ class EgoVehicle(Vehicle):
                 self.joystick_wheel.erase_ff_autocenter()
                 # force follow
                 self.joystick_wheel.SetWheelPos(self._rpc.get_wheel())
+        # inputs not applied by now (the other side drives) are not measured
+        self._input_stamps.clear()
 
         # Update brake & reverse light
         curr_light = self._light
@@ -201,14 +237,27 @@ class EgoVehicle(Vehicle):
                 carla.VehicleLightState(self._light))
 
         # Update rumbling effect and ldw
-        if_rumble, if_ldw = self.lane_effect_update()
+        if_rumble, _ = self.lane_effect_update()
         if self.is_rumbling and not if_rumble:
             self.stop_rumble()
             self.is_rumbling = False
         elif not self.is_rumbling and if_rumble:
             self.start_rumble()
             self.is_rumbling = True
-        self.ldw_handler(if_ldw)
+        if self._is_ldw_on:
+            from . import World
+            timestamp = World.get_instance().world.get_snapshot().timestamp.elapsed_seconds
+            self.ldw_handler(self.ldw.update(
+                self.carla_vehicle, timestamp,
+                suppressed=bool(self._is_left_blinking or self._is_right_blinking)))
+
+    def mark_input(self, data: InputPacket):
+        """
+        Remember an input handled this tick, its latency is recorded once the control is applied
+        :param data: the input packet
+        """
+        if data.event_type not in self._input_stamps:
+            self._input_stamps[data.event_type] = data.timestamp
 
     def set_brake(self, data: InputPacket):
         """set the vehicle brake value"""
@@ -276,6 +325,7 @@ class EgoVehicle(Vehicle):
 
     def toggle_ldw(self):
         """Toggle the lane departure warning system"""
+        from . import HUD
         self._is_ldw_on = not self._is_ldw_on
         hud = HUD.get_instance()
         if self._is_ldw_on:
@@ -283,15 +333,15 @@ class EgoVehicle(Vehicle):
         else:
             hud.notification('Lane Departure Warning Off')
 
-    def ldw_handler(self, if_ldw):
-        if if_ldw and self._is_ldw_on and not self._is_left_blinking and not self._is_right_blinking:
-            curr_time = datetime.now()
-            if curr_time - self._last_ldw_ts >= self._ldw_time_interval:
-                hud = HUD.get_instance()
-                hud.notification('Warning: Lane Departure!')
-                print("warn", curr_time)
-                self._sound_ldw.play(loops=0)  # loops=0 for playing once
-                self._last_ldw_ts = curr_time
+    def ldw_handler(self, state: LdwState):
+        """warn the driver when the ldw engine decided to"""
+        if state.warning is None:
+            return
+        from . import HUD
+        HUD.get_instance().notification('Warning: Lane Departure!')
+        print("warn", state.warning, "ttlc %.2f s" % min(state.ttlc_left, state.ttlc_right))
+        if ConfigPool.get_config().enable_sound:
+            self._sound_ldw.play(loops=0)  # loops=0 for playing once
 
     # Force feedback
 
@@ -322,17 +372,6 @@ class EgoVehicle(Vehicle):
             if_ldw: True if ldw is needed
         """
 
-        def distance_to_segment_2d(point, seg_start, seg_end):
-            """
-            Calculate the distance from point to a segment defined by "seg_start" and "seg_end"
-            Note: only works for 2D
-            """
-            point.z = 0
-            cross_product = (point.x - seg_start.x) * (seg_end.y - seg_start.y) \
-                            - (point.y - seg_start.y) * (seg_end.x - seg_start.x)
-            distance = abs(cross_product) / seg_start.distance_2d(seg_end)
-            return distance
-
         def is_on_lane(distance, lane_width, low=0.43, high=0.55):
             """
             Define whether the wheel lies in the range of the lane
@@ -349,59 +388,55 @@ class EgoVehicle(Vehicle):
         if self.carla_vehicle.get_velocity().length() == 0:
             return False, False
 
-        ### get the closest waypoint (a point in the center of the lane)
-        ### carla.Location, see https://carla.readthedocs.io/en/latest/python_api/#carla.Location
-        vehicle_location = self.carla_vehicle.get_location()
-        waypoint: carla.Location = self.mapp.get_waypoint(
-            vehicle_location,
-            project_to_road=True,
-            lane_type=(carla.LaneType.Driving | carla.LaneType.Sidewalk))
-        waypoint_loc = waypoint.transform.location
-        next_waypoint_loc = waypoint.next(
-            0.5)[0].transform.location  # next waypoint
-        lane_width = waypoint.lane_width
+        ### get the closest segment of the center of the lane from the local lane index
+        transform: carla.Transform = self.carla_vehicle.get_transform()
+        lane = self.lane_index.project(transform.location)
+        if lane is None:
+            return False, False
+        lane_direction = lane.end - lane.start
 
         ### get the location of wheels, in the order of front left, front right, back left, back right
-        ### convert from cm to m since the vehicle position is in meters
-        wheels = self.carla_vehicle.get_physics_control().wheels
-        wheels_loc: carla.Vector3D = [x.position / 100 for x in wheels]
-        wheels_dist = [
-            distance_to_segment_2d(x, waypoint_loc, next_waypoint_loc)
-            for x in wheels_loc
-        ]
+        ### the offsets are read at spawn and moved with the current transform of the vehicle
+        wheels_loc = self._wheel_offsets @ np.array(transform.get_matrix())[:2].T
+        ### distance from every wheel to the line through the segment
+        relative = wheels_loc - lane.start
+        wheels_dist = np.abs(relative[:, 0] * lane_direction[1] - relative[:, 1] * lane_direction[0]) \
+            / np.hypot(*lane_direction)
 
         ### Determine if the vehicle goes the wrong way
-        lane_direction = next_waypoint_loc - waypoint_loc
         vehicle_direction = wheels_loc[0] - wheels_loc[2]
-        is_reverse: bool = lane_direction.dot_2d(vehicle_direction) < 0
+        is_reverse: bool = lane_direction @ vehicle_direction < 0
 
         ### Determine overlap with lane
         if_rumble: bool = False
         if_ldw: bool = False
         for idx, distance in enumerate(wheels_dist):
-            # print(idx, distance / lane_width)
             ### invade right lane
-            if is_on_lane(distance, lane_width) and (
+            if is_on_lane(distance, lane.lane_width) and (
                 (idx % 2 and not is_reverse) or (idx % 2 == 0 and is_reverse)):
-                # print("right", distance, waypoint.right_lane_marking.type)
-                if waypoint.right_lane_marking.type in self.rumble_lane_type:
+                if lane.right_marking in self.rumble_lane_type:
                     if_rumble = True
-                if waypoint.right_lane_marking.type in self.ldw_lane_type:
+                if lane.right_marking in self.ldw_lane_type:
                     if_ldw = True
             ### invade left lane
-            elif is_on_lane(distance, lane_width):
-                # print("left", distance, waypoint.left_lane_marking.type)
-                if waypoint.left_lane_marking.type in self.rumble_lane_type:
+            elif is_on_lane(distance, lane.lane_width):
+                if lane.left_marking in self.rumble_lane_type:
                     if_rumble = True
-                if waypoint.left_lane_marking.type in self.ldw_lane_type:
+                if lane.left_marking in self.ldw_lane_type:
                     if_ldw = True
 
-        ### DEBUG: visualize wheel locations and the closest waypoint
-        # from . import World
-        # world = World.get_instance().world
-        # world.debug.draw_point(waypoint_loc, size=0.15, color=ORANGE, life_time=1.0)
-        # world.debug.draw_point(next_waypoint_loc, size=0.15, color=RED, life_time=1.0)
-        # for i in wheels_loc:
-        #     world.debug.draw_point(i, size=0.15, color=RED, life_time=0.5)
-
         return if_rumble, if_ldw
+
+    def _read_wheel_offsets(self, transform: carla.Transform) -> np.ndarray:
+        """
+        Read the wheel positions from the physics control and move them in the frame of the vehicle.
+        Called right after spawning, before the first physics step, so the wheel poses of the server
+        and the transform refer to the same instant.
+        :param transform: the transform the vehicle was spawned at
+        :return: (wheels, 4) homogeneous wheel positions in the frame of the vehicle, in meters
+        """
+        wheels = self.carla_vehicle.get_physics_control().wheels
+        ### convert from cm to m since the vehicle position is in meters
+        positions = np.array([(x.position.x / 100, x.position.y / 100, x.position.z / 100, 1.0)
+                              for x in wheels])
+        return positions @ np.array(transform.get_inverse_matrix()).T
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Double-buffered pygame surfaces receiving raw BGRA camera frames
+"""
+
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pygame
+
+# Channel masks of a 32 bit surface whose memory layout matches the BGRA buffers of carla.Image
+# (little endian, the alpha byte is ignored)
+BGRA_MASKS = (0x00FF0000, 0x0000FF00, 0x000000FF, 0)
+
+
+class FrameBuffer:
+    """
+    Two preallocated surfaces laid out like carla's BGRA images. A frame is copied with a single
+    memcpy into the back surface, which is then swapped with the front one, so no surface is
+    allocated and no pixel conversion happens on the sensor thread. The BGRA to display format
+    conversion is left to the blit in render.
+    """
+
+    def __init__(self):
+        self._surfaces: List[pygame.Surface] = []
+        self._size: Tuple[int, int] = (0, 0)
+        self._front: int = 0
+        self._has_frame: bool = False
+        self._frame_id: Optional[int] = None
+        # held while swapping and while the front surface is being blitted
+        self._lock = threading.Lock()
+
+    @property
+    def surface(self) -> Optional[pygame.Surface]:
+        """the surface holding the last complete frame, None before the first frame"""
+        with self._lock:
+            return self._surfaces[self._front] if self._has_frame else None
+
+    @property
+    def frame_id(self) -> Optional[int]:
+        """id of the frame held by the front surface, None before the first frame"""
+        with self._lock:
+            return self._frame_id if self._has_frame else None
+
+    def write_bgra(self, raw_data, width: int, height: int, frame_id: Optional[int] = None) -> None:
+        """
+        Copy a BGRA frame into the back surface and make it the front one
+        :param raw_data: buffer of width * height * 4 bytes (e.g. carla.Image.raw_data)
+        :param width: width of the frame in pixels
+        :param height: height of the frame in pixels
+        :param frame_id: id of the frame (e.g. carla.Image.frame)
+        """
+        if (width, height) != self._size:
+            self._allocate(width, height)
+        # the surface memory is contiguous (pitch == width * 4), copy the frame as 32 bit pixels
+        pixels = np.asarray(self._surfaces[1 - self._front].get_view("1"))
+        np.copyto(pixels, np.frombuffer(raw_data, dtype=np.uint32))
+        # release the view, a locked surface can't be blitted
+        del pixels
+        self._swap(frame_id)
+
+    def write_surface(self, surface: pygame.Surface, frame_id: Optional[int] = None) -> None:
+        """
+        Copy an already built surface (e.g. a lidar raster) into the back surface and swap
+        :param surface: the frame to show
+        :param frame_id: id of the frame
+        """
+        width, height = surface.get_size()
+        if (width, height) != self._size:
+            self._allocate(width, height)
+        self._surfaces[1 - self._front].blit(surface, (0, 0))
+        self._swap(frame_id)
+
+    def render(self, display: pygame.Surface, position: Tuple[int, int] = (0, 0)) -> None:
+        """
+        Blit the last complete frame
+        :param display: surface to draw on
+        :param position: top left corner of the frame on the display
+        """
+        with self._lock:
+            if self._has_frame:
+                display.blit(self._surfaces[self._front], position)
+
+    def clear(self) -> None:
+        """forget the current frame, e.g. when the sensor is replaced"""
+        with self._lock:
+            self._has_frame = False
+
+    def _swap(self, frame_id: Optional[int]) -> None:
+        with self._lock:
+            self._front = 1 - self._front
+            self._has_frame = True
+            self._frame_id = frame_id
+
+    def _allocate(self, width: int, height: int) -> None:
+        with self._lock:
+            self._surfaces = [pygame.Surface((width, height), 0, 32, BGRA_MASKS) for _ in range(2)]
+            self._size = (width, height)
+            self._front = 0
+            self._has_frame = False
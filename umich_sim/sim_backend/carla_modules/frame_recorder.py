@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Background recorder of camera frames
+
+Frames are submitted without blocking into a bounded queue, frames arriving while the queue is full
+are dropped and counted. A writer thread hands the frames to a pool of worker processes that
+compress them, and appends the results in order to chunk files:
+
+    <directory>/chunk_000000.bin, chunk_000001.bin, ...   concatenated frames
+    <directory>/index.csv                                  one line per written frame
+    <directory>/recording.json                             format and frame counts, written on close
+
+Every frame is stored as the raw BGRA buffer of carla.Image (height x width x 4 bytes), zlib
+compressed when compression is enabled. read_recording iterates over a recording as NumPy arrays.
+"""
+
+import csv
+import json
+import queue
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+# Version of the on-disk layout
+RECORDING_VERSION = 1
+INDEX_NAME = "index.csv"
+MANIFEST_NAME = "recording.json"
+CHUNK_PATTERN = "chunk_{:06d}.bin"
+INDEX_FIELDS = ("frame", "timestamp", "chunk", "offset", "length", "width", "height")
+
+
+class FrameRecorder:
+    """
+    Records camera frames without ever blocking the caller
+    """
+
+    def __init__(self, directory: Union[Path, str], compress: bool = True, compress_level: int = 1,
+                 workers: int = 2, queue_size: int = 8, chunk_frames: int = 300):
+        """
+        :param directory: directory of the recording, created if needed
+        :param compress: whether the frames are zlib compressed, raw frames are written by the writer
+                         thread directly without going through the worker processes
+        :param compress_level: zlib compression level
+        :param workers: number of worker processes compressing frames
+        :param queue_size: number of frames waiting to be written above which new frames are dropped
+        :param chunk_frames: number of frames per chunk file
+        """
+        self.directory: Path = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compress: bool = compress
+        self.compress_level: int = compress_level
+        self.chunk_frames: int = chunk_frames
+
+        # number of frames submitted, dropped because the queue was full, and written to disk
+        self.received: int = 0
+        self.dropped: int = 0
+        self.written: int = 0
+
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue(maxsize=queue_size)
+        self._pool: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(workers) if compress else None
+        # frames being compressed, written in submission order
+        self._pending: Deque[Tuple[Tuple, Future]] = deque()
+        self._max_pending: int = 2 * workers
+
+        self._chunk: int = -1
+        self._chunk_file = None
+        self._offset: int = 0
+        self._index_file = open(self.directory / INDEX_NAME, "w", newline="")
+        self._index = csv.writer(self._index_file)
+        self._index.writerow(INDEX_FIELDS)
+        self._size: Optional[Tuple[int, int]] = None
+        self._error: Optional[BaseException] = None
+        self._closed: bool = False
+
+        self._writer = threading.Thread(target=self._write_loop, name="frame-recorder", daemon=True)
+        self._writer.start()
+
+    def submit(self, frame: int, timestamp: float, raw_data, width: int, height: int) -> bool:
+        """
+        Queue a frame for recording, never blocks
+        :param frame: id of the frame (carla.Image.frame)
+        :param timestamp: simulation time of the frame, in seconds
+        :param raw_data: BGRA buffer of the frame, copied before returning
+        :param width: width of the frame in pixels
+        :param height: height of the frame in pixels
+        :return: whether the frame was queued, False if it was dropped
+        """
+        self.received += 1
+        # a frame racing with close is dropped as well
+        if self._closed or self._queue.full():
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait((frame, timestamp, width, height, bytes(raw_data)))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def close(self) -> None:
+        """
+        Write the queued frames and the manifest, then stop the writer and the worker processes
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+        self._index_file.close()
+
+        manifest = {
+            "version": RECORDING_VERSION,
+            "pixel_format": "BGRA",
+            "compression": "zlib" if self.compress else "none",
+            "width": self._size[0] if self._size else None,
+            "height": self._size[1] if self._size else None,
+            "chunk_frames": self.chunk_frames,
+            "received": self.received,
+            "dropped": self.dropped,
+            "written": self.written,
+        }
+        with open(self.directory / MANIFEST_NAME, "w") as f:
+            json.dump(manifest, f, indent=2)
+        if self._error is not None:
+            raise Exception(f"Error: frame recorder failed: {self._error}")
+
+    def destroy(self) -> None:
+        """same as close, lets World.register_death stop the recorder"""
+        self.close()
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                if self._pool is None:
+                    self._write(item[:4], item[4])
+                    continue
+                if len(self._pending) >= self._max_pending:
+                    self._write_oldest()
+                future = self._pool.submit(zlib.compress, item[4], self.compress_level)
+                self._pending.append((item[:4], future))
+            except BaseException as e:
+                self._error = e
+        try:
+            while self._pending and self._error is None:
+                self._write_oldest()
+        except BaseException as e:
+            self._error = e
+
+    def _write_oldest(self) -> None:
+        meta, future = self._pending.popleft()
+        self._write(meta, future.result())
+
+    def _write(self, meta: Tuple, data: bytes) -> None:
+        frame, timestamp, width, height = meta
+        if self._size is None:
+            self._size = (width, height)
+        if self.written % self.chunk_frames == 0:
+            if self._chunk_file is not None:
+                self._chunk_file.close()
+            self._chunk += 1
+            self._chunk_file = open(self.directory / CHUNK_PATTERN.format(self._chunk), "wb")
+            self._offset = 0
+        self._chunk_file.write(data)
+        self._index.writerow((frame, timestamp, self._chunk, self._offset, len(data), width, height))
+        self._offset += len(data)
+        self.written += 1
+
+
+def read_recording(directory: Union[Path, str]) -> Iterator[Tuple[Dict[str, Any], np.ndarray]]:
+    """
+    Iterate over the frames of a recording
+    :param directory: directory of a FrameRecorder recording
+    :return: an iterator of (index entry, height x width x 4 BGRA array) tuples
+    """
+    directory = Path(directory)
+    with open(directory / MANIFEST_NAME) as f:
+        compressed = json.load(f)["compression"] == "zlib"
+    with open(directory / INDEX_NAME, newline="") as f:
+        entries = list(csv.DictReader(f))
+
+    chunk, chunk_file = None, None
+    try:
+        for entry in entries:
+            entry = {name: float(value) if name == "timestamp" else int(value) for name, value in entry.items()}
+            if entry["chunk"] != chunk:
+                if chunk_file is not None:
+                    chunk_file.close()
+                chunk = entry["chunk"]
+                chunk_file = open(directory / CHUNK_PATTERN.format(chunk), "rb")
+            chunk_file.seek(entry["offset"])
+            data = chunk_file.read(entry["length"])
+            if compressed:
+                data = zlib.decompress(data)
+            yield entry, np.frombuffer(data, dtype=np.uint8).reshape(entry["height"], entry["width"], 4)
+    finally:
+        if chunk_file is not None:
+            chunk_file.close()
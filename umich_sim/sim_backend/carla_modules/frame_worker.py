@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Worker thread processing sensor frames outside of the carla sensor callback
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+
+class LatestSlot:
+    """
+    Holds at most one item, putting an item replaces the one waiting (latest value wins)
+    """
+
+    def __init__(self):
+        self._item: Any = None
+        self._full: bool = False
+        self._closed: bool = False
+        self._cond = threading.Condition()
+        # number of items replaced before being taken
+        self.dropped: int = 0
+
+    def put(self, item: Any) -> bool:
+        """
+        Store an item, never blocks
+        :param item: the item
+        :return: whether an older item was dropped to make room
+        """
+        with self._cond:
+            dropped = self._full
+            if dropped:
+                self.dropped += 1
+            self._item = item
+            self._full = True
+            self._cond.notify()
+        return dropped
+
+    def take(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for an item and remove it from the slot
+        :param timeout: seconds to wait, None waits until an item arrives or the slot is closed
+        :return: the item, None on timeout or once the slot is closed
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._full or self._closed, timeout):
+                return None
+            if not self._full:
+                return None
+            item, self._item, self._full = self._item, None, False
+            return item
+
+    def close(self) -> None:
+        """wake up the waiting consumer, take returns None from now on"""
+        with self._cond:
+            self._closed = True
+            self._item, self._full = None, False
+            self._cond.notify_all()
+
+
+class FrameWorker:
+    """
+    Runs the conversion of sensor frames on its own thread. The sensor callback only submits the raw
+    frame, frames arriving while the worker is busy replace the waiting one and are counted as dropped.
+    """
+
+    def __init__(self, process: Callable[[Any], None], name: str = "frame-worker"):
+        """
+        :param process: called on the worker thread with every frame that is not dropped
+        :param name: name of the worker thread
+        """
+        self._process = process
+        self._slot = LatestSlot()
+        # number of frames submitted and processed
+        self.received: int = 0
+        self.processed: int = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self) -> int:
+        """number of frames that were replaced by a newer one before being processed"""
+        return self._slot.dropped
+
+    def submit(self, frame: Any) -> None:
+        """
+        Hand a frame over to the worker, returns immediately
+        :param frame: the frame, passed as is to process
+        """
+        self.received += 1
+        self._slot.put(frame)
+
+    def destroy(self) -> None:
+        """stop the worker thread, the frame being processed is finished first"""
+        self._slot.close()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            frame = self._slot.take()
+            if frame is None:
+                return
+            try:
+                self._process(frame)
+            except Exception as e:
+                print(f"Error: failed to process sensor frame: {e}")
+            self.processed += 1
@@ -3,6 +3,8 @@ import carla
 import weakref
 from .world import World
 from .ego_vehicle import EgoVehicle
+from .sensor_bus import SensorBus, set_sensor_tick
+from umich_sim.sim_config import ConfigPool, Config
 
 
 class GnssSensor(object):
@@ -15,8 +17,12 @@ class GnssSensor(object):
         self._parent = EgoVehicle.get_instance().carla_vehicle
         self.lat = 0.0
         self.lon = 0.0
+        config: Config = ConfigPool.get_config()
+        self.ring = SensorBus.get_instance().register(
+            'gnss', ('latitude', 'longitude', 'altitude'), config.sensors.history)
         world = self._parent.get_world()
         bp = world.get_blueprint_library().find('sensor.other.gnss')
+        set_sensor_tick(bp, config.sensors.gnss_tick)
         self.sensor = world.spawn_actor(bp,
                                         carla.Transform(
                                             carla.Location(x=1.0, z=2.8)),
@@ -35,3 +41,5 @@ class GnssSensor(object):
             return
         self.lat = event.latitude
         self.lon = event.longitude
+        self.ring.publish(event.frame, event.timestamp,
+                          (event.latitude, event.longitude, event.altitude))
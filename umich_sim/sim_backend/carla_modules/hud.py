@@ -10,7 +10,10 @@ import os
 import carla
 import datetime
 import math
+import numpy as np
 from .module_helper import get_actor_display_name
+from .sensor_bus import SensorBus
+from umich_sim.sim_config import ConfigPool
 
 
 class FadingText(object):
@@ -87,6 +90,17 @@ class HUD(object):
         self._show_info = True
         self._info_text = []
         self._server_clock = pygame.time.Clock()
+
+        # the info panel is recomputed info_rate times per second, 0 recomputes it every frame
+        self.info_rate: float = ConfigPool.get_config().hud_info_rate
+        self._info_age: float = float('inf')
+        # panel background, reused every frame
+        self._info_surface = pygame.Surface((220, height))
+        self._info_surface.set_alpha(100)
+        # rendered text lines keyed by their string
+        self._text_cache = {}
+        # display name of every actor id seen by the panel, None for actors that are not vehicles
+        self._vehicle_names = {}
         if HUD.__instance is None:
             HUD.__instance = self
         else:
@@ -110,6 +124,10 @@ class HUD(object):
         self._notifications.tick(world, clock)
         if not self._show_info:
             return
+        self._info_age += 1e-3 * clock.get_time()
+        if self.info_rate > 0.0 and self._info_age < 1.0 / self.info_rate:
+            return
+        self._info_age = 0.0
         vehicle: EgoVehicle = EgoVehicle.get_instance()
         t = vehicle.get_transform()
         v = vehicle.get_velocity()
@@ -118,16 +136,21 @@ class HUD(object):
         heading += 'S' if abs(t.rotation.yaw) > 90.5 else ''
         heading += 'E' if 179.5 > t.rotation.yaw > 0.5 else ''
         heading += 'W' if -0.5 > t.rotation.yaw > -179.5 else ''
-        colhist = world.collision_sensor.get_collision_history()
-        collision = [colhist[x + self.frame - 200] for x in range(0, 200)]
-        max_col = max(1.0, max(collision))
-        collision = [x / max_col for x in collision]
-        vehicles = world.world.get_actors().filter('vehicle.*')
+        collision = world.collision_sensor.get_collision_history(self.frame, 200)
+        collision_stats = world.collision_sensor.history
+        vehicle_ids, positions = self._vehicle_positions(world.world)
+        # sensor values of the current frame (or the last sample before it)
+        bus = SensorBus.get_instance()
+        imu_sample = bus.latest('imu', self.frame)
+        imu = imu_sample.values if imu_sample else dict.fromkeys(bus.ring('imu').fields, 0.0)
+        gnss_sample = bus.latest('gnss', self.frame)
+        gnss = gnss_sample.values if gnss_sample else dict.fromkeys(bus.ring('gnss').fields, 0.0)
 
         self._info_text = [
             'Driver: % 20s' % vehicle.get_driver_name(),
             'Server:  % 16.0f FPS' % self.server_fps,
             'Client:  % 16.0f FPS' % clock.get_fps(),
+            'Dropped frames: % 13d' % world.camera_manager.frame_worker.dropped,
             '',
             'Vehicle: % 20s' %
             get_actor_display_name(world.vehicle.carla_vehicle, truncate=20),
@@ -139,11 +162,11 @@ class HUD(object):
             (3.6 * math.sqrt(v.x**2 + v.y**2 + v.z**2)),
             u'Heading:% 16.0f\N{DEGREE SIGN} % 2s' % (t.rotation.yaw, heading),
             'Accelero: (%5.1f,%5.1f,%5.1f)' %
-            (world.imu_sensor.accelerometer),  #new
+            (imu['accel_x'], imu['accel_y'], imu['accel_z']),  #new
             'Location:% 20s' % ('(% 5.1f, % 5.1f)' %
                                 (t.location.x, t.location.y)),
             'GNSS:% 24s' % ('(% 2.6f, % 3.6f)' %
-                            (world.gnss_sensor.lat, world.gnss_sensor.lon)),
+                            (gnss['latitude'], gnss['longitude'])),
             'Height:  % 18.0f m' % t.location.z,
             ''
         ]
@@ -164,24 +187,66 @@ class HUD(object):
                                     0: 'N'
                                 }.get(c.gear, c.gear)]
         self._info_text += [
-            '', 'Collision:', collision, '',
-            'Number of vehicles: % 8d' % len(vehicles)
+            '', 'Collision:', collision,
+            'Collisions: % 6d peak % 8.0f' % (collision_stats.count, collision_stats.peak_intensity),
         ]
-        if len(vehicles) > 1:
+        latency = vehicle.input_latency.summary()
+        if latency:
+            self._info_text += ['', 'Input latency ms:   p50   p95']
+            for name, stats in latency.items():
+                self._info_text.append('  %-15s % 5.1f % 5.1f' % (name.lower(), stats['p50'], stats['p95']))
+        self._info_text += [
+            '',
+            'Number of vehicles: % 8d' % len(vehicle_ids)
+        ]
+        if len(vehicle_ids) > 1:
             self._info_text += ['Nearby vehicles:']
-            distance = lambda l: math.sqrt((l.x - t.location.x)**2 +
-                                           (l.y - t.location.y)**2 +
-                                           (l.z - t.location.z)**2)
-            vehicles = [(distance(x.get_location()), x) for x in vehicles
-                        if x.id != vehicle.carla_vehicle.id]
-            for d, vehicle in sorted(vehicles):
-                if d > 200.0:
+            distances = np.linalg.norm(
+                positions - (t.location.x, t.location.y, t.location.z), axis=1)
+            for i in np.argsort(distances):
+                if distances[i] > 200.0:
                     break
-                vehicle_type = get_actor_display_name(vehicle, truncate=22)
-                self._info_text.append('% 4dm %s' % (d, vehicle_type))
+                if vehicle_ids[i] == vehicle.carla_vehicle.id:
+                    continue
+                self._info_text.append('% 4dm %s' % (distances[i], self._vehicle_names[vehicle_ids[i]]))
+
+    def _vehicle_positions(self, carla_world):
+        """
+        Get the location of every vehicle from a single world snapshot
+        :param carla_world: the carla.World
+        :return: the list of vehicle ids and a (n, 3) array of their locations
+        """
+        snapshot = carla_world.get_snapshot()
+        actors = list(snapshot)
+        # only look up the actors that were never seen before
+        unknown = [x.id for x in actors if x.id not in self._vehicle_names]
+        if unknown:
+            for actor in carla_world.get_actors(unknown):
+                self._vehicle_names[actor.id] = get_actor_display_name(actor, truncate=22) \
+                    if actor.type_id.startswith('vehicle.') else None
+        vehicle_ids = []
+        positions = []
+        for x in actors:
+            if self._vehicle_names.get(x.id) is not None:
+                location = x.get_transform().location
+                vehicle_ids.append(x.id)
+                positions.append((location.x, location.y, location.z))
+        return vehicle_ids, np.array(positions).reshape(-1, 3)
+
+    def _text(self, text):
+        """rendered surface of a line of the info panel, cached by string"""
+        surface = self._text_cache.get(text)
+        if surface is None:
+            if len(self._text_cache) > 512:
+                self._text_cache.clear()
+            surface = self._font_mono.render(text, True, (255, 255, 255))
+            self._text_cache[text] = surface
+        return surface
 
     def toggle_info(self):
         self._show_info = not self._show_info
+        # refresh the panel on the next tick
+        self._info_age = float('inf')
 
     def notification(self, text, seconds=2.0):
         self._notifications.set_text(text, seconds=seconds)
@@ -191,18 +256,18 @@ class HUD(object):
 
     def render(self, display):
         if self._show_info:
-            info_surface = pygame.Surface((220, self.dim[1]))
-            info_surface.set_alpha(100)
-            display.blit(info_surface, (0, 0))
+            display.blit(self._info_surface, (0, 0))
             v_offset = 4
             bar_h_offset = 100
             bar_width = 106
             for item in self._info_text:
                 if v_offset + 18 > self.dim[1]:
                     break
-                if isinstance(item, list):
+                if isinstance(item, (list, np.ndarray)):
                     if len(item) > 1:
-                        points = [(x + 8, v_offset + 8 + (1.0 - y) * 30)
+                        # graphs are normalized by their peak (at least 1)
+                        peak = max(1.0, float(np.max(item)))
+                        points = [(x + 8, v_offset + 8 + (1.0 - y / peak) * 30)
                                   for x, y in enumerate(item)]
                         pygame.draw.lines(display, (255, 136, 0), False,
                                           points, 2)
@@ -230,9 +295,7 @@ class HUD(object):
                         pygame.draw.rect(display, (255, 255, 255), rect)
                     item = item[0]
                 if item:  # At this point has to be a str.
-                    surface = self._font_mono.render(item, True,
-                                                     (255, 255, 255))
-                    display.blit(surface, (8, v_offset))
+                    display.blit(self._text(item), (8, v_offset))
                 v_offset += 18
         self._notifications.render(display)
         self.help.render(display)
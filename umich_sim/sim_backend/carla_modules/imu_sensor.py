@@ -4,6 +4,8 @@ import weakref
 import math
 from .world import World
 from .ego_vehicle import EgoVehicle
+from .sensor_bus import SensorBus, set_sensor_tick
+from umich_sim.sim_config import ConfigPool, Config
 
 
 class IMUSensor(object):
@@ -17,8 +19,13 @@ class IMUSensor(object):
         self.accelerometer = (0.0, 0.0, 0.0)
         self.gyroscope = (0.0, 0.0, 0.0)
         self.compass = 0.0
+        config: Config = ConfigPool.get_config()
+        self.ring = SensorBus.get_instance().register(
+            'imu', ('accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y',
+                    'gyro_z', 'compass'), config.sensors.history)
         world = self._parent.get_world()
         bp = world.get_blueprint_library().find('sensor.other.imu')
+        set_sensor_tick(bp, config.sensors.imu_tick)
         self.sensor = world.spawn_actor(bp,
                                         carla.Transform(),
                                         attach_to=self._parent)
@@ -52,3 +59,5 @@ class IMUSensor(object):
                               min(limits[1],
                                   math.degrees(sensor_data.gyroscope.z))))
         self.compass = math.degrees(sensor_data.compass)
+        self.ring.publish(sensor_data.frame, sensor_data.timestamp,
+                          self.accelerometer + self.gyroscope + (self.compass, ))
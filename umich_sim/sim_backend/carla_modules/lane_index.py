@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Local index of the lane centre lines around the ego vehicle
+
+Every lane of the map topology is sampled from the carla map the first time it comes within a
+radius of the ego vehicle, and the samples are kept. The segments of the lanes around the vehicle
+are gathered into NumPy arrays, finding the lane under a point is then a vectorized nearest segment
+search. The arrays are only gathered again once the vehicle leaves the covered area.
+
+A lane run is the sampled centre line of a whole lane (one road, section and lane id), callers
+tracking a vehicle along a lane can cache the run returned by locate and follow the vehicle along it
+until it leaves the run.
+"""
+
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+import carla
+import numpy as np
+
+# Centre line segment of the lane closest to a point. start and end are (x, y) arrays in the
+# direction of the lane, the width and markings are the ones of the sample closest to the point
+LaneProjection = namedtuple("LaneProjection", ["start", "end", "lane_width", "left_marking", "right_marking"])
+
+# Samples of the centre line of a whole lane: its (road_id, section_id, lane_id), (n, 3) locations in
+# the direction of the lane, widths, left and right marking types and distance of every sample from the
+# first one along the lane, s[0] = 0 and s[-1] is the length of the run
+LaneRun = namedtuple("LaneRun", ["key", "points", "widths", "lefts", "rights", "s"])
+
+
+def _lane_key(waypoint: carla.Waypoint) -> Tuple[int, int, int]:
+    return waypoint.road_id, waypoint.section_id, waypoint.lane_id
+
+
+class LaneIndex:
+    """
+    Centre line segments of the lanes around a moving point, gathered again when the point gets close
+    to the border of the covered area
+    """
+
+    def __init__(self, carla_map: carla.Map, radius: float = 60.0, spacing: float = 1.0,
+                 lane_type=carla.LaneType.Driving | carla.LaneType.Sidewalk):
+        """
+        :param carla_map: the map of the world
+        :param radius: distance around the point the index is gathered at that is covered, in meters
+        :param spacing: distance between two samples of a centre line, in meters
+        :param lane_type: types of lanes indexed, the lanes next to the driving lanes of the topology
+                          are indexed if their type matches (e.g. sidewalks)
+        """
+        self.map: carla.Map = carla_map
+        self.radius: float = radius
+        self.spacing: float = spacing
+        self.lane_type = lane_type
+        # number of times the segments were gathered
+        self.rebuilds: int = 0
+
+        # first and last waypoint of every lane of the topology, with their location and length
+        self._lanes: List[Tuple[carla.Waypoint, carla.Waypoint]] = carla_map.get_topology()
+        ends = np.array([(start.transform.location.x, start.transform.location.y,
+                          end.transform.location.x, end.transform.location.y)
+                         for start, end in self._lanes]).reshape(-1, 4)
+        self._lane_start, self._lane_end = ends[:, :2], ends[:, 2:]
+        self._lane_length = np.maximum(
+            np.array([abs(end.s - start.s) for start, end in self._lanes]),
+            np.hypot(*(self._lane_end - self._lane_start).T))
+        # lanes sampled so far, for every lane of the topology its run and the ones of its
+        # neighbours of a matching type
+        self._samples: Dict[int, List[LaneRun]] = {}
+        # neighbours already sampled along with another lane of the topology
+        self._sampled_sides = set()
+
+        self._center: Optional[np.ndarray] = None
+        self._start = np.zeros((0, 3))
+        self._delta = np.zeros((0, 3))
+        self._length_sq = np.zeros(0)
+        # index of the first sample of every segment in the sample arrays
+        self._first = np.zeros(0, dtype=np.intp)
+        # run of every segment and index of the segment in its run
+        self._runs: List[LaneRun] = []
+        self._segment_run = np.zeros(0, dtype=np.intp)
+        self._run_segment = np.zeros(0, dtype=np.intp)
+        self._width = np.zeros(0)
+        self._left: List = []
+        self._right: List = []
+
+    def __len__(self) -> int:
+        return len(self._first)
+
+    def clear(self) -> None:
+        """drop the gathered segments, the next projection gathers them again"""
+        self._center = None
+
+    def project(self, location: carla.Location) -> Optional[LaneProjection]:
+        """
+        Find the lane centre segment closest to a location, gathering the segments again if the
+        location left the covered area
+        :param location: the location
+        :return: the closest segment, None if there is no lane around the location
+        """
+        nearest = self._nearest(location)
+        if nearest is None:
+            return None
+        i, t = nearest
+        # width and markings of the sample closest to the projection
+        sample = self._first[i] + int(t >= 0.5)
+        return LaneProjection(self._start[i, :2], self._start[i, :2] + self._delta[i, :2],
+                              self._width[sample], self._left[sample], self._right[sample])
+
+    def locate(self, location: carla.Location) -> Optional[Tuple[LaneRun, int]]:
+        """
+        Find the lane run closest to a location, gathering the segments again if the location left
+        the covered area
+        :param location: the location
+        :return: the run and the index of its segment closest to the location (segment i goes from
+                 sample i to sample i + 1), None if there is no lane around the location
+        """
+        nearest = self._nearest(location)
+        if nearest is None:
+            return None
+        i = nearest[0]
+        return self._runs[self._segment_run[i]], int(self._run_segment[i])
+
+    def _nearest(self, location: carla.Location) -> Optional[Tuple[int, float]]:
+        """index of the segment closest to a location and the position of the projection on it in [0, 1]"""
+        point = np.array((location.x, location.y, location.z))
+        if self._center is None or np.hypot(*(point[:2] - self._center[:2])) > self.radius / 2:
+            self._gather(point)
+        if len(self) == 0:
+            return None
+
+        offset = point - self._start
+        t = np.einsum("ij,ij->i", offset, self._delta) / self._length_sq
+        np.clip(t, 0.0, 1.0, out=t)
+        offset -= t[:, None] * self._delta
+        i = int(np.argmin(np.einsum("ij,ij->i", offset, offset)))
+        return i, float(t[i])
+
+    def _gather(self, point: np.ndarray) -> None:
+        """collect the segments of the lanes that may come within the radius of a point"""
+        self.rebuilds += 1
+        self._center = point
+        # any point of a lane is within half of its length of one of its ends
+        distance = np.minimum(np.hypot(*(self._lane_start - point[:2]).T),
+                              np.hypot(*(self._lane_end - point[:2]).T))
+        nearby = np.flatnonzero(distance - self._lane_length / 2 <= self.radius)
+
+        points, widths, lefts, rights, first, runs = [], [], [], [], [], []
+        count = 0
+        for lane in nearby.tolist():
+            if lane not in self._samples:
+                self._samples[lane] = self._sample_lane(*self._lanes[lane])
+            for run in self._samples[lane]:
+                n = len(run.points)
+                points.append(run.points)
+                widths.append(run.widths)
+                lefts.extend(run.lefts)
+                rights.extend(run.rights)
+                first.append(np.arange(count, count + n - 1))
+                runs.append(run)
+                count += n
+
+        self._runs = runs
+        if not first:
+            self._start, self._delta = np.zeros((0, 3)), np.zeros((0, 3))
+            self._length_sq, self._first = np.zeros(0), np.zeros(0, dtype=np.intp)
+            self._segment_run, self._run_segment = np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+            self._width, self._left, self._right = np.zeros(0), [], []
+            return
+        segments = [len(run.points) - 1 for run in runs]
+        self._segment_run = np.repeat(np.arange(len(runs)), segments)
+        self._run_segment = np.concatenate([np.arange(n) for n in segments])
+        points = np.concatenate(points)
+        self._first = np.concatenate(first)
+        self._start = points[self._first]
+        self._delta = points[self._first + 1] - self._start
+        self._length_sq = np.maximum(np.einsum("ij,ij->i", self._delta, self._delta), 1e-9)
+        self._width = np.concatenate(widths)
+        self._left, self._right = lefts, rights
+
+    def _sample_lane(self, start: carla.Waypoint, end: carla.Waypoint) -> List[LaneRun]:
+        """sample a lane of the topology and the lanes next to it of a matching type"""
+        lanes = [start]
+        seen = {_lane_key(start)}
+        for step in (carla.Waypoint.get_left_lane, carla.Waypoint.get_right_lane):
+            side = step(start)
+            while side is not None and _lane_key(side) not in seen:
+                key = _lane_key(side)
+                seen.add(key)
+                # driving lanes are part of the topology themselves
+                if not int(side.lane_type) & int(carla.LaneType.Driving) \
+                        and int(side.lane_type) & int(self.lane_type) and key not in self._sampled_sides:
+                    self._sampled_sides.add(key)
+                    lanes.append(side)
+                side = step(side)
+
+        samples = []
+        for first in lanes:
+            waypoints = [first] + first.next_until_lane_end(self.spacing)
+            if first is start:
+                last = waypoints[-1].transform.location
+                if last.distance(end.transform.location) > 0.01:
+                    waypoints.append(end)
+            if len(waypoints) < 2:
+                continue
+            points = np.array([(w.transform.location.x, w.transform.location.y, w.transform.location.z)
+                               for w in waypoints])
+            s = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points[:, :2], axis=0).T))))
+            samples.append(LaneRun(
+                _lane_key(first),
+                points,
+                np.array([w.lane_width for w in waypoints]),
+                [w.left_lane_marking.type for w in waypoints],
+                [w.right_lane_marking.type for w in waypoints],
+                s))
+        return samples
@@ -4,7 +4,8 @@ import weakref
 from .world import World
 from .hud import HUD
 from .ego_vehicle import EgoVehicle
-import time
+from .sensor_bus import SensorBus
+from umich_sim.sim_config import ConfigPool, Config
 
 class LaneInvasionSensor(object):
     """
@@ -15,16 +16,16 @@ class LaneInvasionSensor(object):
         self.sensor = None
         self._parent = EgoVehicle.get_instance().carla_vehicle
         self.hud = HUD.get_instance()
+        config: Config = ConfigPool.get_config()
+        # crossed: number of markings crossed, types: bit mask of their carla.LaneMarkingType
+        self.ring = SensorBus.get_instance().register(
+            'lane_invasion', ('crossed', 'types'), config.sensors.history)
+        # lane invasion is an event sensor without a modifiable sensor_tick, events closer than
+        # sensor_tick to the last handled one are ignored on the client
+        self.sensor_tick = config.sensors.lane_invasion_tick
+        self._last_event_ts = None
         world = World.get_instance().world
         bp = world.get_blueprint_library().find('sensor.other.lane_invasion')
-
-        # is_modifiable = bp.get_attribute("sensor_tick") #.is_modifiable()
-        # print("sensor tick modifiable: ", is_modifiable)
-        # bp.set_attribute("sensor_tick", 0.1)
-
-
-
-
         self.sensor = world.spawn_actor(bp,
                                         carla.Transform(),
                                         attach_to=self._parent)
@@ -40,7 +41,16 @@ class LaneInvasionSensor(object):
         self = weak_self()
         if not self:
             return
+        if self._last_event_ts is not None and \
+                event.timestamp - self._last_event_ts < self.sensor_tick:
+            return
+        self._last_event_ts = event.timestamp
         lane_types = set(x.type for x in event.crossed_lane_markings)
+        type_mask = 0
+        for lane_type in lane_types:
+            type_mask |= 1 << int(lane_type)
+        self.ring.publish(event.frame, event.timestamp,
+                          (len(event.crossed_lane_markings), type_mask))
         # print(time.time(), "lane invasion: ", lane_types)
         text = ['%r' % str(x).split()[-1] for x in lane_types]
         self.hud.notification('Crossed line %s' % ' and '.join(text))
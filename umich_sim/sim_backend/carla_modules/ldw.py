@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Predictive lane departure warning based on the time to line crossing (TLC)
+
+The lateral motion of the vehicle inside its lane is extrapolated from its velocity and its yaw rate
+relative to the lane (the yaw rate the curvature of the lane asks for is not a drift), the TLC of a
+side is the time until the edge of the vehicle reaches the line of that side. The lane
+run the vehicle is on (the whole centre line of its road, section and lane) is cached and the vehicle
+is followed along it segment by segment. The run is only looked up again in the LaneIndex once the
+vehicle leaves it, past one of its ends or across one of its lines, so a tick is a handful of
+products. Warnings are rate-limited in simulation time.
+"""
+
+import math
+from collections import namedtuple
+from typing import List, Optional, Set, Tuple
+
+import carla
+import numpy as np
+
+from .lane_index import LaneIndex, LaneRun
+
+# TLC of each side in seconds (inf if the line is not reached within the horizon) and the side
+# warned about this tick ("left", "right" or None)
+LdwState = namedtuple("LdwState", ["ttlc_left", "ttlc_right", "warning"])
+
+# Lane markings a warning is given for
+LDW_MARKINGS = {
+    carla.LaneMarkingType.Solid, carla.LaneMarkingType.Broken,
+    carla.LaneMarkingType.SolidSolid, carla.LaneMarkingType.SolidBroken,
+    carla.LaneMarkingType.BrokenSolid, carla.LaneMarkingType.BrokenBroken
+}
+
+
+def time_to_reach(distance: float, speed: float, acceleration: float, horizon: float) -> float:
+    """
+    First time at which distance = speed * t + acceleration * t^2 / 2
+    :param distance: distance to cover, 0 if already covered
+    :param speed: initial speed towards the target
+    :param acceleration: constant acceleration towards the target
+    :param horizon: times after this are not computed
+    :return: the time in seconds, inf if the target is not reached within the horizon
+    """
+    if distance <= 0.0:
+        return 0.0
+    if abs(acceleration) < 1e-6:
+        t = distance / speed if speed > 0.0 else math.inf
+    else:
+        discriminant = speed * speed + 2.0 * acceleration * distance
+        if discriminant < 0.0:
+            return math.inf
+        root = math.sqrt(discriminant)
+        # smallest positive root of acceleration / 2 * t^2 + speed * t - distance
+        roots = [r for r in ((-speed + root) / acceleration, (-speed - root) / acceleration) if r > 0.0]
+        t = min(roots) if roots else math.inf
+    return t if t <= horizon else math.inf
+
+
+class LaneDepartureWarning:
+    """
+    Warns about a lane departure when the vehicle is predicted to cross a marked line soon
+    """
+
+    def __init__(self, lane_index: LaneIndex, ttlc_threshold: float = 1.0, interval: float = 3.0,
+                 min_speed: float = 2.0, horizon: float = 10.0, markings: Optional[Set] = None):
+        """
+        :param lane_index: index of the lanes around the vehicle
+        :param ttlc_threshold: warn when the TLC of a marked side is below this, in seconds
+        :param interval: minimum simulation time between two warnings, in seconds
+        :param min_speed: no warning below this speed, in m/s
+        :param horizon: TLC above this are reported as inf, in seconds
+        :param markings: lane marking types warned about, LDW_MARKINGS by default
+        """
+        self.lane_index: LaneIndex = lane_index
+        self.ttlc_threshold: float = ttlc_threshold
+        self.interval: float = interval
+        self.min_speed: float = min_speed
+        self.horizon: float = horizon
+        self.markings: Set = LDW_MARKINGS if markings is None else markings
+        # number of lane run lookups
+        self.refreshes: int = 0
+        self.state: LdwState = LdwState(math.inf, math.inf, None)
+        self._last_warning: float = -math.inf
+        # lane run the vehicle is on, the frame (x0, y0, tangent x, tangent y, right x, right y, length,
+        # curvature) of each of its segments and the segment the vehicle was last on
+        self._run: Optional[LaneRun] = None
+        self._frames: List[Tuple[float, ...]] = []
+        self._segment: int = 0
+
+    def reset(self) -> None:
+        """forget the current lane run and the last warning"""
+        self._run = None
+        self._last_warning = -math.inf
+        self.state = LdwState(math.inf, math.inf, None)
+
+    def update(self, vehicle: carla.Vehicle, timestamp: float, suppressed: bool = False) -> LdwState:
+        """
+        Compute the TLC of both sides and decide whether to warn
+        :param vehicle: the ego vehicle
+        :param timestamp: simulation time, in seconds
+        :param suppressed: never warn (e.g. while a turn signal is on)
+        :return: the state, also kept in self.state
+        """
+        transform = vehicle.get_transform()
+        velocity = vehicle.get_velocity()
+        location = transform.location
+        located = self._follow(location.x, location.y, strict=True)
+        if located is None:
+            found = self.lane_index.locate(location)
+            self.refreshes += 1
+            if found is None:
+                self._run = None
+                self.state = LdwState(math.inf, math.inf, None)
+                return self.state
+            self._set_run(*found)
+            located = self._follow(location.x, location.y, strict=False)
+        segment, offset, sample = located
+        _, _, tangent_x, tangent_y, right_x, right_y, _, curvature = self._frames[segment]
+        width = float(self._run.widths[sample])
+        left_marking, right_marking = self._run.lefts[sample], self._run.rights[sample]
+
+        # lateral velocity and acceleration, positive to the right of the lane
+        along = velocity.x * tangent_x + velocity.y * tangent_y
+        lateral_speed = velocity.x * right_x + velocity.y * right_y
+        # only the yaw rate on top of the one following the lane at this speed moves the vehicle across it
+        lateral_acceleration = along * (math.radians(vehicle.get_angular_velocity().z) - along * curvature)
+        # half of the width the vehicle covers across the lane at its current heading
+        heading = math.radians(transform.rotation.yaw) - math.atan2(tangent_y, tangent_x)
+        extent = vehicle.bounding_box.extent
+        half_width = extent.y * abs(math.cos(heading)) + extent.x * abs(math.sin(heading))
+
+        ttlc_right = time_to_reach(width / 2 - offset - half_width, lateral_speed,
+                                   lateral_acceleration, self.horizon)
+        ttlc_left = time_to_reach(width / 2 + offset - half_width, -lateral_speed,
+                                  -lateral_acceleration, self.horizon)
+
+        warning = None
+        if not suppressed and math.hypot(velocity.x, velocity.y) >= self.min_speed \
+                and timestamp - self._last_warning >= self.interval:
+            if ttlc_left < self.ttlc_threshold and left_marking in self.markings \
+                    and ttlc_left <= ttlc_right:
+                warning = "left"
+            elif ttlc_right < self.ttlc_threshold and right_marking in self.markings:
+                warning = "right"
+        if warning is not None:
+            self._last_warning = timestamp
+        self.state = LdwState(ttlc_left, ttlc_right, warning)
+        return self.state
+
+    def _follow(self, x: float, y: float, strict: bool) -> Optional[Tuple[int, float, int]]:
+        """
+        Follow a position along the cached lane run, from the segment it was last on
+        :param x: x of the position
+        :param y: y of the position
+        :param strict: whether the position is walked along the run and leaving the run (past one of
+                       its ends or across one of its lines) returns None, otherwise the segment it was
+                       last on is used as is
+        :return: the segment of the position, its lateral offset (positive to the right of the lane)
+                 and the sample closest to it, None if there is no run or the position left it
+        """
+        if self._run is None:
+            return None
+        frames, i = self._frames, self._segment
+        last = len(frames) - 1
+        # direction the segments are walked in, the walk stops instead of turning back in the gap
+        # outside the corner between two segments
+        step = 0
+        while True:
+            x0, y0, tangent_x, tangent_y, right_x, right_y, length, _ = frames[i]
+            along = (x - x0) * tangent_x + (y - y0) * tangent_y
+            if not strict:
+                break
+            if along < 0.0 and i > 0 and step <= 0:
+                i, step = i - 1, -1
+            elif along > length and i < last and step >= 0:
+                i, step = i + 1, 1
+            else:
+                break
+        if strict and (along < 0.0 and i == 0 or along > length and i == last):
+            return None
+        offset = (x - x0) * right_x + (y - y0) * right_y
+        sample = i + int(along >= length / 2)
+        if strict and abs(offset) > self._run.widths[sample] / 2:
+            return None
+        self._segment = i
+        return i, offset, sample
+
+    def _set_run(self, run: LaneRun, segment: int) -> None:
+        """cache a lane run and the frame of each of its segments"""
+        points = run.points[:, :2]
+        direction = np.diff(points, axis=0)
+        length = np.maximum(np.hypot(*direction.T), 1e-9)
+        tangent = direction / length[:, None]
+        # curvature of the centre line in rad/m (positive turning right like the yaw) at every inner
+        # sample, each segment takes the mean of its two ends
+        curvature = np.zeros(len(length))
+        if len(length) > 1:
+            turn = np.diff(np.arctan2(tangent[:, 1], tangent[:, 0]))
+            turn = (turn + math.pi) % (2 * math.pi) - math.pi
+            inner = turn / ((length[:-1] + length[1:]) / 2)
+            ends = np.concatenate((inner[:1], inner, inner[-1:]))
+            curvature = (ends[:-1] + ends[1:]) / 2
+        # carla is left-handed, the right of a direction (x, y) is (-y, x)
+        self._frames = [tuple(frame) for frame in np.column_stack(
+            (points[:-1], tangent, -tangent[:, 1], tangent[:, 0], length, curvature)).tolist()]
+        self._run = run
+        self._segment = segment
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Top view raster of lidar sweeps, drawn into preallocated buffers
+"""
+
+import numpy as np
+import pygame
+
+# Floats per point of carla.LidarMeasurement.raw_data (x, y, z, intensity)
+LIDAR_POINT_SIZE = 4
+
+
+class LidarRaster:
+    """
+    Scatters lidar points into a reusable grayscale raster. All the buffers are preallocated, drawing
+    a sweep only allocates when a sweep has more points than any sweep before it.
+    """
+
+    def __init__(self, width: int, height: int, lidar_range: float = 50.0, decay: float = 0.0):
+        """
+        :param width: width of the raster in pixels
+        :param height: height of the raster in pixels
+        :param lidar_range: distance in meters from the sensor to the closest edge of the raster
+        :param decay: fraction of the intensity a pixel keeps from one sweep to the next, 0 only
+                      shows the last sweep, values close to 1 leave long trails
+        """
+        if not 0.0 <= decay < 1.0:
+            raise Exception("Error: lidar decay must be in [0, 1).")
+        self.width: int = width
+        self.height: int = height
+        self.decay: float = decay
+        self.pixels_per_meter: float = min(width, height) / (2.0 * lidar_range)
+
+        # Raster indexed [x, y] like pygame.surfarray, followed by one spare cell receiving every
+        # point outside of the viewport
+        self._cells = np.zeros(width * height + 1, dtype=np.uint8)
+        self.raster: np.ndarray = self._cells[:-1].reshape(width, height)
+        self._outside: int = width * height
+
+        # 8 bit grayscale surface the raster is copied into
+        self.surface = pygame.Surface((width, height), 0, 8)
+        self.surface.set_palette([(i, i, i) for i in range(256)])
+
+        self._capacity: int = 0
+        self._grow(4096)
+
+    def _grow(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._xy = np.empty((capacity, 2), dtype=np.float32)
+        self._pixels = np.empty((capacity, 2), dtype=np.intp)
+        self._index = np.empty(capacity, dtype=np.intp)
+        self._inside = np.empty(capacity, dtype=bool)
+        self._scratch = np.empty(capacity, dtype=bool)
+
+    def clear(self) -> None:
+        """erase everything drawn so far"""
+        self._cells.fill(0)
+
+    def draw(self, raw_data) -> pygame.Surface:
+        """
+        Draw a lidar sweep on top of the faded previous ones
+        :param raw_data: carla.LidarMeasurement.raw_data
+        :return: the surface holding the raster, it is reused by the next call
+        """
+        points = np.frombuffer(raw_data, dtype=np.float32)
+        count = len(points) // LIDAR_POINT_SIZE
+        points = points[:count * LIDAR_POINT_SIZE].reshape(count, LIDAR_POINT_SIZE)
+        if count > self._capacity:
+            self._grow(max(count, 2 * self._capacity))
+
+        # fade the previous sweeps
+        if self.decay > 0.0:
+            np.multiply(self._cells, self.decay, out=self._cells, casting="unsafe")
+        else:
+            self._cells.fill(0)
+
+        # sensor coordinates to pixel coordinates, the sensor sits at the center of the raster
+        xy = self._xy[:count]
+        np.multiply(points[:, :2], self.pixels_per_meter, out=xy)
+        xy += (0.5 * self.width, 0.5 * self.height)
+
+        # flat index of every point, the points outside of the viewport go to the spare cell
+        inside, scratch = self._inside[:count], self._scratch[:count]
+        np.greater_equal(xy[:, 0], 0.0, out=inside)
+        np.less(xy[:, 0], self.width, out=scratch)
+        inside &= scratch
+        np.greater_equal(xy[:, 1], 0.0, out=scratch)
+        inside &= scratch
+        np.less(xy[:, 1], self.height, out=scratch)
+        inside &= scratch
+
+        pixels, index = self._pixels[:count], self._index[:count]
+        np.copyto(pixels, xy, casting="unsafe")
+        np.multiply(pixels[:, 0], self.height, out=index)
+        index += pixels[:, 1]
+        np.logical_not(inside, out=scratch)
+        np.copyto(index, self._outside, where=scratch)
+
+        self._cells[index] = 255
+        pygame.surfarray.blit_array(self.surface, self.raster)
+        return self.surface
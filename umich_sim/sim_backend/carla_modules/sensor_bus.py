@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Frame-stamped storage of the samples of the ego vehicle sensors
+
+Every sensor publishes its samples with the frame and timestamp carla gave them into its own ring
+buffer. Readers ask for the latest sample at or before a given frame, or export several sensors
+aligned on a list of frames, so values coming from different sensors always refer to the same
+moment of the simulation.
+"""
+
+import threading
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# A single sample of a sensor, values maps the field names of the sensor to their value
+SensorSample = namedtuple("SensorSample", ["frame", "timestamp", "values"])
+
+
+class SensorRing:
+    """
+    Fixed-size ring of frame-stamped samples of a sensor, samples must be published in frame order
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int = 2048):
+        """
+        :param fields: names of the values of every sample
+        :param capacity: number of samples kept, older samples are overwritten
+        """
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self.capacity: int = capacity
+        self._frames = np.zeros(capacity, dtype=np.int64)
+        self._timestamps = np.zeros(capacity)
+        self._values = np.zeros((capacity, len(self.fields)))
+        # number of samples published, the next sample goes to slot _published % capacity
+        self._published: int = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._published, self.capacity)
+
+    def publish(self, frame: int, timestamp: float, values: Sequence[float]) -> None:
+        """
+        Store a sample, overwrites the oldest one once the ring is full
+        :param frame: frame of the sample
+        :param timestamp: simulation time of the sample, in seconds
+        :param values: one value per field
+        """
+        with self._lock:
+            slot = self._published % self.capacity
+            self._frames[slot] = frame
+            self._timestamps[slot] = timestamp
+            self._values[slot] = values
+            self._published += 1
+
+    def _ordered(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """copies of the stored samples, oldest first (call with the lock held)"""
+        count = len(self)
+        start = self._published - count
+        slots = np.arange(start, start + count) % self.capacity
+        return self._frames[slots], self._timestamps[slots], self._values[slots]
+
+    def latest(self, frame: Optional[int] = None) -> Optional[SensorSample]:
+        """
+        Get the latest sample at or before a frame
+        :param frame: the frame, None for the latest sample
+        :return: the sample, None if there is none at or before that frame
+        """
+        with self._lock:
+            count = len(self)
+            if count == 0:
+                return None
+            # binary search on the ring, the logical position i lives in slot (first + i) % capacity
+            first = self._published - count
+            lo, hi = 0, count
+            if frame is None:
+                lo = count
+            else:
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if self._frames[(first + mid) % self.capacity] <= frame:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+            if lo == 0:
+                return None
+            slot = (first + lo - 1) % self.capacity
+            return SensorSample(int(self._frames[slot]), float(self._timestamps[slot]),
+                                dict(zip(self.fields, self._values[slot].tolist())))
+
+    def export(self, frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the latest sample at or before every frame of a list
+        :param frames: the frames, in any order
+        :return: the frame of the selected samples (-1 where there is none) and a
+                 (len(frames), len(fields)) array of their values (NaN where there is none)
+        """
+        with self._lock:
+            sample_frames, _, values = self._ordered()
+        if len(sample_frames) == 0:
+            return np.full(len(frames), -1), np.full((len(frames), len(self.fields)), np.nan)
+        index = np.searchsorted(sample_frames, frames, side="right") - 1
+        missing = index < 0
+        index[missing] = 0
+        selected_frames = sample_frames[index]
+        selected = values[index]
+        selected_frames[missing] = -1
+        selected[missing] = np.nan
+        return selected_frames, selected
+
+
+class SensorBus:
+    """
+    Registry of the SensorRings of every sensor. The class is a singleton.
+    """
+    __instance = None
+
+    def __init__(self):
+        if SensorBus.__instance is None:
+            SensorBus.__instance = self
+        else:
+            raise Exception("Error: Reinitialization of SensorBus.")
+        self._rings: Dict[str, SensorRing] = {}
+
+    @staticmethod
+    def get_instance() -> "SensorBus":
+        "get the instance of the singleton"
+        if SensorBus.__instance is None:
+            return SensorBus()
+        return SensorBus.__instance
+
+    def register(self, name: str, fields: Sequence[str], capacity: int = 2048) -> SensorRing:
+        """
+        Create the ring of a sensor, replacing the previous ring with that name
+        :param name: name of the sensor (e.g. "imu")
+        :param fields: names of the values of every sample
+        :param capacity: number of samples kept
+        :return: the new ring
+        """
+        ring = SensorRing(fields, capacity)
+        self._rings[name] = ring
+        return ring
+
+    def names(self) -> List[str]:
+        return list(self._rings)
+
+    def ring(self, name: str) -> SensorRing:
+        if name not in self._rings:
+            raise Exception(f"Error: no sensor named {name!r} on the sensor bus")
+        return self._rings[name]
+
+    def publish(self, name: str, frame: int, timestamp: float, values: Sequence[float]) -> None:
+        self.ring(name).publish(frame, timestamp, values)
+
+    def latest(self, name: str, frame: Optional[int] = None) -> Optional[SensorSample]:
+        """
+        Get the latest sample of a sensor at or before a frame
+        :param name: name of the sensor
+        :param frame: the frame, None for the latest sample
+        :return: the sample, None if the sensor has no sample at or before that frame
+        """
+        return self.ring(name).latest(frame)
+
+    def export(self, frames: Iterable[int], names: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Export several sensors aligned on a list of frames
+        :param frames: the frames to align on
+        :param names: the sensors to export, all of them by default
+        :return: columns "frame", "<sensor>.frame" (frame of the sample used, -1 if none) and
+                 "<sensor>.<field>" (NaN if none) with one row per requested frame
+        """
+        frames = np.asarray(list(frames), dtype=np.int64)
+        columns: Dict[str, np.ndarray] = {"frame": frames}
+        for name in (self.names() if names is None else names):
+            ring = self.ring(name)
+            sample_frames, values = ring.export(frames)
+            columns[f"{name}.frame"] = sample_frames
+            for i, field in enumerate(ring.fields):
+                columns[f"{name}.{field}"] = values[:, i]
+        return columns
+
+
+def set_sensor_tick(blueprint, sensor_tick: float) -> None:
+    """
+    Set the sensor_tick of a sensor blueprint
+    :param blueprint: the carla.ActorBlueprint of the sensor
+    :param sensor_tick: seconds between two samples, 0 samples every frame
+    """
+    if sensor_tick > 0.0 and blueprint.has_attribute('sensor_tick'):
+        blueprint.set_attribute('sensor_tick', str(sensor_tick))
@@ -17,7 +17,6 @@ from .world import World
 import carla
 import math
 import numpy as np
-from simple_pid import PID
 from typing import List, Tuple
 
 
@@ -52,6 +51,8 @@ class Vehicle:
         # The target distance that the vehicle will maintain between itself and the car in front of it
         self.target_distance: float = target_distance
 
+        from simple_pid import PID
+
         # PID controller to manage maintaining the target distance
         self.distance_pid_controller = PID(0.5, 0.02, 0.3, setpoint=0)
         self.distance_pid_controller.output_limits = (-1, 1)
@@ -263,9 +264,10 @@ class Vehicle:
             unit_displacement_vector: np.array = displacement_vector / np.linalg.norm(
                 displacement_vector)
 
-            # Now determine the angle between the displacement vector and the forward vector of the current car
+            # Now determine the angle between the displacement vector and the forward vector of the current car,
+            # the dot product of the unit vectors can round to slightly more than 1
             angle = math.acos(
-                np.dot(current_unit_vector, unit_displacement_vector))
+                np.clip(np.dot(current_unit_vector, unit_displacement_vector), -1.0, 1.0))
 
             # If the angle is small enough, then the vehicle is in front of the current vehicle
             if angle < math.atan(self.carla_vehicle.bounding_box.extent.y /
@@ -3,10 +3,13 @@ import re
 import carla
 import random
 from .module_helper import find_weather_presets, get_actor_display_name
-from .hud import HUD
-from typing import Optional, List, Tuple, Dict, Any, Union
+from typing import Optional, List, Tuple, Dict, Any, Union, TYPE_CHECKING
 from umich_sim.wizard.inputs import ClientMode
 
+if TYPE_CHECKING:
+    # pygame is only imported once a HUD is created
+    from .hud import HUD
+
 
 class World(object):
     """
@@ -26,7 +29,7 @@ class World(object):
             self.world: carla.World = client.load_world(map_name)
         else:
             self.world: carla.World = client.get_world()
-        self.hud: HUD = hud
+        self.hud: "HUD" = hud
         self.vehicle = None
         self.collision_sensor = None
         self.lane_invasion_sensor = None
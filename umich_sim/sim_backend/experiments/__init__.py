@@ -1,4 +1,18 @@
 #!/usr/bin/env python3
-from .experiment import Experiment
-from .freeway_experiment import FreewayExperiment
-from .intersection_experiment import IntersectionExperiment
\ No newline at end of file
+from typing import TYPE_CHECKING
+
+from umich_sim.lazy import lazy_dir, lazy_exports
+
+_EXPORTS = {
+    "Experiment": ".experiment",
+    "FreewayExperiment": ".freeway_experiment",
+    "IntersectionExperiment": ".intersection_experiment",
+}
+__all__ = list(_EXPORTS)
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+__dir__ = lazy_dir(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .experiment import Experiment
+    from .freeway_experiment import FreewayExperiment
+    from .intersection_experiment import IntersectionExperiment
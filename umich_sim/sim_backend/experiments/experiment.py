@@ -10,20 +10,27 @@ Summary: The Experiment class is a base class that describes the high level inte
 """
 
 # Local Imports
-from umich_sim.sim_backend.carla_modules import (HUD, World, Vehicle, EgoVehicle, )
+from umich_sim.sim_backend.carla_modules import (World, Vehicle, EgoVehicle, )
 from umich_sim.sim_backend.vehicle_control.base_controller import WAYPOINT_SEPARATION
 from umich_sim.sim_backend.vehicle_control import (VehicleController, EgoController)
 from umich_sim.sim_backend.sections import Section
+from umich_sim.sim_backend.telemetry import TelemetryRecorder
+from umich_sim.sim_backend.replay import RecordedTrajectories, TrajectoryReplay
+from umich_sim.sim_backend.reachability import LaneGraph, Reachability
+from umich_sim.sim_backend.config import ScenarioConfig
+from umich_sim.sim_backend.scenario import (ScenarioPlan, PlannedVehicle, check, validate_scenario,
+                                            scenario_configuration, validate_configuration, configuration_hash,
+                                            read_plan, waypoint_array, transform_array, transforms_from_array)
 from umich_sim.sim_backend.helpers import (ExperimentType, VehicleType,
                                            smooth_path, project_forward)
 from umich_sim.sim_config import ConfigPool, Config
-from umich_sim.wizard import Wizard
+from umich_sim.base_logger import logger
 
 # Library Imports
 import carla
-import pygame
 import random
-from typing import List, Dict
+from pathlib import Path
+from typing import Any, List, Dict, Optional, Union
 from abc import ABCMeta, abstractmethod
 
 
@@ -44,6 +51,12 @@ class Experiment(metaclass=ABCMeta):
         self.server_initialized: bool = False
         self.headless = headless
 
+        # The carla.Client connected to the Carla server
+        self.client: carla.Client = None
+
+        # Replay of recorded trajectories driving the non-ego vehicles, None for a live experiment
+        self.replay: Optional[TrajectoryReplay] = None
+
         # A carla.Map object that stores the current map loaded in the simulation
         self.map: carla.Map = None
 
@@ -68,12 +81,33 @@ class Experiment(metaclass=ABCMeta):
         # List that holds all the intersections or freeway sections in the experiment
         self.section_list: List[Section] = []
 
+        # The configuration dictionary the experiment was initialized with
+        self.configuration: Optional[Dict[Any, Any]] = None
+
+        # Hash of the configuration the experiment was initialized or its plan compiled from
+        self.source_hash: Optional[str] = None
+
+        # Transform each Vehicle was spawned at, by Vehicle id
+        self.spawn_transforms: Dict[int, carla.Transform] = {}
+
+        # Location of each Vehicle when run_experiment stopped, by Vehicle id, taken before the actors are destroyed
+        self.final_locations: Dict[int, carla.Location] = {}
+
+        # Lanes of the map and the sections they reach, built by the first configuration checked
+        self.lane_graph: Optional[LaneGraph] = None
+        self.reachability: Optional[Reachability] = None
+
     def init(self) -> None:
         """
         Connects to the Carla server.
 
         :returns: None
         """
+        # the window, the HUD and the wizard are only needed with a display
+        import pygame
+        from umich_sim.sim_backend.carla_modules import HUD
+        from umich_sim.wizard import Wizard
+
         config: Config = ConfigPool.get_config()
         pygame.init()
         pygame.font.init()
@@ -83,6 +117,7 @@ class Experiment(metaclass=ABCMeta):
         try:
             client = carla.Client(config.server_addr, config.carla_port)
             client.set_timeout(2.0)
+            self.client = client
 
             hud = HUD(*config.client_resolution)
             world: World = World(client, hud, config.car_filter, self.MAP)
@@ -112,22 +147,158 @@ class Experiment(metaclass=ABCMeta):
             pass
             # print("aba")
 
-    @abstractmethod
-    def initialize_experiment(self, configuration: Dict[str, str]) -> None:
+    def initialize_experiment(self, configuration: Union[Dict[Any, Any], ScenarioConfig, ScenarioPlan, Path,
+                                                         str]) -> None:
         """
         Uses an existing connection to the Carla server and configures the world according to the experiment design.
 
-        THIS FUNCTION IS ABSTRACT, IT MUST BE IMPLEMENTED BY THE DERIVED EXPERIMENT CLASS. OTHERWISE,
-        NOTHING WILL HAPPEN WHEN YOU GO TO RUN THE EXPERIMENT.
-        Adds vehicles in the places specified in the GUI, generates paths for all non-Ego vehicles,
-        specifies traffic light settings.
+        Adds the sections of the experiment, checks the whole configuration, adds the vehicles in the places it
+        specifies and generates the paths of every vehicle through their sections. A compiled plan (see
+        umich_sim.sim_backend.scenario) is loaded instead, without checking or planning again.
+
+        :param configuration: a Dictionary containing the user defined settings for the experiment, a ScenarioConfig,
+                              or a ScenarioPlan or the path of a plan file
+        :return: None
+        """
+        if isinstance(configuration, (ScenarioPlan, Path, str)):
+            self.load_plan(configuration)
+            return
+        source_hash = configuration_hash(configuration)
+        if isinstance(configuration, ScenarioConfig):
+            check(validate_scenario(configuration, self.experiment_type, self.MAP), "scenario")
+            configuration = scenario_configuration(configuration)
+
+        # Add the managed sections to the experiment
+        self.add_sections()
+
+        # Check every vehicle before the first one is spawned
+        check(validate_configuration(self, configuration), "configuration")
+        self.configuration = configuration
+        self.source_hash = source_hash
+
+        # Add the vehicles according to the configuration dictionary
+        self.add_vehicles_from_configuration(configuration)
+
+        # Generate the paths for all the vehicles
+        self._generate_section_paths(configuration)
+
+        # Visualize the waypoints of the vehicles
+        if self.draws_waypoints(configuration):
+            for vehicle in self._all_vehicles():
+                vehicle.draw_waypoints()
+
+    def draws_waypoints(self, configuration: Dict[Any, Any]) -> bool:
+        """
+        Whether the waypoints of the vehicles are drawn, from the "debug" entry of the configuration dictionary or
+        the debug flag of the Config if it has none. Derived experiments may read it elsewhere.
+
+        :param configuration: the configuration dictionary
+        :return: whether to draw the waypoints
+        """
+        return bool(configuration.get("debug", ConfigPool.get_config().debug))
+
+    @abstractmethod
+    def add_sections(self) -> None:
+        """
+        Adds the intersections or freeway sections of the experiment, in order.
+
+        THIS FUNCTION IS ABSTRACT, IT MUST BE IMPLEMENTED BY THE DERIVED EXPERIMENT CLASS.
 
-        :param configuration: a Dictionary containing the user defined settings for the experiment (exact properties
-                              vary from experiment to experiment)
         :return: None
         """
         pass
 
+    def get_reachability(self) -> Reachability:
+        """
+        Gets the reachability between the spawn points and the sections of the experiment, built once the sections
+        are added. The lane graph of the map is kept for the next initialization.
+
+        :return: the Reachability
+        """
+        if self.reachability is None:
+            if self.lane_graph is None:
+                self.lane_graph = LaneGraph(self.map)
+            self.reachability = Reachability(self.lane_graph, self.spawn_points, self.map, self.section_list)
+        return self.reachability
+
+    def load_plan(self, plan: Union[ScenarioPlan, Path, str]) -> None:
+        """
+        Configures the world from a compiled plan.
+
+        Every Vehicle is spawned at its stored transform with its stored blueprint, and its waypoints and trajectory
+        are rebuilt from the stored routes instead of being planned.
+
+        :param plan: a ScenarioPlan or the path of a plan file
+        :return: None
+        """
+        if not isinstance(plan, ScenarioPlan):
+            plan = read_plan(plan)
+        if plan.experiment_type != self.experiment_type:
+            raise Exception(f"Error: the plan was compiled for the {plan.experiment_type.name} experiment, "
+                            f"not the {self.experiment_type.name} experiment")
+        if plan.map.split("/")[-1] != self.map.name.split("/")[-1]:
+            raise Exception(f"Error: the plan was compiled on {plan.map}, the experiment runs on {self.map.name}")
+
+        self.add_sections()
+        if len(self.section_list) != plan.section_count:
+            raise Exception(f"Error: the plan has {plan.section_count} sections, "
+                            f"the experiment has {len(self.section_list)}")
+        self.configuration = plan.configuration()
+        self.source_hash = plan.source_hash
+
+        for planned in plan.vehicles:
+            spawn_transform = planned.spawn_transform()
+            vehicle = self.add_vehicle(spawn_transform, planned.vehicle_type, ego=planned.ego,
+                                       blueprint_id=planned.blueprint)
+            self.spawn_transforms[vehicle.id] = spawn_transform
+            vehicle.set_active_sections(self.section_list[min(planned.sections)],
+                                        self.section_list[max(planned.sections)])
+            if planned.initial_lane_index is not None:
+                vehicle.current_lane = planned.initial_lane_index
+
+            # Look the waypoints up by their lane coordinates, falling back on their location
+            waypoints = planned.waypoints
+            vehicle.waypoints = [
+                self.map.get_waypoint_xodr(road_id, lane_id, s) or self.map.get_waypoint(
+                    carla.Location(x=x, y=y, z=z))
+                for road_id, lane_id, s, x, y, z in zip(
+                    waypoints["road_id"].tolist(), waypoints["lane_id"].tolist(), waypoints["s"].tolist(),
+                    waypoints["x"].tolist(), waypoints["y"].tolist(), waypoints["z"].tolist())
+            ]
+            vehicle.trajectory = transforms_from_array(planned.trajectory)
+
+        if self.draws_waypoints(self.configuration):
+            for vehicle in self._all_vehicles():
+                vehicle.draw_waypoints()
+
+    def capture_plan(self) -> ScenarioPlan:
+        """
+        Captures the vehicles and routes of the initialized experiment into a plan.
+
+        :return: the ScenarioPlan
+        """
+        if self.configuration is None:
+            raise Exception("Error: the experiment is not initialized")
+        vehicles = []
+        for vehicle in self._all_vehicles():
+            vehicle_configuration = self.configuration[vehicle.id]
+            spawn_transform = self.spawn_transforms[vehicle.id]
+            vehicles.append(PlannedVehicle(
+                vehicle_type=vehicle_configuration["type"],
+                ego=vehicle is self.ego_vehicle,
+                blueprint=vehicle.carla_vehicle.type_id,
+                spawn=tuple(transform_array([spawn_transform])[0].tolist()),
+                sections=dict(vehicle_configuration["sections"]),
+                initial_lane_index=vehicle_configuration.get("initial_lane_index"),
+                waypoints=waypoint_array(vehicle.waypoints),
+                trajectory=transform_array(vehicle.trajectory)))
+        return ScenarioPlan(experiment_type=self.experiment_type,
+                            map=self.map.name,
+                            section_count=len(self.section_list),
+                            debug=self.draws_waypoints(self.configuration),
+                            vehicles=vehicles,
+                            source_hash=self.source_hash)
+
     def _generate_section_paths(
             self, configuration: Dict[int, Dict[int, str]]) -> None:
         """
@@ -138,7 +309,7 @@ class Experiment(metaclass=ABCMeta):
         :return: None
         """
 
-        for vehicle in [self.ego_vehicle] + self.vehicle_list:
+        for vehicle in self._all_vehicles():
             # Set the vehicle's first waypoint to their initial position
             vehicle.waypoints.append(
                 self.map.get_waypoint(vehicle.get_current_location()))
@@ -175,7 +346,80 @@ class Experiment(metaclass=ABCMeta):
                     vehicle.trajectory = smooth_path(vehicle.waypoints)
                     break
 
-    def run_experiment(self) -> None:
+    def _all_vehicles(self) -> List[Vehicle]:
+        """
+        Gets every Vehicle of the experiment, starting with the Ego Vehicle if there is one.
+
+        :return: a List of all the Vehicles in the experiment
+        """
+        if self.ego_vehicle is None:
+            return list(self.vehicle_list)
+        return [self.ego_vehicle] + self.vehicle_list
+
+    def step(self) -> None:
+        """
+        Advances the experiment logic by a single tick.
+
+        Updates the state of each section, the relative locations of each vehicle and applies control
+        to the Ego Vehicle and every other Vehicle. Rendering is left to the caller.
+
+        :return: None
+        """
+
+        # Update the state of each of the experiment sections (mainly applicable to intersection and
+        # traffic lights)
+        for section in self.section_list:
+            section.tick()
+
+        # In replay mode the other vehicles follow their recorded poses, only the Ego Vehicle is controlled
+        if self.replay is not None:
+            self.replay.tick()
+            if self.ego_vehicle is not None:
+                self.ego_vehicle.update_other_vehicle_locations(self.vehicle_list)
+                EgoController.update_control(self.ego_vehicle, self.experiment_type)
+            return
+
+        # Update the relative locations of each vehicle
+        for vehicle in self._all_vehicles():
+            vehicle.update_other_vehicle_locations(self.vehicle_list)
+
+        # Apply control to the Ego Vehicle
+        if self.ego_vehicle is not None:
+            # Lambda used to avoid passing all the arguments into the update_control function
+            EgoController.update_control(self.ego_vehicle,
+                                         self.experiment_type)
+
+        # Apply control to every other Vehicle
+        for vehicle in self.vehicle_list:
+            self.update_control(vehicle)
+
+    def start_replay(self, recording: Union[Path, str, RecordedTrajectories]) -> None:
+        """
+        Switches the experiment to replay mode.
+
+        Every non-ego Vehicle is driven along the trajectory recorded for its id instead of being
+        controlled, the Ego Vehicle stays under live control. The experiment must be initialized with
+        the configuration of the recorded run so the Vehicle ids match.
+
+        :param recording: a telemetry run directory or already loaded RecordedTrajectories
+        :return: None
+        """
+        if not isinstance(recording, RecordedTrajectories):
+            recording = RecordedTrajectories.from_directory(recording)
+        actors = {vehicle.id: vehicle.carla_vehicle for vehicle in self.vehicle_list}
+        self.replay = TrajectoryReplay(self.client, self.client.get_world(), recording, actors)
+
+    def stop_replay(self) -> None:
+        """
+        Hands the replayed vehicles back to their controllers.
+
+        :return: None
+        """
+        if self.replay is not None:
+            self.replay.stop()
+            self.replay = None
+
+    def run_experiment(self, max_ticks: Optional[int] = None) -> None:
         """
         Runs a basic main simulation loop to drive the experiment.
 
@@ -183,56 +427,67 @@ class Experiment(metaclass=ABCMeta):
         Spawns a new thread to control each manually driven vehicle. Each tick, updates the positions of
         each vehicle and applies autonomous control to each vehicle.
 
+        :param max_ticks: an optional number of ticks after which the loop stops on its own (used by
+                          unattended runs such as parameter sweeps), by default the loop runs until
+                          the wizard is stopped
         :return: None
         """
 
+        import pygame
+        from umich_sim.sim_backend.carla_modules import HUD
+
         config: Config = ConfigPool.get_config()
 
         world: World = World.get_instance()
         hud: HUD = HUD.get_instance()
         world.restart()
 
+        # Record the state of every vehicle each tick if a telemetry directory is configured
+        recorder: Optional[TelemetryRecorder] = None
+        if config.telemetry_dir:
+            recorder = TelemetryRecorder(config.telemetry_dir, config.telemetry_chunk_size)
+
         try:
             # Loop continuously
             clock = pygame.time.Clock()
-            while True:
+            ticks = 0
+            while max_ticks is None or ticks < max_ticks:
                 # check if program need to stop
                 if self.wizard.is_stopping():
                     break
+                ticks += 1
 
                 # Tick the clock
                 clock.tick(config.client_frame_rate)
                 # clock.tick_busy_loop(config.client_frame_rate) # use more cpu for accuracy
 
-                # Update the state of each of the experiment sections (mainly applicable to intersection and
-                # traffic lights)
-                for section in self.section_list:
-                    section.tick()
-
-                # Update the relative locations of each vehicle
-                for vehicle in self.vehicle_list + [self.ego_vehicle]:
-                    vehicle.update_other_vehicle_locations(self.vehicle_list)
+                # Drain the pygame event queue once per frame, the keys pressed apply this frame
+                # See: https://www.pygame.org/docs/ref/event.html#pygame.event.get
+                self.wizard.pump_events()
 
-                # Apply control to the Ego Vehicle
-                if self.ego_vehicle is not None:
-                    # Lambda used to avoid passing all the arguments into the update_control function
-                    EgoController.update_control(self.ego_vehicle,
-                                                 self.experiment_type)
-
-                # Apply control to every other Vehicle
-                for vehicle in self.vehicle_list:
-                    self.update_control(vehicle)
+                # Update the sections and apply control to every vehicle
+                self.step()
+                if recorder is not None:
+                    timestamp = world.world.get_snapshot().timestamp
+                    recorder.record(timestamp.frame, timestamp.elapsed_seconds, self._all_vehicles())
 
                 # Update the UI elements
                 hud.tick(clock)
                 world.render(self.display)
-                # Do you call the event queue every tick? If not pygame may become unresponsive.
-                # See: https://www.pygame.org/docs/ref/event.html#pygame.event.pump
-                pygame.event.pump()
                 pygame.display.flip()
+
+            # the actors are destroyed below
+            self.final_locations = {vehicle.id: vehicle.get_current_location() for vehicle in self._all_vehicles()}
         finally:
-            world.destroy()
-            pygame.quit()
+            # a failing telemetry writer must not keep the actors alive nor hide an error of the loop
+            try:
+                if recorder is not None:
+                    recorder.close()
+            except Exception as e:
+                logger.error(f"closing the telemetry recorder failed: {e}")
+            finally:
+                world.destroy()
+                pygame.quit()
 
     @abstractmethod
     def update_control(self, vehicle: Vehicle) -> None:
@@ -251,6 +506,30 @@ class Experiment(metaclass=ABCMeta):
         for vehicle in self.vehicle_list:
             vehicle.carla_vehicle.destroy()
 
+    def reset_experiment(self) -> None:
+        """
+        Destroys every Vehicle, the Ego Vehicle included, and removes the sections so the experiment can be
+        initialized again.
+
+        :return: None
+        """
+        self.clean_up_experiment()
+        # The ids of the Vehicles and sections index the configuration, number them from the start again (the
+        # Ego Vehicle is created once and keeps its id)
+        Vehicle.id = 0
+        if self.ego_vehicle is not None:
+            self.ego_vehicle.carla_vehicle.destroy()
+            Vehicle.id = self.ego_vehicle.id + 1
+        Section.id = 0
+        self.ego_vehicle = None
+        self.vehicle_list = []
+        self.section_list = []
+        self.configuration = None
+        self.source_hash = None
+        self.spawn_transforms = {}
+        self.final_locations = {}
+        self.reachability = None
+
     def add_vehicle(self,
                     spawn_location: carla.Transform,
                     type_id: VehicleType,
@@ -291,7 +570,7 @@ class Experiment(metaclass=ABCMeta):
             new_carla_vehicle = world.world.spawn_actor(
                 blueprint, spawn_location)
             self.ego_vehicle = EgoVehicle.get_instance()
-            self.ego_vehicle.set_vehicle(new_carla_vehicle)
+            self.ego_vehicle.set_vehicle(new_carla_vehicle, spawn_location)
 
             # Set the camera to be located at the Ego vehicle
             self.spectator.set_transform(
@@ -323,12 +602,7 @@ class Experiment(metaclass=ABCMeta):
             vehicle_configuration = configuration[i]
 
             # Set up the Vehicle's spawn point
-            spawn_point = self.spawn_points[
-                vehicle_configuration["spawn_point"]]
-            if "spawn_offset" in vehicle_configuration and vehicle_configuration[
-                "spawn_offset"] != 0.0:
-                spawn_point = project_forward(
-                    spawn_point, vehicle_configuration["spawn_offset"])
+            spawn_point = self.spawn_transform(vehicle_configuration)
 
             # Create the vehicle
             is_ego = vehicle_configuration["type"] in (
@@ -336,7 +610,9 @@ class Experiment(metaclass=ABCMeta):
                 VehicleType.EGO_FULL_MANUAL, VehicleType.EGO_MANUAL_STEER)
             vehicle = self.add_vehicle(spawn_point,
                                        ego=is_ego,
-                                       type_id=vehicle_configuration["type"])
+                                       type_id=vehicle_configuration["type"],
+                                       blueprint_id=vehicle_configuration.get("blueprint"))
+            self.spawn_transforms[vehicle.id] = spawn_point
 
             # Set which sections the vehicle will be active at
             starting_section = min(vehicle_configuration["sections"].keys())
@@ -350,6 +626,18 @@ class Experiment(metaclass=ABCMeta):
                 vehicle.current_lane = vehicle_configuration[
                     "initial_lane_index"]
 
+    def spawn_transform(self, vehicle_configuration: Dict[str, Any]) -> carla.Transform:
+        """
+        Gets the transform a Vehicle spawns at, its spawn point shifted by its spawn offset.
+
+        :param vehicle_configuration: the configuration of the Vehicle
+        :return: a carla.Transform
+        """
+        spawn_point = self.spawn_points[vehicle_configuration["spawn_point"]]
+        if vehicle_configuration.get("spawn_offset", 0.0) != 0.0:
+            spawn_point = project_forward(spawn_point, vehicle_configuration["spawn_offset"])
+        return spawn_point
+
     def add_section(self, new_section: Section) -> None:
         """
         Adds a new section to the Experiment.
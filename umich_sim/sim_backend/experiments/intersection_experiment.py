@@ -13,10 +13,10 @@ from umich_sim.sim_backend.sections import Intersection
 from umich_sim.sim_backend.vehicle_control import intersection_control
 from umich_sim.sim_backend.helpers import (ExperimentType, VehicleType, project_forward, smooth_path)
 from umich_sim.sim_backend.carla_modules import World, Vehicle
-from umich_sim.sim_config import ConfigPool, Config
+from umich_sim.sim_config import ConfigPool
 
 # Library Imports
-from typing import Dict, List
+from typing import Any, Dict, List
 
 
 class IntersectionExperiment(Experiment):
@@ -26,15 +26,13 @@ class IntersectionExperiment(Experiment):
         super(IntersectionExperiment, self).__init__(headless)
         self.experiment_type = ExperimentType.INTERSECTION
 
-    def initialize_experiment(self, configuration: Dict[int, Dict[int, str]] = None) -> None:
+    def add_sections(self) -> None:
         """
-        Uses an existing connection to the Carla server and configures the world according to the experiment design.
+        Adds the four managed intersections to the experiment.
 
-        :param configuration: a Dictionary containing the user defined settings for the experiment
         :return: None
         """
         world = World.get_instance().world
-        # Add the four managed intersections to the experiment
         first_intersection = Intersection(self.junctions[838], world.get_traffic_lights_in_junction(838))
         second_intersection = Intersection(self.junctions[979], world.get_traffic_lights_in_junction(979))
         third_intersection = Intersection(self.junctions[1427], world.get_traffic_lights_in_junction(1427))
@@ -46,16 +44,15 @@ class IntersectionExperiment(Experiment):
         self.add_section(third_intersection)
         self.add_section(fourth_intersection)
 
-        # Add the vehicles according to the configuration dictionary
-        self.add_vehicles_from_configuration(configuration)
-
-        # Generate the paths for all the vehicles
-        self._generate_section_paths(configuration)
+    def draws_waypoints(self, configuration: Dict[Any, Any]) -> bool:
+        """
+        The intersection experiment draws the waypoints when the Config is in debug mode, the "debug" entry of the
+        configuration dictionary is not used.
 
-        # Visualize the waypoints of the vehicles
-        if ConfigPool.get_config().debug:
-            for vehicle in [self.ego_vehicle] + self.vehicle_list:
-                vehicle.draw_waypoints()
+        :param configuration: the configuration dictionary
+        :return: whether to draw the waypoints
+        """
+        return ConfigPool.get_config().debug
 
     def update_control(self, vehicle: Vehicle) -> None:
         intersection_control(vehicle)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Backend - Reachability Precheck
+
+Summary: Checks that every vehicle of a configuration can drive through its sections before any actor is
+    spawned. VehicleController.generate_path only follows lanes forward (and the pairs of a junction), so a
+    manoeuvre leading away from the next section is found out once its A* search has explored everything
+    reachable, and Section.get_thru_waypoints returns None for a turn a junction does not have.
+
+    The LaneGraph holds the lanes of the map and their successors. Its strongly connected components
+    (Tarjan) are collapsed into a DAG whose transitive closure says which lanes reach which. Reachability
+    builds on it a matrix between the points paths are planned between: the spawn points, the entries of
+    the sections (stop waypoints, lane starts) and their exits (junction lanes, lane ends). Checking a
+    vehicle replays the choices _generate_section_paths makes at each section and looks them up in the
+    matrix.
+"""
+
+# Local Imports
+from umich_sim.sim_backend.helpers import angle_difference
+from umich_sim.sim_backend.vehicle_control.base_controller import WAYPOINT_SEPARATION
+from umich_sim.sim_backend.sections import Intersection, FreewaySection, Section
+
+# Library Imports
+import carla
+import math
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+# Step used to find the successors at the end of a lane, in meters
+LANE_STEP = 0.1
+# Distance between the points sampled along every lane, in meters
+LANE_SAMPLING = 2.0
+# The A* search of generate_path stops at the first waypoint this close to its destination, on any lane
+ARRIVAL_RADIUS = WAYPOINT_SEPARATION / 2
+# Distance after a turn of the last waypoint added by Intersection.get_thru_waypoints, in meters
+TURN_RUNOUT = 18.0
+
+
+def _lane_key(waypoint: carla.Waypoint) -> Tuple[int, int, int]:
+    return waypoint.road_id, waypoint.section_id, waypoint.lane_id
+
+
+def _distance_squared(first: Tuple[float, float], second: Tuple[float, float]) -> float:
+    return (first[0] - second[0]) ** 2 + (first[1] - second[1]) ** 2
+
+
+class LaneGraph:
+    """
+    The lanes of a map, which lanes follow them and which lanes they reach
+    """
+
+    def __init__(self, carla_map: carla.Map):
+        """
+        :param carla_map: the carla.Map
+        """
+        self.nodes: Dict[Tuple[int, int, int], int] = {}
+        self.successors: List[List[int]] = []
+        # points sampled along the lanes and their lane node
+        samples: List[Tuple[float, float]] = []
+        sample_nodes: List[int] = []
+        for start, end in carla_map.get_topology():
+            node = self._node(_lane_key(start))
+            for waypoint in [start] + start.next_until_lane_end(LANE_SAMPLING):
+                location = waypoint.transform.location
+                samples.append((location.x, location.y))
+                sample_nodes.append(node)
+            # Step out of the lane, the end of a segment can sit slightly before the end of its lane
+            pending = [end]
+            for _ in range(10):
+                stepped = [waypoint for previous in pending for waypoint in previous.next(LANE_STEP)]
+                pending = [waypoint for waypoint in stepped if _lane_key(waypoint) == _lane_key(start)]
+                for waypoint in stepped:
+                    if _lane_key(waypoint) != _lane_key(start):
+                        self.successors[node].append(self._node(_lane_key(waypoint)))
+                if not pending:
+                    break
+        self.samples: np.ndarray = np.array(samples, dtype=np.float64).reshape(-1, 2)
+        self.sample_nodes: np.ndarray = np.array(sample_nodes, dtype=np.int64)
+        self._condense()
+
+    def _condense(self) -> None:
+        """
+        Collapse the strongly connected components of the successors and compute which components reach which
+        """
+        self.component, components = self._strongly_connected_components()
+        count = len(components)
+        # A component reaches itself when it has a cycle: several lanes or a lane following itself
+        self.cyclic = np.zeros(count, dtype=bool)
+        for index, members in enumerate(components):
+            self.cyclic[index] = len(members) > 1 or members[0] in self.successors[members[0]]
+
+        # Transitive closure of the condensation, the components come out of Tarjan's algorithm in reverse
+        # topological order so every successor is complete before its predecessors
+        self.reach = np.zeros((count, count), dtype=bool)
+        for index, members in enumerate(components):
+            row = self.reach[index]
+            for member in members:
+                for successor in self.successors[member]:
+                    target = self.component[successor]
+                    if target != index:
+                        row |= self.reach[target]
+                        row[target] = True
+            row[index] = self.cyclic[index]
+
+    def _node(self, key: Tuple[int, int, int]) -> int:
+        if key not in self.nodes:
+            self.nodes[key] = len(self.successors)
+            self.successors.append([])
+        return self.nodes[key]
+
+    def node(self, waypoint: carla.Waypoint) -> int:
+        """
+        :param waypoint: a waypoint on a lane of the map
+        :return: the node of its lane, -1 for a lane missing from the topology
+        """
+        return self.nodes.get(_lane_key(waypoint), -1)
+
+    def lanes_near(self, location: np.ndarray, radius: float) -> np.ndarray:
+        """
+        :param location: a location (x, y)
+        :param radius: distance from the location, in meters
+        :return: the nodes of the lanes passing within radius of the location
+        """
+        offsets = self.samples - location
+        return np.unique(self.sample_nodes[np.einsum("ij,ij->i", offsets, offsets) <= radius * radius])
+
+    def _strongly_connected_components(self) -> Tuple[np.ndarray, List[List[int]]]:
+        """
+        Tarjan's algorithm, iterative so long chains of lanes do not hit the recursion limit
+        :return: the component of every node and the nodes of every component, in reverse topological order
+        """
+        size = len(self.successors)
+        index = [-1] * size
+        low = [0] * size
+        on_stack = [False] * size
+        stack: List[int] = []
+        component = np.full(size, -1, dtype=np.int64)
+        components: List[List[int]] = []
+        counter = 0
+        for root in range(size):
+            if index[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child = work.pop()
+                if child == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                successors = self.successors[node]
+                # resume at the next successor of the node
+                while child < len(successors):
+                    successor = successors[child]
+                    child += 1
+                    if index[successor] == -1:
+                        work.append((node, child))
+                        work.append((successor, 0))
+                        break
+                    if on_stack[successor]:
+                        low[node] = min(low[node], index[successor])
+                else:
+                    if low[node] == index[node]:
+                        members = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component[member] = len(components)
+                            members.append(member)
+                            if member == node:
+                                break
+                        components.append(members)
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+        return component, components
+
+
+class Reachability:
+    """
+    Reachability between the spawn points and the sections of an experiment
+    """
+
+    def __init__(self, lane_graph: LaneGraph, spawn_points: List[carla.Transform], carla_map: carla.Map,
+                 sections: List[Section]):
+        """
+        :param lane_graph: the LaneGraph of the map
+        :param spawn_points: the spawn points of the map
+        :param carla_map: the carla.Map
+        :param sections: the sections of the experiment, in order
+        """
+        # Every point: its lane node, location (x, y) and heading (degrees), and the points paths are planned to
+        nodes: List[int] = []
+        locations: List[Tuple[float, float]] = []
+        yaws: List[float] = []
+        destinations: List[int] = []
+
+        def add(waypoint: carla.Waypoint, destination: bool = False) -> int:
+            transform = waypoint.transform
+            nodes.append(lane_graph.node(waypoint))
+            locations.append((transform.location.x, transform.location.y))
+            yaws.append(transform.rotation.yaw)
+            if destination:
+                destinations.append(len(nodes) - 1)
+            return len(nodes) - 1
+
+        # The first waypoint of a vehicle is the waypoint of its spawn point
+        self.spawn_points: List[int] = [add(carla_map.get_waypoint(transform.location))
+                                        for transform in spawn_points]
+
+        # Entries and exits of every section, see check_vehicle for how they are picked
+        self.sections: List[Dict[str, Any]] = []
+        for section in sections:
+            if isinstance(section, Intersection):
+                entries = [add(waypoint, destination=True) for light in section.traffic_lights
+                           for waypoint in light.get_stop_waypoints()]
+                pairs = section.junction.get_waypoints(carla.LaneType.Driving)
+                self.sections.append({
+                    "type": "intersection",
+                    "entries": entries,
+                    "exits": [add(end) for _, end in pairs],
+                    "exit_starts": [(start.transform.location.x, start.transform.location.y) for start, _ in pairs],
+                })
+            elif isinstance(section, FreewaySection):
+                self.sections.append({
+                    "type": "freeway",
+                    "entries": [add(waypoint, destination=True) for waypoint in section.starting_waypoints],
+                    "exits": [add(waypoint, destination=True) for waypoint in section.ending_waypoints],
+                })
+            else:
+                self.sections.append({"type": None})
+
+        self.nodes = np.array(nodes, dtype=np.int64)
+        self.locations = np.array(locations, dtype=np.float64).reshape(-1, 2)
+        self.yaws = np.array(yaws, dtype=np.float64)
+        # python copies used by check_vehicle, indexing numpy arrays one value at a time is slow
+        self._location_list: List[Tuple[float, float]] = locations
+        self._yaw_list: List[float] = yaws
+
+        # matrix[p, q]: a path planned from point p reaches the destination q (a section entry or the end of a
+        # freeway lane). The search reaches q as soon as it gets within ARRIVAL_RADIUS of it, on any of the lanes
+        # passing there.
+        count = len(self.nodes)
+        components = lane_graph.component[self.nodes]
+        headings = np.radians(self.yaws)
+        directions = np.stack((np.cos(headings), np.sin(headings)), axis=1)
+        self.matrix: np.ndarray = np.zeros((count, count), dtype=bool)
+        for point in destinations:
+            near = lane_graph.lanes_near(self.locations[point], ARRIVAL_RADIUS)
+            if len(near) == 0:
+                continue
+            self.matrix[:, point] = lane_graph.reach[np.ix_(components, lane_graph.component[near])].any(axis=1)
+            # Points on one of these lanes also reach the point if it lies ahead of them
+            ahead = np.einsum("ij,ij->i", self.locations[point] - self.locations, directions) >= -ARRIVAL_RADIUS
+            self.matrix[np.isin(self.nodes, near) & ahead, point] = True
+        # A point on a lane missing from the topology is only known to reach itself
+        self.matrix[self.nodes < 0, :] = False
+        np.fill_diagonal(self.matrix, True)
+
+    def reaches(self, start: int, end: int) -> bool:
+        """
+        :param start: a point
+        :param end: a destination point
+        :return: whether a path planned from start reaches end
+        """
+        return bool(self.matrix[start, end])
+
+    def check_vehicle(self, name: str, vehicle_configuration: Dict[str, Any],
+                      spawn_transform: carla.Transform) -> List[str]:
+        """
+        Follow a vehicle through its sections like Experiment._generate_section_paths
+        :param name: name of the vehicle in the messages
+        :param vehicle_configuration: the configuration of the vehicle, with valid spawn point and sections
+        :param spawn_transform: the transform the vehicle spawns at
+        :return: a message for every section the vehicle can not drive through
+        """
+        errors: List[str] = []
+        sections = vehicle_configuration["sections"]
+        current = self.spawn_points[vehicle_configuration["spawn_point"]]
+        location = (spawn_transform.location.x, spawn_transform.location.y)
+        lane = vehicle_configuration.get("initial_lane_index")
+        previous = f"spawn point {vehicle_configuration['spawn_point']}"
+        for index in sorted(sections):
+            section = self.sections[index]
+            manoeuvre = sections[index]
+            if section["type"] == "intersection":
+                # The vehicle enters at the closest stop waypoint
+                entries = section["entries"]
+                if len(entries) == 0:
+                    errors.append(f"section {index} of {name} has no traffic lights to stop at")
+                    break
+                entry = min(entries, key=lambda point: _distance_squared(self._location_list[point], location))
+                if not self.reaches(current, entry):
+                    errors.append(f"{name} can not reach section {index} from {previous}")
+                    break
+                exit_point = self._turn(section, spawn_transform, manoeuvre)
+                if exit_point is None:
+                    errors.append(f"{name} can not turn {manoeuvre} at section {index}")
+                    break
+                current = exit_point
+                location = self._location_list[exit_point]
+                if manoeuvre in ("left", "right"):
+                    heading = math.radians(self._yaw_list[exit_point])
+                    location = (location[0] + TURN_RUNOUT * math.cos(heading),
+                                location[1] + TURN_RUNOUT * math.sin(heading))
+            elif section["type"] == "freeway":
+                entries, exits = section["entries"], section["exits"]
+                if lane is None or not 0 <= lane < len(entries):
+                    errors.append(f"{name} initial_lane_index {lane!r} is not one of the {len(entries)} lanes "
+                                  f"of section {index}")
+                    break
+                if not self.reaches(current, entries[lane]):
+                    errors.append(f"{name} can not reach lane {lane} of section {index} from {previous}")
+                    break
+                target = {"straight": lane, "left": max(lane - 1, 0), "right": lane + 1}[manoeuvre]
+                if target >= len(exits):
+                    errors.append(f"{name} has no lane right of lane {lane} at section {index}")
+                    break
+                if not self.reaches(entries[lane], exits[target]):
+                    errors.append(f"{name} can not drive from lane {lane} to lane {target} through section "
+                                  f"{index}")
+                    break
+                current = exits[target]
+                location = self._location_list[current]
+            previous = f"section {index}"
+        return errors
+
+    def _turn(self, section: Dict[str, Any], transform: carla.Transform, manoeuvre: str) -> Optional[int]:
+        """
+        Pick the junction lane of a manoeuvre like Intersection.get_thru_waypoints, which starts from the lane
+        closest to the vehicle and looks for the yaw of the manoeuvre
+        :return: the exit point or None if the junction has no lane for the manoeuvre
+        """
+        starts = section["exit_starts"]
+        if not starts:
+            return None
+        location = (transform.location.x, transform.location.y)
+        closest = min(starts, key=lambda start: _distance_squared(start, location))
+        candidates = [point for point, start in zip(section["exits"], starts)
+                      if _distance_squared(start, closest) < 1.0]
+        target_yaw = transform.rotation.yaw + (90 if manoeuvre == "right" else -90 if manoeuvre == "left"
+                                               else 0) % 360
+        if target_yaw < 0:
+            target_yaw += 360
+        difference, best = min((angle_difference(self._yaw_list[point], target_yaw), point) for point in candidates)
+        if difference > 5:
+            return None
+        return best
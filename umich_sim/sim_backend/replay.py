@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Backend - Trajectory Replay
+
+Summary: Replays the vehicles of a recorded telemetry run. Instead of re-planning routes and running
+    the controllers, every replayed vehicle is moved kinematically to its recorded pose with one batch
+    of carla.command.ApplyTransform per tick. Poses are interpolated on the recorded time line, so the
+    replay can run at a different tick rate than the recording. Vehicles that were driven by a person
+    (the ego vehicle) are not replayed and stay under live control.
+"""
+
+# Local Imports
+from umich_sim.sim_backend.telemetry import load_telemetry
+
+# Library Imports
+import carla
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+
+class RecordedTrajectories:
+    """
+    Recorded poses of a set of vehicles on a common time line
+    """
+
+    def __init__(self, telemetry: Dict[str, np.ndarray]):
+        """
+        :param telemetry: a run loaded by load_telemetry, records driven by a person are ignored
+        """
+        autonomous = telemetry["driver"] == -1
+        times = telemetry["time"][autonomous]
+        vehicle_ids = telemetry["vehicle_id"][autonomous]
+        if len(times) == 0:
+            raise Exception("Error: the telemetry run has no autonomous vehicle to replay.")
+
+        # Recorded times (T,) and vehicle ids (V,), every record lands in one cell of the (V, T) grid
+        self.times: np.ndarray
+        self.vehicle_ids: np.ndarray
+        self.times, time_index = np.unique(times, return_inverse=True)
+        self.vehicle_ids, vehicle_index = np.unique(vehicle_ids, return_inverse=True)
+
+        # Poses of every vehicle at every recorded time, NaN where a vehicle has no record
+        shape = (len(self.vehicle_ids), len(self.times))
+        self.x = np.full(shape, np.nan)
+        self.y = np.full(shape, np.nan)
+        self.z = np.full(shape, np.nan)
+        self.yaw = np.full(shape, np.nan)
+        for name in ("x", "y", "z", "yaw"):
+            getattr(self, name)[vehicle_index, time_index] = telemetry[name][autonomous]
+
+        # Unwrap the yaw of each vehicle so interpolating between -179 and 179 degrees goes the short way
+        for row in self.yaw:
+            valid = ~np.isnan(row)
+            row[valid] = np.degrees(np.unwrap(np.radians(row[valid])))
+
+    @staticmethod
+    def from_directory(directory: Union[Path, str]) -> "RecordedTrajectories":
+        """
+        Loads the trajectories of a run directory written by a TelemetryRecorder.
+
+        :param directory: the run directory
+        :return: the RecordedTrajectories of the run
+        """
+        return RecordedTrajectories(load_telemetry(directory))
+
+    @property
+    def duration(self) -> float:
+        """:return: length of the recording, in seconds"""
+        return float(self.times[-1] - self.times[0])
+
+    def poses_at(self, elapsed: float) -> np.ndarray:
+        """
+        Interpolates the pose of every vehicle.
+
+        Before the start and after the end of the recording, the first and last poses are held.
+
+        :param elapsed: time since the start of the recording, in seconds
+        :return: a (V, 4) array of x, y, z and yaw, rows are NaN for vehicles without a record
+                 around that time
+        """
+        columns = (self.x, self.y, self.z, self.yaw)
+        if len(self.times) == 1:
+            return np.stack([values[:, 0] for values in columns], axis=1)
+        t = self.times[0] + elapsed
+        i = int(np.clip(np.searchsorted(self.times, t, side="right"), 1, len(self.times) - 1))
+        t0, t1 = self.times[i - 1], self.times[i]
+        alpha = float(np.clip((t - t0) / (t1 - t0), 0.0, 1.0))
+        return np.stack([(1.0 - alpha) * values[:, i - 1] + alpha * values[:, i] for values in columns],
+                        axis=1)
+
+
+class TrajectoryReplay:
+    """
+    Drives live actors along RecordedTrajectories, one batch of transforms per tick
+    """
+
+    def __init__(self, client: carla.Client, world: carla.World, trajectories: RecordedTrajectories,
+                 actors: Dict[int, carla.Actor]):
+        """
+        :param client: the carla.Client used to send the command batches
+        :param world: the carla.World, its snapshots provide the replay clock
+        :param trajectories: the recorded trajectories
+        :param actors: maps the recorded vehicle ids to the actors that replay them, recorded vehicles
+                       without an actor are skipped
+        """
+        self.client: carla.Client = client
+        self.world: carla.World = world
+        self.trajectories: RecordedTrajectories = trajectories
+
+        # Rows of the trajectories that are replayed and the id of the actor replaying each of them
+        self._rows: List[int] = []
+        self._actor_ids: List[int] = []
+        for row, vehicle_id in enumerate(trajectories.vehicle_ids):
+            if int(vehicle_id) in actors:
+                self._rows.append(row)
+                self._actor_ids.append(actors[int(vehicle_id)].id)
+
+        # Simulation time of the first replayed tick
+        self._start: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        """:return: whether the end of the recording has been reached"""
+        return self._start is not None and self.elapsed() >= self.trajectories.duration
+
+    def elapsed(self) -> float:
+        """:return: simulation time since the first replayed tick, in seconds"""
+        if self._start is None:
+            return 0.0
+        return self.world.get_snapshot().timestamp.elapsed_seconds - self._start
+
+    def start(self) -> None:
+        """
+        Turns off the physics of the replayed actors and starts the replay clock.
+
+        :return: None
+        """
+        self.client.apply_batch([carla.command.SetSimulatePhysics(actor_id, False)
+                                 for actor_id in self._actor_ids])
+        self._start = self.world.get_snapshot().timestamp.elapsed_seconds
+
+    def stop(self) -> None:
+        """
+        Gives the replayed actors their physics back.
+
+        :return: None
+        """
+        self.client.apply_batch([carla.command.SetSimulatePhysics(actor_id, True)
+                                 for actor_id in self._actor_ids])
+        self._start = None
+
+    def tick(self) -> None:
+        """
+        Moves every replayed actor to its recorded pose at the current simulation time.
+
+        :return: None
+        """
+        if self._start is None:
+            self.start()
+        poses = self.trajectories.poses_at(self.elapsed())[self._rows]
+        batch = [
+            carla.command.ApplyTransform(actor_id,
+                                         carla.Transform(carla.Location(x=x, y=y, z=z),
+                                                         carla.Rotation(yaw=yaw)))
+            for actor_id, (x, y, z, yaw) in zip(self._actor_ids, poses.tolist())
+            if x == x  # skip vehicles without a record around this time (NaN)
+        ]
+        self.client.apply_batch(batch)
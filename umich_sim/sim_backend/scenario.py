@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Backend - Scenario Plans
+
+Summary: Compiles a scenario ahead of time. A ScenarioConfig (umich_sim.sim_backend.config) or a
+    configuration dictionary is validated as a whole before any actor is spawned, translated into the
+    configuration dictionary read by the experiments, and planned once: the spawn transforms, blueprints,
+    active sections, manoeuvres and the routes (waypoints and smoothed trajectory) of every vehicle are
+    captured into a ScenarioPlan.
+
+    A plan is saved as a versioned binary file: a fixed header, the JSON metadata of the plan, then the
+    routes of the vehicles as raw NumPy records. Experiment.initialize_experiment loads a plan by
+    spawning the vehicles at their stored transforms and rebuilding their routes from the stored lane
+    coordinates, without validating or planning again:
+
+        plan = compile_scenario(experiment, scenario)
+        write_plan(plan, "intersection.plan")
+        ...
+        experiment.initialize_experiment("intersection.plan")
+
+    The metadata keeps a hash of the configuration the plan was compiled from. read_current_plan only
+    returns a plan compiled from the given configuration by this version, a stale plan is compiled again.
+"""
+
+# Local Imports
+from umich_sim.sim_backend.config import (ScenarioConfig, Task, Behavior, VehicleExpSettingsIntersection,
+                                          VehicleExpSettingsFreeway)
+from umich_sim.sim_backend.config import Vehicle as ScenarioVehicle
+from umich_sim.sim_backend.config import VehicleType as ScenarioVehicleType
+from umich_sim.sim_backend.helpers import ExperimentType, VehicleType
+
+# Library Imports
+import carla
+import hashlib
+import json
+import struct
+import numpy as np
+from dataclasses import asdict, dataclass, is_dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from umich_sim.sim_backend.experiments import Experiment
+
+# First bytes of a plan file and version of the layout written by write_plan
+PLAN_MAGIC = b"SIMPLAN\x00"
+PLAN_VERSION = 2
+# magic, version and length of the JSON metadata that follows the header
+_HEADER = struct.Struct("<8sHI")
+
+# A waypoint of a route: OpenDRIVE road, lane and distance along the road, with the position used when
+# the waypoint can not be found from the lane coordinates
+WAYPOINT_DTYPE = np.dtype([("road_id", "<i4"), ("lane_id", "<i4"), ("s", "<f8"),
+                           ("x", "<f8"), ("y", "<f8"), ("z", "<f8")])
+# A transform of a trajectory or a spawn point
+TRANSFORM_DTYPE = np.dtype([(name, "<f8") for name in ("x", "y", "z", "pitch", "yaw", "roll")])
+
+# Manoeuvres understood by Section.get_thru_waypoints
+MANOEUVRES = ("straight", "left", "right")
+# Vehicle types driven by a person, only one of them per experiment
+EGO_TYPES = (VehicleType.EGO, VehicleType.EGO_MANUAL_STEER, VehicleType.EGO_FULL_MANUAL)
+
+# Task of the scenario run by each experiment type
+EXPERIMENT_TASKS: Dict[ExperimentType, Task] = {
+    ExperimentType.INTERSECTION: Task.INTERSECTION,
+    ExperimentType.FREEWAY: Task.FREEWAY,
+}
+# Roles of the scenario description and the VehicleType controlling them, every other role is GENERIC
+VEHICLE_TYPES: Dict[ScenarioVehicleType, VehicleType] = {
+    ScenarioVehicleType.EGO: VehicleType.EGO_FULL_MANUAL,
+    ScenarioVehicleType.LEAD: VehicleType.LEAD,
+    ScenarioVehicleType.FOLLOW: VehicleType.FOLLOWER,
+}
+# Vehicle lists of an intersection, in the order the vehicles are numbered
+INTERSECTION_LANES = ("subject_lane_vehicles", "left_lane_vehicles", "right_lane_vehicles",
+                      "ahead_lane_vehicles")
+# Vehicle lists of a freeway and the index of their lane in the FreewaySection, from the left
+FREEWAY_LANES: Dict[str, int] = {"left_lane_vehicles": 0, "subject_lane_vehicles": 1}
+# Freeway behaviors moving the vehicle to the other lane, the other behaviors are speed changes
+# applied by the controllers and keep the lane
+LANE_CHANGES = (Behavior.CHANGE_LANE, Behavior.ENTER_ADJACENT)
+
+
+@dataclass
+class PlannedVehicle:
+    """
+    A vehicle of a compiled scenario, in the order the vehicles are spawned (the Ego Vehicle first)
+    """
+    vehicle_type: VehicleType
+    ego: bool
+    blueprint: str
+    spawn: Tuple[float, float, float, float, float, float]  # x, y, z, pitch, yaw, roll
+    sections: Dict[int, str]  # section index -> manoeuvre
+    initial_lane_index: Optional[int]
+    waypoints: np.ndarray  # WAYPOINT_DTYPE
+    trajectory: np.ndarray  # TRANSFORM_DTYPE
+
+    def spawn_transform(self) -> carla.Transform:
+        x, y, z, pitch, yaw, roll = self.spawn
+        return carla.Transform(carla.Location(x=x, y=y, z=z),
+                               carla.Rotation(pitch=pitch, yaw=yaw, roll=roll))
+
+
+@dataclass
+class ScenarioPlan:
+    """
+    A scenario validated and planned for an experiment type and a map
+    """
+    experiment_type: ExperimentType
+    map: str
+    section_count: int
+    debug: bool
+    vehicles: List[PlannedVehicle]
+    # configuration_hash of the ScenarioConfig or configuration dictionary the plan was compiled from
+    source_hash: Optional[str] = None
+
+    def configuration(self) -> Dict[Any, Any]:
+        """
+        :return: the configuration dictionary the plan was compiled from
+        """
+        configuration: Dict[Any, Any] = {"debug": self.debug, "number_of_vehicles": len(self.vehicles)}
+        for i, vehicle in enumerate(self.vehicles):
+            configuration[i] = {"type": vehicle.vehicle_type, "blueprint": vehicle.blueprint,
+                                "sections": dict(vehicle.sections)}
+            if vehicle.initial_lane_index is not None:
+                configuration[i]["initial_lane_index"] = vehicle.initial_lane_index
+        return configuration
+
+
+def check(errors: List[str], subject: str) -> None:
+    """
+    Raise every validation error at once
+    :param errors: the messages returned by a validation function
+    :param subject: what was validated
+    """
+    if errors:
+        raise Exception(f"Error: invalid {subject}:\n    " + "\n    ".join(errors))
+
+
+def _map_name(name: str) -> str:
+    """name of a map without its package ("Carla/Maps/Town05" -> "Town05")"""
+    return name.split("/")[-1]
+
+
+def _placements(scenario: ScenarioConfig,
+                errors: List[str]) -> List[Tuple[ScenarioVehicle, Dict[int, str], Optional[int]]]:
+    """
+    Find the sections of every vehicle of a scenario. A vehicle takes part in every section listing it,
+    the same Vehicle object is listed by each of them.
+    :param scenario: the scenario
+    :param errors: receives the vehicles listed twice in a section
+    :return: the vehicles in order of appearance, with their manoeuvre at each section and, on a freeway,
+             the lane they start in
+    """
+    placements: Dict[int, Tuple[ScenarioVehicle, Dict[int, str], Optional[int]]] = {}
+    if scenario.task == Task.INTERSECTION:
+        for index, intersection in enumerate(scenario.intersections):
+            for lane in INTERSECTION_LANES:
+                for vehicle in getattr(intersection, lane):
+                    _, sections, _ = placements.setdefault(id(vehicle), (vehicle, {}, None))
+                    if index in sections:
+                        errors.append(f"a {vehicle.exp_settings.vehicle_type.name} vehicle is listed twice "
+                                      f"in intersection {index}")
+                    settings = vehicle.exp_settings
+                    sections[index] = settings.direction.name.lower() \
+                        if isinstance(settings, VehicleExpSettingsIntersection) else "straight"
+    else:
+        for index, freeway in enumerate(scenario.freeways):
+            for lane, lane_index in FREEWAY_LANES.items():
+                for vehicle in getattr(freeway, lane):
+                    _, sections, _ = placements.setdefault(id(vehicle), (vehicle, {}, lane_index))
+                    if index in sections:
+                        errors.append(f"a {vehicle.exp_settings.vehicle_type.name} vehicle is listed twice "
+                                      f"in freeway {index}")
+                    settings = vehicle.exp_settings
+                    if isinstance(settings, VehicleExpSettingsFreeway) and settings.behavior in LANE_CHANGES:
+                        sections[index] = "right" if lane_index == 0 else "left"
+                    else:
+                        sections[index] = "straight"
+    return list(placements.values())
+
+
+def validate_scenario(scenario: ScenarioConfig, experiment_type: ExperimentType, map_name: str) -> List[str]:
+    """
+    Check a scenario against the experiment running it, without the simulator. The spawn points and
+    routes are checked by validate_configuration once the scenario is translated.
+    :param scenario: the scenario
+    :param experiment_type: the ExperimentType of the experiment
+    :param map_name: the map of the experiment
+    :return: a message for every problem found, empty if the scenario is valid
+    """
+    errors: List[str] = []
+    if scenario.task != EXPERIMENT_TASKS.get(experiment_type):
+        errors.append(f"a {scenario.task.name} scenario can not run in the {experiment_type.name} experiment")
+        return errors
+    if _map_name(scenario.map) != _map_name(map_name):
+        errors.append(f"the scenario takes place on {scenario.map}, the experiment on {map_name}")
+    if scenario.min_speed > scenario.max_speed:
+        errors.append(f"min_speed {scenario.min_speed} is above max_speed {scenario.max_speed}")
+    if scenario.safety_distance < 0:
+        errors.append(f"safety_distance {scenario.safety_distance} is negative")
+    sections = scenario.intersections if scenario.task == Task.INTERSECTION else scenario.freeways
+    if not sections:
+        errors.append(f"the {scenario.task.name} scenario has no sections")
+
+    placements = _placements(scenario, errors)
+    settings_type = VehicleExpSettingsIntersection if scenario.task == Task.INTERSECTION \
+        else VehicleExpSettingsFreeway
+    egos = 0
+    for i, (vehicle, _, _) in enumerate(placements):
+        name = f"vehicle {i} ({vehicle.exp_settings.vehicle_type.name})"
+        egos += vehicle.exp_settings.vehicle_type == ScenarioVehicleType.EGO
+        if not isinstance(vehicle.exp_settings, settings_type):
+            errors.append(f"{name} has {type(vehicle.exp_settings).__name__}, "
+                          f"expected {settings_type.__name__}")
+        if not scenario.min_speed <= vehicle.speed <= scenario.max_speed:
+            errors.append(f"{name} speed {vehicle.speed} is outside "
+                          f"[{scenario.min_speed}, {scenario.max_speed}]")
+        if vehicle.location < 0:
+            errors.append(f"{name} location {vehicle.location} is negative")
+        if len(vehicle.color) != 3 or any(not 0 <= c <= 255 for c in vehicle.color):
+            errors.append(f"{name} color {vehicle.color} is not an RGB triple")
+    if egos != 1:
+        errors.append(f"the scenario has {egos} EGO vehicles, expected one")
+    return errors
+
+
+def scenario_configuration(scenario: ScenarioConfig, debug: Optional[bool] = None) -> Dict[Any, Any]:
+    """
+    Translate a scenario into the configuration dictionary of the experiments. The location of a
+    vehicle is the index of its spawn point, its gap shifts the spawn point forward and its model is the
+    blueprint spawned.
+    :param scenario: a scenario checked by validate_scenario
+    :param debug: whether the waypoints are drawn, defaults to the debug flag of the Config
+    :return: the configuration dictionary, the EGO vehicle is vehicle 0
+    """
+    placements = _placements(scenario, [])
+    # the ego vehicle must be vehicle 0, the others keep their order of appearance
+    placements.sort(key=lambda placement: placement[0].exp_settings.vehicle_type != ScenarioVehicleType.EGO)
+    configuration: Dict[Any, Any] = {"number_of_vehicles": len(placements),
+                                     "safety_distance": scenario.safety_distance}
+    if debug is not None:
+        configuration["debug"] = debug
+    for i, (vehicle, sections, lane_index) in enumerate(placements):
+        configuration[i] = {
+            "type": VEHICLE_TYPES.get(vehicle.exp_settings.vehicle_type, VehicleType.GENERIC),
+            "spawn_point": vehicle.location,
+            "spawn_offset": vehicle.gap,
+            "blueprint": vehicle.model,
+            "sections": dict(sorted(sections.items())),
+        }
+        if lane_index is not None:
+            configuration[i]["initial_lane_index"] = lane_index
+    return configuration
+
+
+def validate_configuration(experiment: "Experiment", configuration: Dict[Any, Any]) -> List[str]:
+    """
+    Check a configuration dictionary against an experiment whose sections are added, before any
+    vehicle is spawned.
+    :param experiment: the experiment, connected to the simulator
+    :param configuration: the configuration dictionary
+    :return: a message for every problem found, empty if the configuration is valid
+    """
+    from umich_sim.sim_backend.carla_modules import World
+
+    errors: List[str] = []
+    count = configuration.get("number_of_vehicles")
+    if not isinstance(count, int) or count < 0:
+        return [f"number_of_vehicles {count!r} is not a number of vehicles"]
+
+    section_count = len(experiment.section_list)
+    blueprint_library = None
+    egos: List[int] = []
+    transforms: Dict[int, carla.Transform] = {}
+    for i in range(count):
+        if i not in configuration:
+            errors.append(f"vehicle {i} is missing, the vehicle ids must be consecutive from 0")
+            continue
+        vehicle_configuration = configuration[i]
+        name = f"vehicle {i}"
+
+        vehicle_type = vehicle_configuration.get("type")
+        if not isinstance(vehicle_type, VehicleType):
+            errors.append(f"{name} type {vehicle_type!r} is not a VehicleType")
+        elif vehicle_type in EGO_TYPES:
+            egos.append(i)
+
+        spawn_point = vehicle_configuration.get("spawn_point")
+        if not isinstance(spawn_point, int) or not 0 <= spawn_point < len(experiment.spawn_points):
+            errors.append(f"{name} spawn_point {spawn_point!r} is not one of the "
+                          f"{len(experiment.spawn_points)} spawn points of the map")
+        else:
+            transforms[i] = experiment.spawn_transform(vehicle_configuration)
+
+        sections = vehicle_configuration.get("sections")
+        if not sections:
+            errors.append(f"{name} has no sections")
+        else:
+            for index, manoeuvre in sections.items():
+                if not isinstance(index, int) or not 0 <= index < section_count:
+                    errors.append(f"{name} section {index!r} is not one of the {section_count} sections")
+                if manoeuvre not in MANOEUVRES:
+                    errors.append(f"{name} manoeuvre {manoeuvre!r} at section {index} is not one of "
+                                  f"{', '.join(MANOEUVRES)}")
+
+        blueprint = vehicle_configuration.get("blueprint")
+        if blueprint is not None:
+            if blueprint_library is None:
+                blueprint_library = World.get_instance().world.get_blueprint_library()
+            if len(blueprint_library.filter(blueprint)) == 0:
+                errors.append(f"{name} blueprint {blueprint!r} does not exist")
+
+    if len(egos) > 1:
+        errors.append(f"vehicles {', '.join(map(str, egos))} are all ego vehicles, only one is allowed")
+    elif egos and egos[0] != 0:
+        errors.append(f"the ego vehicle is vehicle {egos[0]}, it must be vehicle 0")
+
+    # every vehicle must be able to drive through its sections, checked once the rest is valid
+    if not errors:
+        reachability = experiment.get_reachability()
+        for i in range(count):
+            errors += reachability.check_vehicle(f"vehicle {i}", configuration[i], transforms[i])
+
+    # vehicles spawned on top of each other collide (or fail to spawn) on the first tick
+    safety_distance = max(configuration.get("safety_distance", 0.0), 1.0)
+    ids = sorted(transforms)
+    for n, i in enumerate(ids):
+        for j in ids[n + 1:]:
+            distance = transforms[i].location.distance(transforms[j].location)
+            if distance < safety_distance:
+                errors.append(f"vehicles {i} and {j} spawn {distance:.1f} m apart, "
+                              f"closer than {safety_distance} m")
+    return errors
+
+
+def configuration_hash(configuration: Union[ScenarioConfig, Dict[Any, Any]]) -> str:
+    """
+    Hash a scenario or a configuration dictionary, equal dictionaries have the same hash whatever the order of
+    their keys
+    :param configuration: the ScenarioConfig or the configuration dictionary
+    :return: the SHA-256 of the configuration as a hexadecimal string
+    """
+    def canonical(value: Any) -> Any:
+        if is_dataclass(value):
+            return [type(value).__name__, canonical(asdict(value))]
+        if isinstance(value, dict):
+            return sorted([str(key), canonical(item)] for key, item in value.items())
+        if isinstance(value, (list, tuple)):
+            return [canonical(item) for item in value]
+        if isinstance(value, Enum):
+            return value.name
+        return value
+
+    return hashlib.sha256(json.dumps(canonical(configuration)).encode()).hexdigest()
+
+
+def waypoint_array(waypoints: Sequence[carla.Waypoint]) -> np.ndarray:
+    """:return: the WAYPOINT_DTYPE records of a route"""
+    array = np.empty(len(waypoints), dtype=WAYPOINT_DTYPE)
+    for i, waypoint in enumerate(waypoints):
+        location = waypoint.transform.location
+        array[i] = (waypoint.road_id, waypoint.lane_id, waypoint.s, location.x, location.y, location.z)
+    return array
+
+
+def transform_array(transforms: Sequence[carla.Transform]) -> np.ndarray:
+    """:return: the TRANSFORM_DTYPE records of a trajectory"""
+    array = np.empty(len(transforms), dtype=TRANSFORM_DTYPE)
+    for i, transform in enumerate(transforms):
+        location, rotation = transform.location, transform.rotation
+        array[i] = (location.x, location.y, location.z, rotation.pitch, rotation.yaw, rotation.roll)
+    return array
+
+
+def transforms_from_array(array: np.ndarray) -> List[carla.Transform]:
+    """:return: the carla.Transforms of TRANSFORM_DTYPE records"""
+    return [carla.Transform(carla.Location(x=x, y=y, z=z), carla.Rotation(pitch=pitch, yaw=yaw, roll=roll))
+            for x, y, z, pitch, yaw, roll in array.tolist()]
+
+
+def compile_scenario(experiment: "Experiment",
+                     scenario: Union[ScenarioConfig, Dict[Any, Any]]) -> ScenarioPlan:
+    """
+    Validate and plan a scenario on an experiment connected to the simulator. The actors spawned while
+    planning are destroyed afterwards, the same experiment can then load the plan.
+    :param experiment: an Experiment on which init was called
+    :param scenario: a ScenarioConfig or a configuration dictionary
+    :return: the plan
+    """
+    experiment.initialize_experiment(scenario)
+    try:
+        return experiment.capture_plan()
+    finally:
+        experiment.reset_experiment()
+
+
+def write_plan(plan: ScenarioPlan, path: Union[Path, str]) -> None:
+    """
+    Save a plan
+    :param plan: the plan
+    :param path: the file receiving the plan
+    """
+    blobs: List[bytes] = []
+    offset = 0
+
+    def add(array: np.ndarray, dtype: np.dtype) -> List[int]:
+        nonlocal offset
+        blob = np.ascontiguousarray(array, dtype=dtype).tobytes()
+        blobs.append(blob)
+        offset += len(blob)
+        return [offset - len(blob), len(array)]
+
+    vehicles = [{
+        "type": vehicle.vehicle_type.name,
+        "ego": vehicle.ego,
+        "blueprint": vehicle.blueprint,
+        "spawn": list(vehicle.spawn),
+        "sections": {str(index): manoeuvre for index, manoeuvre in vehicle.sections.items()},
+        "initial_lane_index": vehicle.initial_lane_index,
+        "waypoints": add(vehicle.waypoints, WAYPOINT_DTYPE),
+        "trajectory": add(vehicle.trajectory, TRANSFORM_DTYPE),
+    } for vehicle in plan.vehicles]
+    metadata = json.dumps({
+        "experiment_type": plan.experiment_type.name,
+        "map": plan.map,
+        "section_count": plan.section_count,
+        "debug": plan.debug,
+        "source_hash": plan.source_hash,
+        "vehicles": vehicles,
+    }).encode()
+    # pad the metadata so the records start 8 byte aligned
+    metadata += b" " * (-(_HEADER.size + len(metadata)) % 8)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(PLAN_MAGIC, PLAN_VERSION, len(metadata)))
+        f.write(metadata)
+        for blob in blobs:
+            f.write(blob)
+
+
+def read_plan(path: Union[Path, str]) -> ScenarioPlan:
+    """
+    Load a plan saved by write_plan, the routes are read without copies
+    :param path: the plan file
+    :return: the plan
+    """
+    data = Path(path).read_bytes()
+    if len(data) < _HEADER.size:
+        raise Exception(f"Error: {path} is not a scenario plan")
+    magic, version, metadata_length = _HEADER.unpack_from(data)
+    if magic != PLAN_MAGIC:
+        raise Exception(f"Error: {path} is not a scenario plan")
+    if version != PLAN_VERSION:
+        raise Exception(f"Error: {path} is a version {version} scenario plan, "
+                        f"version {PLAN_VERSION} is expected, compile the scenario again")
+    start = _HEADER.size + metadata_length
+    metadata = json.loads(data[_HEADER.size:start])
+
+    def records(location: List[int], dtype: np.dtype) -> np.ndarray:
+        return np.frombuffer(data, dtype=dtype, count=location[1], offset=start + location[0])
+
+    return ScenarioPlan(
+        experiment_type=ExperimentType[metadata["experiment_type"]],
+        map=metadata["map"],
+        section_count=metadata["section_count"],
+        debug=metadata["debug"],
+        source_hash=metadata["source_hash"],
+        vehicles=[PlannedVehicle(
+            vehicle_type=VehicleType[vehicle["type"]],
+            ego=vehicle["ego"],
+            blueprint=vehicle["blueprint"],
+            spawn=tuple(vehicle["spawn"]),
+            sections={int(index): manoeuvre for index, manoeuvre in vehicle["sections"].items()},
+            initial_lane_index=vehicle["initial_lane_index"],
+            waypoints=records(vehicle["waypoints"], WAYPOINT_DTYPE),
+            trajectory=records(vehicle["trajectory"], TRANSFORM_DTYPE),
+        ) for vehicle in metadata["vehicles"]])
+
+
+def read_current_plan(path: Union[Path, str],
+                      configuration: Union[ScenarioConfig, Dict[Any, Any]]) -> Optional[ScenarioPlan]:
+    """
+    Load a plan if it is up to date
+    :param path: the plan file
+    :param configuration: the ScenarioConfig or configuration dictionary the plan should be compiled from
+    :return: the plan, None if there is no plan file or the plan was written by another version or compiled
+             from another configuration
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) == _HEADER.size:
+        magic, version, _ = _HEADER.unpack(header)
+        # a plan of another version is compiled again, any other file is refused by read_plan
+        if magic == PLAN_MAGIC and version != PLAN_VERSION:
+            return None
+    plan = read_plan(path)
+    if plan.source_hash != configuration_hash(configuration):
+        return None
+    return plan
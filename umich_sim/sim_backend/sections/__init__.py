@@ -1,3 +1,17 @@
-from .section import Section
-from .freeway_section import FreewaySection
-from .intersection import Intersection
+from typing import TYPE_CHECKING
+
+from umich_sim.lazy import lazy_dir, lazy_exports
+
+_EXPORTS = {
+    "Section": ".section",
+    "FreewaySection": ".freeway_section",
+    "Intersection": ".intersection",
+}
+__all__ = list(_EXPORTS)
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+__dir__ = lazy_dir(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .section import Section
+    from .freeway_section import FreewaySection
+    from .intersection import Intersection
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Backend - Telemetry Recorder
+
+Summary: Records the per-tick state of every vehicle of an experiment (pose, speed, control inputs,
+    active section, traffic light phase and driver) into fixed-schema columns. Rows are appended into
+    preallocated NumPy chunks on the simulation thread; full chunks are handed to a background thread
+    that compresses them and writes one .npz file per chunk, so the main loop never waits on disk.
+
+    A run directory holds chunk_000000.npz, chunk_000001.npz, ... and a telemetry.json manifest
+    written on close. load_telemetry reads a run back as one array per column.
+"""
+
+# Library Imports
+import json
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Version of the on-disk layout
+TELEMETRY_VERSION = 1
+
+# Column name and dtype of every telemetry record
+TELEMETRY_SCHEMA: List[Tuple[str, str]] = [
+    ("frame", "i8"),  # simulation frame of the record
+    ("time", "f8"),  # simulation time, in seconds
+    ("vehicle_id", "i4"),  # Vehicle.id
+    ("x", "f4"),
+    ("y", "f4"),
+    ("z", "f4"),
+    ("yaw", "f4"),  # degrees
+    ("speed", "f4"),  # km/h
+    ("throttle", "f4"),
+    ("steer", "f4"),
+    ("brake", "f4"),
+    ("reverse", "?"),
+    ("active", "?"),  # whether the vehicle is active (inactive vehicles do not move)
+    ("section", "i4"),  # id of the current section, -1 if none
+    ("light_pair", "i1"),  # active light pair of the current intersection (0 first, 1 second), -1 if none
+    ("light_state", "i1"),  # carla.TrafficLightState of the active pair, -1 if none
+    ("driver", "i1"),  # ClientMode driving the vehicle, -1 for autonomous vehicles
+]
+
+MANIFEST_NAME = "telemetry.json"
+CHUNK_PATTERN = "chunk_{:06d}.npz"
+
+
+class _Chunk:
+    """
+    Preallocated columns holding up to size records
+    """
+
+    def __init__(self, size: int):
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.empty(size, dtype=dtype) for name, dtype in TELEMETRY_SCHEMA
+        }
+        self.rows: int = 0
+        self.index: int = 0
+
+
+class TelemetryRecorder:
+    """
+    Appends telemetry records into column chunks and writes them from a background thread.
+
+    Use it as a context manager, or call close() once the run is over so the last partial chunk
+    and the manifest are written.
+    """
+
+    def __init__(self, directory: Union[Path, str], chunk_size: int = 4096, compress: bool = True):
+        """
+        :param directory: run directory receiving the chunk files, created if needed
+        :param chunk_size: number of records per chunk file
+        :param compress: whether the chunk files are compressed
+        """
+        if chunk_size <= 0:
+            raise Exception("Error: telemetry chunk_size must be positive.")
+        self.directory: Path = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunk_size: int = chunk_size
+        self.compress: bool = compress
+
+        # Full chunks waiting to be written, and written chunks ready to be reused. Both are
+        # unbounded so handing a chunk over never blocks the simulation thread.
+        self._pending: "queue.SimpleQueue[Optional[_Chunk]]" = queue.SimpleQueue()
+        self._free: "queue.SimpleQueue[_Chunk]" = queue.SimpleQueue()
+
+        self._rows: int = 0
+        self._chunks: int = 0
+        self._closed: bool = False
+        self._chunk: _Chunk = self._new_chunk()
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._write_loop, name="telemetry-writer", daemon=True)
+        self._writer.start()
+
+    def __enter__(self) -> "TelemetryRecorder":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def rows(self) -> int:
+        """:return: number of records appended so far"""
+        return self._rows
+
+    def record_vehicle(self, frame: int, sim_time: float, vehicle, light_phase: Tuple[int, int] = (-1, -1)) -> None:
+        """
+        Appends the record of a single vehicle.
+
+        :param frame: simulation frame of the record
+        :param sim_time: simulation time of the record, in seconds
+        :param vehicle: the Vehicle to record
+        :param light_phase: the (active pair, light state) of the vehicle's current section
+        :return: None
+        """
+        self._check_open()
+        carla_vehicle = vehicle.carla_vehicle
+        transform = carla_vehicle.get_transform()
+        velocity = carla_vehicle.get_velocity()
+        control = carla_vehicle.get_control()
+        section = vehicle.current_section
+        driver = getattr(vehicle, "driver", None)
+
+        chunk = self._chunk
+        columns, row = chunk.columns, chunk.rows
+        columns["frame"][row] = frame
+        columns["time"][row] = sim_time
+        columns["vehicle_id"][row] = vehicle.id
+        columns["x"][row] = transform.location.x
+        columns["y"][row] = transform.location.y
+        columns["z"][row] = transform.location.z
+        columns["yaw"][row] = transform.rotation.yaw
+        columns["speed"][row] = 3.6 * (velocity.x ** 2 + velocity.y ** 2 + velocity.z ** 2) ** 0.5
+        columns["throttle"][row] = control.throttle
+        columns["steer"][row] = control.steer
+        columns["brake"][row] = control.brake
+        columns["reverse"][row] = control.reverse
+        columns["active"][row] = vehicle.active
+        columns["section"][row] = -1 if section is None else section.id
+        columns["light_pair"][row], columns["light_state"][row] = light_phase
+        columns["driver"][row] = -1 if driver is None else int(driver)
+
+        chunk.rows += 1
+        self._rows += 1
+        if chunk.rows == self.chunk_size:
+            self._hand_over()
+
+    def record(self, frame: int, sim_time: float, vehicles: List) -> None:
+        """
+        Appends one record per vehicle for the current tick.
+
+        :param frame: simulation frame of the records
+        :param sim_time: simulation time of the records, in seconds
+        :param vehicles: the Vehicles to record
+        :return: None
+        """
+        phases: Dict[int, Tuple[int, int]] = {}
+        for vehicle in vehicles:
+            section = vehicle.current_section
+            if section is None:
+                phase = (-1, -1)
+            elif section.id in phases:
+                phase = phases[section.id]
+            else:
+                phase = phases[section.id] = light_phase(section)
+            self.record_vehicle(frame, sim_time, vehicle, phase)
+
+    def flush(self) -> None:
+        """
+        Hands the current partial chunk over to the writer.
+
+        :return: None
+        """
+        self._check_open()
+        if self._chunk.rows > 0:
+            self._hand_over()
+
+    def close(self) -> None:
+        """
+        Writes the remaining records and the manifest, then stops the writer thread.
+
+        :return: None
+        """
+        if self._closed:
+            return
+        if self._chunk.rows > 0:
+            self._hand_over()
+        self._closed = True
+        self._pending.put(None)
+        self._writer.join()
+        if self._error is not None:
+            raise Exception(f"Error: telemetry writer failed: {self._error}")
+
+        manifest = {
+            "version": TELEMETRY_VERSION,
+            "schema": TELEMETRY_SCHEMA,
+            "chunk_size": self.chunk_size,
+            "chunks": self._chunks,
+            "rows": self._rows,
+        }
+        with open(self.directory / MANIFEST_NAME, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise Exception("Error: telemetry recorder is closed.")
+        if self._error is not None:
+            raise Exception(f"Error: telemetry writer failed: {self._error}")
+
+    def _new_chunk(self) -> _Chunk:
+        try:
+            chunk = self._free.get_nowait()
+        except queue.Empty:
+            # every chunk is still being written, grow the pool
+            chunk = _Chunk(self.chunk_size)
+        chunk.rows = 0
+        chunk.index = self._chunks
+        return chunk
+
+    def _hand_over(self) -> None:
+        self._pending.put(self._chunk)
+        self._chunks += 1
+        self._chunk = self._new_chunk()
+
+    def _write_loop(self) -> None:
+        save = np.savez_compressed if self.compress else np.savez
+        while True:
+            chunk = self._pending.get()
+            if chunk is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                path = self.directory / CHUNK_PATTERN.format(chunk.index)
+                save(path, **{name: column[:chunk.rows] for name, column in chunk.columns.items()})
+            except BaseException as e:
+                self._error = e
+            self._free.put(chunk)
+
+
+def light_phase(section) -> Tuple[int, int]:
+    """
+    Gets the traffic light phase of a section.
+
+    :param section: an Intersection or Freeway Section
+    :return: the (active pair, carla.TrafficLightState) of an Intersection, (-1, -1) for sections
+             without traffic lights
+    """
+    traffic_lights = getattr(section, "traffic_lights", None)
+    if not traffic_lights:
+        return -1, -1
+    if section.active_pair == 'first':
+        pair, light_index = 0, section.first_pair[0]
+    else:
+        pair, light_index = 1, section.second_pair[0]
+    return pair, int(traffic_lights[light_index].get_state())
+
+
+def iter_telemetry_chunks(directory: Union[Path, str]) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Iterates over the chunks of a recorded run, in recording order.
+
+    :param directory: run directory of a TelemetryRecorder
+    :return: an iterator of Dicts mapping column names to arrays
+    """
+    for path in sorted(Path(directory).glob("chunk_*.npz")):
+        with np.load(path) as chunk:
+            yield {name: chunk[name] for name in chunk.files}
+
+
+def load_telemetry(directory: Union[Path, str]) -> Dict[str, np.ndarray]:
+    """
+    Loads a recorded run as one array per column.
+
+    Runs that were not closed (no manifest) are loaded from the chunks that made it to disk.
+
+    :param directory: run directory of a TelemetryRecorder
+    :return: a Dict mapping every column of TELEMETRY_SCHEMA to an array holding all the records
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        raise Exception(f"Error: no telemetry run at {directory}")
+    chunks = list(iter_telemetry_chunks(directory))
+    if not chunks:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in TELEMETRY_SCHEMA}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name, _ in TELEMETRY_SCHEMA}
+
+
+def select_vehicle(telemetry: Dict[str, np.ndarray], vehicle_id: int) -> Dict[str, np.ndarray]:
+    """
+    Gets the records of a single vehicle out of a loaded run.
+
+    :param telemetry: a run loaded by load_telemetry
+    :param vehicle_id: the Vehicle.id to select
+    :return: the columns restricted to the records of that vehicle
+    """
+    mask = telemetry["vehicle_id"] == vehicle_id
+    return {name: column[mask] for name, column in telemetry.items()}
@@ -1,6 +1,20 @@
 #!/usr/bin/env python3
+from typing import TYPE_CHECKING
 
-from .base_controller import VehicleController
-from .freeway_controller import freeway_control
-from .intersection_controller import intersection_control
-from .ego_controller import EgoController
+from umich_sim.lazy import lazy_dir, lazy_exports
+
+_EXPORTS = {
+    "VehicleController": ".base_controller",
+    "freeway_control": ".freeway_controller",
+    "intersection_control": ".intersection_controller",
+    "EgoController": ".ego_controller",
+}
+__all__ = list(_EXPORTS)
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+__dir__ = lazy_dir(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .base_controller import VehicleController
+    from .freeway_controller import freeway_control
+    from .intersection_controller import intersection_control
+    from .ego_controller import EgoController
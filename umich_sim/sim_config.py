@@ -1,10 +1,7 @@
 #!/usr/bin/env python3
-import hydra
-from omegaconf import DictConfig, OmegaConf, MISSING
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Union
-from hydra.conf import ConfigStore
 from umich_sim.wizard.inputs import ClientMode, InputDevType, ClientMode
 
 
@@ -15,6 +12,23 @@ class WizardConfig:
     dev_type: InputDevType = InputDevType.KBD
     dev_path: Union[Path, str] = ""
     enable_wizard: bool = False
+    # records the events of the input device to this binary log if set, replayed with dev_type REPLAY
+    input_log: Union[Path, str] = ""
+    # speed of a replayed log, 0 sends the events without waiting
+    replay_speed: float = 1.0
+
+
+@dataclass
+class SensorConfig:
+    # seconds between two samples of each ego vehicle sensor, 0 samples every frame
+    # collision and lane invasion are event sensors, their events are throttled on the client
+    gnss_tick: float = 0.0
+    imu_tick: float = 0.0
+    collision_tick: float = 0.0
+    lane_invasion_tick: float = 0.0
+    camera_tick: float = 0.0
+    # number of samples kept per sensor on the sensor bus
+    history: int = 2048
 
 
 @dataclass
@@ -26,12 +40,21 @@ class Config:
     carla_port: int = 2000
     rpc_port: int = 2003  # rpc server port
     client_resolution: tuple = (1280, 720)
+    hud_info_rate: float = 5.0  # refresh rate of the HUD info panel in Hz, 0 refreshes every frame
+    ldw_ttlc: float = 1.0  # lane departure warning when the time to line crossing drops below this, in seconds
+    ldw_interval: float = 3.0  # minimum simulation time between two lane departure warnings, in seconds
+    input_latency_file: Union[Path, str] = ""  # JSON file receiving the input latency histograms on exit
     client_mode: ClientMode = ClientMode.EGO
     gui_mode: bool = False
     cam_recording: bool = False  # whether to record experiment
     cam_record_dir: Union[Path, str] = Path("./_record")
+    cam_record_compress: bool = True  # whether recorded frames are zlib compressed
+    telemetry_dir: Union[Path, str] = ""  # run directory of the telemetry recorder, empty to disable
+    telemetry_chunk_size: int = 4096  # telemetry records per chunk file
+    scenario_plan: Union[Path, str] = ""  # compiled scenario loaded by the scripts, written again when stale
     car_filter: str = "vehicle.*"
     wizard: WizardConfig = WizardConfig()
+    sensors: SensorConfig = SensorConfig()
 
 
 class ConfigPool:
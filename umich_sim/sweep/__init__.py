@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Parameter sweeps over many CARLA servers
+"""
+
+from typing import TYPE_CHECKING
+
+from umich_sim.lazy import lazy_dir, lazy_exports
+
+_EXPORTS = {
+    "ParameterGrid": ".grid",
+    "SweepOrchestrator": ".orchestrator",
+    "SweepResults": ".orchestrator",
+    "LocalSimulator": ".local_sim",
+    "local_trial": ".local_sim",
+    "carla_trial": ".trials",
+}
+__all__ = list(_EXPORTS)
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+__dir__ = lazy_dir(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .grid import ParameterGrid
+    from .orchestrator import SweepOrchestrator, SweepResults
+    from .local_sim import LocalSimulator, local_trial
+    from .trials import carla_trial
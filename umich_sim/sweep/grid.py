@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Parameter grids describing the runs of a sweep
+"""
+
+import itertools
+from typing import Any, Dict, Iterator, List, Mapping
+
+
+class ParameterGrid:
+    """
+    Cartesian product of parameter values.
+
+    Every key of the grid maps to either a list of values to sweep over or a single value that
+    is shared by all the runs (tuples count as a single value, so PID gains can be swept as a
+    list of (kp, ki, kd) tuples). Iterating over the grid yields one dictionary per run, e.g.::
+
+        ParameterGrid({"target_distance": [5.0, 10.0], "green_time": [8.0, 12.0], "map": "Town05"})
+
+    describes four runs that all use "Town05".
+    """
+
+    def __init__(self, grid: Mapping[str, Any]):
+        self.names: List[str] = list(grid.keys())
+        self.values: List[List[Any]] = [
+            list(value) if isinstance(value, list) else [value]
+            for value in grid.values()
+        ]
+        for name, values in zip(self.names, self.values):
+            if len(values) == 0:
+                raise Exception(f"Parameter {name!r} has no values to sweep over")
+
+    def __len__(self) -> int:
+        length = 1
+        for values in self.values:
+            length *= len(values)
+        return length
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for combination in itertools.product(*self.values):
+            yield dict(zip(self.names, combination))
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """
+        Get all the runs of the grid
+        :return: a list holding the parameters of every run, in sweep order
+        """
+        return list(self)
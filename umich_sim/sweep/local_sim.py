@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Local simulator stand-in for sweep workers
+
+Runs a one dimensional lead/follower scenario in pure Python with the same controllers
+(simple_pid gains, target_distance, light timings) the backend applies to its vehicles,
+so a sweep can be exercised end to end without a CARLA server.
+"""
+
+import math
+import os
+import random
+from typing import Any, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from simple_pid import PID
+
+# Default values of the swept parameters, they mirror the defaults of the backend Vehicle
+# and Intersection classes
+DEFAULT_PARAMS: Dict[str, Any] = {
+    "target_distance": 10.0,  # m
+    "straight_speed": 35.0,  # km/h
+    "breaking_distance": 20.0,  # m
+    "distance_pid": (0.5, 0.02, 0.3),
+    "speed_pid": (-0.5, -0.02, -0.3),
+    "location_pid": (-0.5, -0.1, -0.3),
+    "green_time": 10.0,  # s
+    "yellow_time": 3.0,  # s
+    "duration": 60.0,  # simulated seconds
+}
+
+# Distance from the start of the road to the stop line of the traffic light
+LIGHT_POSITION = 150.0
+# Length of the vehicles
+VEHICLE_LENGTH = 4.5
+# Acceleration at full throttle and deceleration at full brake, in m/s^2
+MAX_ACCELERATION = 3.5
+MAX_DECELERATION = 8.0
+# Global constant that dictates how much additional stopping distance the vehicle gains per km/h,
+# same as umich_sim.sim_backend.vehicle_control.base_controller.STOP_DISTANCE_FACTOR
+STOP_DISTANCE_FACTOR = 0.25
+
+
+class LocalSimulator:
+    """
+    Stand-in for a CARLA server running a lead vehicle and a follower on a straight road
+    with one traffic light.
+    """
+
+    def __init__(self, params: Dict[str, Any], delta_seconds: float = 1 / 60):
+        """
+        :param params: parameters of the run, missing values are taken from DEFAULT_PARAMS
+        :param delta_seconds: fixed time step of the simulation, defaults to the client frame rate
+        """
+        self.params: Dict[str, Any] = dict(DEFAULT_PARAMS)
+        self.params.update(params)
+        self.delta_seconds: float = delta_seconds
+
+    def _pid(self, name: str) -> "PID":
+        """Create the PID controller named name with its configured gains"""
+        from simple_pid import PID
+        pid = PID(*self.params[name], setpoint=0, sample_time=None)
+        pid.output_limits = (-1, 1)
+        return pid
+
+    def _light_is_red(self, time: float) -> bool:
+        """
+        Whether the light is red or yellow at the given time, the light cycles like
+        umich_sim.sim_backend.sections.Intersection with two pairs of lights and a 1 s overlap
+        """
+        green, yellow = self.params["green_time"], self.params["yellow_time"]
+        cycle = 2 * (green + yellow + 1.0)
+        return time % cycle >= green
+
+    def _throttle_to_acceleration(self, throttle: float, speed: float) -> float:
+        """Convert a throttle in [-1, 1] to an acceleration, with a light drag"""
+        if throttle > 0:
+            return throttle * MAX_ACCELERATION - 0.01 * speed
+        return throttle * MAX_DECELERATION - 0.01 * speed
+
+    def run(self) -> Dict[str, float]:
+        """
+        Run the scenario
+        :return: the metrics of the run
+        """
+        dt = self.delta_seconds
+        target_distance: float = self.params["target_distance"]
+        target_speed: float = self.params["straight_speed"]
+        breaking_distance: float = self.params["breaking_distance"]
+
+        lead_speed_pid, follow_speed_pid = self._pid("speed_pid"), self._pid("speed_pid")
+        location_pid = self._pid("location_pid")
+        distance_pid = self._pid("distance_pid")
+
+        # positions (front bumper) and speeds (m/s) of the lead and the follower
+        lead_x, lead_v = target_distance + VEHICLE_LENGTH + 5.0, 0.0
+        follow_x, follow_v = 0.0, 0.0
+
+        min_gap = math.inf
+        gap_error_sum = 0.0
+        speed_sum = 0.0
+        lead_stops = 0
+        lead_stopped = True  # starting at rest is not a stop
+        steps = int(self.params["duration"] / dt)
+        for step in range(steps):
+            time = step * dt
+
+            # lead vehicle: keep the target speed, stop at the light if it is red
+            lead_throttle = lead_speed_pid(target_speed - lead_v * 3.6, dt=dt)
+            distance_to_light = LIGHT_POSITION - lead_x
+            if 0 <= distance_to_light <= breaking_distance and self._light_is_red(time):
+                stop_throttle = location_pid(distance_to_light - lead_v * 3.6 * STOP_DISTANCE_FACTOR,
+                                             dt=dt)
+                lead_throttle = min(lead_throttle, stop_throttle)
+
+            # follower: keep the target speed and the target distance to the lead vehicle
+            gap = lead_x - VEHICLE_LENGTH - follow_x
+            follow_throttle = min(follow_speed_pid(target_speed - follow_v * 3.6, dt=dt),
+                                  distance_pid(target_distance - gap, dt=dt))
+
+            # integrate
+            lead_v = max(0.0, lead_v + self._throttle_to_acceleration(lead_throttle, lead_v) * dt)
+            follow_v = max(0.0,
+                           follow_v + self._throttle_to_acceleration(follow_throttle, follow_v) * dt)
+            lead_x += lead_v * dt
+            follow_x += follow_v * dt
+
+            # metrics
+            gap = lead_x - VEHICLE_LENGTH - follow_x
+            min_gap = min(min_gap, gap)
+            gap_error_sum += abs(gap - target_distance)
+            speed_sum += follow_v
+            if lead_v < 0.1 and not lead_stopped and lead_x < LIGHT_POSITION:
+                lead_stops += 1
+            lead_stopped = lead_v < 0.1
+
+        return {
+            "sim_time": steps * dt,
+            "min_gap": min_gap,
+            "mean_abs_gap_error": gap_error_sum / max(steps, 1),
+            "follower_mean_speed_kmh": 3.6 * speed_sum / max(steps, 1),
+            "collided": min_gap <= 0.0,
+            "lead_stops": lead_stops,
+        }
+
+
+def local_trial(params: Dict[str, Any],
+                carla_port: int,
+                fail_rate: float = 0.0,
+                crash_rate: float = 0.0) -> Dict[str, float]:
+    """
+    Sweep trial running on the LocalSimulator instead of a CARLA server.
+
+    Failures can be injected to exercise the retry logic of the orchestrator, bind the rates
+    with functools.partial.
+    :param params: parameters of the run
+    :param carla_port: port of the worker, unused by the stand-in
+    :param fail_rate: probability of the trial raising an exception
+    :param crash_rate: probability of the worker process dying in the middle of the trial
+    :return: the metrics of the run
+    """
+    # workers forked from the same parent share their random state, use the system source
+    rng = random.SystemRandom()
+    if crash_rate > 0 and rng.random() < crash_rate:
+        os._exit(1)
+    if fail_rate > 0 and rng.random() < fail_rate:
+        raise Exception(f"Injected failure of the local simulator on port {carla_port}")
+    return LocalSimulator(params).run()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Process-pool orchestration of parameter sweeps
+
+Every worker process is bound to its own CARLA server (one carla_port per worker) and runs
+the trials assigned to it one after the other. The orchestrator hands out the runs of a
+ParameterGrid, restarts workers that die or hang, retries failed runs and collects the
+results into a single SweepResults table. Trials that can not run twice in the same process
+(carla_trial, whose HUD and World are singletons) get a fresh worker for every run with
+tasks_per_worker=1.
+
+Every worker reports on its own pipe: a worker dying in the middle of a report can not leave a
+lock shared with the other workers held, the pipe is simply replaced with the worker.
+"""
+
+import csv
+import multiprocessing as mp
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Union
+
+from umich_sim.base_logger import logger
+
+# A trial receives the parameters of one run and the port of the CARLA server it is bound to
+# and returns a dictionary of metrics. It must be picklable (a module level function or a
+# functools.partial of one) since it is sent to the worker processes.
+Trial = Callable[[Dict[str, Any], int], Dict[str, Any]]
+
+# Message kinds sent from the workers back to the orchestrator
+_DONE = "done"
+_FAILED = "failed"
+
+
+def _worker_main(trial: Trial, carla_port: int, task_queue,
+                 result_conn) -> None:
+    """
+    Main loop of a worker process, runs the trials sent through task_queue until None is received
+    :param trial: function running a single trial
+    :param carla_port: port of the CARLA server this worker is bound to
+    :param task_queue: queue of (run_id, params) tuples dedicated to this worker
+    :param result_conn: write end of the pipe the worker reports its results on, results are
+                        sent synchronously so a report is complete before the next trial starts
+    """
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+        run_id, params = task
+        try:
+            metrics = trial(dict(params), carla_port)
+            result_conn.send((_DONE, carla_port, run_id, dict(metrics or {})))
+        except Exception:
+            result_conn.send((_FAILED, carla_port, run_id, traceback.format_exc()))
+
+
+@dataclass
+class _Worker:
+    """
+    Book keeping of a single worker process
+    """
+    carla_port: int
+    process: Any = None
+    task_queue: Any = None
+    result_conn: Any = None  # read end of the pipe the worker reports on
+    run_id: Optional[int] = None  # run currently assigned to the worker
+    started_at: float = 0.0
+    tasks: int = 0  # runs the worker reported on
+
+    def busy(self) -> bool:
+        return self.run_id is not None
+
+
+@dataclass
+class _Run:
+    """
+    Book keeping of a single run of the sweep
+    """
+    run_id: int
+    params: Dict[str, Any]
+    attempts: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class SweepResults:
+    """
+    Table holding one row per run of a sweep.
+
+    Every row stores the run id, its final status ("ok" or "failed"), the number of attempts,
+    the carla_port of the last worker that ran it, its parameters and the metrics returned by
+    the trial (or the last error for failed runs).
+    """
+    STATUS_OK = "ok"
+    STATUS_FAILED = "failed"
+
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None):
+        self.rows: List[Dict[str, Any]] = rows if rows is not None else []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.rows.append(row)
+
+    def sorted(self) -> "SweepResults":
+        """:return: the results ordered by run id"""
+        return SweepResults(sorted(self.rows, key=lambda row: row["run_id"]))
+
+    @property
+    def columns(self) -> List[str]:
+        """:return: every column present in the table, in first seen order"""
+        columns: Dict[str, None] = {}
+        for row in self.rows:
+            for key in row:
+                columns.setdefault(key, None)
+        return list(columns)
+
+    def column(self, name: str) -> List[Any]:
+        """
+        Get a single column of the table
+        :param name: name of the column
+        :return: the values of the column, None for rows that do not have it
+        """
+        return [row.get(name) for row in self.rows]
+
+    def failed(self) -> List[Dict[str, Any]]:
+        """:return: the rows of the runs that failed after all their retries"""
+        return [row for row in self.rows if row["status"] == self.STATUS_FAILED]
+
+    def to_csv(self, path: Union[Path, str]) -> None:
+        """
+        Write the table to a csv file
+        :param path: destination of the csv file
+        """
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns)
+            writer.writeheader()
+            for row in self.rows:
+                writer.writerow(row)
+
+
+class SweepOrchestrator:
+    """
+    Runs the trials of a parameter sweep on a pool of worker processes, one per CARLA server.
+    """
+
+    def __init__(self,
+                 trial: Trial,
+                 carla_ports: Iterable[int],
+                 max_retries: int = 2,
+                 run_timeout: Optional[float] = None,
+                 start_method: str = "spawn",
+                 tasks_per_worker: Optional[int] = None):
+        """
+        :param trial: function running a single trial, see Trial
+        :param carla_ports: ports of the CARLA servers, one worker process is started per port
+        :param max_retries: number of times a failed run is retried before giving up on it
+        :param run_timeout: seconds after which a run is considered hung, its worker is then
+                            killed and restarted. None disables the timeout
+        :param start_method: multiprocessing start method of the workers
+        :param tasks_per_worker: number of runs after which a worker is replaced by a fresh process,
+                                 None keeps the workers for the whole sweep
+        """
+        self.trial: Trial = trial
+        self.carla_ports: List[int] = list(carla_ports)
+        if len(self.carla_ports) == 0:
+            raise Exception("Error: a sweep needs at least one carla_port")
+        if len(set(self.carla_ports)) != len(self.carla_ports):
+            raise Exception("Error: every sweep worker needs its own carla_port")
+        self.max_retries: int = max_retries
+        self.run_timeout: Optional[float] = run_timeout
+        if tasks_per_worker is not None and tasks_per_worker < 1:
+            raise Exception("Error: tasks_per_worker must be at least 1")
+        self.tasks_per_worker: Optional[int] = tasks_per_worker
+        self._ctx = mp.get_context(start_method)
+        self._workers: Dict[int, _Worker] = {}
+
+    def run(self, runs: Iterable[Dict[str, Any]]) -> SweepResults:
+        """
+        Run every run of the sweep and wait for all of them to finish
+        :param runs: parameters of every run, usually a ParameterGrid
+        :return: the results of the sweep ordered by run id
+        """
+        pending: Deque[_Run] = deque(
+            _Run(run_id, dict(params)) for run_id, params in enumerate(runs))
+        in_flight: Dict[int, _Run] = {}
+        results = SweepResults()
+        total = len(pending)
+
+        for port in self.carla_ports:
+            self._workers[port] = self._start_worker(port)
+
+        try:
+            while pending or in_flight:
+                # hand out runs to idle workers
+                for worker in self._workers.values():
+                    if not pending:
+                        break
+                    if not worker.busy():
+                        self._assign(worker, pending.popleft(), in_flight)
+
+                # collect the reports of the workers
+                connections = {worker.result_conn: worker
+                               for worker in self._workers.values() if worker.busy()}
+                for conn in wait(list(connections), timeout=0.1):
+                    try:
+                        kind, port, run_id, payload = conn.recv()
+                    except (EOFError, OSError):
+                        # the worker died, restarted below
+                        continue
+                    worker = connections[conn]
+                    # ignore late reports of runs that were already given up on
+                    if worker.run_id == run_id:
+                        worker.run_id = None
+                        run = in_flight.pop(run_id)
+                        if kind == _DONE:
+                            results.add(self._row(run, port, SweepResults.STATUS_OK, payload))
+                            logger.info("sweep run %d/%d done on port %d", len(results), total, port)
+                        else:
+                            self._on_failure(run, port, payload, pending, results)
+                        worker.tasks += 1
+                        if self.tasks_per_worker is not None and worker.tasks >= self.tasks_per_worker:
+                            self._stop_worker(worker)
+                            self._workers[port] = self._start_worker(port)
+
+                # restart workers that crashed or hung
+                now = time.monotonic()
+                for port, worker in self._workers.items():
+                    if not worker.busy():
+                        continue
+                    if not worker.process.is_alive():
+                        error = f"worker exited with code {worker.process.exitcode}"
+                    elif self.run_timeout is not None and now - worker.started_at > self.run_timeout:
+                        error = f"run timed out after {self.run_timeout} s"
+                    else:
+                        continue
+                    run = in_flight.pop(worker.run_id)
+                    self._stop_worker(worker, force=True)
+                    self._workers[port] = self._start_worker(port)
+                    self._on_failure(run, port, error, pending, results)
+        finally:
+            for worker in self._workers.values():
+                self._stop_worker(worker, force=worker.busy())
+            self._workers.clear()
+
+        return results.sorted()
+
+    def _assign(self, worker: _Worker, run: _Run, in_flight: Dict[int, _Run]) -> None:
+        """Send a run to an idle worker"""
+        run.attempts += 1
+        worker.run_id = run.run_id
+        worker.started_at = time.monotonic()
+        in_flight[run.run_id] = run
+        worker.task_queue.put((run.run_id, run.params))
+
+    def _on_failure(self, run: _Run, port: int, error: str, pending: Deque[_Run],
+                    results: SweepResults) -> None:
+        """Retry a failed run or record it as failed once it ran out of retries"""
+        run.errors.append(error)
+        if run.attempts <= self.max_retries:
+            logger.warning("sweep run %d failed on port %d, retrying: %s", run.run_id, port,
+                           error.strip().splitlines()[-1])
+            pending.append(run)
+        else:
+            logger.error("sweep run %d failed after %d attempts", run.run_id, run.attempts)
+            results.add(self._row(run, port, SweepResults.STATUS_FAILED, {"error": error}))
+
+    @staticmethod
+    def _row(run: _Run, port: int, status: str, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the result table row of a finished run"""
+        row: Dict[str, Any] = {
+            "run_id": run.run_id,
+            "status": status,
+            "attempts": run.attempts,
+            "carla_port": port,
+        }
+        row.update(run.params)
+        row.update(metrics)
+        return row
+
+    def _start_worker(self, port: int) -> _Worker:
+        """Start a worker process bound to the given port"""
+        result_conn, worker_conn = self._ctx.Pipe(duplex=False)
+        worker = _Worker(port, task_queue=self._ctx.Queue(), result_conn=result_conn)
+        worker.process = self._ctx.Process(target=_worker_main,
+                                           args=(self.trial, port, worker.task_queue, worker_conn),
+                                           name=f"sweep-worker-{port}",
+                                           daemon=True)
+        worker.process.start()
+        # only the worker writes to the pipe, the read end sees EOF once it exits
+        worker_conn.close()
+        return worker
+
+    @staticmethod
+    def _stop_worker(worker: _Worker, force: bool = False) -> None:
+        """Stop a worker, killing it if it is in the middle of a run"""
+        if force:
+            worker.process.terminate()
+        else:
+            worker.task_queue.put(None)
+        worker.process.join(timeout=5.0)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        worker.result_conn.close()
+        worker.run_id = None
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Sweep trial running an experiment against a CARLA server
+"""
+
+import os
+import time
+from typing import Any, Dict
+
+# Vehicle attributes that can be swept directly
+VEHICLE_PARAMS = ("target_distance", "straight_speed", "turning_speed", "breaking_distance")
+# PID gains that can be swept as (kp, ki, kd) tuples, mapped to the Vehicle controller they tune
+PID_PARAMS = {
+    "distance_pid": "distance_pid_controller",
+    "speed_pid": "speed_pid_controller",
+    "location_pid": "location_pid_controller",
+}
+
+# Whether carla_trial already ran in this process, the HUD and World it creates are singletons
+_trial_started: bool = False
+
+
+def apply_params(experiment, params: Dict[str, Any]) -> None:
+    """
+    Apply the swept parameters to an initialized experiment
+    :param experiment: an Experiment on which initialize_experiment was already called
+    :param params: parameters of the run, unknown keys are ignored
+    """
+    import carla
+    from umich_sim.sim_backend.sections import Intersection
+
+    for vehicle in experiment.vehicle_list:
+        for name in VEHICLE_PARAMS:
+            if name in params:
+                setattr(vehicle, name, params[name])
+        if "straight_speed" in params:
+            vehicle.target_speed = params["straight_speed"]
+        for name, controller in PID_PARAMS.items():
+            if name in params:
+                getattr(vehicle, controller).tunings = tuple(params[name])
+
+    for section in experiment.section_list:
+        if isinstance(section, Intersection):
+            if "green_time" in params:
+                section.light_timings[carla.TrafficLightState.Green] = params["green_time"]
+            if "yellow_time" in params:
+                section.light_timings[carla.TrafficLightState.Yellow] = params["yellow_time"]
+
+
+def carla_trial(params: Dict[str, Any],
+                carla_port: int,
+                configuration: Dict,
+                experiment_type: str = "intersection",
+                ticks: int = 1200,
+                server_addr: str = "127.0.0.1") -> Dict[str, Any]:
+    """
+    Sweep trial running one experiment on the CARLA server listening on carla_port.
+
+    Bind the fixed arguments with functools.partial before handing the trial to the
+    SweepOrchestrator. The trial runs once per process, the orchestrator must replace the worker
+    after every run (tasks_per_worker=1).
+    :param params: parameters of the run
+    :param carla_port: port of the CARLA server the worker is bound to
+    :param configuration: configuration dictionary of the experiment, see scripts/*_test.py
+    :param experiment_type: either "intersection" or "freeway"
+    :param ticks: number of ticks the experiment runs for
+    :param server_addr: address of the CARLA servers
+    :return: the metrics of the run
+    """
+    global _trial_started
+    if _trial_started:
+        raise Exception("Error: carla_trial runs once per process, "
+                        "give the SweepOrchestrator tasks_per_worker=1")
+    _trial_started = True
+
+    # workers run unattended, render into a dummy window
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    from umich_sim.sim_config import ConfigPool, Config
+    from umich_sim.sim_backend.experiments import FreewayExperiment, IntersectionExperiment
+
+    config = Config()
+    config.server_addr = server_addr
+    config.carla_port = carla_port
+    config.gui_mode = True
+    config.debug = False
+    ConfigPool.load_config(config)
+
+    experiment_classes = {
+        "intersection": IntersectionExperiment,
+        "freeway": FreewayExperiment,
+    }
+    if experiment_type not in experiment_classes:
+        raise Exception(f"Invalid experiment type {experiment_type!r} passed to carla_trial")
+    experiment = experiment_classes[experiment_type](True)
+    experiment.init()
+    experiment.initialize_experiment(configuration)
+    apply_params(experiment, params)
+
+    start_locations = [vehicle.get_current_location() for vehicle in experiment.vehicle_list]
+    start_time = time.perf_counter()
+    try:
+        experiment.run_experiment(max_ticks=ticks)
+        wall_time = time.perf_counter() - start_time
+        # the actors are gone once run_experiment returns, it keeps their last locations
+        distances = [
+            experiment.final_locations[vehicle.id].distance(start)
+            for vehicle, start in zip(experiment.vehicle_list, start_locations)
+        ]
+        return {
+            "ticks": ticks,
+            "wall_time": wall_time,
+            "ticks_per_second": ticks / wall_time if wall_time > 0 else 0.0,
+            "mean_distance_travelled": sum(distances) / len(distances) if distances else 0.0,
+            "active_vehicles": sum(1 for vehicle in experiment.vehicle_list if vehicle.active),
+        }
+    finally:
+        experiment.clean_up_experiment()
@@ -3,4 +3,16 @@
 Wizard of Oz module for interfacing with racing wheel
 """
 
-from .wizard import Wizard
+from typing import TYPE_CHECKING
+
+from umich_sim.lazy import lazy_dir, lazy_exports
+
+_EXPORTS = {
+    "Wizard": ".wizard",
+}
+__all__ = list(_EXPORTS)
+__getattr__ = lazy_exports(__name__, _EXPORTS)
+__dir__ = lazy_dir(__name__, _EXPORTS)
+
+if TYPE_CHECKING:
+    from .wizard import Wizard
@@ -8,13 +8,31 @@ import sys
 
 def create_input_device(dev_type: InputDevType,
                         client_mode: ClientMode,
-                        dev_path: Optional[str] = None) -> InputDevice:
+                        dev_path: Optional[str] = None,
+                        record_path: Optional[str] = None,
+                        replay_speed: float = 1.0) -> InputDevice:
     """
     create input device based on dev_type passed
     :param dev_type: device type
     :param client_mode: client mode (wizard or host)
-    :param dev_path: optional argument passed to joystick devices
+    :param dev_path: optional argument passed to joystick devices, the input log to replay for REPLAY
+    :param record_path: records the events of the device to this input log if set
+    :param replay_speed: speed of the replay for REPLAY, 0 sends the events without waiting
     """
+    device = _create_device(dev_type, client_mode, dev_path, replay_speed)
+    if record_path:
+        from .input_log import RecordingInput
+        return RecordingInput(device, dev_type, record_path)
+    return device
+
+
+def _create_device(dev_type: InputDevType,
+                   client_mode: ClientMode,
+                   dev_path: Optional[str],
+                   replay_speed: float) -> InputDevice:
+    if dev_type == InputDevType.REPLAY:
+        from .input_log import ReplayInput
+        return ReplayInput(dev_path, client_mode, replay_speed)
     from .keyboard import KeyboardInput
     if sys.platform != "linux":
         if dev_type == InputDevType.KBD:
@@ -35,4 +53,3 @@ def create_input_device(dev_type: InputDevType,
         return KeyboardInput(client_mode)
     else:
         return wheel_map[dev_type](dev_path, client_mode)
-
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 from abc import ABCMeta, abstractmethod
-from . import ClientMode
+from typing import Callable, Optional, Sequence
+from . import ClientMode, ControlEventType
 import threading
 
 
@@ -21,10 +22,37 @@ class InputDevice(metaclass=ABCMeta):
         # type
         self.client_mode: ClientMode = client_mode
 
+        # receives the events of the device, Wizard.register_event if None
+        self.sink: Optional[Callable[[ControlEventType, ClientMode, int, float], None]] = None
+
     @abstractmethod
     def events_handler(self) -> None:
         pass
 
+    def _post(self, event_type: ControlEventType, val: int, timestamp: float,
+              dev: Optional[ClientMode] = None) -> None:
+        """
+        Send an event of the device to its sink
+        :param event_type: type of the event
+        :param val: value of the event
+        :param timestamp: time.monotonic() when the event was received
+        :param dev: client the event comes from, the client mode of the device by default
+        """
+        dev = self.client_mode if dev is None else dev
+        if self.sink is not None:
+            self.sink(event_type, dev, val, timestamp)
+        else:
+            from umich_sim.wizard import Wizard
+            Wizard.get_instance().register_event(event_type, dev, val, timestamp)
+
+    def handle_pygame_events(self, events: Sequence) -> None:
+        """
+        Handle the pygame events drained by the main loop this frame, devices reading pygame events
+        (keyboard) override this instead of reading the pygame queue themselves
+        :param events: the pygame events
+        """
+        pass
+
     def start(self) -> None:
         """
         start the thread
@@ -1,11 +1,14 @@
 #!/usr/bin/env python
 import math
+import time
 
 from umich_sim.wizard.utils.map import LinearMap
 from umich_sim.wizard.utils.limits import *
 from .input_types import ClientMode, WheelKeyType, ControlEventType
 from .base_input_dev import InputDevice
-from evdev import ecodes, ff
+from .input_reactor import InputReactor
+from .ff_manager import FFManager
+from evdev import ecodes
 import evdev
 
 class BaseWheel(InputDevice):
@@ -33,29 +36,30 @@ class BaseWheel(InputDevice):
         self.ev_events: list = []
         self.ev_type_accepted: tuple = (1, 3)
 
-        # evdev device
+        # evdev device, None while unplugged
         self._ev = None
+        self._ev_path: str = ev_path
         self._ctl_key_map: dict = {}
         # data
         self.steer_val: int = 0  # steer input [0,65535]
         self.acc_val: int = 0  # accelarator input [0,255]
         self.brake_val: int = 0  # brake input [0,255]
         self.clutch_val: int = 0  # clutch input [0,255]
-        # FF id
-        self._ff_spring_id = None
-        self._ff_autocenter_val: int = 0
 
         # connect evdev device
         self._ev_connect(ev_path)
+        # force feedback, every effect uploaded once and updated in place
+        self.ff: FFManager = FFManager(self._ev)
         self._init()
 
     def __del__(self):
         "Destructor, used to erase ff settings"
-        self._ev.close()
+        if self._ev is not None:
+            self._ev.close()
 
     def _init(self):
         # init with 75% autocenter force
-        # self._setFFAutoCenter(49150)
+        # self.ff.set_autocenter(49150)
         print("Racing wheel registered")
 
     def set_speed_feedback(self):
@@ -74,8 +78,8 @@ class BaseWheel(InputDevice):
         autocenter_cmd: int = int(
             abs(math.sin(speed / s2_w_threshold)) * iinfo(uint16).max)
 
-        # send autocenterCmd to the steeringwheel
-        self._setFFAutoCenter(autocenter_cmd)
+        # send autocenterCmd to the steeringwheel, skipped if it barely changed
+        self.ff.set_autocenter(autocenter_cmd)
 
     def SetWheelPos(self, val: float):
         """
@@ -84,94 +88,77 @@ class BaseWheel(InputDevice):
         - val: float to indicate wheel position [-1,1]
         """
         # strongest force to maintain position
-        self._setFFSpring(pos=int(val * iinfo(int16).max),
-                          saturation=iinfo(uint16).max,
-                          coeff=iinfo(int16).max)
+        self.ff.set_spring(pos=int(val * iinfo(int16).max),
+                           saturation=int(iinfo(uint16).max),
+                           coeff=int(iinfo(int16).max))
+
+    def start(self) -> None:
+        "start reading the device on the input reactor thread"
+        InputReactor.get_instance().register(self)
+
+    def stop(self) -> None:
+        "stop reading the device, returns once the reactor let go of it"
+        InputReactor.get_instance().unregister(self)
+
+    def support_ff(self) -> bool:
+        # no force feedback while the wheel is unplugged
+        return self.has_ff and self._ev is not None and self.ff.attached()
+
+    def fileno(self) -> int:
+        return self._ev.fd
 
     def events_handler(self) -> None:
         """
-        Capture and handle events
-        """
-        from umich_sim.wizard import Wizard
-        for event in self._ev.read_loop():
-            # return if terminated
-            if self._thread_terminating:
-                return
-            if event.type in self.ev_type_accepted:
-                # key based on raw code
-                key_type: WheelKeyType = self.ev_events[event.type].get(
-                    event.code)
-                # controller event
-
-                if event_type := self._ctl_key_map.get(key_type, None):
-                    Wizard.get_instance().register_event(
-                        event_type, self.client_mode, event.value)
-
-    def _ev_connect(self, ev_path: str):
-        "Connect to evdev device based on config file"
-        self._ev: evdev.InputDevice = evdev.InputDevice(ev_path)
-
-    def _setFFAutoCenter(self, val: int):
-        """
-        Set the auto center force
-        Input: val - uint16_t indicates the intensity
-        """
-        assert (0 <= val <= iinfo(uint16).max)
-        self._ff_autocenter_val = val
-        self._ev.write(ecodes.EV_FF, ecodes.FF_AUTOCENTER, val)
-
-    def _setFFSpring(self,
-                     pos: int,
-                     saturation: int,
-                     coeff: int,
-                     deadband: int = 0) -> None:
-        """
-        Set the spring force feedback
-        Input:
-        - pos: position of the balance point
-        - saturation: maximum level when wheel moved all way to end
-        - coeff: controls how fast the force grows when the joystick
-                 moves from center
-        - deadband: size of the dead zone, where no force is produced
-        """
-        # create effect
-        springs = (ff.Condition * 2)()
-        for spring in springs:
-            spring.right_saturation = saturation
-            spring.left_saturation = saturation
-            spring.right_coeff = coeff
-            spring.left_coeff = coeff
-            spring.deadband = deadband
-            spring.center = pos
-
-        # register effect
-        spring_id = self._ev.upload_effect(
-            ff.Effect(ecodes.FF_SPRING, -1, 16384, ff.Trigger(0, 0),
-                      ff.Replay(iinfo(int16).max, 0),
-                      ff.EffectType(ff_condition_effect=springs)))
-
-        # apply
-        self._ev.write(ecodes.EV_FF, spring_id, 1)
-
-        # erase previous effect
-        if self._ff_spring_id is not None:
-            self._ev.erase_effect(self._ff_spring_id)
-
-        self._ff_spring_id = spring_id
+        Handle every event waiting on the device, called by the input reactor when it is readable
+        """
+        timestamp = time.monotonic()
+        try:
+            for event in self._ev.read():
+                if event.type in self.ev_type_accepted:
+                    # key based on raw code
+                    key_type: WheelKeyType = self.ev_events[event.type].get(
+                        event.code)
+                    # controller event
+
+                    if event_type := self._ctl_key_map.get(key_type, None):
+                        self._post(event_type, event.value, timestamp)
+        except BlockingIOError:
+            # nothing left to read
+            pass
+
+    def disconnect(self) -> None:
+        "Close the evdev device after it was unplugged"
+        # waits for a force feedback write of the main loop to the device
+        self.ff.detach()
+        ev, self._ev = self._ev, None
+        try:
+            ev.close()
+        except OSError:
+            pass
+
+    def reconnect(self) -> bool:
+        """
+        Open the evdev device again after it was unplugged
+        :return: whether the device is back
+        """
+        try:
+            self._ev_connect(self._ev_path)
+        except OSError:
+            return False
+        # the effects were lost with the old device
+        self.ff.attach(self._ev)
+        return True
 
     # TODO: test if this work for all effects
     def erase_ff(self, ff_type: int):
         """
-        Erase the specified force feedback type
+        Stop the specified force feedback type
         """
         if ff_type == ecodes.FF_SPRING:
-            if self._ff_spring_id is not None:
-                self._ev.erase_effect(self._ff_spring_id)
-                self._ff_spring_id = None
+            self.ff.stop_spring()
 
         elif ff_type == ecodes.FF_AUTOCENTER:
-            if self._ff_autocenter_val != 0:
-                self._setFFAutoCenter(0)
+            self.ff.set_autocenter(0, force=True)
 
     def erase_ff_spring(self):
         self.erase_ff(ecodes.FF_SPRING)
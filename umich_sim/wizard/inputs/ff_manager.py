@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Force feedback of a racing wheel with a bounded cost per tick
+
+Every effect is uploaded to the device once and later changes update the uploaded effect in place
+through its id, instead of uploading, starting and erasing a new effect each time. Values closer
+than a threshold to the one on the device are not written, and every effect is written at most
+max_rate times per second. A skipped value is not lost: the callers set the target every tick, so
+the device catches up as soon as the rate allows.
+
+The input reactor closes the device when the wheel is unplugged while the main loop keeps setting
+effects, so every access to the device holds a lock. A write failing because the device is gone
+detaches it, the effects are lost until attach() gets the new device.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import evdev
+from evdev import ecodes, ff
+
+from umich_sim.base_logger import logger
+from umich_sim.wizard.utils.limits import *
+
+# length of the spring effect in ms, the effect is started again before it runs out
+SPRING_LENGTH_MS: int = int(iinfo(int16).max)
+
+
+class FFManager:
+    """
+    Force feedback effects of an evdev device
+    """
+
+    def __init__(self, ev: evdev.InputDevice,
+                 spring_threshold: int = 64,
+                 autocenter_threshold: int = 512,
+                 max_rate: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param ev: the evdev device
+        :param spring_threshold: smallest change of the spring centre written, in int16 units
+                                 (64 is about 0.9 degree on a 900 degree wheel)
+        :param autocenter_threshold: smallest change of the auto center force written, in uint16 units
+        :param max_rate: maximum number of writes per second of each effect
+        :param clock: time source in seconds
+        """
+        # None while detached
+        self._ev: Optional[evdev.InputDevice] = ev
+        self._lock = threading.RLock()
+        self.spring_threshold: int = spring_threshold
+        self.autocenter_threshold: int = autocenter_threshold
+        self.min_interval: float = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._clock = clock
+        # time of the last write of every effect
+        self._last_write: Dict[str, float] = {}
+        # spring effect id, parameters on the device and time it was started
+        self._spring_id: Optional[int] = None
+        self._spring: Optional[tuple] = None
+        self._spring_started: Optional[float] = None
+        # auto center force on the device
+        self._autocenter: int = 0
+        # effects uploaded once by name
+        self._effects: Dict[str, int] = {}
+        # number of writes to the device and of updates skipped
+        self.writes: int = 0
+        self.skipped: int = 0
+
+    def attach(self, ev: evdev.InputDevice) -> None:
+        """
+        Use a newly opened device, after the wheel was plugged in again. The effects uploaded to the
+        old device are gone, the auto center force is restored.
+        :param ev: the evdev device
+        """
+        with self._lock:
+            self._ev = ev
+            self._last_write.clear()
+            self._spring_id = None
+            self._spring = None
+            self._spring_started = None
+            self._effects.clear()
+            autocenter, self._autocenter = self._autocenter, 0
+            if autocenter != 0:
+                self.set_autocenter(autocenter, force=True)
+
+    def detach(self) -> None:
+        """
+        Stop using the device before it is closed, every effect is dropped until attach. Returns once
+        no write to the device is running.
+        """
+        with self._lock:
+            self._ev = None
+
+    def attached(self) -> bool:
+        """:return: whether the effects are written to a device"""
+        return self._ev is not None
+
+    def set_autocenter(self, val: int, force: bool = False) -> None:
+        """
+        Set the auto center force
+        :param val: intensity in [0, 65535]
+        :param force: write even if the change is small or the rate is exceeded
+        """
+        assert (0 <= val <= iinfo(uint16).max)
+        with self._lock:
+            if self._ev is None or val == self._autocenter:
+                return
+            if not force:
+                # always write a change to or from 0 (effect switched on or off)
+                small = (abs(val - self._autocenter) < self.autocenter_threshold
+                         and val != 0 and self._autocenter != 0)
+                if small or not self._allowed("autocenter"):
+                    self.skipped += 1
+                    return
+            if not self._write(ecodes.FF_AUTOCENTER, val):
+                return
+            self._wrote("autocenter")
+            self._autocenter = val
+
+    def set_spring(self, pos: int, saturation: int, coeff: int, deadband: int = 0) -> None:
+        """
+        Set the spring force feedback, started if it is not playing
+        :param pos: position of the balance point
+        :param saturation: maximum level when wheel moved all way to end
+        :param coeff: controls how fast the force grows when the joystick moves from center
+        :param deadband: size of the dead zone, where no force is produced
+        """
+        with self._lock:
+            if self._ev is None:
+                return
+            now = self._clock()
+            params = (pos, saturation, coeff, deadband)
+            expiring = (self._spring_started is not None
+                        and now - self._spring_started > 0.9 * SPRING_LENGTH_MS / 1000)
+            if self._spring_started is not None and not expiring:
+                if params == self._spring or (abs(pos - self._spring[0]) < self.spring_threshold
+                                              and params[1:] == self._spring[1:]):
+                    return
+                if not self._allowed("spring"):
+                    self.skipped += 1
+                    return
+
+            if params != self._spring or self._spring_id is None:
+                springs = (ff.Condition * 2)()
+                for spring in springs:
+                    spring.right_saturation = saturation
+                    spring.left_saturation = saturation
+                    spring.right_coeff = coeff
+                    spring.left_coeff = coeff
+                    spring.deadband = deadband
+                    spring.center = pos
+                # id -1 uploads a new effect, an existing id updates it in place
+                spring_id = self._upload(ff.Effect(
+                    ecodes.FF_SPRING, -1 if self._spring_id is None else self._spring_id, 16384,
+                    ff.Trigger(0, 0), ff.Replay(SPRING_LENGTH_MS, 0),
+                    ff.EffectType(ff_condition_effect=springs)))
+                if spring_id is None:
+                    return
+                self._spring_id = spring_id
+                self._spring = params
+                self._wrote("spring")
+            if self._spring_started is None or expiring:
+                if not self._write(self._spring_id, 1):
+                    return
+                self._spring_started = now
+                self.writes += 1
+
+    def stop_spring(self) -> None:
+        """Stop the spring effect, it stays uploaded for the next set_spring"""
+        with self._lock:
+            if self._ev is not None and self._spring_started is not None:
+                if not self._write(self._spring_id, 0):
+                    return
+                self._spring_started = None
+                self.writes += 1
+
+    def upload(self, name: str, effect: ff.Effect) -> Optional[int]:
+        """
+        Upload an effect played by name, only the first call uploads
+        :param name: name of the effect
+        :param effect: the effect, with id -1
+        :return: id of the effect, None while detached
+        """
+        with self._lock:
+            if self._ev is None:
+                return None
+            if name not in self._effects:
+                effect_id = self._upload(effect)
+                if effect_id is None:
+                    return None
+                self._effects[name] = effect_id
+                self.writes += 1
+            return self._effects[name]
+
+    def play(self, name: str, playing: bool = True) -> None:
+        """
+        Start or stop an effect uploaded with upload, nothing happens if the upload was lost
+        :param name: name of the effect
+        :param playing: start the effect if True, stop it otherwise
+        """
+        with self._lock:
+            if self._ev is None or name not in self._effects:
+                return
+            if self._write(self._effects[name], 1 if playing else 0):
+                self.writes += 1
+
+    def erase(self) -> None:
+        """Remove every effect from the device and switch the auto center force off"""
+        with self._lock:
+            if self._ev is not None:
+                for effect_id in ([self._spring_id] if self._spring_id is not None else []) + list(self._effects.values()):
+                    if not self._erase(effect_id):
+                        break
+            if self._autocenter != 0:
+                self.set_autocenter(0, force=True)
+            # not restored by attach either
+            self._autocenter = 0
+            self._spring_id = None
+            self._spring = None
+            self._spring_started = None
+            self._effects.clear()
+
+    # device accesses, with the lock held and the device attached. A failure detaches the device.
+    def _write(self, code: int, val: int) -> bool:
+        try:
+            self._ev.write(ecodes.EV_FF, code, val)
+        except OSError as e:
+            self._lost(e)
+            return False
+        return True
+
+    def _upload(self, effect: ff.Effect) -> Optional[int]:
+        try:
+            return self._ev.upload_effect(effect)
+        except OSError as e:
+            self._lost(e)
+            return None
+
+    def _erase(self, effect_id: int) -> bool:
+        try:
+            self._ev.erase_effect(effect_id)
+        except OSError as e:
+            self._lost(e)
+            return False
+        return True
+
+    def _lost(self, error: OSError) -> None:
+        logger.warning(f"force feedback lost until the wheel is attached again: {error}")
+        self._ev = None
+
+    def _allowed(self, effect: str) -> bool:
+        last = self._last_write.get(effect)
+        return last is None or self._clock() - last >= self.min_interval
+
+    def _wrote(self, effect: str) -> None:
+        self._last_write[effect] = self._clock()
+        self.writes += 1
@@ -68,33 +68,29 @@ class G920(BaseWheel):
         # 1 for key type and 3 for abs type
         self.ev_events: list = [None, self.ev_key_map, None, self.ev_abs_map]
 
+    def collision_effect(self):
         rumble = ff.Rumble(strong_magnitude=0xffff, weak_magnitude=0xffff)
-        collision_effect = ff.Effect(
+        self.ff.upload("collision", ff.Effect(
             ecodes.FF_RUMBLE, -1, 0,
             ff.Trigger(0, 0),
             ff.Replay(100, 0),
             ff.EffectType(ff_rumble_effect=rumble)
-        )
-        self.collision_effect_id = self._ev.upload_effect(collision_effect)
-
-    def collision_effect(self):
-        self._ev.write(ecodes.EV_FF, self.collision_effect_id, 1)
+        ))
+        self.ff.play("collision")
 
     def start_rumble(self):
         rumble_duration = 100000
         rumble = ff.Rumble(strong_magnitude=0x0000, weak_magnitude=0xffff)
-        rumble_effect = ff.Effect(
+        self.ff.upload("rumble", ff.Effect(
             ecodes.FF_RUMBLE, -1, 0,
             ff.Trigger(0, 0),
             ff.Replay(rumble_duration, 0),
             ff.EffectType(ff_rumble_effect=rumble)
-        )
-        self.rumble_effect_id = self._ev.upload_effect(rumble_effect)
-        self._ev.write(ecodes.EV_FF, self.rumble_effect_id, 1)
+        ))
+        self.ff.play("rumble")
 
     def stop_rumble(self):
-        self._ev.erase_effect(self.rumble_effect_id)
-
+        self.ff.play("rumble", False)
 
 if __name__ == "__main__":
     rw = G920(ClientMode.EGO)
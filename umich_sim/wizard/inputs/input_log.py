@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Binary log of input events, with a device recording it and a device replaying it
+
+The log starts with a header (magic, version, type and client mode of the recorded device, and the
+maximum values its steering wheel and pedals report) followed by one 14 byte record per event:
+
+    timestamp  float64   time.monotonic() when the device received the event
+    event_type uint8     ControlEventType
+    dev        uint8     ClientMode the event came from
+    val        int32     raw value of the event
+
+All the fields are little-endian.
+"""
+
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple, Union
+
+import numpy as np
+
+from .input_types import ClientMode, ControlEventType, InputDevType
+from .base_input_dev import InputDevice
+
+INPUT_LOG_MAGIC = b"SIMINLOG"
+INPUT_LOG_VERSION = 1
+_HEADER = struct.Struct("<8sHBBII")
+_RECORD = struct.Struct("<dBBi")
+INPUT_LOG_DTYPE = np.dtype([("timestamp", "<f8"), ("event_type", "u1"), ("dev", "u1"), ("val", "<i4")])
+
+
+class InputLogWriter:
+    """
+    Appends events to an input log, thread-safe
+    """
+
+    def __init__(self, path: Union[Path, str], dev_type: InputDevType, client_mode: ClientMode,
+                 steer_max: int = 0, pedal_max: int = 0):
+        """
+        :param path: the log file, overwritten
+        :param dev_type: type of the recorded device
+        :param client_mode: client mode of the recorded device
+        :param steer_max: maximum value of the steering wheel of the device, 0 if it has none
+        :param pedal_max: maximum value of the pedals of the device, 0 if it has none
+        """
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(INPUT_LOG_MAGIC, INPUT_LOG_VERSION, int(dev_type), int(client_mode),
+                                      int(steer_max), int(pedal_max)))
+        self._lock = threading.Lock()
+        # number of events written
+        self.count: int = 0
+
+    def write(self, event_type: ControlEventType, dev: ClientMode, val: int, timestamp: float) -> None:
+        record = _RECORD.pack(timestamp, int(event_type), int(dev), int(val))
+        with self._lock:
+            if self._file is not None:
+                self._file.write(record)
+                self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_input_log(path: Union[Path, str]) -> Tuple[Dict[str, Any], np.ndarray]:
+    """
+    Read an input log
+    :param path: the log file
+    :return: the header (dev_type, client_mode, steer_max, pedal_max) and the events as a structured
+             array of INPUT_LOG_DTYPE
+    """
+    with open(path, "rb") as f:
+        magic, version, dev_type, client_mode, steer_max, pedal_max = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != INPUT_LOG_MAGIC or version != INPUT_LOG_VERSION:
+            raise Exception(f"Error: {path} is not an input log of version {INPUT_LOG_VERSION}")
+        data = f.read()
+    # drop a record cut short by a crash
+    data = data[:len(data) - len(data) % INPUT_LOG_DTYPE.itemsize]
+    header = {"dev_type": InputDevType(dev_type), "client_mode": ClientMode(client_mode),
+              "steer_max": steer_max, "pedal_max": pedal_max}
+    return header, np.frombuffer(data, dtype=INPUT_LOG_DTYPE)
+
+
+class RecordingInput(InputDevice):
+    """
+    Wraps an input device and logs every event it sends before passing it on to the wizard. Every
+    other attribute (force feedback, value maps) comes from the wrapped device.
+    """
+
+    def __init__(self, device: InputDevice, dev_type: InputDevType, path: Union[Path, str]):
+        """
+        :param device: the device to record
+        :param dev_type: type of the device
+        :param path: the log file, overwritten
+        """
+        super().__init__(device.client_mode)
+        self.device: InputDevice = device
+        self.writer = InputLogWriter(path, dev_type, device.client_mode,
+                                     getattr(device, "steer_max", 0), getattr(device, "pedal_max", 0))
+        device.sink = self._record
+
+    def __getattr__(self, name: str):
+        # only called for the attributes this class does not have
+        return getattr(self.__dict__["device"], name)
+
+    def support_ff(self) -> bool:
+        return self.device.support_ff()
+
+    def events_handler(self) -> None:
+        # the events are read by the thread of the wrapped device
+        pass
+
+    def handle_pygame_events(self, events) -> None:
+        self.device.handle_pygame_events(events)
+
+    def start(self) -> None:
+        self.device.start()
+
+    def stop(self) -> None:
+        self.device.stop()
+        self.writer.close()
+
+    def _record(self, event_type: ControlEventType, dev: ClientMode, val: int, timestamp: float) -> None:
+        self.writer.write(event_type, dev, val, timestamp)
+        from umich_sim.wizard import Wizard
+        Wizard.get_instance().register_event(event_type, dev, val, timestamp)
+
+
+class ReplayInput(InputDevice):
+    """
+    Sends the events of an input log again, with the delays between them divided by speed
+    """
+    has_ff: bool = False
+
+    def __init__(self, path: Union[Path, str], client_mode: ClientMode = ClientMode.EGO, speed: float = 1.0):
+        """
+        :param path: the log file
+        :param client_mode: client mode of the device
+        :param speed: replay speed, 2 replays twice as fast, 0 sends every event without waiting
+        """
+        super().__init__(client_mode)
+        self.header, self.events = read_input_log(path)
+        self.speed: float = speed
+        self.steer_max: int = self.header["steer_max"]
+        self.pedal_max: int = self.header["pedal_max"]
+        # number of events sent, and whether the whole log was sent
+        self.sent: int = 0
+        self.finished = threading.Event()
+        self._thread.daemon = True
+
+    def SteerMap(self, val: int) -> float:
+        """same mapping as BaseWheel.SteerMap with the maximum of the recorded wheel"""
+        return val / self.steer_max * 2 - 1
+
+    def PedalMap(self, val: int) -> float:
+        """same mapping as BaseWheel.PedalMap with the maximum of the recorded pedals"""
+        return (self.pedal_max - val) / self.pedal_max
+
+    def events_handler(self) -> None:
+        if len(self.events) == 0:
+            self.finished.set()
+            return
+        # delays relative to the first event, in replay time
+        offsets = self.events["timestamp"] - self.events["timestamp"][0]
+        if self.speed > 0.0:
+            offsets = offsets / self.speed
+        start = time.monotonic()
+        for offset, event in zip(offsets.tolist(), self.events.tolist()):
+            if self._thread_terminating:
+                return
+            if self.speed > 0.0:
+                delay = start + offset - time.monotonic()
+                if delay > 0.0:
+                    time.sleep(delay)
+            _, event_type, dev, val = event
+            self._post(ControlEventType(event_type), val, time.monotonic(), ClientMode(dev))
+            self.sent += 1
+        self.finished.set()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Single thread reading every evdev input device
+
+The reactor waits on all the registered devices at once with selectors (epoll on linux) and lets a
+device read every event waiting on it when it becomes readable. Registering, unregistering and
+shutting down wake the reactor up through a pipe, so none of them waits for the next input event.
+
+A device that fails to read (unplugged) is closed and retried every rescan_interval seconds until
+its device node comes back. Devices must therefore be opened through a stable path, such as the ones
+in /dev/input/by-id.
+
+A device handled by the reactor provides:
+    fileno()        file descriptor to wait on
+    events_handler  read and dispatch the waiting events, raises OSError once unplugged
+    disconnect()    close the device after a failed read
+    reconnect()     try to open the device again, returns whether it worked
+"""
+
+import os
+import selectors
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Optional, Set, Tuple
+
+from umich_sim.base_logger import logger
+
+
+class InputReactor:
+    """
+    Reads the registered input devices on one thread. The thread starts with the first registered
+    device and ends once the last one is unregistered. The class is a singleton.
+    """
+    __instance = None
+
+    def __init__(self, rescan_interval: float = 1.0):
+        """
+        :param rescan_interval: seconds between two attempts to reopen an unplugged device
+        """
+        if InputReactor.__instance is None:
+            InputReactor.__instance = self
+        else:
+            raise Exception("Error: Reinitialization of InputReactor.")
+        self.rescan_interval: float = rescan_interval
+        self._lock = threading.Lock()
+        # (register or not, device, set once the reactor handled the command)
+        self._commands: Deque[Tuple[bool, Any, threading.Event]] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._wake_r: int = -1
+        self._wake_w: int = -1
+        # number of times a device became readable
+        self.batches: int = 0
+
+    @staticmethod
+    def get_instance() -> "InputReactor":
+        "get the instance of the singleton"
+        if InputReactor.__instance is None:
+            return InputReactor()
+        return InputReactor.__instance
+
+    def register(self, device: Any) -> None:
+        """
+        Start reading a device, starts the reactor thread if needed
+        :param device: the device
+        """
+        self._command(True, device)
+
+    def unregister(self, device: Any) -> None:
+        """
+        Stop reading a device, no event of the device is dispatched once this returns
+        :param device: the device
+        """
+        self._command(False, device)
+
+    def _command(self, register: bool, device: Any) -> None:
+        done = threading.Event()
+        with self._lock:
+            if self._thread is None:
+                if not register:
+                    return
+                self._wake_r, self._wake_w = os.pipe()
+                os.set_blocking(self._wake_r, False)
+                os.set_blocking(self._wake_w, False)
+                self._thread = threading.Thread(target=self._run, name="input-reactor", daemon=True)
+                self._commands.append((register, device, done))
+                self._thread.start()
+            else:
+                self._commands.append((register, device, done))
+                self._wake()
+            thread = self._thread
+        if threading.current_thread() is not thread:
+            done.wait()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            # the pipe is full, the reactor is woken up anyway
+            pass
+
+    def _run(self) -> None:
+        selector = selectors.DefaultSelector()
+        selector.register(self._wake_r, selectors.EVENT_READ, None)
+        devices: Set[Any] = set()
+        # unplugged devices, retried every rescan_interval
+        lost: Set[Any] = set()
+        next_rescan = 0.0
+        while True:
+            with self._lock:
+                while self._commands:
+                    register, device, done = self._commands.popleft()
+                    if register and device not in devices:
+                        devices.add(device)
+                        selector.register(device.fileno(), selectors.EVENT_READ, device)
+                    elif not register and device in devices:
+                        devices.discard(device)
+                        if device in lost:
+                            lost.discard(device)
+                        else:
+                            selector.unregister(device.fileno())
+                    done.set()
+                if not devices:
+                    # last device gone, the next register starts a new thread
+                    self._thread = None
+                    selector.close()
+                    os.close(self._wake_r)
+                    os.close(self._wake_w)
+                    return
+
+            timeout = max(0.0, next_rescan - time.monotonic()) if lost else None
+            for key, _ in selector.select(timeout):
+                if key.data is None:
+                    self._drain_wake()
+                    continue
+                device = key.data
+                self.batches += 1
+                try:
+                    device.events_handler()
+                except OSError as e:
+                    logger.warning(f"input device disconnected: {e}")
+                    selector.unregister(key.fd)
+                    device.disconnect()
+                    lost.add(device)
+                    next_rescan = time.monotonic() + self.rescan_interval
+
+            if lost and time.monotonic() >= next_rescan:
+                for device in list(lost):
+                    if device.reconnect():
+                        logger.info("input device reconnected")
+                        lost.discard(device)
+                        selector.register(device.fileno(), selectors.EVENT_READ, device)
+                next_rescan = time.monotonic() + self.rescan_interval
+
+    def _drain_wake(self) -> None:
+        try:
+            while os.read(self._wake_r, 512):
+                pass
+        except BlockingIOError:
+            pass
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
+import time
 from enum import IntEnum, auto
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 class InputDevType(IntEnum):
@@ -11,6 +12,7 @@ class InputDevType(IntEnum):
     G29 = auto()
     G27 = auto()
     KBD = auto()
+    REPLAY = auto()  # input log written by a recording device
 
 
 class ControlEventType(IntEnum):
@@ -102,3 +104,5 @@ class InputPacket:
     event_type: ControlEventType
     dev: ClientMode
     val: int
+    # time.monotonic() when the device thread created the packet
+    timestamp: float = field(default_factory=time.monotonic)
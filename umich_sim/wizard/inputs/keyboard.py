@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
+import time
+from typing import Sequence
 from .base_input_dev import InputDevice
 from .input_types import ClientMode, ControlEventType
 import pygame
-from umich_sim.wizard import Wizard
 from umich_sim.base_logger import logger
 
 
@@ -52,20 +53,35 @@ class KeyboardInput(InputDevice):
 
     def __init__(self, client_type: ClientMode = ClientMode.EGO):
         super().__init__(client_type)
+        # the keyboard has no thread, events are only handled between start and stop
+        self._thread_terminating = True
+
+    def start(self) -> None:
+        self._thread_terminating = False
+
+    def stop(self) -> None:
+        self._thread_terminating = True
 
     def events_handler(self) -> None:
-        while True:
-            # return if terminated
-            if self._thread_terminating:
-                return
-            event = pygame.event.wait()
+        """
+        Handle the keyboard events waiting in the pygame queue, for loops that do not drain it
+        """
+        self.handle_pygame_events(pygame.event.get((pygame.KEYDOWN, pygame.KEYUP)))
 
+    def handle_pygame_events(self, events: Sequence) -> None:
+        """
+        Send the key events drained by the main loop to the wizard
+        :param events: the pygame events of the frame
+        """
+        if self._thread_terminating:
+            return
+        timestamp = time.monotonic()
+        for event in events:
             # only handle keyboard event
-            if event.type not in [pygame.KEYDOWN, pygame.KEYUP]:
+            if event.type not in (pygame.KEYDOWN, pygame.KEYUP):
                 continue
 
             # get event type based on key map and send to wizard controller
             if event_key := KeyboardInput.KB_EVENT_MAP.get(event.key, None):
-                Wizard.get_instance().register_event(
-                    event_key, self.client_mode,
-                    1 if event.type == pygame.KEYDOWN else 0)
+                self._post(event_key, 1 if event.type == pygame.KEYDOWN else 0,
+                           timestamp)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency of the driver inputs
+
+Every InputPacket is stamped with time.monotonic() by the device thread that creates it. The ego
+vehicle records, for every kind of event, the time from the stamp to the apply_control call that
+carries its effect to carla. Latencies go into fixed log-spaced histograms, cheap enough to record
+on every tick and exportable as JSON.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, Union
+
+import numpy as np
+
+from umich_sim.wizard.inputs import ControlEventType
+
+# Events that change the control of the vehicle, the ones whose latency is measured
+CONTROL_EVENTS = frozenset({
+    ControlEventType.GAS, ControlEventType.BRAKE, ControlEventType.STEER, ControlEventType.CLUTCH,
+    ControlEventType.DEC_GEAR, ControlEventType.INC_GEAR,
+    ControlEventType.KB_GAS, ControlEventType.KB_BRAKE, ControlEventType.KB_LEFT,
+    ControlEventType.KB_RIGHT, ControlEventType.KB_TOGGLE_REVERSE,
+})
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies with log-spaced bins, from 10 us to 10 s
+    """
+    # bin edges in seconds, 20 bins per decade
+    EDGES = np.logspace(-5, 1, 6 * 20 + 1)
+
+    def __init__(self):
+        # counts[0] holds the latencies below the first edge, counts[-1] the ones above the last
+        self.counts = np.zeros(len(self.EDGES) + 1, dtype=np.int64)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[np.searchsorted(self.EDGES, seconds, side="right")] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        """
+        :param p: percentile, in [0, 100]
+        :return: upper edge of the bin holding the percentile (at most the maximum) in seconds, nan
+                 without samples
+        """
+        if self.count == 0:
+            return math.nan
+        rank = max(1, math.ceil(p / 100 * self.count))
+        i = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(float(self.EDGES[i]), self.max) if i < len(self.EDGES) else self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+
+class LatencyTracker:
+    """
+    Input latency histograms per event type. The class is a singleton.
+    """
+    __instance = None
+
+    def __init__(self):
+        if LatencyTracker.__instance is None:
+            LatencyTracker.__instance = self
+        else:
+            raise Exception("Error: Reinitialization of LatencyTracker.")
+        self.histograms: Dict[ControlEventType, LatencyHistogram] = {}
+
+    @staticmethod
+    def get_instance() -> "LatencyTracker":
+        "get the instance of the singleton"
+        if LatencyTracker.__instance is None:
+            return LatencyTracker()
+        return LatencyTracker.__instance
+
+    def record(self, event_type: ControlEventType, seconds: float) -> None:
+        """
+        Record the latency of an event
+        :param event_type: type of the event
+        :param seconds: time from the creation of the event to its application
+        """
+        if event_type not in self.histograms:
+            self.histograms[event_type] = LatencyHistogram()
+        self.histograms[event_type].record(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: count, mean, p50, p95, p99 and max in milliseconds, per event type name
+        """
+        return {
+            event_type.name: {
+                "count": histogram.count,
+                "mean": 1e3 * histogram.mean(),
+                "p50": 1e3 * histogram.percentile(50),
+                "p95": 1e3 * histogram.percentile(95),
+                "p99": 1e3 * histogram.percentile(99),
+                "max": 1e3 * histogram.max,
+            }
+            for event_type, histogram in sorted(self.histograms.items())
+        }
+
+    def export(self, path: Union[Path, str]) -> None:
+        """
+        Write the summary and the histograms as JSON
+        :param path: the JSON file
+        """
+        data = {
+            "edges_s": LatencyHistogram.EDGES.tolist(),
+            "summary_ms": self.summary(),
+            "counts": {event_type.name: histogram.counts.tolist()
+                       for event_type, histogram in sorted(self.histograms.items())},
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Mailbox of the input events waiting for the next tick of the wizard
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from umich_sim.wizard.inputs import ControlEventType, ClientMode, InputPacket
+
+# Events carrying the position of a continuous axis, only the latest one matters
+AXIS_EVENTS = frozenset({
+    ControlEventType.STEER, ControlEventType.GAS, ControlEventType.BRAKE, ControlEventType.CLUTCH
+})
+
+
+class InputMailbox:
+    """
+    Collects the input events posted by the input devices until the wizard ticks. Axis events keep
+    only their latest value per axis and device, the other events (buttons, keys) are all kept in
+    order. Posting and draining only use operations that are atomic in CPython (deque append and
+    popleft, dict item assignment and pop), so neither side takes a lock.
+    """
+
+    def __init__(self):
+        self._events: Deque[InputPacket] = deque()
+        self._axes: Dict[Tuple[ControlEventType, ClientMode], InputPacket] = {}
+        # number of axis events replaced by a newer one before being handled
+        self.coalesced: int = 0
+
+    def post(self, packet: InputPacket) -> None:
+        """
+        Add an event, called from the device threads
+        :param packet: the event
+        """
+        if packet.event_type in AXIS_EVENTS:
+            key = (packet.event_type, packet.dev)
+            if key in self._axes:
+                self.coalesced += 1
+            self._axes[key] = packet
+        else:
+            self._events.append(packet)
+
+    def drain(self) -> List[InputPacket]:
+        """
+        Take every event posted so far
+        :return: the discrete events in the order they were posted, followed by the latest event of
+                 every axis that moved
+        """
+        packets = []
+        events = self._events
+        while events:
+            packets.append(events.popleft())
+        for key in list(self._axes):
+            packet = self._axes.pop(key, None)
+            if packet is not None:
+                packets.append(packet)
+        return packets
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+from typing import Tuple
 import msgpackrpc
 from umich_sim.wizard.inputs import ClientMode
 from umich_sim.sim_config import ConfigPool, Config
@@ -47,3 +48,8 @@ class RPC:
     def get_wheel(self) -> float:
         "get the wheel information"
         return self.client.call("get_wheel")
+
+    def get_state(self) -> Tuple[ClientMode, float]:
+        "get the current driver and the wheel information in one call"
+        _, driver, wheel = self.client.call("get_state")
+        return ClientMode(driver), wheel
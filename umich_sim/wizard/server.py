@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Wizard state server
+
+Holds who is driving and the position of the racing wheel, shared by every connected client, and
+serves them over msgpack-rpc with the calls of umich_sim.wizard.rpc.RPC. get_state returns the whole
+state in one round trip. Every change bumps a version number, subscribe is a long poll that answers
+as soon as the state is newer than the version the caller already has, which lets the clients
+(umich_sim.wizard.sync.WizardSync) receive changes as they happen instead of polling.
+
+    python -m umich_sim.wizard.server --port 2003                 # on every interface
+    python -m umich_sim.wizard.server --host 127.0.0.1 --port 2003  # local clients only
+"""
+
+import argparse
+import threading
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import msgpackrpc
+from msgpackrpc.server import AsyncResult
+from msgpackrpc.transport import tcp
+from umich_sim.wizard.inputs import ClientMode
+
+
+class WizardState:
+    """
+    msgpack-rpc dispatcher of the wizard state, all the calls run on the thread of the server loop
+    """
+
+    def __init__(self, loop: msgpackrpc.Loop):
+        """
+        :param loop: loop of the server, used for the timeouts of the subscriptions
+        """
+        self._loop = loop
+        self._driver: int = int(ClientMode.EGO)
+        self._wheel: float = 0.0
+        self._version: int = 0
+        # subscriptions waiting for a change, with the handle of their timeout
+        self._waiting: List[Tuple[AsyncResult, object]] = []
+
+    def set_driver(self, driver: int) -> int:
+        """
+        Set the current driver
+        :param driver: ClientMode of the driver
+        :return: version of the state after the call
+        """
+        if int(driver) != self._driver:
+            self._driver = int(driver)
+            self._publish()
+        return self._version
+
+    def get_driver(self) -> int:
+        return self._driver
+
+    def set_wheel(self, pos: float) -> int:
+        """
+        Set the position of the racing wheel
+        :param pos: position of the wheel
+        :return: version of the state after the call
+        """
+        if float(pos) != self._wheel:
+            self._wheel = float(pos)
+            self._publish()
+        return self._version
+
+    def get_wheel(self) -> float:
+        return self._wheel
+
+    def get_state(self) -> list:
+        """
+        Get the driver and the wheel position in a single call
+        :return: [version, driver, wheel]
+        """
+        return self._state()
+
+    def subscribe(self, version: int, timeout: float):
+        """
+        Wait for the state to change
+        :param version: version of the state the caller has
+        :param timeout: seconds after which the current state is returned even if unchanged
+        :return: [version, driver, wheel], as soon as the version differs from the given one
+        """
+        if version != self._version:
+            return self._state()
+        result = AsyncResult()
+        handle = self._loop._ioloop.call_later(timeout, self._expire, result)
+        self._waiting.append((result, handle))
+        return result
+
+    def _state(self) -> list:
+        return [self._version, self._driver, self._wheel]
+
+    def _publish(self) -> None:
+        """bump the version and answer every waiting subscription"""
+        self._version += 1
+        waiting, self._waiting = self._waiting, []
+        state = self._state()
+        for result, handle in waiting:
+            self._loop._ioloop.remove_timeout(handle)
+            result.set_result(state)
+
+    def _expire(self, result: AsyncResult) -> None:
+        self._waiting = [item for item in self._waiting if item[0] is not result]
+        result.set_result(self._state())
+
+
+class _ServerTransport(tcp.ServerTransport):
+    """msgpack-rpc server transport listening on the host of its address, the stock one ignores it"""
+
+    def listen(self, server):
+        self._server = server
+        self._mp_server = tcp.MessagePackServer(self, io_loop=server._loop._ioloop, encodings=self._encodings)
+        self._mp_server.listen(self._address.port, self._address.host)
+
+
+class WizardServer:
+    """
+    Runs a WizardState server in the background or on the calling thread
+    """
+
+    def __init__(self, port: int = 2003, host: str = "0.0.0.0"):
+        """
+        :param port: port to listen on
+        :param host: address to listen on, every interface by default since the ego client and the
+                     wizard usually run on different machines (server_addr of the config)
+        """
+        self.port: int = port
+        self.host: str = host
+        self.state: Optional[WizardState] = None
+        self._loop: Optional[msgpackrpc.Loop] = None
+        self._server: Optional[msgpackrpc.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def start(self) -> "WizardServer":
+        """start serving in the background, returns once the server listens"""
+        self._thread = threading.Thread(target=self._run, name="wizard-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def serve_forever(self) -> None:
+        """serve on the calling thread until stop is called from another thread"""
+        self._run()
+
+    def stop(self) -> None:
+        """stop the server and wait for its thread"""
+        if self._loop is None:
+            return
+        self._loop._ioloop.add_callback(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        # the loop is created on the thread that runs it
+        self._loop = msgpackrpc.Loop()
+        self.state = WizardState(self._loop)
+        self._server = msgpackrpc.Server(self.state, loop=self._loop,
+                                         builder=SimpleNamespace(ServerTransport=_ServerTransport))
+        self._server.listen(msgpackrpc.Address(self.host, self.port))
+        self._ready.set()
+        self._server.start()
+        self._server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Wizard state server")
+    parser.add_argument("--host", default="0.0.0.0",
+                        help="address to listen on, every interface by default")
+    parser.add_argument("--port", type=int, default=2003, help="port to listen on (rpc_port of the config)")
+    args = parser.parse_args()
+    server = WizardServer(args.port, args.host)
+    print(f"wizard server listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
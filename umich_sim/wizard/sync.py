@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Local mirror of the wizard state
+
+The control loop reads who is driving and the wheel position from a local copy and never waits on
+the network. A subscriber thread keeps the copy up to date with the changes the server pushes
+(long-polling umich_sim.wizard.server.WizardState.subscribe), a sender thread uploads the local
+changes. Wheel positions set faster than they can be sent are coalesced, only the latest one is sent.
+Both threads reconnect on their own, a server that restarted (its version went back) is followed.
+"""
+
+import threading
+import time
+from typing import Optional
+
+import msgpackrpc
+from umich_sim.wizard.inputs import ClientMode
+from umich_sim.sim_config import ConfigPool, Config
+from umich_sim.base_logger import logger
+
+
+class WizardSync:
+    """
+    Non-blocking drop-in for umich_sim.wizard.rpc.RPC. The class is a singleton.
+    """
+    __instance = None
+
+    def __init__(self, addr: Optional[str] = None, port: Optional[int] = None,
+                 poll_timeout: float = 1.0, retry_interval: float = 0.5):
+        """
+        :param addr: address of the server, server_addr of the config by default
+        :param port: port of the server, rpc_port of the config by default
+        :param poll_timeout: seconds a subscription waits on the server for a change
+        :param retry_interval: seconds to wait before reconnecting after a network error
+        """
+        if WizardSync.__instance is None:
+            WizardSync.__instance = self
+        else:
+            raise Exception("Error: Reinitialization of WizardSync")
+        config: Config = ConfigPool.get_config()
+        self.address = msgpackrpc.Address(addr if addr is not None else config.server_addr,
+                                          port if port is not None else config.rpc_port)
+        self.poll_timeout: float = poll_timeout
+        self.retry_interval: float = retry_interval
+
+        self._cond = threading.Condition()
+        # mirror of the server state, version -1 until the first state is received
+        self.version: int = -1
+        self._driver: ClientMode = ClientMode.EGO
+        self._wheel: float = 0.0
+        # local changes not sent yet
+        self._out_driver: Optional[ClientMode] = None
+        self._out_wheel: Optional[float] = None
+        # states older than the last one the sender got back are stale
+        self._min_version: int = 0
+        # number of wheel positions sent, and replaced by a newer one before being sent
+        self.sent: int = 0
+        self.coalesced: int = 0
+        self._closed: bool = False
+
+        self._threads = [
+            threading.Thread(target=self._subscribe_loop, name="wizard-subscriber", daemon=True),
+            threading.Thread(target=self._send_loop, name="wizard-sender", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @staticmethod
+    def get_instance() -> "WizardSync":
+        "get the instance of the singleton"
+        if WizardSync.__instance is None:
+            return WizardSync()
+        return WizardSync.__instance
+
+    def set_driver(self, driver: ClientMode):
+        """
+        Set the current driver, returns immediately
+        :param driver: who is driving
+        """
+        with self._cond:
+            self._driver = self._out_driver = ClientMode(driver)
+            self._cond.notify_all()
+
+    def get_driver(self) -> ClientMode:
+        "Get the current driver from the local mirror"
+        return self._driver
+
+    def set_wheel(self, pos: float):
+        """
+        upload the wheel position to the server, returns immediately
+        Input: pos: position of the racing wheel
+        """
+        with self._cond:
+            if self._out_wheel is not None:
+                self.coalesced += 1
+            self._wheel = self._out_wheel = float(pos)
+            self._cond.notify_all()
+
+    def get_wheel(self) -> float:
+        "get the wheel position from the local mirror"
+        return self._wheel
+
+    def wait_synced(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the mirror received a state from the server and every local change was sent
+        :param timeout: seconds to wait, None waits forever
+        :return: whether the mirror is in sync
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.version >= self._min_version and self.version >= 0
+                and self._out_driver is None and self._out_wheel is None, timeout)
+
+    def close(self):
+        """
+        stop the threads, local changes not sent yet are lost. Returns within poll_timeout + retry_interval,
+        threads still waiting on the network are left to finish on their own
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        deadline = time.monotonic() + self.poll_timeout + self.retry_interval
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        WizardSync.__instance = None
+
+    def _client(self) -> msgpackrpc.Client:
+        # msgpack-rpc does not fail the calls of a connection that dropped, they time out (in steps of
+        # one second). Subscriptions are answered after poll_timeout, a short margin detects a server
+        # that went away early.
+        return msgpackrpc.Client(self.address, timeout=self.poll_timeout + 2, reconnect_limit=1)
+
+    def _subscribe_loop(self):
+        client = None
+        while not self._closed:
+            try:
+                if client is None:
+                    client = self._client()
+                version, driver, wheel = client.call("subscribe", self.version, self.poll_timeout)
+            except Exception as e:
+                logger.warning(f"wizard subscription failed: {e}")
+                client = self._close_client(client)
+                self._wait_retry()
+                continue
+            with self._cond:
+                if version < self.version:
+                    # the server restarted and its versions started over, versions acknowledged by
+                    # the previous server mean nothing any more
+                    self._min_version = 0
+                if version < self._min_version:
+                    continue
+                self.version = version
+                # local changes win until the server has them
+                if self._out_driver is None:
+                    self._driver = ClientMode(driver)
+                if self._out_wheel is None:
+                    self._wheel = wheel
+                self._cond.notify_all()
+        self._close_client(client)
+
+    def _send_loop(self):
+        client = None
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._out_driver is not None
+                                    or self._out_wheel is not None)
+                if self._closed:
+                    break
+                driver, wheel = self._out_driver, self._out_wheel
+            try:
+                if client is None:
+                    client = self._client()
+                version = self._min_version
+                if driver is not None:
+                    version = client.call("set_driver", int(driver))
+                if wheel is not None:
+                    version = client.call("set_wheel", wheel)
+                    self.sent += 1
+            except Exception as e:
+                logger.warning(f"wizard update failed: {e}")
+                client = self._close_client(client)
+                self._wait_retry()
+                continue
+            with self._cond:
+                self._min_version = max(self._min_version, version)
+                # keep the changes made while sending
+                if self._out_driver is driver:
+                    self._out_driver = None
+                if self._out_wheel is wheel:
+                    self._out_wheel = None
+                self._cond.notify_all()
+        self._close_client(client)
+
+    def _wait_retry(self) -> None:
+        """wait retry_interval before reconnecting, close interrupts the wait"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed, self.retry_interval)
+
+    @staticmethod
+    def _close_client(client: Optional[msgpackrpc.Client]) -> None:
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+        return None
@@ -1,10 +1,8 @@
 #!/usr/bin/env python3
-from threading import Lock
-from queue import Queue
-from typing import Callable
-from umich_sim.sim_config import ConfigPool
+from typing import Callable, Optional
 from umich_sim.wizard.inputs import ControlEventType, ClientMode, InputPacket
-import pygame
+from umich_sim.wizard.mailbox import InputMailbox
+from umich_sim.wizard.latency import CONTROL_EVENTS
 from umich_sim.base_logger import logger
 
 
@@ -30,6 +28,7 @@ class Wizard:
             raise Exception("Error: Reinitialization of Controller")
         # objects and references
         from umich_sim.sim_backend.carla_modules import World, HUD, EgoVehicle
+        from umich_sim.sim_config import ConfigPool
         self.__world: World = World.get_instance()
         # TODO: change this
         if not ConfigPool.get_config().gui_mode:
@@ -41,9 +40,8 @@ class Wizard:
         self.driver: ClientMode = ClientMode.EGO
         self.__stopping = False
 
-        # events handling
-        self.__event_lock: Lock = Lock()
-        self.__events_queue: Queue = Queue()
+        # events handling, axis events are coalesced until the next tick
+        self.__mailbox: InputMailbox = InputMailbox()
         self.__event_handlers: dict = {
             ControlEventType.CHANGE_WEATHER:
                 onpush(self.__world.next_weather),
@@ -121,16 +119,30 @@ class Wizard:
         return Wizard.__instance
 
     def register_event(self, event_type: ControlEventType, dev: ClientMode,
-                       val: int) -> None:
+                       val: int, timestamp: Optional[float] = None) -> None:
         """
         Register the input event into the event queue
         Inputs:
             event_type: What type of actions is required to take
             dev: From which device
             val: Additional data field
+            timestamp: time.monotonic() when the device received the event, now by default
         """
-        with self.__event_lock:
-            self.__events_queue.put_nowait(InputPacket(event_type, dev, val))
+        if timestamp is None:
+            self.__mailbox.post(InputPacket(event_type, dev, val))
+        else:
+            self.__mailbox.post(InputPacket(event_type, dev, val, timestamp))
+
+    def pump_events(self) -> None:
+        """
+        Drain the pygame event queue, called once per frame by the main loop. Key events go to the
+        input device of the vehicle, closing the window stops the program.
+        """
+        import pygame
+        events = pygame.event.get()
+        self.__vehicle.joystick_wheel.handle_pygame_events(events)
+        if any(event.type == pygame.QUIT for event in events):
+            self.stop()
 
     def tick(self):
         """
@@ -141,12 +153,13 @@ class Wizard:
 
     def handle_events(self):
         """
-        Handle events registered in the previous loop
+        Handle events registered in the previous loop, at most one update per axis
         """
-        while not self.__events_queue.empty():
-            with self.__event_lock:
-                pac: InputPacket = self.__events_queue.get_nowait()
-                self.__event_handlers[pac.event_type](pac)
+        for pac in self.__mailbox.drain():
+            self.__event_handlers[pac.event_type](pac)
+            if pac.event_type in CONTROL_EVENTS:
+                # the latency is measured when the vehicle applies the control
+                self.__vehicle.mark_input(pac)
 
     def stop(self):
         """